@@ -7,6 +7,7 @@ from flask import Flask, request, jsonify, Response
 from .response import ModelResponse
 from .model import LabelStudioMLBase
 from .exceptions import exception_handler
+from .metrics import stage_timings
 
 logger = logging.getLogger(__name__)
 
@@ -61,32 +62,35 @@ def _predict():
     params = data.get('params', {})
     context = params.pop('context', {})
 
-    model = MODEL_CLASS(project_id=project_id,
-                        label_config=label_config)
+    with stage_timings.measure('predict.init'):
+        model = MODEL_CLASS(project_id=project_id,
+                            label_config=label_config)
 
     # model.use_label_config(label_config)
 
-    response = model.predict(tasks, context=context, **params)
+    with stage_timings.measure('predict.model'):
+        response = model.predict(tasks, context=context, **params)
 
-    # if there is no model version we will take the default
-    if isinstance(response, ModelResponse):
-        if not response.has_model_version():
-            mv = model.model_version
-            if mv:
-                response.set_version(str(mv))
-        else:
-            response.update_predictions_version()
+    with stage_timings.measure('predict.serialize'):
+        # if there is no model version we will take the default
+        if isinstance(response, ModelResponse):
+            if not response.has_model_version():
+                mv = model.model_version
+                if mv:
+                    response.set_version(str(mv))
+            else:
+                response.update_predictions_version()
 
-        response = response.model_dump()
+            response = response.model_dump()
 
-    res = response
-    if res is None:
-        res = []
+        res = response
+        if res is None:
+            res = []
 
-    if isinstance(res, dict):
-        res = response.get("predictions", response)
+        if isinstance(res, dict):
+            res = response.get("predictions", response)
 
-    return jsonify({'results': res})
+        return jsonify({'results': res})
 
 
 @_server.route('/setup', methods=['POST'])
@@ -122,8 +126,10 @@ def webhook():
         return jsonify({'status': 'Unknown event'}), 200
     project_id = str(data['project']['id'])
     label_config = data['project']['label_config']
-    model = MODEL_CLASS(project_id, label_config=label_config)
-    result = model.fit(event, data)
+    with stage_timings.measure('webhook.init'):
+        model = MODEL_CLASS(project_id, label_config=label_config)
+    with stage_timings.measure('webhook.fit'):
+        result = model.fit(event, data)
 
     try:
         response = jsonify({'result': result, 'status': 'ok'})
@@ -146,7 +152,7 @@ def health():
 @_server.route('/metrics', methods=['GET'])
 @exception_handler
 def metrics():
-    return jsonify({})
+    return jsonify({'stages': stage_timings.snapshot()})
 
 
 @_server.errorhandler(FileNotFoundError)
@@ -0,0 +1,5 @@
+"""Load-testing harness for LabelStudioMLBase backends.
+
+Run `python -m label_studio_ml.benchmark --help` for usage.
+"""
+from .runner import BenchmarkConfig, run_benchmark, compare_results  # noqa: F401
@@ -0,0 +1,66 @@
+"""Command line entry point of the benchmark harness.
+
+Example:
+    python -m label_studio_ml.benchmark label_studio_ml/examples/yolo/model.py:YOLO \
+        --control RectangleLabels --requests 200 --concurrency 8 --output results/yolo-rect.json
+"""
+import argparse
+import json
+import logging
+import sys
+
+from .configs import CONTROL_TYPES
+from .runner import BenchmarkConfig, compare_results, run_benchmark, save_result
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description='Load test a Label Studio ML backend')
+    parser.add_argument('script', help='Model class in the following format: /my/script/path.py:ModelClass')
+    parser.add_argument('--control', dest='control_type', default='RectangleLabels', choices=CONTROL_TYPES,
+                        help='Control type used to generate the labeling config and tasks')
+    parser.add_argument('--endpoint', default='predict', choices=['predict', 'webhook'],
+                        help='Endpoint to drive')
+    parser.add_argument('--requests', type=int, default=100, help='Number of measured requests')
+    parser.add_argument('--concurrency', type=int, default=4, help='Number of concurrent clients')
+    parser.add_argument('--tasks-per-request', type=int, default=1, help='Tasks in one /predict request')
+    parser.add_argument('--warmup', type=int, default=2, help='Number of requests sent before measuring')
+    parser.add_argument('--images', type=int, default=16, help='Number of synthetic images')
+    parser.add_argument('--image-size', default='640x480', help='Synthetic image size, WIDTHxHEIGHT')
+    parser.add_argument('--video', help='Video file used for VideoRectangle and TimelineLabels')
+    parser.add_argument('--output', help='Save the report as JSON to this path')
+    parser.add_argument('--baseline', help='Previous JSON report to compare with')
+    parser.add_argument('--log-level', default='WARNING', help='Logging level')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    logging.basicConfig(level=args.log_level)
+    width, height = (int(v) for v in args.image_size.lower().split('x'))
+
+    result = run_benchmark(BenchmarkConfig(
+        script=args.script,
+        control_type=args.control_type,
+        endpoint=args.endpoint,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        tasks_per_request=args.tasks_per_request,
+        warmup=args.warmup,
+        images=args.images,
+        image_width=width,
+        image_height=height,
+        video=args.video,
+    ))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            result['baseline_change'] = compare_results(result, json.load(f))
+    if args.output:
+        save_result(result, args.output)
+
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
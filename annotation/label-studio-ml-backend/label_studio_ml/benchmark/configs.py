@@ -0,0 +1,165 @@
+"""Synthetic labeling configs, tasks, annotations and media for the benchmark harness.
+One entry per YOLO control type, see label_studio_ml/examples/yolo/control_models.
+"""
+import os
+import random
+
+from typing import Dict, List
+
+from PIL import Image, ImageDraw
+
+
+IMAGE_CONFIGS = {
+    'RectangleLabels': """
+    <View>
+      <Image name="image" value="$image"/>
+      <RectangleLabels name="label" toName="image" model_score_threshold="0.25">
+        <Label value="Person" predicted_values="person"/>
+        <Label value="Car" predicted_values="car,truck"/>
+      </RectangleLabels>
+    </View>
+    """,
+    'RectangleLabelsObb': """
+    <View>
+      <Image name="image" value="$image"/>
+      <RectangleLabels name="label" toName="image" model_score_threshold="0.1" model_obb="true">
+        <Label value="plane" predicted_values="plane,helicopter"/>
+        <Label value="vehicle" predicted_values="large vehicle,small vehicle"/>
+      </RectangleLabels>
+    </View>
+    """,
+    'PolygonLabels': """
+    <View>
+      <Image name="image" value="$image"/>
+      <PolygonLabels name="label" toName="image" model_score_threshold="0.25">
+        <Label value="Person" predicted_values="person"/>
+        <Label value="Car" predicted_values="car,truck"/>
+      </PolygonLabels>
+    </View>
+    """,
+    'Choices': """
+    <View>
+      <Image name="image" value="$image"/>
+      <Choices name="label" toName="image" model_score_threshold="0.25">
+        <Choice value="Car" predicted_values="racer,sports_car,wagon"/>
+        <Choice value="Airplane" predicted_values="airliner,warplane"/>
+      </Choices>
+    </View>
+    """,
+    'KeyPointLabels': """
+    <View>
+      <Image name="image" value="$image"/>
+      <KeyPointLabels name="keypoints" toName="image" model_score_threshold="0.5" model_add_bboxes="false">
+        <Label value="nose" predicted_values="person" model_index="0"/>
+        <Label value="left_eye" predicted_values="person" model_index="1"/>
+        <Label value="right_eye" predicted_values="person" model_index="2"/>
+      </KeyPointLabels>
+    </View>
+    """,
+}
+
+VIDEO_CONFIGS = {
+    'VideoRectangle': """
+    <View>
+      <Labels name="videoLabels" toName="video" allowEmpty="true">
+        <Label value="person"/>
+      </Labels>
+      <Video name="video" value="$video" framerate="25.0"/>
+      <VideoRectangle name="box" toName="video"/>
+    </View>
+    """,
+    'TimelineLabels': """
+    <View>
+      <TimelineLabels name="videoLabels" toName="video" model_score_threshold="0.01">
+        <Label value="Car" predicted_values="snowmobile,racer,cab"/>
+      </TimelineLabels>
+      <Video name="video" value="$video" framerate="25.0"/>
+    </View>
+    """,
+}
+
+CONTROL_TYPES = list(IMAGE_CONFIGS) + list(VIDEO_CONFIGS)
+
+
+def is_video_control(control_type: str) -> bool:
+    return control_type in VIDEO_CONFIGS
+
+
+def get_label_config(control_type: str) -> str:
+    if control_type in IMAGE_CONFIGS:
+        return IMAGE_CONFIGS[control_type]
+    if control_type in VIDEO_CONFIGS:
+        return VIDEO_CONFIGS[control_type]
+    raise ValueError(f'Unknown control type "{control_type}", use one of: {", ".join(CONTROL_TYPES)}')
+
+
+def write_images(directory: str, count: int, size=(640, 480), seed: int = 0) -> List[str]:
+    """Generate JPEG images with random shapes, returns file names relative to directory"""
+    rnd = random.Random(seed)
+    names = []
+    for i in range(count):
+        image = Image.new('RGB', size, color=tuple(rnd.randint(0, 255) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(rnd.randint(1, 8)):
+            x0, y0 = rnd.randint(0, size[0] - 2), rnd.randint(0, size[1] - 2)
+            x1, y1 = rnd.randint(x0 + 1, size[0]), rnd.randint(y0 + 1, size[1])
+            draw.rectangle((x0, y0, x1, y1), fill=tuple(rnd.randint(0, 255) for _ in range(3)))
+        name = f'image_{i}.jpg'
+        image.save(os.path.join(directory, name), quality=90)
+        names.append(name)
+    return names
+
+
+def make_tasks(control_type: str, media_urls: List[str], count: int, start_id: int = 1) -> List[Dict]:
+    """Build tasks cycling over the media urls"""
+    key = 'video' if is_video_control(control_type) else 'image'
+    return [
+        {'id': start_id + i, 'data': {key: media_urls[i % len(media_urls)]}}
+        for i in range(count)
+    ]
+
+
+def make_annotation_result(control_type: str) -> List[Dict]:
+    """Synthetic annotation result used in webhook payloads"""
+    if control_type in ('RectangleLabels', 'RectangleLabelsObb'):
+        return [{
+            'from_name': 'label', 'to_name': 'image', 'type': 'rectanglelabels',
+            'original_width': 640, 'original_height': 480,
+            'value': {'x': 10, 'y': 10, 'width': 30, 'height': 20, 'rotation': 0, 'rectanglelabels': ['Car']},
+        }]
+    if control_type == 'PolygonLabels':
+        return [{
+            'from_name': 'label', 'to_name': 'image', 'type': 'polygonlabels',
+            'original_width': 640, 'original_height': 480,
+            'value': {'points': [[10, 10], [40, 10], [40, 30]], 'polygonlabels': ['Car']},
+        }]
+    if control_type == 'Choices':
+        return [{'from_name': 'label', 'to_name': 'image', 'type': 'choices', 'value': {'choices': ['Car']}}]
+    if control_type == 'KeyPointLabels':
+        return [{
+            'from_name': 'keypoints', 'to_name': 'image', 'type': 'keypointlabels',
+            'original_width': 640, 'original_height': 480,
+            'value': {'x': 50, 'y': 50, 'width': 1, 'keypointlabels': ['nose']},
+        }]
+    if control_type == 'VideoRectangle':
+        return [{
+            'from_name': 'box', 'to_name': 'video', 'type': 'videorectangle',
+            'value': {'framesCount': 25, 'duration': 1, 'sequence': [
+                {'frame': 1, 'enabled': True, 'x': 10, 'y': 10, 'width': 30, 'height': 20, 'rotation': 0, 'time': 0.04}
+            ], 'labels': ['person']},
+        }]
+    if control_type == 'TimelineLabels':
+        return [{
+            'from_name': 'videoLabels', 'to_name': 'video', 'type': 'timelinelabels',
+            'value': {'ranges': [{'start': 1, 'end': 10}], 'timelinelabels': ['Car']},
+        }]
+    raise ValueError(f'Unknown control type "{control_type}"')
+
+
+def make_webhook_payload(control_type: str, task: Dict, project_id: int = 1) -> Dict:
+    return {
+        'action': 'ANNOTATION_CREATED',
+        'project': {'id': project_id, 'label_config': get_label_config(control_type)},
+        'task': task,
+        'annotation': {'id': task['id'], 'task': task['id'], 'result': make_annotation_result(control_type)},
+    }
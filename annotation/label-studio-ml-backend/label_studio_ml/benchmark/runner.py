@@ -0,0 +1,312 @@
+"""Benchmark runner: starts a backend via init_app, serves synthetic media over HTTP
+and drives /predict and /webhook at a configurable concurrency.
+"""
+import functools
+import importlib
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+from werkzeug.serving import make_server
+
+from label_studio_ml.api import init_app
+from label_studio_ml.metrics import StageTimings, stage_timings
+from label_studio_ml.model import LabelStudioMLBase
+
+from .configs import (
+    get_label_config, is_video_control, make_tasks, make_webhook_payload, write_images
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkConfig:
+    # model class in "path/to/model.py:ClassName" format
+    script: str
+    control_type: str = 'RectangleLabels'
+    endpoint: str = 'predict'  # predict or webhook
+    requests: int = 100
+    concurrency: int = 4
+    tasks_per_request: int = 1
+    warmup: int = 2
+    images: int = 16
+    image_width: int = 640
+    image_height: int = 480
+    # path to a video file, required for the video control types
+    video: Optional[str] = None
+
+
+def load_model_class(script: str):
+    """Import a LabelStudioMLBase subclass from "path/to/model.py:ClassName".
+    The script directory is added to sys.path, so example-local imports keep working.
+    """
+    path, _, class_name = script.partition(':')
+    path = os.path.abspath(path)
+    directory, module_name = os.path.split(os.path.splitext(path)[0])
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    module = importlib.import_module(module_name)
+    if class_name:
+        return getattr(module, class_name)
+    for value in vars(module).values():
+        if isinstance(value, type) and issubclass(value, LabelStudioMLBase) and value is not LabelStudioMLBase:
+            return value
+    raise ValueError(f'No LabelStudioMLBase subclass found in {path}')
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, q in [0, 100]"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def get_rss_mb() -> Optional[float]:
+    """Current resident set size of this process (the backend runs in-process)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+
+def get_peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class _ServerThread(threading.Thread):
+
+    def __init__(self, server):
+        super().__init__(daemon=True)
+        self.server = server
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class MediaServer:
+    """Static file server standing in for Label Studio media storage"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.timings = StageTimings()
+        timings = self.timings
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                with timings.measure('media.serve'):
+                    super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=directory))
+        self._thread = _ServerThread(self._server)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._thread.stop()
+        self._server.server_close()
+
+
+class BackendServer:
+    """ML backend app started through init_app on a free local port"""
+
+    def __init__(self, model_class):
+        app = init_app(model_class=model_class)
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self._thread = _ServerThread(self._server)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._thread.stop()
+        self._server.server_close()
+
+
+class RSSSampler(threading.Thread):
+    """Samples RSS in the background to catch the peak of the measured run"""
+
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+
+    def run(self):
+        while not self._stop.is_set():
+            rss = get_rss_mb()
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+
+
+def _build_payloads(config: BenchmarkConfig, media_url: str, media_names: List[str]) -> List[Dict]:
+    label_config = get_label_config(config.control_type)
+    urls = [f'{media_url}/{name}' for name in media_names]
+    payloads = []
+    total = config.requests + config.warmup
+    tasks = make_tasks(config.control_type, urls, total * config.tasks_per_request)
+    for i in range(total):
+        chunk = tasks[i * config.tasks_per_request:(i + 1) * config.tasks_per_request]
+        if config.endpoint == 'webhook':
+            payloads.append(make_webhook_payload(config.control_type, chunk[0]))
+        else:
+            payloads.append({
+                'tasks': chunk,
+                'label_config': label_config,
+                'project': '1.1000000000',
+                'params': {'context': {}},
+            })
+    return payloads
+
+
+def _send(session: requests.Session, url: str, payload: Dict):
+    start = time.perf_counter()
+    try:
+        response = session.post(url, json=payload, timeout=600)
+        ok = response.status_code < 400
+    except requests.RequestException as exc:
+        logger.warning(f'Request failed: {exc}')
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_benchmark(config: BenchmarkConfig) -> Dict:
+    """Run one benchmark and return the report as a JSON-serializable dict"""
+    if config.endpoint not in ('predict', 'webhook'):
+        raise ValueError(f'Unknown endpoint "{config.endpoint}", use "predict" or "webhook"')
+    model_class = load_model_class(config.script)
+
+    media_dir = tempfile.mkdtemp(prefix='ls-ml-benchmark-')
+    try:
+        if is_video_control(config.control_type):
+            if not config.video:
+                raise ValueError(f'{config.control_type} needs a video file, pass it with --video')
+            shutil.copy(config.video, os.path.join(media_dir, os.path.basename(config.video)))
+            media_names = [os.path.basename(config.video)]
+        else:
+            media_names = write_images(media_dir, config.images, size=(config.image_width, config.image_height))
+
+        with MediaServer(media_dir) as media, BackendServer(model_class) as backend:
+            payloads = _build_payloads(config, media.url, media_names)
+            url = f'{backend.url}/{config.endpoint}'
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=config.concurrency)
+            session.mount('http://', adapter)
+
+            # warmup requests load models and fill caches, they are not measured
+            for payload in payloads[:config.warmup]:
+                _send(session, url, payload)
+            stage_timings.reset()
+            media.timings.reset()
+
+            rss_before = get_rss_mb()
+            sampler = RSSSampler()
+            sampler.start()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+                results = list(executor.map(lambda p: _send(session, url, p), payloads[config.warmup:]))
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+
+            stages = session.get(f'{backend.url}/metrics').json().get('stages', {})
+            stages.update(media.timings.snapshot())
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        'config': asdict(config),
+        'model_class': model_class.__name__,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'requests': len(results),
+        'errors': sum(1 for _, ok in results if not ok),
+        'elapsed_sec': elapsed,
+        'throughput_rps': len(results) / elapsed if elapsed else None,
+        'throughput_tasks_per_sec': len(results) * config.tasks_per_request / elapsed if elapsed else None,
+        'latency_sec': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else None,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+        },
+        'rss_mb': {
+            'before': rss_before,
+            'max_sampled': max(sampler.samples) if sampler.samples else None,
+            'peak_process': get_peak_rss_mb(),
+        },
+        'stages': stages,
+    }
+
+
+def compare_results(current: Dict, baseline: Dict) -> Dict:
+    """Relative change of the main metrics against a baseline report: (current - baseline) / baseline.
+    Positive latency and rss changes mean slower/bigger, a positive throughput change means faster.
+    """
+    def change(a, b):
+        if a is None or not b:
+            return None
+        return (a - b) / b
+
+    return {
+        'latency_p50': change(current['latency_sec']['p50'], baseline['latency_sec']['p50']),
+        'latency_p95': change(current['latency_sec']['p95'], baseline['latency_sec']['p95']),
+        'latency_p99': change(current['latency_sec']['p99'], baseline['latency_sec']['p99']),
+        'throughput_rps': change(current['throughput_rps'], baseline['throughput_rps']),
+        'rss_max_sampled': change(current['rss_mb']['max_sampled'], baseline['rss_mb']['max_sampled']),
+    }
+
+
+def save_result(result: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
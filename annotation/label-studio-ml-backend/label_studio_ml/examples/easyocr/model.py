@@ -1,15 +1,16 @@
 import boto3
-import io
 import json
 import easyocr
 import logging
 import os
+import numpy as np
 from uuid import uuid4
 
 from typing import List, Dict, Optional
 from label_studio_ml.model import LabelStudioMLBase
+from label_studio_ml.ocr_engine import BaseRecognizer, OCREngine, OCRJob, OCR_WORKERS
 from label_studio_ml.response import ModelResponse
-from label_studio_ml.utils import get_image_size, DATA_UNDEFINED_NAME
+from label_studio_ml.utils import DATA_UNDEFINED_NAME
 from label_studio_sdk._extensions.label_studio_tools.core.utils.io import get_local_path
 from botocore.exceptions import ClientError
 from urllib.parse import urlparse
@@ -17,6 +18,46 @@ from urllib.parse import urlparse
 logger = logging.getLogger(__name__)
 
 
+class EasyOCRRecognizer(BaseRecognizer):
+    """Warm easyocr reader living in an OCR worker process"""
+
+    def __init__(self, lang_list, gpu, height_ths):
+        self.lang_list = lang_list
+        self.gpu = gpu
+        self.height_ths = height_ths
+        self.lang = ','.join(lang_list)
+        self.reader = None
+
+    def __getstate__(self):
+        # the reader is never sent to the workers, each one creates its own in setup()
+        return {**self.__dict__, 'reader': None}
+
+    def setup(self):
+        self.reader = easyocr.Reader(
+            lang_list=self.lang_list,
+            gpu=self.gpu,
+            download_enabled=True,
+            detector=True,
+            recognizer=True,
+        )
+
+    def recognize(self, image, regions):
+        # easyocr reads file paths as RGB, the PIL image is RGB already and is passed as is
+        array = np.asarray(image)
+        results = []
+        for region in regions:
+            dx, dy = 0, 0
+            crop = array
+            if region is not None:
+                x, y, w, h = (int(round(v)) for v in region)
+                crop, dx, dy = array[y:y + h, x:x + w], x, y
+            results.append([
+                ([[float(p[0]) + dx, float(p[1]) + dy] for p in points], text, float(score))
+                for points, text, score in self.reader.readtext(crop, height_ths=self.height_ths)
+            ])
+        return results
+
+
 class EasyOCR(LabelStudioMLBase):
     """Custom ML Backend model
     """
@@ -41,18 +82,18 @@ class EasyOCR(LabelStudioMLBase):
     MODEL_DIR = os.getenv('MODEL_DIR', '.')
 
     _label_map = {}
-    _model = None
+    _engine = None
 
     def _lazy_init(self):
-        if self._model is not None:
+        if EasyOCR._engine is not None:
             return
 
-        self.model = easyocr.Reader(
-            lang_list=self.LANG_LIST,
-            gpu=True if 'cuda' in self.DEVICE else False,
-            download_enabled=True,
-            detector=True,
-            recognizer=True,
+        gpu = 'cuda' in self.DEVICE
+        # readers are initialized once per worker process, CUDA requires spawned workers
+        EasyOCR._engine = OCREngine(
+            EasyOCRRecognizer(self.LANG_LIST, gpu=gpu, height_ths=self.HEIGHT_THS),
+            workers=int(os.getenv('OCR_WORKERS', 1 if gpu else OCR_WORKERS)),
+            start_method='spawn' if gpu else None,
         )
 
     def setup(self):
@@ -85,32 +126,36 @@ class EasyOCR(LabelStudioMLBase):
                 logger.warning(f'Can\'t generate presigned URL for {image_url}. Reason: {exc}')
         return image_url
 
-    def predict_single(self, task):
-        logger.debug('Task data: %s', task['data'])
-        from_name_poly, to_name, value = self.get_first_tag_occurence('Polygon', 'Image')
-        from_name_labels, _, _ = self.get_first_tag_occurence('Polygon', 'Image')
-        from_name_trans, _, _ = self.get_first_tag_occurence('TextArea', 'Image')
-        labels = self.label_interface.labels
-        labels = sum([list(l) for l in labels], [])
-        if len(labels) > 1:
-            logger.warning('More than one label in the tag. Only the first one will be used: %s', labels[0])
-        label = labels[0]
-
+    def _fetch_image(self, task, value):
         image_url = self._get_image_url(task, value)
         cache_dir = os.path.join(self.MODEL_DIR, '.file-cache')
         os.makedirs(cache_dir, exist_ok=True)
         logger.debug(f'Using cache dir: {cache_dir}')
-        image_path = get_local_path(
+        return get_local_path(
             image_url,
             cache_dir=cache_dir,
             hostname=self.LABEL_STUDIO_HOST,
             access_token=self.LABEL_STUDIO_ACCESS_TOKEN,
             task_id=task.get('id')
         )
-        model_results = self.model.readtext(image_path, height_ths=self.HEIGHT_THS)
+
+    def predict_single(self, task, ocr_result):
+        logger.debug('Task data: %s', task['data'])
+        from_name_poly, to_name, value = self.get_first_tag_occurence('Polygon', 'Image')
+        from_name_labels, _, _ = self.get_first_tag_occurence('Polygon', 'Image')
+        from_name_trans, _, _ = self.get_first_tag_occurence('TextArea', 'Image')
+        labels = self.label_interface.labels
+        labels = sum([list(l) for l in labels], [])
+        if len(labels) > 1:
+            logger.warning('More than one label in the tag. Only the first one will be used: %s', labels[0])
+        label = labels[0]
+
+        if ocr_result is None:
+            return
+        model_results = ocr_result.results[0]
         if not model_results:
             return
-        img_width, img_height = get_image_size(image_path)
+        img_width, img_height = ocr_result.width, ocr_result.height
         result = []
         all_scores = []
         for res in model_results:
@@ -172,13 +217,20 @@ class EasyOCR(LabelStudioMLBase):
     def predict(self, tasks: List[Dict], context: Optional[Dict] = None, **kwargs) -> ModelResponse:
 
         self._lazy_init()
+        _, _, value = self.get_first_tag_occurence('Polygon', 'Image')
+        # images are fetched in parallel and recognized by the pool of warm readers
+        ocr_results = self._engine.run([
+            OCRJob(fetch=lambda task=task: self._fetch_image(task, value))
+            for task in tasks
+        ])
+
         predictions = []
-        for task in tasks:
+        for task, ocr_result in zip(tasks, ocr_results):
             # TODO: implement is_skipped() function
             # if is_skipped(task):
             #     continue
 
-            prediction = self.predict_single(task)
+            prediction = self.predict_single(task, ocr_result)
             if prediction:
                 predictions.append(prediction)
 
@@ -7,10 +7,8 @@ from typing import List, Dict, Optional
 from uuid import uuid4
 from label_studio_ml.model import LabelStudioMLBase, ModelResponse
 from label_studio_sdk._extensions.label_studio_tools.core.utils.io import get_local_path
-from groundingdino.util.inference import load_model, load_image, predict, annotate
-from groundingdino.util import box_ops
-
-from typing import Tuple, List
+from label_studio_ml.zero_shot_detection import ZeroShotDetectionEngine
+from groundingdino.util.inference import load_model
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +29,8 @@ TEXT_THRESHOLD = os.environ.get("TEXT_THRESHOLD", 0.25)
 device = "cuda" if torch.cuda.is_available() else "cpu"
 logger.info(f"Using device {device}")
 
+detection_engine = ZeroShotDetectionEngine(groundingdino_model, device=device)
+
 
 class GroundingDINO(LabelStudioMLBase):
 
@@ -130,14 +130,11 @@ class GroundingDINO(LabelStudioMLBase):
 
     def predict(self, tasks: List[Dict], context: Optional[Dict] = None, **kwargs) -> List[Dict]:
 
-        assert len(tasks) == 1, "Only one task is supported for now"
-        task = tasks[0]
-
         prompt_control = self._get_prompt(context)
         prompt = prompt_control['prompt']
         if not prompt:
             logger.warning("Prompt not found")
-            ModelResponse(predictions=[])
+            return ModelResponse(predictions=[])
 
         from_name_r, to_name_r, value = self.get_first_tag_occurence('RectangleLabels', 'Image')
 
@@ -145,75 +142,68 @@ class GroundingDINO(LabelStudioMLBase):
         BOX_THRESHOLD = float(thresh_controls['box_threshold'])
         TEXT_THRESHOLD = float(thresh_controls['text_threshold'])
 
-        all_points = []
-        all_scores = []
-        all_lengths = []
-        raw_img_path = task['data'][value]
-
-        try:
-            img_path = get_local_path(
-                raw_img_path,
-                task_id=task.get('id')
-            )
-        except Exception as e:
-            logger.error(f"Error getting image path: {e}")
-            return ModelResponse(predictions=[])
-
-        src, img = load_image(img_path)
-
-        boxes, logits, _ = predict(
-            model=groundingdino_model,
-            image=img,
-            caption=prompt,
+        # tasks with unreachable images get empty predictions, the rest are detected in batches
+        img_paths = {}
+        for i, task in enumerate(tasks):
+            try:
+                img_paths[i] = get_local_path(
+                    task['data'][value],
+                    task_id=task.get('id')
+                )
+            except Exception as e:
+                logger.error(f"Error getting image path for task {task.get('id')}: {e}")
+
+        detections = dict(zip(img_paths, detection_engine.predict(
+            list(img_paths.values()),
+            prompt=prompt,
             box_threshold=BOX_THRESHOLD,
-            text_threshold=TEXT_THRESHOLD,
-            device=device
-        )
-
-        H, W, _ = src.shape
-
-        boxes_xyxy = box_ops.box_cxcywh_to_xyxy(boxes) * torch.Tensor([W, H, W, H])
-
-        points = boxes_xyxy.cpu().numpy()
-
-        for point, logit in zip(points, logits):
-            all_points.append(point)
-            all_scores.append(logit)
-            all_lengths.append((H, W))
-
-        predictions = self.get_results(all_points, all_scores, all_lengths, from_name_r, to_name_r)
-
-        if not context:
-            if prompt:
-                # prompt restored from cache - show it in the UI
-                predictions['result'].append({
-                    'from_name': prompt_control['from_name'],
-                    'to_name': to_name_r,
-                    'type': 'textarea',
-                    'value': {
-                        'text': [prompt]
-                    }
-                })
-            if thresh_controls['from_name_box']:
-                predictions['result'].append({
-                    'from_name': thresh_controls['from_name_box'],
-                    'to_name': to_name_r,
-                    'type': 'number',
-                    'value': {
-                        'number': BOX_THRESHOLD
-                    }
-                })
-            if thresh_controls['from_name_text']:
-                predictions['result'].append({
-                    'from_name': thresh_controls['from_name_text'],
-                    'to_name': to_name_r,
-                    'type': 'number',
-                    'value': {
-                        'number': TEXT_THRESHOLD
-                    }
-                })
-
-        return ModelResponse(predictions=[predictions])
+            text_threshold=TEXT_THRESHOLD
+        )))
+
+        all_predictions = []
+        for i in range(len(tasks)):
+            if i not in detections:
+                all_predictions.append({'result': [], 'score': 0})
+                continue
+
+            detection = detections[i]
+            lengths = [(detection.height, detection.width)] * len(detection.boxes)
+            predictions = self.get_results(detection.boxes, detection.scores, lengths, from_name_r, to_name_r)
+
+            if not context:
+                self._add_controls(predictions, prompt_control, thresh_controls, to_name_r, prompt)
+            all_predictions.append(predictions)
+
+        return ModelResponse(predictions=all_predictions)
+
+    def _add_controls(self, predictions, prompt_control, thresh_controls, to_name_r, prompt):
+        # prompt and thresholds restored from cache - show them in the UI
+        predictions['result'].append({
+            'from_name': prompt_control['from_name'],
+            'to_name': to_name_r,
+            'type': 'textarea',
+            'value': {
+                'text': [prompt]
+            }
+        })
+        if thresh_controls['from_name_box']:
+            predictions['result'].append({
+                'from_name': thresh_controls['from_name_box'],
+                'to_name': to_name_r,
+                'type': 'number',
+                'value': {
+                    'number': float(thresh_controls['box_threshold'])
+                }
+            })
+        if thresh_controls['from_name_text']:
+            predictions['result'].append({
+                'from_name': thresh_controls['from_name_text'],
+                'to_name': to_name_r,
+                'type': 'number',
+                'value': {
+                    'number': float(thresh_controls['text_threshold'])
+                }
+            })
 
     def fit(self, event, data, **additional_params):
         logger.debug(f'Data received: {data}')
@@ -1,12 +1,11 @@
-import io
 import logging
 import os
 
 import boto3
 import pytesseract as pt
-from PIL import Image, ImageOps
 
 from label_studio_ml.model import LabelStudioMLBase
+from label_studio_ml.ocr_engine import BaseRecognizer, OCREngine, OCRJob
 
 logger = logging.getLogger(__name__)
 global OCR_config
@@ -29,38 +28,54 @@ S3_TARGET = boto3.resource('s3',
                            verify=False)
 
 
+class TesseractRecognizer(BaseRecognizer):
+    """Runs pytesseract on image crops inside the OCR worker processes"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lang = config
+
+    def recognize(self, image, regions):
+        results = []
+        for region in regions:
+            crop = image
+            if region is not None:
+                x, y, w, h = region
+                crop = image.crop((x, y, x + w, y + h))
+            results.append(pt.image_to_string(crop, config=self.config).strip())
+        return results
+
+
+# pytesseract is single-threaded per call, so recognition runs in a pool of processes
+ocr_engine = OCREngine(TesseractRecognizer(OCR_config))
+
+
 class BBOXOCR(LabelStudioMLBase):
     MODEL_DIR = os.environ.get('MODEL_DIR', '.')
 
     def setup(self):
         self.set("model_version", f'{self.__class__.__name__}-v0.0.1')
 
-    def load_image(self, img_path_url, task_id):
-        # load an s3 image, this is very basic demonstration code
+    def fetch_image(self, img_path_url, task_id):
+        # fetch an s3 image, this is very basic demonstration code
         # you may need to modify to fit your own needs
         if img_path_url.startswith("s3:"):
             bucket_name = img_path_url.split("/")[2]
             key = "/".join(img_path_url.split("/")[3:])
 
             obj = S3_TARGET.Object(bucket_name, key).get()
-            data = obj['Body'].read()
-            image = Image.open(io.BytesIO(data))
-            image = ImageOps.exif_transpose(image)
-            return image
+            return obj['Body'].read()
         else:
             cache_dir = os.path.join(self.MODEL_DIR, '.file-cache')
             os.makedirs(cache_dir, exist_ok=True)
             logger.debug(f'Using cache dir: {cache_dir}')
-            filepath = self.get_local_path(
+            return self.get_local_path(
                 img_path_url,
                 cache_dir=cache_dir,
                 ls_access_token=LABEL_STUDIO_ACCESS_TOKEN,
                 ls_host=LABEL_STUDIO_HOST,
                 task_id=task_id
             )
-            image = Image.open(filepath)
-            image = ImageOps.exif_transpose(image)
-            return image
 
     def predict(self, tasks, **kwargs):
         # extract task metadata: labels, from_name, to_name and other
@@ -76,8 +91,6 @@ class BBOXOCR(LabelStudioMLBase):
             if not context["result"]:
                 return []
 
-            image = self.load_image(img_path_url, task.get('id'))
-
             result = context.get('result')[-1]
             meta = self._extract_meta({**task, **result})
             x = meta["x"] * meta["original_width"] / 100
@@ -85,11 +98,16 @@ class BBOXOCR(LabelStudioMLBase):
             w = meta["width"] * meta["original_width"] / 100
             h = meta["height"] * meta["original_height"] / 100
 
-            result_text = pt.image_to_string(
-                image.crop((x, y, x + w, y + h)),
-                config=OCR_config
-            ).strip()
-            meta["text"] = result_text
+            # repeated clicks on the same region are served from the engine cache
+            ocr_result = ocr_engine.run([OCRJob(
+                fetch=lambda: self.fetch_image(img_path_url, task.get('id')),
+                regions=[(x, y, w, h)],
+                # cache lookup by URL, cached regions are returned without downloading the image
+                source_key=img_path_url,
+            )])[0]
+            if ocr_result is None:
+                return []
+            meta["text"] = ocr_result.results[0]
             temp = {
                 "original_width": meta["original_width"],
                 "original_height": meta["original_height"],
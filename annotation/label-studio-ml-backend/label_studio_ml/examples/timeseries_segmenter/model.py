@@ -34,6 +34,7 @@ class TimeSeriesSegmenter(LabelStudioMLBase):
     TRAIN_EPOCHS = int(os.getenv("TRAIN_EPOCHS", 1000))
     SEQUENCE_SIZE = int(os.getenv("SEQUENCE_SIZE", 50))
     HIDDEN_SIZE = int(os.getenv("HIDDEN_SIZE", 64))
+    PREDICT_BATCH_SIZE = int(os.getenv("PREDICT_BATCH_SIZE", 256))
     MODEL_DIR = os.getenv("MODEL_DIR", ".")
     
     # New parameters for handling imbalanced data
@@ -181,14 +182,19 @@ class TimeSeriesSegmenter(LabelStudioMLBase):
         logger.debug(f"Task {task_id}: Input shape for prediction: {X.shape}")
         
         # Get predictions
-        with torch.no_grad():
-            probs = model.predict(X)  # Shape: (seq_len, n_classes)
-            if len(probs) == 0:
-                logger.warning(f"Task {task_id}: No predictions generated")
-                return {}
-                
-            labels_idx = torch.argmax(probs, dim=1).cpu().numpy()
-            scores = torch.max(probs, dim=1)[0].cpu().numpy()
+        probs = model.predict(X, batch_size=self.PREDICT_BATCH_SIZE)  # Shape: (seq_len, n_classes)
+        return self._build_prediction(task, df, time_col, probs, params)
+
+    def _build_prediction(
+        self, task: Dict, df: pd.DataFrame, time_col: str, probs: torch.Tensor, params: Dict
+    ) -> Dict:
+        task_id = task.get("id", "unknown")
+        if len(probs) == 0:
+            logger.warning(f"Task {task_id}: No predictions generated")
+            return {}
+
+        labels_idx = torch.argmax(probs, dim=1).cpu().numpy()
+        scores = torch.max(probs, dim=1)[0].cpu().numpy()
 
         # Map predictions back to original labels
         df["pred_label_idx"] = labels_idx
@@ -442,11 +448,25 @@ class TimeSeriesSegmenter(LabelStudioMLBase):
         params = self._get_labeling_params()
         model = self._get_model(len(params["channels"]), len(params["all_labels"]), project_id=project_id)
         
-        predictions = []
+        # Read all series first so windows of every task are predicted in shared batches
+        frames = []
         for i, task in enumerate(tasks):
-            logger.debug(f"Processing prediction {i+1}/{len(tasks)}")
-            pred = self._predict_task(task, model, params)
-            predictions.append(pred)
+            logger.debug(f"Reading task data {i+1}/{len(tasks)}")
+            df, time_col = self._read_csv(task, task["data"][params["value"]], params)
+            frames.append((df, time_col))
+
+        sequences = [
+            df[params["channels"]].values.astype(np.float32) for df, _ in frames if not df.empty
+        ]
+        probs_iter = iter(model.predict_batch(sequences, batch_size=self.PREDICT_BATCH_SIZE))
+
+        predictions = []
+        for task, (df, time_col) in zip(tasks, frames):
+            if df.empty:
+                logger.warning(f"Task {task.get('id', 'unknown')}: No data found for prediction")
+                predictions.append({})
+                continue
+            predictions.append(self._build_prediction(task, df, time_col, next(probs_iter), params))
             
         successful_predictions = len([p for p in predictions if p])
         logger.info(f"Prediction completed: {successful_predictions}/{len(tasks)} tasks had results")
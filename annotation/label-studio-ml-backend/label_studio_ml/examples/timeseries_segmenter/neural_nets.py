@@ -256,11 +256,7 @@ class TimeSeriesLSTM(BaseNN):
                 chunks = padded.unsqueeze(0)
         else:
             # Create overlapping windows
-            indices = list(range(0, seq_len - sequence_size + 1, step_size))
-            # Ensure we cover the end of the sequence
-            if indices[-1] + sequence_size < seq_len:
-                indices.append(seq_len - sequence_size)
-            
+            indices = self._window_starts(seq_len, step_size)
             chunks = torch.stack([sequence[i:i + sequence_size] for i in indices])
 
         # Handle labels if provided
@@ -279,69 +275,141 @@ class TimeSeriesLSTM(BaseNN):
                     padded_labels[start_idx:start_idx + seq_len] = labels
                 label_chunks = padded_labels.unsqueeze(0)
             else:
-                indices = list(range(0, seq_len - sequence_size + 1, step_size))
-                if indices[-1] + sequence_size < seq_len:
-                    indices.append(seq_len - sequence_size)
-                    
+                indices = self._window_starts(seq_len, step_size)
                 label_chunks = torch.stack([labels[i:i + sequence_size] for i in indices])
 
         return chunks, label_chunks
 
-    def predict_with_overlap_averaging(self, sequence: Union[List, np.ndarray, torch.Tensor]) -> torch.Tensor:
+    def _window_starts(self, seq_len: int, step_size: int) -> List[int]:
+        """Start offsets of the overlapping windows covering a sequence of seq_len steps.
+        The last window is aligned to the end of the sequence so every timestep is covered.
+        """
+        starts = list(range(0, seq_len - self.sequence_size + 1, step_size))
+        if starts[-1] + self.sequence_size < seq_len:
+            starts.append(seq_len - self.sequence_size)
+        return starts
+
+    def _pad_short_sequence(self, sequence: torch.Tensor) -> Tuple[torch.Tensor, int]:
+        """Reflect-pad a sequence shorter than the window size.
+        Returns:
+            padded: Single window of shape (sequence_size, input_size)
+            offset: Position of the first original timestep inside the window
+        """
+        seq_len = len(sequence)
+        pad_size = self.sequence_size - seq_len
+        if seq_len > 1:
+            offset = pad_size // 2 + pad_size % 2
+            padded = torch.cat([
+                sequence.flip(0)[:offset],
+                sequence,
+                sequence.flip(0)[:pad_size // 2]
+            ])
+            # Reflection can't fill the window if the sequence is much shorter than it
+            if len(padded) == self.sequence_size:
+                return padded, offset
+        padded = torch.zeros(self.sequence_size, sequence.shape[-1], dtype=sequence.dtype)
+        offset = pad_size // 2
+        padded[offset:offset + seq_len] = sequence
+        return padded, offset
+
+    def _iter_windows(self, sequences: List[torch.Tensor], step_size: int):
+        """Yield (sequence index, start, window) for every window of every sequence.
+        Windows of long sequences are strided views into the original tensor (no copies),
+        short sequences yield a single padded window with a negative start offset.
+        """
+        for seq_idx, sequence in enumerate(sequences):
+            seq_len = len(sequence)
+            if seq_len == 0:
+                continue
+            if seq_len < self.sequence_size:
+                padded, offset = self._pad_short_sequence(sequence)
+                yield seq_idx, -offset, padded
+                continue
+            # unfold gives (n_windows, input_size, sequence_size) views over the same storage
+            windows = sequence.unfold(0, self.sequence_size, step_size).transpose(1, 2)
+            starts = self._window_starts(seq_len, step_size)
+            for i, start in enumerate(starts):
+                if i < len(windows):
+                    yield seq_idx, start, windows[i]
+                else:
+                    # Tail window aligned to the end of the sequence
+                    yield seq_idx, start, sequence[start:start + self.sequence_size]
+
+    def predict_batch(
+        self,
+        sequences: List[Union[List, np.ndarray, torch.Tensor]],
+        batch_size: int = 256,
+        overlap_ratio: float = 0.5,
+    ) -> List[torch.Tensor]:
+        """Predict several sequences at once with overlapping windows and overlap averaging.
+        Windows of all sequences are packed into fixed-size batches, so memory usage depends on
+        batch_size and not on the number or length of sequences. Probabilities are accumulated
+        into preallocated per-sequence buffers and averaged over the number of covering windows.
+        Args:
+            sequences: List of input sequences, each of shape (seq_len, input_size)
+            batch_size: Maximum number of windows passed to the network at once
+            overlap_ratio: Overlap ratio between windows (0.5 = 50% overlap)
+        Returns:
+            List of per-timestep class probabilities, one (seq_len, output_size) tensor per sequence
+        """
+        sequences = [
+            torch.as_tensor(np.asarray(s, dtype=np.float32)) if isinstance(s, (list, np.ndarray))
+            else s.float().cpu()
+            for s in sequences
+        ]
+        step_size = max(1, int(self.sequence_size * (1 - overlap_ratio)))
+
+        # Preallocated accumulators, the only buffers proportional to the sequence length
+        predictions = [torch.zeros(len(s), self.output_size, device=self.device) for s in sequences]
+        counts = [torch.zeros(len(s), device=self.device) for s in sequences]
+        offsets = torch.arange(self.sequence_size, device=self.device)
+
+        def flush(batch):
+            seq_ids, starts, windows = zip(*batch)
+            chunk = torch.stack(windows).to(self.device)
+            probs = torch.softmax(self(chunk), dim=-1)  # Shape: (n_windows, seq_size, n_classes)
+            seq_ids = torch.tensor(seq_ids, device=self.device)
+            starts = torch.tensor(starts, device=self.device)
+            for seq_idx in seq_ids.unique().tolist():
+                mask = seq_ids == seq_idx
+                positions = (starts[mask].unsqueeze(1) + offsets).reshape(-1)
+                window_probs = probs[mask].reshape(-1, self.output_size)
+                # Short sequences are padded, drop the positions that fall outside of them
+                valid = (positions >= 0) & (positions < len(sequences[seq_idx]))
+                predictions[seq_idx].index_add_(0, positions[valid], window_probs[valid])
+                counts[seq_idx].index_add_(
+                    0, positions[valid], torch.ones_like(positions[valid], dtype=counts[seq_idx].dtype)
+                )
+
+        self.eval()
+        with torch.inference_mode():
+            batch = []
+            for item in self._iter_windows(sequences, step_size):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+
+        return [
+            p / c.clamp(min=1).unsqueeze(-1) if len(p) else torch.tensor([])
+            for p, c in zip(predictions, counts)
+        ]
+
+    def predict_with_overlap_averaging(
+        self, sequence: Union[List, np.ndarray, torch.Tensor], batch_size: int = 256
+    ) -> torch.Tensor:
         """Predict with overlapping windows and average predictions for overlapping regions.
         Args:
             sequence: Input sequence data
+            batch_size: Maximum number of windows passed to the network at once
         Returns:
             Predictions for each timestep
         """
         if len(sequence) == 0:
             return torch.tensor([])
-
-        # Convert to tensor
-        if isinstance(sequence, (list, np.ndarray)):
-            sequence = torch.tensor(sequence, dtype=torch.float32)
-
-        sequence = sequence.to(self.device)
-        self.eval()
-        
-        with torch.no_grad():
-            # Get windowed data with overlap
-            chunks, _ = self.preprocess_sequence(sequence, overlap_ratio=0.5)
-            chunks = chunks.to(self.device)
-            
-            # Predict on all chunks
-            chunk_predictions = self(chunks)  # Shape: (n_chunks, seq_size, n_classes)
-            chunk_predictions = torch.softmax(chunk_predictions, dim=-1)
-            
-            # Average overlapping predictions
-            seq_len = len(sequence)
-            sequence_size = self.sequence_size
-            step_size = max(1, int(sequence_size * 0.5))  # 50% overlap
-            
-            # Initialize prediction accumulator
-            predictions = torch.zeros(seq_len, self.output_size, device=self.device)
-            counts = torch.zeros(seq_len, device=self.device)
-            
-            # Handle short sequences
-            if seq_len < sequence_size:
-                pred = chunk_predictions[0]  # Single chunk
-                start_idx = (sequence_size - seq_len) // 2
-                predictions = pred[start_idx:start_idx + seq_len]
-            else:
-                # Accumulate predictions from overlapping windows
-                indices = list(range(0, seq_len - sequence_size + 1, step_size))
-                if indices[-1] + sequence_size < seq_len:
-                    indices.append(seq_len - sequence_size)
-                
-                for i, start_idx in enumerate(indices):
-                    end_idx = start_idx + sequence_size
-                    predictions[start_idx:end_idx] += chunk_predictions[i]
-                    counts[start_idx:end_idx] += 1
-                
-                # Average the predictions
-                predictions = predictions / counts.unsqueeze(-1)
-        
-        return predictions
+        return self.predict_batch([sequence], batch_size=batch_size)[0]
 
     def evaluate_metrics(self, dataloader, threshold=0.5):
         """Evaluate model performance using multiclass metrics optimized for imbalanced data."""
@@ -543,9 +611,9 @@ class TimeSeriesLSTM(BaseNN):
 
         return metrics
 
-    def predict(self, sequence):
+    def predict(self, sequence, batch_size=256):
         """Predict labels for input sequence using overlap averaging."""
-        return self.predict_with_overlap_averaging(sequence)
+        return self.predict_with_overlap_averaging(sequence, batch_size=batch_size)
 
     @classmethod
     def load_model(cls, path) -> "TimeSeriesLSTM":
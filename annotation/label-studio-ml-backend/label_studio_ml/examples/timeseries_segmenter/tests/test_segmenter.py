@@ -499,6 +499,36 @@ class TestTimeSeriesSegmenter:
         assert predictions.shape[1] == 3   # Number of classes
         logger.info("✓ Windowing functionality test passed")
 
+    def test_batched_overlap_averaging(self):
+        """Test streaming batched prediction over several sequences.
+
+        This test validates:
+        - Small inference batches give the same probabilities as one large batch
+        - Several sequences of different lengths (including short ones) are predicted in one call
+        - Averaged probabilities remain valid distributions for every timestep
+        """
+        logger.info("=== Testing batched overlap averaging ===")
+        model = TimeSeriesLSTM(
+            input_size=2,
+            output_size=3,
+            sequence_size=10,
+            hidden_size=16,
+            num_layers=1
+        )
+        sequences = [
+            np.random.randn(length, 2).astype(np.float32) for length in (37, 3, 10, 123)
+        ]
+
+        batched = model.predict_batch(sequences, batch_size=4)
+        assert [len(p) for p in batched] == [37, 3, 10, 123]
+
+        for sequence, probs in zip(sequences, batched):
+            single = model.predict(sequence, batch_size=1024)
+            assert single.shape == (len(sequence), 3)
+            assert np.allclose(probs.cpu().numpy(), single.cpu().numpy(), atol=1e-5)
+            assert np.allclose(probs.sum(dim=1).cpu().numpy(), 1.0, atol=1e-5)
+        logger.info("✓ Batched overlap averaging test passed")
+
     def test_api_integration(self, client, temp_model_dir):
         """Test Flask API endpoints and web service functionality.
         
@@ -2,6 +2,8 @@ import os
 import logging
 import json
 
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from tqdm import tqdm
 from argparse import ArgumentParser
 from model import YOLO
@@ -11,6 +13,14 @@ from label_studio_ml.response import ModelResponse
 LABEL_STUDIO_URL = os.getenv("LABEL_STUDIO_URL", "http://localhost:8080")
 LABEL_STUDIO_API_KEY = os.getenv("LABEL_STUDIO_API_KEY", "your_api_key")
 PROJECT_ID = os.getenv("LABEL_STUDIO_PROJECT_ID", "1")
+# number of tasks in one model.predict() call
+BATCH_SIZE = int(os.getenv("CLI_BATCH_SIZE", 32))
+# number of predictions in one import request to Label Studio
+UPLOAD_CHUNK_SIZE = int(os.getenv("CLI_UPLOAD_CHUNK_SIZE", 1000))
+# number of threads downloading media of the next batch
+PREFETCH_WORKERS = int(os.getenv("CLI_PREFETCH_WORKERS", 8))
+# number of tasks in one page requested from Label Studio
+PAGE_SIZE = int(os.getenv("CLI_PAGE_SIZE", 500))
 
 logger = logging.getLogger(__name__)
 
@@ -33,52 +43,295 @@ def arg_parser():
     parser.add_argument(
         "--tasks",
         type=str,
-        default="tasks.json",
+        default=None,
         help="Path to tasks JSON file with list of ids or task datas. Example: tasks.json\n"
              "String with ids separated by comma: if you provide task ids, "
-             "task data will be downloaded automatically from the Label Studio instance. Example: 1,2,3",
+             "task data will be downloaded automatically from the Label Studio instance. Example: 1,2,3\n"
+             "If not set, all project tasks are streamed from the Label Studio instance page by page",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, help="Number of tasks predicted at once"
+    )
+    parser.add_argument(
+        "--upload-chunk-size",
+        type=int,
+        default=UPLOAD_CHUNK_SIZE,
+        help="Number of predictions uploaded to Label Studio in one request",
+    )
+    parser.add_argument(
+        "--prefetch-workers",
+        type=int,
+        default=PREFETCH_WORKERS,
+        help="Number of threads downloading media of the next batch",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help="Number of tasks in one page requested from Label Studio",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Path to the checkpoint file used to resume interrupted runs. "
+             "Default: yolo_cli_checkpoint_<project>.json",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Predict tasks even if they already have predictions of the current model version",
     )
     return parser.parse_args()
 
 
+def _get(item, key, default=None):
+    """Read a field from a task or prediction returned either as a dict or as an SDK object"""
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+def iter_batches(items, batch_size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class Checkpoint:
+    """Ids of tasks whose predictions are uploaded, stored in a JSON file after every upload.
+    The checkpoint is reset if the project or the model version changes.
+    """
+
+    def __init__(self, path, project_id, model_version):
+        self.path = path
+        self.project_id = project_id
+        self.model_version = model_version
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if (
+                data.get("project") == project_id
+                and data.get("model_version") == model_version
+            ):
+                self.done = set(data.get("done", []))
+                logger.info(f"Resuming from checkpoint {path}: {len(self.done)} tasks done")
+            else:
+                logger.info(f"Checkpoint {path} is for another project or model version, ignoring it")
+
+    def __contains__(self, task_id):
+        return task_id in self.done
+
+    def update(self, task_ids):
+        self.done.update(task_ids)
+        # write to a temporary file first, so an interrupted run never leaves a broken checkpoint
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "project": self.project_id,
+                    "model_version": self.model_version,
+                    "done": sorted(self.done),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class PredictionUploader:
+    """Collects predictions and imports them into the project in large chunks.
+    One chunk is uploaded in background while the next batches are predicted.
+    """
+
+    def __init__(self, ls, project_id, chunk_size, checkpoint):
+        self.ls = ls
+        self.project_id = project_id
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.predictions = []
+        self.task_ids = []
+        self.uploaded = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def add(self, task_ids, predictions):
+        self.task_ids += task_ids
+        self.predictions += predictions
+        if len(self.predictions) >= self.chunk_size:
+            self._submit()
+
+    def flush(self):
+        self._submit()
+        self._wait()
+        self._executor.shutdown()
+
+    def _submit(self):
+        # keep at most one upload in flight
+        self._wait()
+        if not self.task_ids:
+            return
+        task_ids, predictions = self.task_ids, self.predictions
+        self.task_ids, self.predictions = [], []
+        self._pending = (task_ids, self._executor.submit(self._upload, predictions))
+
+    def _upload(self, predictions):
+        if predictions:
+            self.ls.projects.import_predictions(id=self.project_id, request=predictions)
+        return len(predictions)
+
+    def _wait(self):
+        if self._pending is None:
+            return
+        task_ids, future = self._pending
+        self._pending = None
+        try:
+            self.uploaded += future.result()
+        except Exception as e:
+            logger.error(f"Failed to upload predictions for {len(task_ids)} tasks: {e}")
+            return
+        self.checkpoint.update(task_ids)
+
+
 class LabelStudioMLPredictor:
     def __init__(self, ls_url, ls_api_key):
         self.ls = LabelStudio(base_url=ls_url, api_key=ls_api_key)
         logger.info(f"Successfully connected to Label Studio: {ls_url}")
 
-    def run(self, project, tasks):
+    def run(
+        self,
+        project,
+        tasks=None,
+        batch_size=BATCH_SIZE,
+        upload_chunk_size=UPLOAD_CHUNK_SIZE,
+        prefetch_workers=PREFETCH_WORKERS,
+        page_size=PAGE_SIZE,
+        checkpoint=None,
+        overwrite=False,
+    ):
         # initialize Label Studio SDK client
         ls = self.ls
         project = ls.projects.get(id=project)
         logger.info(f"Project is retrieved: {project.id}")
 
-        tasks = self.prepare_tasks(ls, tasks)
+        if tasks:
+            tasks = self.prepare_tasks(ls, tasks)
+            total = len(tasks)
+        else:
+            tasks = self.stream_tasks(ls, project.id, page_size)
+            total = _get(project, "task_number")
 
         # load YOLO model
         # TODO: use get_all_classes_inherited_LabelStudioMLBase to detect model classes
         model = YOLO(project_id=str(project.id), label_config=project.label_config)
-        logger.info(f"YOLO ML backend is created")
-
-        # predict and send prediction to Label Studio
-        for task in tqdm(tasks, desc="Predict tasks"):
-            response = model.predict([task])
-            predictions = self.postprocess_response(model, response, task)
-
-            # send predictions to Label Studio
-            for prediction in predictions:
-                ls.predictions.create(
-                    task=task["id"],
-                    score=prediction.get("score", 0),
-                    model_version=prediction.get("model_version", "none"),
-                    result=prediction["result"],
+        model_version = str(model.model_version)
+        control_models = model.detect_control_models()
+        logger.info(f"YOLO ML backend is created, model version: {model_version}")
+
+        checkpoint = Checkpoint(
+            checkpoint or f"yolo_cli_checkpoint_{project.id}.json", project.id, model_version
+        )
+        uploader = PredictionUploader(ls, project.id, upload_chunk_size, checkpoint)
+        progress = tqdm(total=total, desc="Predict tasks")
+
+        def is_pending(task):
+            if task["id"] in checkpoint or (
+                not overwrite and self.has_predictions(task, model_version)
+            ):
+                progress.update(1)
+                return False
+            return True
+
+        # predict and send predictions to Label Studio
+        with ThreadPoolExecutor(max_workers=max(1, prefetch_workers)) as executor:
+            batches = self.prefetch_batches(
+                filter(is_pending, tasks), control_models, batch_size, executor
+            )
+            for batch in batches:
+                if not batch:
+                    continue
+                try:
+                    response = model.predict(batch)
+                except Exception as e:
+                    logger.error(f"Failed to predict {len(batch)} tasks: {e}", exc_info=True)
+                    progress.update(len(batch))
+                    continue
+
+                predictions = self.postprocess_response(model, response, batch)
+                progress.update(len(batch))
+                if not predictions:
+                    continue
+                uploader.add(
+                    [task["id"] for task in batch],
+                    [
+                        {
+                            "task": task["id"],
+                            "score": prediction.get("score", 0),
+                            "model_version": prediction.get("model_version") or model_version,
+                            "result": prediction["result"],
+                        }
+                        for task, prediction in zip(batch, predictions)
+                    ],
                 )
+        uploader.flush()
+        progress.close()
+
+        logger.info(f"Model predictions are done! {uploader.uploaded} predictions uploaded")
+
+    @staticmethod
+    def stream_tasks(ls, project_id, page_size):
+        """Iterate over all project tasks, pages are requested from Label Studio lazily"""
+        for task in ls.tasks.list(project=project_id, fields="all", page_size=page_size):
+            yield {
+                "id": _get(task, "id"),
+                "data": _get(task, "data"),
+                "predictions": _get(task, "predictions") or [],
+            }
+
+    @staticmethod
+    def has_predictions(task, model_version):
+        return any(
+            str(_get(prediction, "model_version")) == model_version
+            for prediction in task.get("predictions", [])
+        )
+
+    @staticmethod
+    def prefetch_batches(tasks, control_models, batch_size, executor):
+        """Group tasks into batches and download media of the next batch
+        while the current batch is predicted. Tasks with media that can't be loaded are skipped.
+        """
 
-        logger.info("Model predictions are done!")
+        def fetch(task):
+            # get_path downloads remote media to the local cache, model.predict() reuses it
+            for control_model in control_models:
+                control_model.get_path(task)
+
+        def ready(batch, futures):
+            loaded = []
+            for task, future in zip(batch, futures):
+                try:
+                    future.result()
+                    loaded.append(task)
+                except Exception as e:
+                    logger.error(f"Failed to load media for task {task['id']}: {e}")
+            return loaded
+
+        pending = None
+        for batch in iter_batches(tasks, batch_size):
+            futures = [executor.submit(fetch, task) for task in batch]
+            if pending is not None:
+                yield ready(*pending)
+            pending = (batch, futures)
+        if pending is not None:
+            yield ready(*pending)
 
     @staticmethod
-    def postprocess_response(model, response, task):
+    def postprocess_response(model, response, tasks):
         if response is None:
-            logger.warning(f"No predictions for task: {task}")
+            logger.warning(f"No predictions for tasks: {[task['id'] for task in tasks]}")
             return None
 
         # model returned ModelResponse
@@ -135,4 +388,13 @@ class LabelStudioMLPredictor:
 if __name__ == "__main__":
     args = arg_parser()
     predictor = LabelStudioMLPredictor(args.ls_url, args.ls_api_key)
-    predictor.run(args.project, args.tasks)
+    predictor.run(
+        args.project,
+        args.tasks,
+        batch_size=args.batch_size,
+        upload_chunk_size=args.upload_chunk_size,
+        prefetch_workers=args.prefetch_workers,
+        page_size=args.page_size,
+        checkpoint=args.checkpoint,
+        overwrite=args.overwrite,
+    )
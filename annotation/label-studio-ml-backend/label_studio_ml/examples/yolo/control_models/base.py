@@ -15,6 +15,8 @@ from label_studio_sdk.label_interface import LabelInterface
 # use matplotlib plots for debug
 DEBUG_PLOT = os.getenv("DEBUG_PLOT", "false").lower() in ["1", "true"]
 MODEL_SCORE_THRESHOLD = float(os.getenv("MODEL_SCORE_THRESHOLD", 0.5))
+# number of images in one YOLO forward pass when many tasks are predicted at once
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", 16))
 DEFAULT_MODEL_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
 MODEL_ROOT = os.getenv("MODEL_ROOT", DEFAULT_MODEL_ROOT)
 os.makedirs(MODEL_ROOT, exist_ok=True)
@@ -57,6 +59,8 @@ class ControlModel(BaseModel):
     value: str
     model: YOLO
     model_path: ClassVar[str]
+    # image models run YOLO on batches of files, video models process files one by one
+    batch_inference: ClassVar[bool] = False
     model_score_threshold: float = 0.5
     label_map: Optional[Dict[str, str]] = {}
     label_studio_ml_backend: LabelStudioMLBase
@@ -164,6 +168,33 @@ class ControlModel(BaseModel):
         """
         raise NotImplementedError("This method should be overridden in derived classes")
 
+    def create_regions(self, results, path) -> List[Dict]:
+        """Convert YOLO results of one image to Label Studio regions.
+        Required by models with batch_inference enabled.
+        Args:
+            results: YOLO results list, only the first item is used
+            path (str): Path to the file with media
+        """
+        raise NotImplementedError("This method should be overridden in derived classes")
+
+    def predict_regions_batch(self, paths: List[str]) -> List[List[Dict]]:
+        """Predict regions for many media files, returns one list of regions per path.
+        Args:
+            paths (List[str]): Paths to the files with media
+        """
+        if not self.batch_inference:
+            return [self.predict_regions(path) for path in paths]
+
+        regions = []
+        for start in range(0, len(paths), YOLO_BATCH_SIZE):
+            chunk = paths[start : start + YOLO_BATCH_SIZE]
+            results = self.model.predict(chunk, batch=len(chunk))
+            regions += [
+                self.create_regions([result], path)
+                for result, path in zip(results, chunk)
+            ]
+        return regions
+
     def fit(self, event, data, **kwargs):
         """Fit the model."""
         logger.warning("The fit method is not implemented for this control model")
@@ -24,8 +24,13 @@ class ChoicesModel(ControlModel):
         # support both Choices and Taxonomy because of their similarity
         return control.tag in [cls.type, "Taxonomy"]
 
+    batch_inference = True
+
     def predict_regions(self, path) -> List[Dict]:
         results = self.model.predict(path)
+        return self.create_regions(results, path)
+
+    def create_regions(self, results, path) -> List[Dict]:
         self.debug_plot(results[0].plot())
         return self.create_choices(results, path)
 
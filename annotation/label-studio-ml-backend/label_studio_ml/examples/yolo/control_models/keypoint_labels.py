@@ -59,8 +59,13 @@ class KeypointLabelsModel(ControlModel):
             )
         return mapping
 
+    batch_inference = True
+
     def predict_regions(self, path) -> List[Dict]:
         results = self.model.predict(path)
+        return self.create_regions(results, path)
+
+    def create_regions(self, results, path) -> List[Dict]:
         return self.create_keypoints(results, path)
 
     def create_keypoints(self, results, path):
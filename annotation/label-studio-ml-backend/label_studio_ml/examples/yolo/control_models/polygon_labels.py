@@ -22,8 +22,13 @@ class PolygonLabelsModel(ControlModel):
             return False
         return control.tag == cls.type
 
+    batch_inference = True
+
     def predict_regions(self, path) -> List[Dict]:
         results = self.model.predict(path)
+        return self.create_regions(results, path)
+
+    def create_regions(self, results, path) -> List[Dict]:
         return self.create_polygons(results, path)
 
     def create_polygons(self, results, path):
@@ -32,8 +32,13 @@ class RectangleLabelsModel(ControlModel):
             return False
         return control.tag == cls.type
 
+    batch_inference = True
+
     def predict_regions(self, path) -> List[Dict]:
         results = self.model.predict(path)
+        return self.create_regions(results, path)
+
+    def create_regions(self, results, path) -> List[Dict]:
         self.debug_plot(results[0].plot())
 
         # oriented bounding boxes are detected, but it should be processed by RectangleLabelsObbModel
@@ -108,14 +108,15 @@ class YOLO(LabelStudioMLBase):
         )
         control_models = self.detect_control_models()
 
-        predictions = []
-        for task in tasks:
-
-            regions = []
-            for model in control_models:
-                path = model.get_path(task)
-                regions += model.predict_regions(path)
+        # each control model runs on all tasks at once, image models use batched inference
+        task_regions = [[] for _ in tasks]
+        for model in control_models:
+            paths = [model.get_path(task) for task in tasks]
+            for regions, model_regions in zip(task_regions, model.predict_regions_batch(paths)):
+                regions += model_regions
 
+        predictions = []
+        for regions in task_regions:
             # calculate final score
             all_scores = [region["score"] for region in regions if "score" in region]
             avg_score = sum(all_scores) / max(len(all_scores), 1)
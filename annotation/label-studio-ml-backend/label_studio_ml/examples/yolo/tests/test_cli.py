@@ -0,0 +1,51 @@
+"""
+This file contains tests for the bulk prediction mode of cli.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from cli import Checkpoint, LabelStudioMLPredictor, PredictionUploader, iter_batches
+
+
+def test_iter_batches():
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_batches([], 2)) == []
+
+
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, 1, "yolo").update([1, 2, 3])
+
+    assert 2 in Checkpoint(path, 1, "yolo")
+    # another model version starts from scratch
+    assert 2 not in Checkpoint(path, 1, "yolo-v2")
+
+
+def test_skip_tasks_with_predictions():
+    task = {"id": 1, "data": {}, "predictions": [{"model_version": "yolo"}]}
+    assert LabelStudioMLPredictor.has_predictions(task, "yolo")
+    assert not LabelStudioMLPredictor.has_predictions(task, "yolo-v2")
+
+
+def test_prefetch_batches_skips_broken_media():
+    control_model = MagicMock()
+    control_model.get_path.side_effect = lambda task: task["data"]["image"] or 1 / 0
+    tasks = [{"id": i, "data": {"image": "" if i == 2 else f"{i}.jpg"}} for i in range(5)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        batches = LabelStudioMLPredictor.prefetch_batches(tasks, [control_model], 2, executor)
+        assert [[task["id"] for task in batch] for batch in batches] == [[0, 1], [3], [4]]
+
+
+def test_uploader_chunks(tmp_path):
+    ls = MagicMock()
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), 1, "yolo")
+    uploader = PredictionUploader(ls, 1, 2, checkpoint)
+    for i in range(5):
+        uploader.add([i], [{"task": i, "result": []}])
+    uploader.flush()
+
+    assert ls.projects.import_predictions.call_count == 3
+    assert uploader.uploaded == 5
+    assert all(i in checkpoint for i in range(5))
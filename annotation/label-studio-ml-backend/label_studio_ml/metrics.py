@@ -0,0 +1,44 @@
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimings:
+    """Thread-safe accumulator of wall-clock time spent in named request stages.
+    Exposed by the /metrics endpoint and used by the benchmark harness.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stage = self._stages.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stage['count'] += 1
+            stage['total'] += seconds
+            stage['max'] = max(stage['max'], seconds)
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {**stage, 'mean': stage['total'] / stage['count']}
+                for name, stage in self._stages.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+
+stage_timings = StageTimings()
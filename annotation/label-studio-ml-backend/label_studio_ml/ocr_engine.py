@@ -0,0 +1,263 @@
+"""Process-pool OCR execution engine shared by the OCR examples (tesseract, easyocr).
+
+OCR libraries are either single-threaded per call (pytesseract) or hold the GIL for most of the
+work (easyocr), so running them inside gunicorn threads uses one core. The engine keeps a pool of
+worker processes, each with its own warm recognizer initialized once, and:
+
+- fetches images in a thread pool while previously fetched images are being recognized
+- sends all regions of one image to a worker as a single job, so crops of interactive requests are batched
+- caches results by (image, region, language), so repeated interactive clicks on the same
+  region return without touching the pool; the image is identified by OCRJob.source_key
+  (e.g. the task image URL) without fetching it, or by the hash of its content
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageOps
+
+from label_studio_ml.utils import InMemoryLRUDictCache
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+OCR_FETCH_WORKERS = int(os.getenv('OCR_FETCH_WORKERS', 4))
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', 4096))
+
+# region in absolute pixels: (x, y, width, height), None means the whole image
+Region = Optional[Tuple[float, float, float, float]]
+
+
+class BaseRecognizer:
+    """Recognizer executed inside the worker processes.
+    Subclasses must be picklable: heavy objects (readers, models) are created in setup(),
+    which is called once per worker process.
+    """
+    # part of the result cache key, results of different languages/configs never mix
+    lang = ''
+
+    def setup(self):
+        pass
+
+    def recognize(self, image: Image.Image, regions: Sequence[Region]) -> List[Any]:
+        """Recognize text in the image for each region
+        :param image: RGB PIL image with EXIF orientation applied
+        :param regions: list of regions, None stands for the whole image
+        :return: one picklable result per region
+        """
+        raise NotImplementedError
+
+
+@dataclass
+class OCRJob:
+    """Regions to recognize on one image.
+    fetch() must return a local file path or the image bytes.
+    source_key identifies the image content (a stable URL or path, not a presigned URL): cached regions
+    of a known source_key are returned without calling fetch(). Without it results are cached by content hash.
+    """
+    fetch: Callable[[], Union[str, bytes]]
+    regions: Sequence[Region] = (None,)
+    source_key: Optional[str] = None
+
+
+@dataclass
+class OCRResult:
+    width: int
+    height: int
+    # one item per region of the job, as returned by BaseRecognizer.recognize()
+    results: List[Any]
+
+
+_worker_recognizer: Optional[BaseRecognizer] = None
+
+
+def _init_worker(recognizer: BaseRecognizer):
+    global _worker_recognizer
+    recognizer.setup()
+    _worker_recognizer = recognizer
+
+
+def _run_job(data: bytes, regions: Sequence[Region]) -> Tuple[int, int, List[Any]]:
+    image = open_image(data)
+    width, height = image.size
+    return width, height, _worker_recognizer.recognize(image, regions)
+
+
+def open_image(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGB')
+
+
+def region_key(region: Region) -> Optional[Tuple[float, ...]]:
+    # sub-pixel differences come from percent/pixel conversions in the frontend
+    return None if region is None else tuple(round(v, 1) for v in region)
+
+
+class OCREngine:
+    """Runs OCR jobs on a pool of worker processes with warm recognizers"""
+
+    def __init__(
+        self,
+        recognizer: BaseRecognizer,
+        workers: int = OCR_WORKERS,
+        fetch_workers: int = OCR_FETCH_WORKERS,
+        cache_size: int = OCR_CACHE_SIZE,
+        start_method: Optional[str] = None,
+    ):
+        """
+        :param recognizer: recognizer to initialize once in every worker process
+        :param workers: number of worker processes, 0 runs recognition in the calling thread
+        :param fetch_workers: number of threads fetching images ahead of recognition
+        :param cache_size: number of (image hash, region, language) results kept in memory
+        :param start_method: multiprocessing start method, use "spawn" for CUDA recognizers
+        """
+        self.recognizer = recognizer
+        self.workers = max(0, workers)
+        self.fetch_workers = max(1, fetch_workers)
+        self.start_method = start_method
+        self._cache = InMemoryLRUDictCache(cache_size)
+        self._pool: Optional[Executor] = None
+        self._local_ready = False
+        # the engine is shared by the threads of a gunicorn worker
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[Executor]:
+        # created on first use, so forked gunicorn workers don't share the pool of the master
+        with self._lock:
+            if self.workers and self._pool is None:
+                context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.recognizer,),
+                )
+                logger.info(f'Started OCR pool with {self.workers} {type(self.recognizer).__name__} workers')
+            return self._pool
+
+    def _run_local(self, data: bytes, regions: Sequence[Region]) -> Future:
+        future = Future()
+        try:
+            with self._lock:
+                if not self._local_ready:
+                    self.recognizer.setup()
+                    self._local_ready = True
+                image = open_image(data)
+                future.set_result((*image.size, self.recognizer.recognize(image, regions)))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def _read(job: OCRJob) -> bytes:
+        source = job.fetch()
+        if isinstance(source, bytes):
+            return source
+        with open(source, 'rb') as f:
+            return f.read()
+
+    def _iter_fetched(self, jobs: Sequence[OCRJob], executor: ThreadPoolExecutor) -> Iterator[Future]:
+        # bounded read-ahead keeps memory independent of the number of jobs
+        prefetch = 2 * self.fetch_workers
+        futures = deque()
+        for job in jobs:
+            futures.append(executor.submit(self._read, job))
+            if len(futures) >= prefetch:
+                yield futures.popleft()
+        while futures:
+            yield futures.popleft()
+
+    def _get_cached(self, image_key: str, job: OCRJob):
+        keys = [(image_key, region_key(region), self.recognizer.lang) for region in job.regions]
+        with self._lock:
+            return keys, [self._cache.get(key) for key in keys]
+
+    def run(self, jobs: Sequence[OCRJob]) -> List[Optional[OCRResult]]:
+        """Recognize all jobs, results are returned in the order of jobs.
+        A job whose image can't be fetched or recognized gets None.
+        """
+        # jobs with all regions cached by source_key are not fetched at all
+        known = []
+        for job in jobs:
+            if job.source_key is not None:
+                keys, cached = self._get_cached(job.source_key, job)
+                if all(hit is not None for hit in cached):
+                    known.append((keys, cached, None))
+                    continue
+            known.append(None)
+        to_fetch = [job for job, item in zip(jobs, known) if item is None]
+
+        pool = self._get_pool()
+        results = []
+        # image bytes of submitted jobs stay in memory until their results are collected,
+        # so the oldest job is collected before more than 2 * workers jobs are in flight
+        max_in_flight = 2 * max(1, self.workers)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetcher:
+            fetched_jobs = self._iter_fetched(to_fetch, fetcher)
+            for i, (job, item) in enumerate(zip(jobs, known)):
+                if item is not None:
+                    pending.append(item)
+                    continue
+                fetched = next(fetched_jobs)
+                try:
+                    data = fetched.result()
+                except Exception as exc:
+                    logger.error(f'Failed to fetch image for OCR job {i}: {exc}', exc_info=True)
+                    pending.append(None)
+                    continue
+
+                image_key = job.source_key or hashlib.sha1(data).hexdigest()
+                keys, cached = self._get_cached(image_key, job)
+                missing = [region for region, hit in zip(job.regions, cached) if hit is None]
+                if not missing:
+                    pending.append((keys, cached, None))
+                elif pool is not None:
+                    pending.append((keys, cached, pool.submit(_run_job, data, missing)))
+                else:
+                    pending.append((keys, cached, self._run_local(data, missing)))
+
+                while len(pending) > max_in_flight:
+                    results.append(self._collect(pending.popleft()))
+
+        results.extend(self._collect(item) for item in pending)
+        return results
+
+    def _collect(self, item) -> Optional[OCRResult]:
+        if item is None:
+            return None
+        keys, cached, future = item
+        if future is None:
+            # every region was cached, image size is stored along with the result
+            width, height = cached[0][0]
+            return OCRResult(width=width, height=height, results=[c[1] for c in cached])
+
+        try:
+            width, height, results = future.result()
+        except Exception as exc:
+            logger.error(f'OCR job failed: {exc}', exc_info=True)
+            return None
+
+        results = iter(results)
+        merged = []
+        with self._lock:
+            for key, hit in zip(keys, cached):
+                if hit is None:
+                    hit = ((width, height), next(results))
+                    self._cache.put(key, hit)
+                merged.append(hit[1])
+        return OCRResult(width=width, height=height, results=merged)
@@ -0,0 +1,233 @@
+"""Batched zero-shot detection engine shared by the Grounding DINO based examples.
+
+The engine wraps an already loaded Grounding DINO model (and optionally a SAM model) and
+runs text-prompted detection over many images at once:
+
+- images are decoded and resized in a thread pool while the current batch is on the device
+- prompt preprocessing and tokenization are memoized per (prompt, model)
+- images are grouped into batches bounded both by count and by total pixel budget
+- SAM masks are computed for the detected boxes in the same pass, reusing the decoded images
+
+torch, groundingdino and segment_anything are imported lazily, so the module can be imported
+without the heavy dependencies installed.
+"""
+import logging
+import os
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from label_studio_ml.utils import InMemoryLRUDictCache
+
+logger = logging.getLogger(__name__)
+
+DETECTION_BATCH_SIZE = int(os.getenv('DETECTION_BATCH_SIZE', 8))
+# 8 images of 800x1333 (default Grounding DINO input size)
+DETECTION_MAX_BATCH_PIXELS = int(os.getenv('DETECTION_MAX_BATCH_PIXELS', 8 * 800 * 1333))
+DETECTION_LOAD_WORKERS = int(os.getenv('DETECTION_LOAD_WORKERS', min(8, os.cpu_count() or 1)))
+DETECTION_PROMPT_CACHE_SIZE = int(os.getenv('DETECTION_PROMPT_CACHE_SIZE', 128))
+
+
+@dataclass
+class Detection:
+    """Detection results for one image, boxes are absolute xyxy pixel coordinates"""
+    height: int
+    width: int
+    boxes: Any  # np.ndarray of shape (n, 4)
+    scores: Any  # np.ndarray of shape (n,)
+    phrases: List[str]
+    masks: Any = None  # np.ndarray of shape (n, height, width), uint8, only with SAM
+    mask_scores: Any = None  # np.ndarray of shape (n,), only with SAM
+
+
+def iter_bounded_batches(
+    sizes: Sequence[int], max_batch_size: int, max_batch_pixels: int
+) -> Iterator[List[int]]:
+    """Group item indices into consecutive batches that hold at most max_batch_size items
+    and at most max_batch_pixels pixels in total. An item larger than the pixel budget
+    always gets a batch of its own.
+    :param sizes: number of pixels of each item, in order
+    :param max_batch_size: maximum number of items in one batch
+    :param max_batch_pixels: maximum total number of pixels in one batch
+    :return: iterator over lists of item indices
+    """
+    batch, pixels = [], 0
+    for i, size in enumerate(sizes):
+        if batch and (len(batch) >= max_batch_size or pixels + size > max_batch_pixels):
+            yield batch
+            batch, pixels = [], 0
+        batch.append(i)
+        pixels += size
+    if batch:
+        yield batch
+
+
+class ZeroShotDetectionEngine:
+    """Text-prompted detection over batches of images with an optional SAM refinement step"""
+
+    def __init__(
+        self,
+        model,
+        sam_model=None,
+        device: str = 'cpu',
+        batch_size: int = DETECTION_BATCH_SIZE,
+        max_batch_pixels: int = DETECTION_MAX_BATCH_PIXELS,
+        load_workers: int = DETECTION_LOAD_WORKERS,
+        prompt_cache_size: int = DETECTION_PROMPT_CACHE_SIZE,
+        image_loader: Optional[Callable[[str], Tuple[Any, Any]]] = None,
+    ):
+        """
+        :param model: loaded Grounding DINO model
+        :param sam_model: loaded SAM / MobileSAM model, masks are not computed if None
+        :param device: torch device for inference
+        :param batch_size: maximum number of images in one forward pass
+        :param max_batch_pixels: maximum total number of input pixels in one forward pass
+        :param load_workers: number of threads that decode and resize images
+        :param prompt_cache_size: number of memoized (prompt, model) encodings
+        :param image_loader: callable returning (RGB numpy image, transformed tensor) for a path,
+            defaults to groundingdino.util.inference.load_image
+        """
+        self.model = model.to(device)
+        self.sam_model = sam_model
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self.max_batch_pixels = max_batch_pixels
+        self.load_workers = max(1, load_workers)
+        self._prompt_cache = InMemoryLRUDictCache(prompt_cache_size)
+        if image_loader is None:
+            from groundingdino.util.inference import load_image
+            image_loader = load_image
+        self.image_loader = image_loader
+        self._sam_transform = None
+        if sam_model is not None:
+            from segment_anything.utils.transforms import ResizeLongestSide
+            self._sam_transform = ResizeLongestSide(sam_model.image_encoder.img_size)
+
+    def encode_prompt(self, prompt: str):
+        """Preprocess and tokenize the text prompt, memoized per (prompt, model)
+        :return: (preprocessed caption, tokenized caption)
+        """
+        key = (prompt, id(self.model))
+        encoded = self._prompt_cache.get(key)
+        if encoded is None:
+            from groundingdino.util.inference import preprocess_caption
+            caption = preprocess_caption(caption=prompt)
+            encoded = (caption, self.model.tokenizer(caption))
+            self._prompt_cache.put(key, encoded)
+        return encoded
+
+    def load_images(self, image_paths: Iterable[str], executor: ThreadPoolExecutor) -> Iterator[Tuple[Any, Any]]:
+        """Decode and resize images in parallel, results are yielded in input order.
+        At most two batches of images are decoded ahead, so memory does not grow with the number of images.
+        """
+        prefetch = 2 * self.batch_size
+        futures = deque()
+        for path in image_paths:
+            futures.append(executor.submit(self.image_loader, path))
+            if len(futures) >= prefetch:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+    def predict(
+        self,
+        image_paths: Sequence[str],
+        prompt: str,
+        box_threshold: float,
+        text_threshold: float,
+    ) -> List[Detection]:
+        """Run detection (and SAM refinement if enabled) for all images with the same prompt
+        :param image_paths: local paths of the images
+        :param prompt: text prompt, e.g. "cat . dog ."
+        :param box_threshold: minimal box confidence
+        :param text_threshold: minimal token confidence used to extract phrases
+        :return: one Detection per image, in the order of image_paths
+        """
+        if not image_paths:
+            return []
+
+        caption, tokenized = self.encode_prompt(prompt)
+        detections = []
+        with ThreadPoolExecutor(max_workers=self.load_workers) as executor:
+            # next images are decoded while the current batch runs on the device
+            pending = []
+            for item in self.load_images(image_paths, executor):
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    detections.extend(self._run(pending, caption, tokenized, box_threshold, text_threshold))
+                    pending = []
+            if pending:
+                detections.extend(self._run(pending, caption, tokenized, box_threshold, text_threshold))
+        return detections
+
+    def _run(self, images, caption, tokenized, box_threshold, text_threshold) -> List[Detection]:
+        # split further if the images don't fit into the pixel budget
+        sizes = [image.shape[-2] * image.shape[-1] for _, image in images]
+        detections = []
+        for indices in iter_bounded_batches(sizes, self.batch_size, self.max_batch_pixels):
+            batch = [images[i] for i in indices]
+            batch_detections = self._detect(batch, caption, tokenized, box_threshold, text_threshold)
+            if self.sam_model is not None:
+                self._segment(batch, batch_detections)
+            detections.extend(batch_detections)
+        return detections
+
+    def _detect(self, batch, caption, tokenized, box_threshold, text_threshold) -> List[Detection]:
+        import torch
+        from groundingdino.util import box_ops
+        from groundingdino.util.utils import get_phrases_from_posmap
+
+        # images of different sizes are padded into one NestedTensor by the model
+        images = [image.to(self.device) for _, image in batch]
+        with torch.inference_mode():
+            outputs = self.model(images, captions=[caption] * len(images))
+        prediction_logits = outputs['pred_logits'].cpu().sigmoid()  # (batch, nq, 256)
+        prediction_boxes = outputs['pred_boxes'].cpu()  # (batch, nq, 4)
+        mask = prediction_logits.max(dim=2)[0] > box_threshold
+
+        detections = []
+        for i, (source, _) in enumerate(batch):
+            logits = prediction_logits[i][mask[i]]
+            boxes = prediction_boxes[i][mask[i]]
+            phrases = [
+                get_phrases_from_posmap(logit > text_threshold, tokenized, self.model.tokenizer).replace('.', '')
+                for logit in logits
+            ]
+            height, width = source.shape[:2]
+            boxes_xyxy = box_ops.box_cxcywh_to_xyxy(boxes) * torch.Tensor([width, height, width, height])
+            detections.append(Detection(
+                height=height,
+                width=width,
+                boxes=boxes_xyxy.numpy(),
+                scores=logits.max(dim=1)[0].numpy(),
+                phrases=phrases,
+            ))
+        return detections
+
+    def _segment(self, batch, detections: List[Detection]):
+        import torch
+
+        batched_input, targets = [], []
+        for (source, _), detection in zip(batch, detections):
+            if not len(detection.boxes):
+                continue
+            # SAM works on the same decoded RGB image, no second read from disk
+            image = self._sam_transform.apply_image(source)
+            image = torch.as_tensor(image, device=self.sam_model.device).permute(2, 0, 1).contiguous()
+            boxes = torch.as_tensor(detection.boxes, device=self.sam_model.device)
+            batched_input.append({
+                'image': image,
+                'boxes': self._sam_transform.apply_boxes_torch(boxes, source.shape[:2]),
+                'original_size': source.shape[:2],
+            })
+            targets.append(detection)
+
+        if not batched_input:
+            return
+        with torch.inference_mode():
+            batched_output = self.sam_model(batched_input, multimask_output=False)
+        for output, detection in zip(batched_output, targets):
+            detection.masks = output['masks'][:, 0, :, :].cpu().numpy().astype('uint8')
+            detection.mask_scores = output['iou_predictions'][:, 0].cpu().numpy()
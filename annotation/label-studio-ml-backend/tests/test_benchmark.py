@@ -0,0 +1,46 @@
+import pytest
+
+from label_studio_ml.benchmark.configs import CONTROL_TYPES, get_label_config, make_tasks, make_webhook_payload
+from label_studio_ml.benchmark.runner import compare_results, percentile
+
+
+@pytest.mark.parametrize(
+    "values, q, expected",
+    [
+        # Test case 1: median of odd number of values
+        ([3, 1, 2], 50, 2),
+        # Test case 2: high percentile picks the largest value
+        (list(range(1, 101)), 99, 99),
+        (list(range(1, 101)), 100, 100),
+        # Test case 3: single value
+        ([5], 95, 5),
+        # Test case 4: no values
+        ([], 50, None),
+    ]
+)
+def test_percentile(values, q, expected):
+    assert percentile(values, q) == expected
+
+
+@pytest.mark.parametrize("control_type", CONTROL_TYPES)
+def test_benchmark_payloads(control_type):
+    assert control_type.replace("Obb", "") in get_label_config(control_type)
+    tasks = make_tasks(control_type, ['http://localhost/1.jpg', 'http://localhost/2.jpg'], 3)
+    assert [task['id'] for task in tasks] == [1, 2, 3]
+    payload = make_webhook_payload(control_type, tasks[0])
+    assert payload['action'] == 'ANNOTATION_CREATED'
+    assert payload['annotation']['result']
+
+
+def test_compare_results():
+    def report(p50, rps):
+        return {
+            'latency_sec': {'p50': p50, 'p95': p50, 'p99': p50},
+            'throughput_rps': rps,
+            'rss_mb': {'max_sampled': None},
+        }
+
+    change = compare_results(report(0.5, 20), report(1.0, 10))
+    assert change['latency_p50'] == -0.5
+    assert change['throughput_rps'] == 1.0
+    assert change['rss_max_sampled'] is None
@@ -0,0 +1,85 @@
+import io
+
+from PIL import Image
+
+from label_studio_ml.ocr_engine import BaseRecognizer, OCREngine, OCRJob
+
+
+class CountingRecognizer(BaseRecognizer):
+    lang = 'test'
+
+    def __init__(self):
+        self.calls = []
+
+    def recognize(self, image, regions):
+        self.calls.append(list(regions))
+        return [f'{image.size}-{region}' for region in regions]
+
+
+def make_image(color='white', size=(40, 20)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_ocr_engine_results_keep_job_order():
+    recognizer = CountingRecognizer()
+    engine = OCREngine(recognizer, workers=0)
+    results = engine.run([
+        OCRJob(fetch=lambda: make_image('white', (40, 20))),
+        OCRJob(fetch=lambda: make_image('black', (10, 30)), regions=[(0, 0, 5, 5), (1, 1, 2, 2)]),
+    ])
+    assert (results[0].width, results[0].height) == (40, 20)
+    assert results[0].results == ['(40, 20)-None']
+    assert (results[1].width, results[1].height) == (10, 30)
+    assert results[1].results == ['(10, 30)-(0, 0, 5, 5)', '(10, 30)-(1, 1, 2, 2)']
+    # all regions of one image are recognized in one call
+    assert recognizer.calls == [[None], [(0, 0, 5, 5), (1, 1, 2, 2)]]
+
+
+def test_ocr_engine_caches_regions():
+    recognizer = CountingRecognizer()
+    engine = OCREngine(recognizer, workers=0)
+    data = make_image()
+    engine.run([OCRJob(fetch=lambda: data, regions=[(0, 0, 5, 5)])])
+    results = engine.run([OCRJob(fetch=lambda: data, regions=[(0, 0, 5, 5), (1, 1, 2, 2)])])
+    assert results[0].results == ['(40, 20)-(0, 0, 5, 5)', '(40, 20)-(1, 1, 2, 2)']
+    # only the new region reaches the recognizer
+    assert recognizer.calls == [[(0, 0, 5, 5)], [(1, 1, 2, 2)]]
+
+
+def test_ocr_engine_cache_by_source_key_skips_fetch():
+    recognizer = CountingRecognizer()
+    engine = OCREngine(recognizer, workers=0)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return make_image()
+
+    job = OCRJob(fetch=fetch, regions=[(0, 0, 5, 5)], source_key='http://host/image.png')
+    engine.run([job])
+    results = engine.run([job, OCRJob(fetch=fetch, source_key='http://host/other.png')])
+    assert results[0].results == ['(40, 20)-(0, 0, 5, 5)']
+    assert results[1].results == ['(40, 20)-None']
+    # the cached image is not downloaded again
+    assert len(fetches) == 2
+    assert recognizer.calls == [[(0, 0, 5, 5)], [None]]
+
+
+def test_ocr_engine_failed_fetch():
+    def fail():
+        raise IOError('not found')
+
+    engine = OCREngine(CountingRecognizer(), workers=0)
+    results = engine.run([OCRJob(fetch=fail), OCRJob(fetch=make_image)])
+    assert results[0] is None
+    assert results[1].results == ['(40, 20)-None']
+
+
+def test_ocr_engine_keeps_order_with_bounded_in_flight_jobs():
+    # more jobs than the 2 * workers in flight limit, oldest jobs are collected first
+    sizes = [(10 + i, 20) for i in range(7)]
+    engine = OCREngine(CountingRecognizer(), workers=0)
+    results = engine.run([OCRJob(fetch=lambda size=size: make_image(size=size)) for size in sizes])
+    assert [(r.width, r.height) for r in results] == sizes
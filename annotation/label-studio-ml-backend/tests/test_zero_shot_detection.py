@@ -0,0 +1,20 @@
+import pytest
+
+from label_studio_ml.zero_shot_detection import iter_bounded_batches
+
+
+@pytest.mark.parametrize(
+    "sizes, max_batch_size, max_batch_pixels, expected",
+    [
+        # Test case 1: batches limited by count
+        ([10, 10, 10, 10, 10], 2, 1000, [[0, 1], [2, 3], [4]]),
+        # Test case 2: batches limited by pixel budget
+        ([40, 40, 40, 10, 90], 10, 100, [[0, 1], [2, 3], [4]]),
+        # Test case 3: an item larger than the budget gets its own batch
+        ([10, 500, 10], 10, 100, [[0], [1], [2]]),
+        # Test case 4: no items
+        ([], 4, 100, []),
+    ]
+)
+def test_iter_bounded_batches(sizes, max_batch_size, max_batch_pixels, expected):
+    assert list(iter_bounded_batches(sizes, max_batch_size, max_batch_pixels)) == expected
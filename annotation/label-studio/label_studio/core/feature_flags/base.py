@@ -1,4 +1,7 @@
 import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 
 import ldclient
 from django.conf import settings
@@ -69,6 +72,70 @@ else:
     client = ldclient.get()
 
 
+@lru_cache(maxsize=None)
+def get_env_flag(feature_flag):
+    """Flag value from the environment, the environment is read once per process for each flag"""
+    return get_bool_env(feature_flag, default=None)
+
+
+class FlagSnapshot:
+    """Flag values for the users seen within one request or background job.
+    All flags of a user are evaluated in bulk on the first check, flags missing in the bulk state
+    (unknown flags or offline client) are evaluated one by one and memoized.
+    """
+
+    def __init__(self):
+        self._flags = {}
+        self._variations = {}
+
+    def _user_flags(self, user):
+        if user.pk not in self._flags:
+            state = client.all_flags_state(get_user_repr(user))
+            self._flags[user.pk] = (
+                {flag: value for flag, value in state.to_json_dict().items() if not flag.startswith('$')}
+                if state.valid
+                else {}
+            )
+        return self._flags[user.pk]
+
+    def variation(self, feature_flag, user, default):
+        value = self._user_flags(user).get(feature_flag)
+        if value is not None:
+            return value
+        key = (user.pk, feature_flag, default)
+        if key not in self._variations:
+            self._variations[key] = client.variation(feature_flag, get_user_repr(user), default)
+        return self._variations[key]
+
+
+_thread_locals = threading.local()
+
+
+@contextmanager
+def flag_snapshot():
+    """Evaluate flags once per user inside the block, use it in background jobs.
+    Requests get a snapshot automatically via the current request.
+    """
+    previous = getattr(_thread_locals, 'snapshot', None)
+    _thread_locals.snapshot = previous or FlagSnapshot()
+    try:
+        yield _thread_locals.snapshot
+    finally:
+        _thread_locals.snapshot = previous
+
+
+def get_flag_snapshot():
+    snapshot = getattr(_thread_locals, 'snapshot', None)
+    if snapshot is not None:
+        return snapshot
+    request = get_current_request()
+    if request is None:
+        return None
+    if not hasattr(request, '_flag_snapshot'):
+        request._flag_snapshot = FlagSnapshot()
+    return request._flag_snapshot
+
+
 def flag_set(feature_flag, user=None, override_system_default=None):
     """Use this method to check whether this flag is set ON to the current user, to split the logic on backend
     For example,
@@ -97,13 +164,16 @@ def flag_set(feature_flag, user=None, override_system_default=None):
         if request and getattr(request, 'user', None) and request.user.is_authenticated:
             user = request.user
 
-    env_value = get_bool_env(feature_flag, default=None)
+    env_value = get_env_flag(feature_flag)
     if env_value is not None:
         return env_value
     if override_system_default is not None:
         system_default = override_system_default
     else:
         system_default = settings.FEATURE_FLAGS_DEFAULT_VALUE
+    snapshot = get_flag_snapshot()
+    if snapshot is not None:
+        return snapshot.variation(feature_flag, user, system_default)
     user_dict = get_user_repr(user)
     return client.variation(feature_flag, user_dict, system_default)
 
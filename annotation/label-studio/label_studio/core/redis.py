@@ -58,10 +58,10 @@ def redis_hget(key1, key2):
     return _redis.hget(key1, key2)
 
 
-def redis_set(key, value, ttl=None):
+def redis_set(key, value, ttl=None, nx=False):
     if not redis_healthcheck():
         return
-    return _redis.set(key, value, ex=ttl)
+    return _redis.set(key, value, ex=ttl, nx=nx)
 
 
 def redis_hset(key1, key2, value):
@@ -76,6 +76,37 @@ def redis_delete(key):
     return _redis.delete(key)
 
 
+def redis_set_many_nx(keys, ttl=None, value=1):
+    """Set the keys which don't exist yet with one healthcheck and one round-trip,
+    returns a list of flags whether each key was set, None if redis is not connected
+    """
+    if not redis_healthcheck():
+        return
+    pipeline = _redis.pipeline(transaction=False)
+    for key in keys:
+        pipeline.set(key, value, ex=ttl, nx=True)
+    return [bool(reply) for reply in pipeline.execute()]
+
+
+def redis_delete_many(keys):
+    if not redis_healthcheck() or not keys:
+        return
+    return _redis.delete(*keys)
+
+
+def redis_pipeline():
+    """Pipeline to send several commands in one round-trip, None if redis is not connected"""
+    if not redis_healthcheck():
+        return
+    return _redis.pipeline()
+
+
+def redis_zrem(key, *members):
+    if not redis_healthcheck():
+        return
+    return _redis.zrem(key, *members)
+
+
 def start_job_async_or_sync(job, *args, in_seconds=0, **kwargs):
     """
     Start job async with redis or sync if redis is not connected
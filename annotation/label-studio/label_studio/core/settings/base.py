@@ -483,6 +483,7 @@ SUPPORTED_EXTENSIONS = set(
         '.jpg',
         '.jpeg',
         '.json',
+        '.jsonl',
         '.m4a',
         '.mp3',
         '.ogg',
@@ -507,6 +508,12 @@ os.makedirs(TEST_DATA_ROOT, exist_ok=True)
 EXPORT_DIR = os.path.join(BASE_DATA_DIR, 'export')
 EXPORT_URL_ROOT = '/export/'
 EXPORT_MIXIN = 'data_export.mixins.ExportMixin'
+# gzip export snapshots on the fly, snapshot files get .json.gz extension
+EXPORT_COMPRESS = get_bool_env('EXPORT_COMPRESS', False)
+# number of task batches fetched from the DB in a background thread while the current batch is serialized
+EXPORT_PREFETCH_BATCHES = int(get_env('EXPORT_PREFETCH_BATCHES', 1))
+# rows in one Parquet row group of the columnar export format
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(get_env('EXPORT_PARQUET_ROW_GROUP_SIZE', 10000))
 # old export dir
 os.makedirs(EXPORT_DIR, exist_ok=True)
 # dir for delayed export
@@ -518,14 +525,38 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = int(get_env('DATA_UPLOAD_MAX_MEMORY_SIZE', 250 * 1
 DATA_UPLOAD_MAX_NUMBER_FILES = int(get_env('DATA_UPLOAD_MAX_NUMBER_FILES', 100))
 TASKS_MAX_NUMBER = 1000000
 TASKS_MAX_FILE_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+# async import parses uploaded files incrementally and commits tasks in chunks of this size
+IMPORT_TASKS_CHUNK_SIZE = int(get_env('IMPORT_TASKS_CHUNK_SIZE', 5000))
 
 TASK_LOCK_TTL = int(get_env('TASK_LOCK_TTL', default=86400))
+# expired task locks are deleted in background at most once per this number of seconds
+TASK_LOCK_REAP_INTERVAL = int(get_env('TASK_LOCK_REAP_INTERVAL', default=60))
+# mirror active task locks in "redis" or "locmem" (single process deployments only), empty to read them from DB
+TASK_LOCK_CACHE = get_env('TASK_LOCK_CACHE', '')
 
 LABEL_STREAM_HISTORY_LIMIT = int(get_env('LABEL_STREAM_HISTORY_LIMIT', default=100))
 
 RANDOM_NEXT_TASK_SAMPLE_SIZE = int(get_env('RANDOM_NEXT_TASK_SAMPLE_SIZE', 50))
+# candidates checked for locks in one query by sequential sampling
+NEXT_TASK_UNLOCKED_BATCH_SIZE = int(get_env('NEXT_TASK_UNLOCKED_BATCH_SIZE', 50))
+
+# uncertainty sampling: name from tasks.active_learning.ACQUISITION_FUNCTIONS or an import path of a function
+ACTIVE_LEARNING_ACQUISITION_FUNCTION = get_env('ACTIVE_LEARNING_ACQUISITION_FUNCTION', 'least_confidence')
+# the most uncertain predictions read at once, candidates are reordered by clusters solved by the annotator
+ACTIVE_LEARNING_CANDIDATES = int(get_env('ACTIVE_LEARNING_CANDIDATES', 100))
+ACTIVE_LEARNING_CLUSTER_DIVERSITY = get_bool_env('ACTIVE_LEARNING_CLUSTER_DIVERSITY', True)
+
+# materialized labeling queue for the next task API (projects.functions.labeling_queue)
+LABELING_QUEUE_ENABLED = get_bool_env('LABELING_QUEUE_ENABLED', False)
+LABELING_QUEUE_REBUILD_INTERVAL = int(get_env('LABELING_QUEUE_REBUILD_INTERVAL', 600))
+LABELING_QUEUE_CLAIM_SIZE = int(get_env('LABELING_QUEUE_CLAIM_SIZE', 20))
 
 TASK_API_PAGE_SIZE_MAX = int(get_env('TASK_API_PAGE_SIZE_MAX', 0)) or None
+# tasks listed by the Data Manager wait for automatically retrieved predictions at most this many seconds,
+# after that they are enqueued again
+PREDICTIONS_PENDING_TTL = int(get_env('PREDICTIONS_PENDING_TTL', 600))
+# tasks listed without pagination get predictions scheduled for this many tasks at most per request
+PREDICTIONS_PENDING_MAX_TASKS = int(get_env('PREDICTIONS_PENDING_MAX_TASKS', 100))
 
 # Email backend
 FROM_EMAIL = get_env('FROM_EMAIL', 'Label Studio <hello@labelstud.io>')
@@ -534,6 +565,8 @@ EMAIL_BACKEND = get_env('EMAIL_BACKEND', 'django.core.mail.backends.dummy.EmailB
 ENABLE_LOCAL_FILES_STORAGE = get_bool_env('ENABLE_LOCAL_FILES_STORAGE', default=True)
 LOCAL_FILES_SERVING_ENABLED = get_bool_env('LOCAL_FILES_SERVING_ENABLED', default=False)
 LOCAL_FILES_DOCUMENT_ROOT = get_env('LOCAL_FILES_DOCUMENT_ROOT', default=os.path.abspath(os.sep))
+# number of paths sorted in memory during local storage sync, bigger trees are sorted in runs spilled to disk
+LOCAL_FILES_SCAN_RUN_SIZE = int(get_env('LOCAL_FILES_SCAN_RUN_SIZE', 100000))
 
 SYNC_ON_TARGET_STORAGE_CREATION = get_bool_env('SYNC_ON_TARGET_STORAGE_CREATION', default=True)
 
@@ -557,6 +590,15 @@ MAX_TASK_BATCH_SIZE = int(get_env('MAX_TASK_BATCH_SIZE', 1000))
 TASK_DATA_PER_BATCH = int(get_env('TASK_DATA_PER_BATCH', 50 * 1024 * 1024))  # 50 MB in bytes
 PROJECT_TITLE_MIN_LEN = 3
 PROJECT_TITLE_MAX_LEN = 50
+# read project counters (task_number, finished_task_number, etc) from ProjectCounters instead of aggregating
+PROJECT_COUNTERS_ENABLED = get_bool_env('PROJECT_COUNTERS_ENABLED', True)
+PROJECT_COUNTERS_RECONCILE_BATCH_SIZE = int(get_env('PROJECT_COUNTERS_RECONCILE_BATCH_SIZE', 100))
+# counters are recounted in the background at most once per this many seconds (requires redis), 0 disables it
+PROJECT_COUNTERS_RECONCILE_INTERVAL = int(get_env('PROJECT_COUNTERS_RECONCILE_INTERVAL', 3600))
+# project summary changes are stored as delta rows and folded into the summary at most this many seconds later
+# (or when the summary is read), without redis bulk changes are folded right after commit, others on read
+PROJECT_SUMMARY_FOLD_INTERVAL = int(get_env('PROJECT_SUMMARY_FOLD_INTERVAL', 10))
+PROJECT_SUMMARY_FOLD_BATCH_SIZE = int(get_env('PROJECT_SUMMARY_FOLD_BATCH_SIZE', 1000))
 LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = '/user/login/'
 
@@ -691,6 +733,16 @@ FUTURE_SAVE_TASK_TO_STORAGE = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE', defaul
 FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT', default=True)
 STORAGE_IN_PROGRESS_TIMER = float(get_env('STORAGE_IN_PROGRESS_TIMER', 5.0))
 STORAGE_EXPORT_CHUNK_SIZE = int(get_env('STORAGE_EXPORT_CHUNK_SIZE', 100))
+# number of threads saving objects to target storages
+STORAGE_EXPORT_MAX_WORKERS = int(get_env('STORAGE_EXPORT_MAX_WORKERS', 8))
+# number of keys checked for existing links with one query and number of tasks created with one bulk insert
+STORAGE_SYNC_BATCH_SIZE = int(get_env('STORAGE_SYNC_BATCH_SIZE', 1000))
+# JSON task files are fetched and parsed by this number of threads during storage sync
+STORAGE_SYNC_PREFETCH_WORKERS = int(get_env('STORAGE_SYNC_PREFETCH_WORKERS', 8))
+# limit of fetched but not yet processed JSON task files in memory during storage sync
+STORAGE_SYNC_PREFETCH_BYTES = int(get_env('STORAGE_SYNC_PREFETCH_BYTES', 256 * 1024 * 1024))
+# number of S3 folders listed in parallel during recursive storage sync
+S3_SYNC_LISTING_WORKERS = int(get_env('S3_SYNC_LISTING_WORKERS', 8))
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env('USE_NGINX_FOR_EXPORT_DOWNLOADS', False)
 USE_NGINX_FOR_UPLOADS = get_bool_env('USE_NGINX_FOR_UPLOADS', True)
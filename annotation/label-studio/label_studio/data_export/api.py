@@ -325,6 +325,8 @@ class ExportListAPI(generics.ListCreateAPIView):
     def get_serializer_context(self):
         context = super(ExportListAPI, self).get_serializer_context()
         context['user'] = self.request.user
+        if self.request.method == 'POST':
+            context['project'] = self._get_project()
         return context
 
     def _get_project(self):
@@ -422,9 +424,13 @@ class ExportDetailAPI(generics.RetrieveDestroyAPIView):
     permission_required = all_permissions.projects_change
 
     def delete(self, *args, **kwargs):
+        export = self.get_object()
+        # deltas can't be read without the base snapshot, they are removed on project deletion only
+        if export.deltas.exists():
+            raise ValidationError('This export is the base of delta exports, delete them first')
+
         if flag_set('ff_back_dev_4664_remove_storage_file_on_export_delete_29032023_short'):
             try:
-                export = self.get_object()
                 export.file.delete()
 
                 for converted_format in export.converted_formats.all():
@@ -594,6 +600,7 @@ def async_convert(converted_format_id, export_type, project, hostname, download_
     file_path = f'{project.id}/{file_name}'  # finally file will be in settings.DELAYED_EXPORT_DIR/project.id/file_name
     file_ = File(converted_file, name=file_path)
     converted_format.file.save(file_path, file_)
+    converted_file.close()
     converted_format.status = ConvertedFormat.Status.COMPLETED
     converted_format.save(update_fields=['file', 'status'])
 
@@ -668,3 +675,58 @@ class ExportConvertAPI(generics.RetrieveAPIView):
             on_failure=set_convert_background_failure,
         )
         return Response({'export_type': export_type, 'converted_format': converted_format.id})
+
+
+@method_decorator(
+    name='post',
+    decorator=extend_schema(
+        tags=['Export'],
+        summary='Compact export snapshots',
+        description='Create a new full export snapshot by merging the delta snapshot with its base snapshots.',
+        request=None,
+        responses={201: ExportSerializer},
+        parameters=[
+            OpenApiParameter(
+                name='id',
+                type=OpenApiTypes.INT,
+                location='path',
+                description='A unique integer value identifying this project.',
+            ),
+            OpenApiParameter(
+                name='export_pk',
+                type=OpenApiTypes.STR,
+                location='path',
+                description='Primary key identifying the export file.',
+            ),
+        ],
+        extensions={
+            'x-fern-sdk-group-name': ['projects', 'exports'],
+            'x-fern-sdk-method-name': 'compact',
+            'x-fern-audiences': ['public'],
+        },
+    ),
+)
+class ExportCompactAPI(generics.GenericAPIView):
+    queryset = Export.objects.all()
+    lookup_url_kwarg = 'export_pk'
+    permission_required = all_permissions.projects_change
+
+    def get_queryset(self):
+        project = generics.get_object_or_404(Project.objects.for_user(self.request.user), pk=self.kwargs.get('pk'))
+        return super().get_queryset().filter(project=project)
+
+    def post(self, request, *args, **kwargs):
+        source = self.get_object()
+        try:
+            source.get_snapshot_chain()
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+
+        compacted = Export.objects.create(
+            project=source.project,
+            created_by=request.user,
+            title=f'{source.title}-compacted',
+        )
+        compacted.run_compaction(source)
+        compacted.refresh_from_db()
+        return Response(ExportSerializer(compacted).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_export', '0010_alter_convertedformat_export_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='base_export',
+            field=models.ForeignKey(
+                default=None,
+                help_text='Delta snapshots contain only tasks changed since the watermark of the base snapshot',
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name='deltas',
+                to='data_export.export',
+                verbose_name='base export',
+            ),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='watermark',
+            field=models.DateTimeField(
+                default=None,
+                help_text='Changes made after this time are not guaranteed to be included, next delta starts from it',
+                null=True,
+                verbose_name='watermark',
+            ),
+        ),
+    ]
@@ -1,10 +1,14 @@
+import gzip
 import hashlib
-import io
 import json
 import logging
 import pathlib
 import shutil
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from functools import reduce
 
 import django_rq
@@ -17,24 +21,65 @@ from core.utils.io import (
     get_all_files_from_dir,
     get_temp_dir,
 )
+from data_import.models import iter_json_items, iter_text_chunks
 from data_manager.models import View
 from django.conf import settings
 from django.core.files import File
 from django.core.files import temp as tempfile
-from django.db import transaction
+from django.db import connections, transaction
 from django.db.models import Prefetch
 from django.db.models.query_utils import Q
 from django.utils import dateformat, timezone
 from label_studio_sdk.converter import Converter
-from tasks.models import Annotation, AnnotationDraft, Task
+from tasks.models import Annotation, AnnotationDraft, Prediction, Task
 
 ONLY = 'only'
 EXCLUDE = 'exclude'
+EXPORT_WRITE_BUFFER_SIZE = 1024 * 1024
+DELTA_WATERMARK_MARGIN = timedelta(minutes=1)
+# pyarrow is imported only when the format is used, see data_export/parquet.py
+PARQUET_FORMAT = 'PARQUET'
 
 
 logger = logging.getLogger(__name__)
 
 
+def ids_to_ranges(ids):
+    """Compress ids to a sorted list of inclusive [start, end] ranges, task ids of a project are mostly contiguous"""
+    ranges = []
+    for id_ in sorted(ids):
+        if ranges and id_ <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], id_)
+        else:
+            ranges.append([id_, id_])
+    return ranges
+
+
+def ranges_to_ids(ranges):
+    for start, end in ranges:
+        yield from range(start, end + 1)
+
+
+class HashingWriter:
+    """Binary file wrapper evaluating md5 of the written data, so the file doesn't have to be re-read"""
+
+    def __init__(self, file):
+        self.file = file
+        self.md5 = hashlib.md5()  # nosec
+        self.size = 0
+
+    def write(self, data):
+        self.md5.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
 class ExportMixin:
     def has_permission(self, user):
         user.project = self.project  # link for activity log
@@ -151,6 +196,18 @@ class ExportMixin:
                 options['download_resources'] = True
         return options
 
+    @staticmethod
+    def get_filter_options(task_filter_options=None, annotation_filter_options=None, serialization_options=None):
+        """Options selecting and shaping the exported tasks in a JSON comparable form,
+        a delta snapshot must be created with the same options as its base snapshot
+        """
+        options = {
+            'task_filter_options': task_filter_options,
+            'annotation_filter_options': annotation_filter_options,
+            'serialization_options': serialization_options,
+        }
+        return json.loads(json.dumps(options))
+
     def get_task_queryset(self, ids, annotation_filter_options):
         annotations_qs = self._get_filtered_annotations_queryset(annotation_filter_options=annotation_filter_options)
 
@@ -192,18 +249,28 @@ class ExportMixin:
         logger.debug('Run get_task_queryset')
 
         start = datetime.now()
+        timings = {'query': 0.0, 'query_wait': 0.0, 'serialization': 0.0}
+        # the prefetch thread has its own connection, it can't see uncommitted data of the caller's transaction
+        prefetch = 0 if transaction.get_connection().in_atomic_block else settings.EXPORT_PREFETCH_BATCHES
         with transaction.atomic():
             # TODO: make counters from queryset
             # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
-            self.counters = {'task_number': 0}
+            self.counters = {
+                'task_number': 0,
+                'filter_options': self.get_filter_options(
+                    task_filter_options, annotation_filter_options, serialization_options
+                ),
+            }
             all_tasks = self.project.tasks
             logger.debug('Tasks filtration')
-            task_ids = list(
-                self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
-                .distinct()
-                .values_list('id', flat=True)
-                .iterator(chunk_size=1000)
-            )
+            filtered_tasks = self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
+            if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
+                filtered_tasks = filtered_tasks.filter(annotations__isnull=False)
+            task_ids = list(filtered_tasks.distinct().values_list('id', flat=True).iterator(chunk_size=1000))
+            # tasks present in the snapshot, deltas based on it evaluate deleted tasks from them
+            self.counters['task_id_ranges'] = ids_to_ranges(task_ids)
+            if self.base_export_id:
+                task_ids = self._get_delta_task_ids(task_ids)
             base_export_serializer_option = self._get_export_serializer_option(serialization_options)
             i = 0
 
@@ -212,12 +279,9 @@ class ExportMixin:
             else:
                 BATCH_SIZE = settings.BATCH_SIZE
 
-            for ids in batch(task_ids, BATCH_SIZE):
+            for tasks in self._iter_task_batches(task_ids, BATCH_SIZE, annotation_filter_options, prefetch, timings):
                 i += 1
-                tasks = list(self.get_task_queryset(ids, annotation_filter_options))
                 logger.debug(f'Batch: {i*BATCH_SIZE}')
-                if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
-                    tasks = [task for task in tasks if task.annotations.exists()]
 
                 if serialization_options and serialization_options.get('include_annotation_history') is True:
                     task_ids = [task.id for task in tasks]
@@ -226,15 +290,59 @@ class ExportMixin:
                         base_export_serializer_option, annotation_ids
                     )
 
+                serialization_start = time.perf_counter()
                 serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
+                data = serializer.data
+                timings['serialization'] += time.perf_counter() - serialization_start
                 self.counters['task_number'] += len(tasks)
-                for task in serializer.data:
+                for task in data:
                     yield task
         duration = datetime.now() - start
         logger.info(
-            f'{self.counters["task_number"]} tasks from project {self.project_id} exported in {duration.total_seconds():.2f} seconds'
+            f'{self.counters["task_number"]} tasks from project {self.project_id} exported in {duration.total_seconds():.2f} seconds '
+            f'(query: {timings["query"]:.2f}s, waiting for query: {timings["query_wait"]:.2f}s, '
+            f'serialization: {timings["serialization"]:.2f}s, prefetch: {prefetch} batches)'
         )
 
+    def _iter_task_batches(self, task_ids, batch_size, annotation_filter_options, prefetch, timings):
+        """Yield lists of tasks with prefetched relations. With prefetch > 0 the next batches are fetched
+        in a background thread while the current one is being serialized.
+        """
+
+        def fetch(ids):
+            fetch_start = time.perf_counter()
+            tasks = list(self.get_task_queryset(ids, annotation_filter_options))
+            return tasks, time.perf_counter() - fetch_start
+
+        if prefetch <= 0:
+            for ids in batch(task_ids, batch_size):
+                tasks, duration = fetch(ids)
+                timings['query'] += duration
+                yield tasks
+            return
+
+        def wait(future):
+            wait_start = time.perf_counter()
+            tasks, duration = future.result()
+            timings['query_wait'] += time.perf_counter() - wait_start
+            timings['query'] += duration
+            return tasks
+
+        futures = deque()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                for ids in batch(task_ids, batch_size):
+                    futures.append(executor.submit(fetch, ids))
+                    if len(futures) > prefetch:
+                        yield wait(futures.popleft())
+                while futures:
+                    yield wait(futures.popleft())
+            finally:
+                for future in futures:
+                    future.cancel()
+                # connection of the worker thread isn't closed by the request/job cycle
+                executor.submit(connections.close_all).result()
+
     def update_export_serializer_option(self, base_export_serializer_option, annotation_ids):
         return base_export_serializer_option
 
@@ -249,43 +357,74 @@ class ExportMixin:
         md5 = md5_object.hexdigest()
         return md5
 
-    def save_file(self, file, md5):
+    def save_file(self, file, md5, ext='.json'):
         now = datetime.now()
-        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}.json'
+        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}{ext}'
         file_path = f'{self.project.id}/{file_name}'  # finally file will be in settings.DELAYED_EXPORT_DIR/self.project.id/file_name
         file_ = File(file, name=file_path)
+        # storage backends read the file in chunks (multipart uploads for S3), it's never loaded into memory
         self.file.save(file_path, file_)
         self.md5 = md5
         self.save(update_fields=['file', 'md5', 'counters'])
 
-    def export_to_file(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
-        logger.debug(
-            f'Run export for {self.id} with params:\n'
-            f'task_filter_options: {task_filter_options}\n'
-            f'annotation_filter_options: {annotation_filter_options}\n'
-            f'serialization_options: {serialization_options}\n'
+    def write_export_data(self, file, export_data, compress=False):
+        """Encode export data as JSON into the binary file in a single pass and return the md5 of written bytes"""
+        writer = HashingWriter(file)
+        output = gzip.GzipFile(fileobj=writer, mode='wb', mtime=0) if compress else writer
+        iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(SerializableGenerator(export_data))
+        # iterencode yields tiny strings, join them to avoid a write call per token
+        parts, size = [], 0
+        for chunk in iter_json:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= EXPORT_WRITE_BUFFER_SIZE:
+                output.write(''.join(parts).encode('utf-8'))
+                parts, size = [], 0
+        output.write(''.join(parts).encode('utf-8'))
+        if compress:
+            output.close()
+        return writer.hexdigest()
+
+    def _get_delta_task_ids(self, task_ids):
+        """Select tasks changed since the watermark of the base snapshot and record deleted tasks as tombstones.
+        Saved annotations, predictions and drafts are found by their own updated_at, bulk operations don't touch
+        the task row. Deleted predictions can't be found, so their deletion updates task.updated_at.
+        """
+        base = self.base_export
+        if base.counters.get('filter_options') != self.counters['filter_options']:
+            raise ValueError(f'Base export snapshot {base.id} was created with different filter options')
+        since = base.watermark
+        project = self.project
+        changed = set(Task.objects.filter(project=project, updated_at__gte=since).values_list('id', flat=True))
+        for queryset in (
+            Annotation.objects.filter(project=project, updated_at__gte=since),
+            Prediction.objects.filter(project=project, updated_at__gte=since),
+            AnnotationDraft.objects.filter(task__project=project, updated_at__gte=since),
+        ):
+            changed.update(queryset.values_list('task_id', flat=True))
+
+        present = set(task_ids)
+        # tasks deleted or not matching the filters anymore
+        base_ids = ranges_to_ids(base.counters.get('task_id_ranges', []))
+        deleted = [task_id for task_id in base_ids if task_id not in present]
+        self.counters['deleted_task_id_ranges'] = ids_to_ranges(deleted)
+        delta_ids = [task_id for task_id in task_ids if task_id in changed]
+        logger.info(
+            f'Delta export {self.id} of project {self.project_id} since {since}: '
+            f'{len(delta_ids)} changed tasks, {len(deleted)} deleted tasks'
         )
+        return delta_ids
+
+    def _write_snapshot(self, export_data):
         try:
-            iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
-                SerializableGenerator(
-                    self.get_export_data(
-                        task_filter_options=task_filter_options,
-                        annotation_filter_options=annotation_filter_options,
-                        serialization_options=serialization_options,
-                    )
-                )
-            )
+            compress = settings.EXPORT_COMPRESS
             with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
-                for chunk in iter_json:
-                    encoded_chunk = chunk.encode('utf-8')
-                    file.write(encoded_chunk)
+                md5 = self.write_export_data(file, export_data, compress=compress)
                 file.seek(0)
-
-                md5 = self.eval_md5(file)
-                self.save_file(file, md5)
+                self.save_file(file, md5, ext='.json.gz' if compress else '.json')
 
             self.status = self.Status.COMPLETED
-            self.save(update_fields=['status'])
+            self.save(update_fields=['status', 'watermark'])
 
         except Exception as e:
             self.status = self.Status.FAILED
@@ -295,6 +434,96 @@ class ExportMixin:
             self.finished_at = datetime.now()
             self.save(update_fields=['finished_at'])
 
+    def export_to_file(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
+        logger.debug(
+            f'Run export for {self.id} with params:\n'
+            f'task_filter_options: {task_filter_options}\n'
+            f'annotation_filter_options: {annotation_filter_options}\n'
+            f'serialization_options: {serialization_options}\n'
+        )
+        # changes committed with a slightly older updated_at during the export are picked up by the next delta
+        self.watermark = timezone.now() - DELTA_WATERMARK_MARGIN
+        self._write_snapshot(
+            self.get_export_data(
+                task_filter_options=task_filter_options,
+                annotation_filter_options=annotation_filter_options,
+                serialization_options=serialization_options,
+            )
+        )
+
+    @contextmanager
+    def open_snapshot_file(self):
+        """Open the snapshot file for binary reading, compressed snapshots are decompressed on the fly"""
+        with self.file.open('rb') as file:
+            if self.file.name.endswith('.gz'):
+                with gzip.GzipFile(fileobj=file, mode='rb') as decompressed:
+                    yield decompressed
+            else:
+                yield file
+
+    def iter_snapshot_tasks(self):
+        with self.open_snapshot_file() as file:
+            yield from iter_json_items(iter_text_chunks(file))
+
+    def get_snapshot_chain(self):
+        """Snapshots from the full base snapshot to this one"""
+        chain = [self]
+        while chain[-1].base_export_id:
+            chain.append(chain[-1].base_export)
+        chain.reverse()
+        for snapshot in chain:
+            if snapshot.status != self.Status.COMPLETED or not snapshot.file:
+                raise ValueError(f'Export snapshot {snapshot.id} is not completed')
+        return chain
+
+    def get_compacted_data(self, source):
+        """Tasks of a full snapshot equal to the source snapshot with all its deltas applied.
+        Tasks of deltas are kept in memory, the full base snapshot is streamed.
+        """
+        base, *deltas = source.get_snapshot_chain()
+        present = set(ranges_to_ids(source.counters.get('task_id_ranges', [])))
+        latest = {}
+        for delta in deltas:
+            for task in delta.iter_snapshot_tasks():
+                latest[task['id']] = task
+
+        self.counters = {
+            'task_number': 0,
+            'task_id_ranges': source.counters.get('task_id_ranges', []),
+            'filter_options': source.counters.get('filter_options'),
+        }
+        for task in base.iter_snapshot_tasks():
+            if task['id'] in present:
+                self.counters['task_number'] += 1
+                yield latest.pop(task['id'], task)
+        # tasks created after the base snapshot
+        for task_id in sorted(latest):
+            if task_id in present:
+                self.counters['task_number'] += 1
+                yield latest[task_id]
+
+    def compact_from(self, source):
+        """Write a full snapshot merging the source delta snapshot with its base snapshots"""
+        logger.debug(f'Run compaction of export {source.id} into {self.id}')
+        self.watermark = source.watermark
+        self._write_snapshot(self.get_compacted_data(source))
+
+    def run_compaction(self, source):
+        self.status = self.Status.IN_PROGRESS
+        self.save(update_fields=['status'])
+
+        if redis_connected():
+            queue = django_rq.get_queue('default')
+            queue.enqueue(
+                compact_background,
+                self.id,
+                source.id,
+                on_failure=set_export_background_failure,
+                job_timeout='3h',  # 3 hours
+            )
+        else:
+            self.compact_from(source)
+
     def run_file_exporting(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
         if self.status == self.Status.IN_PROGRESS:
             logger.warning('Try to export with in progress stage')
@@ -327,22 +556,32 @@ class ExportMixin:
             out_dir = pathlib.Path(tmp_dir) / OUT
             out_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
 
-            converter = Converter(
-                config=self.project.get_parsed_config(),
-                project_dir=None,
-                upload_dir=out_dir,
-                download_resources=download_resources,
-                # for downloading resource we need access to the API
-                access_token=self.project.organization.created_by.auth_token.key,
-                hostname=hostname,
-            )
             input_name = pathlib.Path(self.file.name).name
-            input_file_path = pathlib.Path(tmp_dir) / input_name
+            if input_name.endswith('.gz'):
+                input_name = input_name[: -len('.gz')]
 
-            with open(input_file_path, 'wb') as file_:
-                file_.write(self.file.open().read())
+            if to_format == PARQUET_FORMAT:
+                from .parquet import ParquetExportWriter
 
-            converter.convert(input_file_path, out_dir, to_format, is_dir=False)
+                # native columnar format is streamed from the snapshot, the SDK converter isn't involved
+                with ParquetExportWriter(out_dir) as writer:
+                    writer.write(self.iter_snapshot_tasks())
+            else:
+                converter = Converter(
+                    config=self.project.get_parsed_config(),
+                    project_dir=None,
+                    upload_dir=out_dir,
+                    download_resources=download_resources,
+                    # for downloading resource we need access to the API
+                    access_token=self.project.organization.created_by.auth_token.key,
+                    hostname=hostname,
+                )
+                input_file_path = pathlib.Path(tmp_dir) / input_name
+
+                with self.open_snapshot_file() as source, open(input_file_path, 'wb') as file_:
+                    shutil.copyfileobj(source, file_, EXPORT_WRITE_BUFFER_SIZE)
+
+                converter.convert(input_file_path, out_dir, to_format, is_dir=False)
 
             files = get_all_files_from_dir(out_dir)
             dirs = get_all_dirs_from_dir(out_dir)
@@ -357,12 +596,14 @@ class ExportMixin:
                 output_file = pathlib.Path(tmp_dir) / (str(out_dir.stem) + '.zip')
                 filename = pathlib.Path(input_name).stem + '.zip'
 
-            # TODO(jo): can we avoid the `f.read()` here?
+            # temp dir is removed on exit, the result is copied to a temp file without reading it into memory
+            result = tempfile.NamedTemporaryFile(
+                suffix=pathlib.Path(filename).suffix, dir=settings.FILE_UPLOAD_TEMP_DIR
+            )
             with open(output_file, mode='rb') as f:
-                return File(
-                    io.BytesIO(f.read()),
-                    name=filename,
-                )
+                shutil.copyfileobj(f, result, EXPORT_WRITE_BUFFER_SIZE)
+            result.seek(0)
+            return File(result, name=filename)
 
 
 def export_background(
@@ -377,6 +618,12 @@ def export_background(
     )
 
 
+def compact_background(export_id, source_id, *args, **kwargs):
+    from data_export.models import Export
+
+    Export.objects.get(id=export_id).compact_from(Export.objects.get(id=source_id))
+
+
 def set_export_background_failure(job, connection, type, value, traceback):
     from data_export.models import Export
 
@@ -12,6 +12,7 @@ from core import version
 from core.feature_flags import flag_set
 from core.utils.common import load_func
 from core.utils.io import get_all_files_from_dir, get_temp_dir, path_to_open_binary_file
+from data_export.mixins import PARQUET_FORMAT
 from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save
@@ -82,6 +83,21 @@ class Export(ExportMixin, models.Model):
         null=True,
         verbose_name=_('created by'),
     )
+    base_export = models.ForeignKey(
+        'self',
+        related_name='deltas',
+        on_delete=models.RESTRICT,
+        null=True,
+        default=None,
+        verbose_name=_('base export'),
+        help_text='Delta snapshots contain only tasks changed since the watermark of the base snapshot',
+    )
+    watermark = models.DateTimeField(
+        _('watermark'),
+        null=True,
+        default=None,
+        help_text='Changes made after this time are not guaranteed to be included, next delta starts from it',
+    )
 
 
 @receiver(post_save, sender=Export)
@@ -139,6 +155,10 @@ class DataExport(object):
             if format.name not in supported_formats:
                 format_info['disabled'] = True
             formats.append(format_info)
+
+        from .parquet import PARQUET_FORMAT_INFO
+
+        formats.append(deepcopy(PARQUET_FORMAT_INFO))
         return sorted(formats, key=lambda f: f.get('disabled', False))
 
     @staticmethod
@@ -156,6 +176,9 @@ class DataExport(object):
 
         input_json = DataExport.save_export_files(project, now, get_args, data, md5, name)
 
+        if output_format == PARQUET_FORMAT:
+            return DataExport.generate_parquet_file(tasks, name)
+
         converter = Converter(
             config=project.get_parsed_config(),
             project_dir=None,
@@ -183,6 +206,18 @@ class DataExport(object):
             filename = name + '.zip'
             return out, content_type, filename
 
+    @staticmethod
+    def generate_parquet_file(tasks, name):
+        from .parquet import ParquetExportWriter
+
+        with get_temp_dir() as tmp_dir:
+            out_dir = os.path.join(tmp_dir, name)
+            os.makedirs(out_dir)
+            with ParquetExportWriter(out_dir, prefix=name + '-') as writer:
+                writer.write(tasks)
+            archive = shutil.make_archive(out_dir, 'zip', out_dir)
+            return path_to_open_binary_file(archive), 'application/zip', name + '.zip'
+
 
 class ConvertedFormat(models.Model):
     class Status(models.TextChoices):
@@ -0,0 +1,199 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_export.mixins import PARQUET_FORMAT
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PARQUET_FORMAT_INFO = {
+    'name': PARQUET_FORMAT,
+    'title': 'Parquet',
+    'description': 'Tasks, annotations and flattened annotation regions stored as three Parquet tables. '
+    'Use for analytics, columns are read selectively without parsing JSON.',
+}
+
+# JSON objects without a fixed structure (task data, meta, region values) are stored as JSON strings
+TASKS_SCHEMA = pa.schema(
+    [
+        ('id', pa.int64()),
+        ('inner_id', pa.int64()),
+        ('project', pa.int64()),
+        ('data', pa.string()),
+        ('meta', pa.string()),
+        ('file_upload', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+        ('total_annotations', pa.int64()),
+        ('cancelled_annotations', pa.int64()),
+        ('total_predictions', pa.int64()),
+    ]
+)
+ANNOTATIONS_SCHEMA = pa.schema(
+    [
+        ('id', pa.int64()),
+        ('task_id', pa.int64()),
+        ('completed_by', pa.int64()),
+        ('was_cancelled', pa.bool_()),
+        ('ground_truth', pa.bool_()),
+        ('lead_time', pa.float64()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+        ('result_count', pa.int64()),
+        ('result', pa.string()),
+    ]
+)
+REGIONS_SCHEMA = pa.schema(
+    [
+        ('annotation_id', pa.int64()),
+        ('task_id', pa.int64()),
+        ('id', pa.string()),
+        ('from_name', pa.string()),
+        ('to_name', pa.string()),
+        ('type', pa.string()),
+        ('origin', pa.string()),
+        ('labels', pa.list_(pa.string())),
+        ('x', pa.float64()),
+        ('y', pa.float64()),
+        ('width', pa.float64()),
+        ('height', pa.float64()),
+        ('rotation', pa.float64()),
+        ('value', pa.string()),
+    ]
+)
+
+
+def _json(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _id(value):
+    # expanded relations (like annotations.completed_by) are dicts
+    return value.get('id') if isinstance(value, dict) else value
+
+
+def task_row(task):
+    return {
+        'id': task.get('id'),
+        'inner_id': task.get('inner_id'),
+        'project': task.get('project'),
+        'data': _json(task.get('data')),
+        'meta': _json(task.get('meta')),
+        'file_upload': task.get('file_upload'),
+        'created_at': _timestamp(task.get('created_at')),
+        'updated_at': _timestamp(task.get('updated_at')),
+        'total_annotations': task.get('total_annotations'),
+        'cancelled_annotations': task.get('cancelled_annotations'),
+        'total_predictions': task.get('total_predictions'),
+    }
+
+
+def annotation_row(task_id, annotation):
+    return {
+        'id': annotation.get('id'),
+        'task_id': task_id,
+        'completed_by': _id(annotation.get('completed_by')),
+        'was_cancelled': annotation.get('was_cancelled'),
+        'ground_truth': annotation.get('ground_truth'),
+        'lead_time': annotation.get('lead_time'),
+        'created_at': _timestamp(annotation.get('created_at')),
+        'updated_at': _timestamp(annotation.get('updated_at')),
+        'result_count': annotation.get('result_count'),
+        'result': _json(annotation.get('result')),
+    }
+
+
+def region_row(task_id, annotation_id, region):
+    value = region.get('value') or {}
+    labels = value.get(region.get('type'))
+    if not (isinstance(labels, list) and all(isinstance(label, str) for label in labels)):
+        labels = None
+    geometry = {key: value.get(key) for key in ('x', 'y', 'width', 'height', 'rotation')}
+    for key, number in geometry.items():
+        if not isinstance(number, (int, float)) or isinstance(number, bool):
+            geometry[key] = None
+    return {
+        'annotation_id': annotation_id,
+        'task_id': task_id,
+        'id': region.get('id'),
+        'from_name': region.get('from_name'),
+        'to_name': region.get('to_name'),
+        'type': region.get('type'),
+        'origin': region.get('origin'),
+        'labels': labels,
+        **geometry,
+        'value': _json(region.get('value')),
+    }
+
+
+class _TableWriter:
+    def __init__(self, path, schema, row_group_size):
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(path, schema, compression='zstd')
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_batch(pa.RecordBatch.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetExportWriter:
+    """Write exported tasks into tasks.parquet, annotations.parquet and regions.parquet of the output dir.
+    Rows are buffered per table and written as Parquet row groups of row_group_size rows,
+    so memory doesn't depend on the number of exported tasks.
+    """
+
+    def __init__(self, out_dir, prefix='', row_group_size=None):
+        row_group_size = row_group_size or settings.EXPORT_PARQUET_ROW_GROUP_SIZE
+        self.tasks = _TableWriter(os.path.join(out_dir, f'{prefix}tasks.parquet'), TASKS_SCHEMA, row_group_size)
+        self.annotations = _TableWriter(
+            os.path.join(out_dir, f'{prefix}annotations.parquet'), ANNOTATIONS_SCHEMA, row_group_size
+        )
+        self.regions = _TableWriter(os.path.join(out_dir, f'{prefix}regions.parquet'), REGIONS_SCHEMA, row_group_size)
+
+    def write_task(self, task):
+        task_id = task.get('id')
+        self.tasks.append(task_row(task))
+        for annotation in task.get('annotations') or []:
+            self.annotations.append(annotation_row(task_id, annotation))
+            for region in annotation.get('result') or []:
+                self.regions.append(region_row(task_id, annotation.get('id'), region))
+
+    def write(self, tasks):
+        for task in tasks:
+            self.write_task(task)
+
+    def close(self):
+        for table in (self.tasks, self.annotations, self.regions):
+            table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -69,7 +69,7 @@ class BaseExportDataSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Task
-        exclude = ('overlap', 'is_labeled')
+        exclude = ('overlap', 'is_labeled', 'data_hash')
         expandable_fields = {
             'drafts': (AnnotationDraftSerializer, {'many': True}),
             'predictions': (PredictionSerializer, {'many': True}),
@@ -106,12 +106,21 @@ class ExportSerializer(serializers.ModelSerializer):
             'md5',
             'counters',
             'converted_formats',
+            'base_export',
+            'watermark',
         ]
         fields = ['title'] + read_only
 
     created_by = UserSimpleSerializer(required=False)
     converted_formats = ConvertedFormatSerializer(many=True, required=False)
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # task ids of the snapshot are kept only for delta exports, they grow with the project size
+        if isinstance(data.get('counters'), dict):
+            data['counters'] = {key: value for key, value in data['counters'].items() if key != 'task_id_ranges'}
+        return data
+
 
 ONLY_OR_EXCLUDE_CHOICE = [
     2 * ['only'],
@@ -198,6 +207,43 @@ class ExportCreateSerializer(ExportSerializer):
     task_filter_options = TaskFilterOptionsSerializer(required=False, default=None)
     annotation_filter_options = AnnotationFilterOptionsSerializer(required=False, default=None)
     serialization_options = SerializationOptionsSerializer(required=False, default=None)
+    base_export = serializers.PrimaryKeyRelatedField(
+        queryset=Export.objects.all(),
+        required=False,
+        allow_null=True,
+        default=None,
+        help_text='Create a delta snapshot with tasks changed since this snapshot, '
+        'deleted tasks are listed in counters.deleted_task_id_ranges',
+    )
+
+    def validate_base_export(self, value):
+        if value is None:
+            return value
+        project = self.context.get('project')
+        if project is not None and value.project_id != project.id:
+            raise serializers.ValidationError('Base export snapshot belongs to another project')
+        if value.status != Export.Status.COMPLETED or value.watermark is None:
+            raise serializers.ValidationError('Base export snapshot is not completed')
+        if 'task_id_ranges' not in value.counters:
+            raise serializers.ValidationError('Base export snapshot was created before delta exports were supported')
+        return value
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        base_export = attrs.get('base_export')
+        if base_export is None:
+            return attrs
+        filter_options = Export.get_filter_options(
+            attrs.get('task_filter_options'),
+            attrs.get('annotation_filter_options'),
+            attrs.get('serialization_options'),
+        )
+        # tasks of a delta are selected by the current filters, tombstones are evaluated from the base snapshot
+        if base_export.counters.get('filter_options') != filter_options:
+            raise serializers.ValidationError(
+                {'base_export': 'Base export snapshot was created with different filter and serialization options'}
+            )
+        return attrs
 
 
 class ExportParamSerializer(serializers.Serializer):
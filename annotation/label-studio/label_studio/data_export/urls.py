@@ -19,6 +19,7 @@ _api_urlpatterns = [
         '<int:pk>/exports/<int:export_pk>/download', api.ExportDownloadAPI.as_view(), name='project-exports-download'
     ),
     path('<int:pk>/exports/<int:export_pk>/convert', api.ExportConvertAPI.as_view(), name='project-exports-convert'),
+    path('<int:pk>/exports/<int:export_pk>/compact', api.ExportCompactAPI.as_view(), name='project-exports-compact'),
 ]
 
 urlpatterns = [
@@ -19,6 +19,7 @@ from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
+from projects.functions.counters import apply_counter_deltas
 from projects.models import Project, ProjectImport, ProjectReimport
 from ranged_fileresponse import RangedFileResponse
 from rest_framework import generics, status
@@ -29,7 +30,7 @@ from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from tasks.functions import update_tasks_counters
-from tasks.models import Prediction, Task
+from tasks.models import Prediction, Task, fill_data_hashes
 from users.models import User
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -153,6 +154,15 @@ task_create_response_scheme = {
                 default=False,
                 required=False,
             ),
+            OpenApiParameter(
+                name='skip_duplicates',
+                type=OpenApiTypes.BOOL,
+                location='query',
+                description='Set to "true" to skip tasks with the same data as existing project tasks '
+                'or other imported tasks.',
+                default=False,
+                required=False,
+            ),
             OpenApiParameter(
                 name='preannotated_from_fields',
                 many=True,
@@ -264,7 +274,11 @@ class ImportAPI(generics.CreateAPIView):
             project = generics.get_object_or_404(Project.objects.for_user(self.request.user), pk=project_id)
         else:
             project = None
-        return {'project': project, 'user': self.request.user}
+        return {
+            'project': project,
+            'user': self.request.user,
+            'skip_duplicates': bool_from_request(self.request.query_params, 'skip_duplicates', False),
+        }
 
     def post(self, *args, **kwargs):
         return super(ImportAPI, self).post(*args, **kwargs)
@@ -272,6 +286,9 @@ class ImportAPI(generics.CreateAPIView):
     def _save(self, tasks):
         serializer = self.get_serializer(data=tasks, many=True)
         serializer.is_valid(raise_exception=True)
+        if serializer.context.get('skip_duplicates'):
+            # tasks created before the data_hash column or updated by SQL expressions have no hash yet
+            fill_data_hashes(Task.objects.filter(project_id=self.kwargs['pk']))
         task_instances = serializer.save(project_id=self.kwargs['pk'])
         project = generics.get_object_or_404(Project.objects.for_user(self.request.user), pk=self.kwargs['pk'])
         emit_webhooks_for_instance(
@@ -296,6 +313,7 @@ class ImportAPI(generics.CreateAPIView):
             task_count = len(tasks)
             annotation_count = len(serializer.db_annotations)
             prediction_count = len(serializer.db_predictions)
+            duplicate_count = serializer.skipped_duplicates
 
             recalculate_stats_counts = {
                 'task_count': task_count,
@@ -314,13 +332,15 @@ class ImportAPI(generics.CreateAPIView):
             )
             logger.info('Tasks bulk_update finished (sync import)')
 
-            project.summary.update_data_columns(parsed_data)
+            # skipped duplicates are not in the project
+            project.summary.update_data_columns(tasks if duplicate_count else parsed_data)
             # TODO: project.summary.update_created_annotations_and_labels
         else:
             # Do nothing - just output file upload ids for further use
             task_count = len(parsed_data)
             annotation_count = None
             prediction_count = None
+            duplicate_count = None
 
         duration = time.time() - start
 
@@ -328,6 +348,7 @@ class ImportAPI(generics.CreateAPIView):
             'task_count': task_count,
             'annotation_count': annotation_count,
             'prediction_count': prediction_count,
+            'duplicate_count': duplicate_count,
             'duration': duration,
             'file_upload_ids': file_upload_ids,
             'could_be_tasks_list': could_be_tasks_list,
@@ -347,6 +368,7 @@ class ImportAPI(generics.CreateAPIView):
             preannotated_from_fields=preannotated_from_fields,
             commit_to_project=commit_to_project,
             return_task_ids=return_task_ids,
+            skip_duplicates=bool_from_request(request.query_params, 'skip_duplicates', False),
         )
 
         if len(request.FILES):
@@ -428,16 +450,17 @@ class ImportPredictionsAPI(generics.CreateAPIView):
                     f'{item} contains invalid "task" field: corresponding task ID couldn\'t be retrieved '
                     f'from project {project} tasks'
                 )
-            predictions.append(
-                Prediction(
-                    task_id=item['task'],
-                    project_id=project.id,
-                    result=Prediction.prepare_prediction_result(item.get('result'), project),
-                    score=item.get('score'),
-                    model_version=item.get('model_version', 'undefined'),
-                )
+            prediction = Prediction(
+                task_id=item['task'],
+                project_id=project.id,
+                result=Prediction.prepare_prediction_result(item.get('result'), project),
+                score=item.get('score'),
+                model_version=item.get('model_version', 'undefined'),
             )
+            prediction.update_uncertainty()
+            predictions.append(prediction)
         predictions_obj = Prediction.objects.bulk_create(predictions, batch_size=settings.BATCH_SIZE)
+        apply_counter_deltas(project.id, {'total_predictions_number': len(predictions_obj)})
         start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=tasks_ids))
         return Response({'created': len(predictions_obj)}, status=status.HTTP_201_CREATED)
 
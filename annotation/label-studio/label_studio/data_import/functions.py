@@ -3,15 +3,18 @@ import time
 import traceback
 from typing import Callable, Optional
 
-from core.utils.common import load_func
+from core.utils.common import batched_iterator, load_func
 from django.conf import settings
 from django.db import transaction
-from projects.models import ProjectImport, ProjectReimport, ProjectSummary
+from django.utils import timezone
+from projects.models import ProjectImport, ProjectReimport
+from rest_framework.exceptions import ValidationError
+from tasks.models import Task, fill_data_hashes
 from users.models import User
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
 
-from .models import FileUpload
+from .models import FileUpload, UploadedFilesTasksReader
 from .serializers import ImportApiSerializer
 from .uploader import load_tasks_for_async_import
 
@@ -37,71 +40,123 @@ def async_import_background(
 
     start = time.time()
     project = project_import.project
-    tasks = None
     # upload files from request, and parse all tasks
-    # TODO: Stop passing request to load_tasks function, make all validation before
-    tasks, file_upload_ids, found_formats, data_columns = load_tasks_for_async_import(project_import, user)
-
-    if project_import.preannotated_from_fields:
-        # turn flat task JSONs {"column1": value, "column2": value} into {"data": {"column1"..}, "predictions": [{..."column2"}]
-        tasks = reformat_predictions(tasks, project_import.preannotated_from_fields)
-
-    if project_import.commit_to_project:
-        with transaction.atomic():
-            # Lock summary for update to avoid race conditions
-            summary = ProjectSummary.objects.select_for_update().get(project=project)
-
-            # Immediately create project tasks and update project states and counters
-            serializer = ImportApiSerializer(data=tasks, many=True, context={'project': project})
-            serializer.is_valid(raise_exception=True)
-            tasks = serializer.save(project_id=project.id)
-            emit_webhooks_for_instance(user.active_organization, project, WebhookAction.TASKS_CREATED, tasks)
-
-            task_count = len(tasks)
-            annotation_count = len(serializer.db_annotations)
-            prediction_count = len(serializer.db_predictions)
-            # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
-            # single operation as counters affect bulk is_labeled update
-
-            recalculate_stats_counts = {
-                'task_count': task_count,
-                'annotation_count': annotation_count,
-                'prediction_count': prediction_count,
-            }
-
-            project.update_tasks_counters_and_task_states(
-                tasks_queryset=tasks,
-                maximum_annotations_changed=False,
-                overlap_cohort_percentage_changed=False,
-                tasks_number_changed=True,
-                recalculate_stats_counts=recalculate_stats_counts,
+    if project_import.file_upload_ids:
+        # uploaded files are parsed incrementally, so big files don't have to fit in memory at once
+        file_upload_ids = project_import.file_upload_ids
+        reader = UploadedFilesTasksReader(project, file_upload_ids)
+        tasks = reader
+    else:
+        # TODO: Stop passing request to load_tasks function, make all validation before
+        reader = None
+        tasks, file_upload_ids, found_formats, data_columns = load_tasks_for_async_import(project_import, user)
+
+    if project_import.commit_to_project and project_import.skip_duplicates:
+        # tasks created before the data_hash column or updated by SQL expressions have no hash yet,
+        # they are hashed once here instead of in every chunk transaction
+        fill_data_hashes(Task.objects.filter(project=project))
+
+    task_count = annotation_count = prediction_count = duplicate_count = 0
+    task_ids = []
+    for chunk in batched_iterator(tasks, settings.IMPORT_TASKS_CHUNK_SIZE):
+        if task_count + len(chunk) > settings.TASKS_MAX_NUMBER:
+            raise ValidationError(
+                f'Maximum task number is {settings.TASKS_MAX_NUMBER}, '
+                f'current task number is at least {task_count + len(chunk)}'
             )
-            logger.info('Tasks bulk_update finished (async import)')
 
-            summary.update_data_columns(tasks)
-            # TODO: summary.update_created_annotations_and_labels
-    else:
-        # Do nothing - just output file upload ids for further use
-        task_count = len(tasks)
-        annotation_count = None
-        prediction_count = None
+        if project_import.preannotated_from_fields:
+            # turn flat task JSONs {"column1": value, "column2": value} into {"data": {"column1"..}, "predictions": [{..."column2"}]
+            chunk = reformat_predictions(chunk, project_import.preannotated_from_fields)
+
+        if project_import.commit_to_project:
+            # every chunk is committed separately, so the import doesn't hold a single huge transaction
+            chunk, chunk_annotation_count, chunk_prediction_count, chunk_duplicate_count = _commit_tasks_chunk(
+                project, user, chunk, skip_duplicates=project_import.skip_duplicates
+            )
+            annotation_count += chunk_annotation_count
+            prediction_count += chunk_prediction_count
+            duplicate_count += chunk_duplicate_count
+            if project_import.return_task_ids:
+                task_ids += [task.id for task in chunk]
+        task_count += len(chunk)
+
+        # report progress of big imports
+        project_import.task_count = task_count
+        project_import.annotation_count = annotation_count
+        project_import.prediction_count = prediction_count
+        project_import.duplicate_count = duplicate_count
+        project_import.updated_at = timezone.now()
+        project_import.save(
+            update_fields=['task_count', 'annotation_count', 'prediction_count', 'duplicate_count', 'updated_at']
+        )
+
+    # empty tasks error, tasks skipped as duplicates are not an error
+    if not task_count and not duplicate_count:
+        raise ValidationError('load_tasks: No tasks added')
+
+    if project_import.commit_to_project and task_count:
+        # the overlap cohort is rearranged over the whole project, so it's done once for all chunks
+        project.update_tasks_states(
+            maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
+        )
+
+    if reader is not None:
+        found_formats, data_columns = reader.found_formats, list(reader.data_columns)
 
     duration = time.time() - start
 
-    project_import.task_count = task_count or 0
-    project_import.annotation_count = annotation_count or 0
-    project_import.prediction_count = prediction_count or 0
     project_import.duration = duration
     project_import.file_upload_ids = file_upload_ids
     project_import.found_formats = found_formats
     project_import.data_columns = data_columns
     if project_import.return_task_ids:
-        project_import.task_ids = [task.id for task in tasks]
+        project_import.task_ids = task_ids
 
     project_import.status = ProjectImport.Status.COMPLETED
     project_import.save()
 
 
+def _commit_tasks_chunk(project, user, tasks, skip_duplicates=False):
+    with transaction.atomic():
+        # summary changes are appended as deltas, the summary row isn't locked for the whole import
+        summary = project.summary
+
+        # Immediately create project tasks and update project states and counters
+        serializer = ImportApiSerializer(
+            data=tasks, many=True, context={'project': project, 'skip_duplicates': skip_duplicates}
+        )
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save(project_id=project.id)
+        emit_webhooks_for_instance(user.active_organization, project, WebhookAction.TASKS_CREATED, tasks)
+
+        annotation_count = len(serializer.db_annotations)
+        prediction_count = len(serializer.db_predictions)
+        duplicate_count = serializer.skipped_duplicates
+        # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
+        # single operation as counters affect bulk is_labeled update
+
+        recalculate_stats_counts = {
+            'task_count': len(tasks),
+            'annotation_count': annotation_count,
+            'prediction_count': prediction_count,
+        }
+
+        project.update_tasks_counters_and_task_states(
+            tasks_queryset=tasks,
+            maximum_annotations_changed=False,
+            overlap_cohort_percentage_changed=False,
+            # async_import_background rearranges the overlap cohort once after the last chunk
+            tasks_number_changed=False,
+            recalculate_stats_counts=recalculate_stats_counts,
+        )
+        logger.info('Tasks bulk_update finished (async import)')
+
+        summary.update_data_columns(tasks)
+        # TODO: summary.update_created_annotations_and_labels
+    return tasks, annotation_count, prediction_count, duplicate_count
+
+
 def set_import_background_failure(job, connection, type, value, _):
     import_id = job.args[0]
     ProjectImport.objects.filter(id=import_id).update(
@@ -152,8 +207,8 @@ def async_reimport_background(reimport_id, organization_id, user, **kwargs):
     )
 
     with transaction.atomic():
-        # Lock summary for update to avoid race conditions
-        summary = ProjectSummary.objects.select_for_update().get(project=project)
+        # summary changes are appended as deltas, the summary row isn't locked for the whole import
+        summary = project.summary
 
         project.remove_tasks_by_file_uploads(reimport.file_upload_ids)
         serializer = ImportApiSerializer(data=tasks, many=True, context={'project': project, 'user': user})
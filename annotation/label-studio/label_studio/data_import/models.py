@@ -1,9 +1,11 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import codecs
 import logging
 import os
 import uuid
 from collections import Counter
+from json import JSONDecodeError, JSONDecoder
 
 import pandas as pd
 
@@ -19,6 +21,152 @@ from rest_framework.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
 
+# bytes read from an uploaded file at once by streaming readers
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_text_chunks(file, chunk_size=READ_CHUNK_SIZE):
+    """Decode a binary file as UTF-8 chunk by chunk, multibyte characters split between chunks are kept intact"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    first = True
+    while data := file.read(chunk_size):
+        text = decoder.decode(data)
+        if first and text:
+            text = text.lstrip('\ufeff')
+            first = False
+        yield text
+    yield decoder.decode(b'', final=True)
+
+
+def iter_lines(chunks):
+    rest = ''
+    for chunk in chunks:
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+def iter_json_items(chunks):
+    """Yield items of a top level JSON array from text chunks without building the whole document.
+    A top level object is yielded as a single item.
+    """
+    decoder = JSONDecoder()
+    chunks = iter(chunks)
+    buffer, pos, eof = '', 0, False
+    # the consumed part of the document is dropped from the buffer: its length, line count and last line break
+    offset, lines, last_newline = 0, 0, -1
+
+    def read_more(grow=False):
+        # grow=True reads until the unparsed part doubles, so big items are not re-parsed for every chunk
+        nonlocal buffer, pos, eof, offset, lines, last_newline
+        newline = buffer.rfind('\n', 0, pos)
+        if newline >= 0:
+            lines += buffer.count('\n', 0, pos)
+            last_newline = offset + newline
+        offset += pos
+        buffer = buffer[pos:]
+        pos = 0
+        target = 2 * len(buffer) if grow else len(buffer) + 1
+        parts = [buffer]
+        size = len(buffer)
+        for chunk in chunks:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= target:
+                break
+        else:
+            eof = True
+        buffer = ''.join(parts)
+
+    def decode_error(msg, at):
+        """JSONDecodeError with the position in the whole document instead of the buffer"""
+        newline = buffer.rfind('\n', 0, at)
+        lineno = lines + buffer.count('\n', 0, at) + 1
+        colno = at - newline if newline >= 0 else offset + at - last_newline
+        error = JSONDecodeError(msg, buffer, at)
+        error.pos, error.lineno, error.colno = offset + at, lineno, colno
+        error.args = (f'{msg}: line {lineno} column {colno} (char {offset + at})',)
+        return error
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            read_more()
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        raise decode_error('Expecting value', pos)
+
+    if buffer[pos] != '[':
+        # single task, it's read as a whole like before
+        while not eof:
+            read_more()
+        try:
+            item = decoder.decode(buffer[pos:])
+        except JSONDecodeError as e:
+            raise decode_error(e.msg, pos + e.pos) from None
+        yield item
+        return
+
+    pos += 1
+    expect_item, empty = True, True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise decode_error('Unterminated array', pos)
+        if buffer[pos] == ']':
+            if expect_item and not empty:
+                raise decode_error('Expecting value', pos)
+            pos += 1
+            break
+        if not expect_item:
+            if buffer[pos] != ',':
+                raise decode_error("Expecting ',' delimiter", pos)
+            pos += 1
+            expect_item = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except JSONDecodeError as e:
+            if eof:
+                raise decode_error(e.msg, e.pos) from None
+            read_more(grow=True)
+            continue
+        if (
+            not eof
+            and isinstance(item, (int, float))
+            and not isinstance(item, bool)
+            and not buffer[end:].strip(NUMBER_CHARS)
+        ):
+            # a number at the end of the buffer (like "1" of "1.5e3") could continue in the next chunk
+            read_more()
+            continue
+        yield item
+        pos = end
+        expect_item, empty = False, False
+
+    skip_whitespace()
+    if pos < len(buffer):
+        raise decode_error('Extra data', pos)
+
+
+def format_task(task):
+    if not task.get('data'):
+        task = {'data': task}
+    if not isinstance(task['data'], dict):
+        raise ValidationError('Task item should be dict')
+    return task
+
 
 def upload_name_generator(instance, filename):
     project = str(instance.project_id)
@@ -90,23 +238,31 @@ class FileUpload(models.Model):
 
     def read_tasks_list_from_json(self):
         logger.debug('Read tasks list from JSON file {}'.format(self.filepath))
+        return list(self.iter_tasks_list_from_json())
 
-        raw_data = self.content
-        # Python 3.5 compatibility fix https://docs.python.org/3/whatsnew/3.6.html#json
-        try:
-            tasks = json.loads(raw_data)
-        except TypeError:
-            tasks = json.loads(raw_data.decode('utf8'))
-        if isinstance(tasks, dict):
-            tasks = [tasks]
-        tasks_formatted = []
-        for i, task in enumerate(tasks):
-            if not task.get('data'):
-                task = {'data': task}
-            if not isinstance(task['data'], dict):
-                raise ValidationError('Task item should be dict')
-            tasks_formatted.append(task)
-        return tasks_formatted
+    def read_tasks_list_from_jsonl(self):
+        logger.debug('Read tasks list from JSONL file {}'.format(self.filepath))
+        return list(self.iter_tasks_list_from_jsonl())
+
+    def iter_tasks_list_from_csv(self, sep=','):
+        chunks = pd.read_csv(self.file.open(), sep=sep, chunksize=settings.IMPORT_TASKS_CHUNK_SIZE)
+        for chunk in chunks:
+            for task in chunk.fillna('').to_dict('records'):
+                yield {'data': task}
+
+    def iter_tasks_list_from_txt(self):
+        for line in iter_lines(iter_text_chunks(self.file.open('rb'))):
+            # like str.splitlines() for "\r\n" line endings
+            yield {'data': {settings.DATA_UNDEFINED_NAME: line.rstrip('\r')}}
+
+    def iter_tasks_list_from_json(self):
+        for task in iter_json_items(iter_text_chunks(self.file.open('rb'))):
+            yield format_task(task)
+
+    def iter_tasks_list_from_jsonl(self):
+        for line in iter_lines(iter_text_chunks(self.file.open('rb'))):
+            if line.strip():
+                yield format_task(json.loads(line))
 
     def read_task_from_hypertext_body(self):
         logger.debug('Read 1 task from hypertext file {}'.format(self.filepath))
@@ -138,6 +294,8 @@ class FileUpload(models.Model):
                 tasks = self.read_tasks_list_from_txt()
             elif file_format == '.json':
                 tasks = self.read_tasks_list_from_json()
+            elif file_format == '.jsonl':
+                tasks = self.read_tasks_list_from_jsonl()
 
             # otherwise - only one object tag should be presented in label config
             elif not self.project.one_object_in_label_config:
@@ -156,6 +314,27 @@ class FileUpload(models.Model):
             raise ValidationError('Failed to parse input file ' + self.file_name + ': ' + str(exc))
         return tasks
 
+    def iter_tasks(self, file_as_tasks_list=True):
+        """Like read_tasks(), but tasks lists (JSON, JSONL, CSV, TSV, TXT) are parsed incrementally"""
+        file_format = self.format
+        if file_format in ('.csv', '.tsv', '.txt') and file_as_tasks_list:
+            if file_format == '.txt':
+                tasks = self.iter_tasks_list_from_txt()
+            else:
+                tasks = self.iter_tasks_list_from_csv(sep='\t' if file_format == '.tsv' else ',')
+        elif file_format == '.json':
+            tasks = self.iter_tasks_list_from_json()
+        elif file_format == '.jsonl':
+            tasks = self.iter_tasks_list_from_jsonl()
+        else:
+            yield from self.read_tasks(file_as_tasks_list)
+            return
+
+        try:
+            yield from tasks
+        except Exception as exc:
+            raise ValidationError('Failed to parse input file ' + self.file_name + ': ' + str(exc))
+
     @classmethod
     def load_tasks_from_uploaded_files(
         cls, project, file_upload_ids=None, formats=None, files_as_tasks_list=True, trim_size=None
@@ -177,16 +356,7 @@ class FileUpload(models.Model):
                 task['file_upload_id'] = file_upload.id
 
             new_data_fields = set(iter(new_tasks[0]['data'].keys())) if len(new_tasks) > 0 else set()
-            if not common_data_fields:
-                common_data_fields = new_data_fields
-            elif not common_data_fields.intersection(new_data_fields):
-                raise ValidationError(
-                    _old_vs_new_data_keys_inconsistency_message(
-                        new_data_fields, common_data_fields, file_upload.file.name
-                    )
-                )
-            else:
-                common_data_fields &= new_data_fields
+            common_data_fields = _merge_data_fields(common_data_fields, new_data_fields, file_upload)
 
             tasks += new_tasks
             fileformats.append(file_format)
@@ -198,6 +368,53 @@ class FileUpload(models.Model):
         return tasks, dict(Counter(fileformats)), common_data_fields
 
 
+class UploadedFilesTasksReader:
+    """Iterate over tasks of uploaded files, files are parsed incrementally (see FileUpload.iter_tasks),
+    so memory doesn't depend on the number of tasks. found_formats and data_columns are complete
+    once the iteration is finished.
+    """
+
+    def __init__(self, project, file_upload_ids=None, formats=None, files_as_tasks_list=True):
+        self.project = project
+        self.file_upload_ids = file_upload_ids
+        self.formats = formats
+        self.files_as_tasks_list = files_as_tasks_list
+        self.fileformats = []
+        self.data_columns = set()
+
+    @property
+    def found_formats(self):
+        return dict(Counter(self.fileformats))
+
+    def __iter__(self):
+        file_uploads = FileUpload.objects.filter(project=self.project)
+        if self.file_upload_ids:
+            file_uploads = file_uploads.filter(id__in=self.file_upload_ids)
+        for file_upload in file_uploads:
+            file_format = file_upload.format
+            if self.formats and file_format not in self.formats:
+                continue
+            first = True
+            for task in file_upload.iter_tasks(self.files_as_tasks_list):
+                if first:
+                    self.data_columns = _merge_data_fields(self.data_columns, set(task['data'].keys()), file_upload)
+                    first = False
+                task['file_upload_id'] = file_upload.id
+                yield task
+            self.fileformats.append(file_format)
+
+
+def _merge_data_fields(common_data_fields, new_data_fields, file_upload):
+    # data keys of all files must intersect, only common keys are kept
+    if not common_data_fields:
+        return new_data_fields
+    if not common_data_fields.intersection(new_data_fields):
+        raise ValidationError(
+            _old_vs_new_data_keys_inconsistency_message(new_data_fields, common_data_fields, file_upload.file.name)
+        )
+    return common_data_fields & new_data_fields
+
+
 def _old_vs_new_data_keys_inconsistency_message(new_data_keys, old_data_keys, current_file):
     new_data_keys_list = ','.join(new_data_keys)
     old_data_keys_list = ','.join(old_data_keys)
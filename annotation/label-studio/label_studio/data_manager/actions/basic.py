@@ -8,6 +8,12 @@ from core.redis import start_job_async_or_sync
 from core.utils.common import load_func
 from data_manager.functions import evaluate_predictions
 from django.conf import settings
+from projects.functions.counters import (
+    annotations_queryset_counter_deltas,
+    apply_counter_deltas,
+    counters_suspended,
+    tasks_queryset_counter_deltas,
+)
 from projects.models import Project
 from tasks.functions import update_tasks_counters
 from tasks.models import Annotation, AnnotationDraft, Prediction, Task
@@ -39,8 +45,10 @@ def delete_tasks(project, queryset, **kwargs):
     count = len(tasks_ids)
     tasks_ids_list = [task['id'] for task in tasks_ids]
     project_count = project.tasks.count()
-    # unlink tasks from project
     queryset = Task.objects.filter(id__in=tasks_ids_list)
+    # tasks are deleted without signals, so subtract them from project counters in bulk
+    apply_counter_deltas(project.id, tasks_queryset_counter_deltas(queryset))
+    # unlink tasks from project
     queryset.update(project=None)
     # delete all project tasks
     if count == project_count:
@@ -97,13 +105,18 @@ def delete_tasks_annotations(project, queryset, **kwargs):
         drafts = drafts.filter(user=int(annotator_id))
     project.summary.remove_created_drafts_and_labels(drafts)
 
-    count, _ = annotations.delete()
+    # task state counters are recounted by update_tasks_counters_and_is_labeled
+    counter_deltas = annotations_queryset_counter_deltas(annotations)
+    with counters_suspended():
+        count, _ = annotations.delete()
+    apply_counter_deltas(project.id, counter_deltas)
+    # tasks with deleted drafts only are changed too for delta exports
+    changed_task_ids = real_task_ids | set(drafts.values_list('task_id', flat=True))
     drafts.delete()  # since task-level annotation drafts will not have been deleted by CASCADE
     emit_webhooks_for_instance(project.organization, project, WebhookAction.ANNOTATIONS_DELETED, annotations_ids)
     request = kwargs['request']
 
-    tasks = Task.objects.filter(id__in=real_task_ids)
-    tasks.update(updated_at=datetime.now(), updated_by=request.user)
+    Task.objects.filter(id__in=changed_task_ids).update(updated_at=datetime.now(), updated_by=request.user)
     # Update tasks counter and is_labeled. It should be a single operation as counters affect bulk is_labeled update
     project.update_tasks_counters_and_is_labeled(tasks_queryset=real_task_ids)
 
@@ -150,7 +163,9 @@ def delete_tasks_predictions(project, queryset, **kwargs):
     predictions = Prediction.objects.filter(task__id__in=task_ids)
     real_task_ids = set(list(predictions.values_list('task__id', flat=True)))
     count = predictions.count()
-    predictions.delete()
+    with counters_suspended():
+        predictions.delete()
+    apply_counter_deltas(project.id, {'total_predictions_number': -count})
     start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=real_task_ids))
     return {'processed_items': count, 'detail': 'Deleted ' + str(count) + ' predictions'}
 
@@ -2,11 +2,15 @@
 """
 
 import logging
+from collections import Counter, defaultdict
 
 from core.permissions import AllPermissions
 from core.redis import start_job_async_or_sync
+from django.conf import settings
+from django.db import transaction
 from label_studio_sdk.label_interface import LabelInterface
-from tasks.models import Annotation, Prediction, Task
+from rq import get_current_job
+from tasks.models import Annotation, Prediction, Task, hash_task_data
 
 logger = logging.getLogger(__name__)
 all_permissions = AllPermissions()
@@ -34,35 +38,52 @@ def cache_labels_job(project, queryset, **kwargs):
     else:
         column_name = f'{column_name}_{control_tag}'
 
-    tasks = list(queryset.only('data'))
-    logger.info(f'Cache labels for {len(tasks)} tasks and control tag {control_tag}')
+    logger.info(f'Cache labels for project {project.id} and control tag {control_tag}')
+    # tasks are processed in ID ordered chunks: one query for the chunk results and one bulk update,
+    # so the memory doesn't depend on the number of selected tasks
+    tasks = Task.objects.filter(id__in=queryset.values('id')).order_by('id').only('id', 'data', 'data_hash')
+    job = get_current_job()
+    first_task, last_id, updated = None, 0, 0
+    while chunk := list(tasks.filter(id__gt=last_id)[: settings.BATCH_SIZE]):
+        task_labels = defaultdict(Counter)
+        results = source_class.objects.filter(task_id__in=[task.id for task in chunk]).values_list('task_id', 'result')
+        for task_id, result in results:
+            task_labels[task_id].update(extract_result_labels(result, control_tag, label_interface_tags))
+
+        for task in chunk:
+            labels = task_labels[task.id]
+            # cache labels in separate data column
+            # with counters
+            if with_counters:
+                task.data[column_name] = ', '.join(sorted(f'{label}: {count}' for label, count in labels.items()))
+            # no counters
+            else:
+                task.data[column_name] = ', '.join(sorted(labels))
+            task.data_hash = hash_task_data(task.data)
+
+        with transaction.atomic():
+            Task.objects.bulk_update(chunk, fields=['data', 'data_hash'])
+
+        first_task = first_task or chunk[0]
+        last_id = chunk[-1].id
+        updated += len(chunk)
+        logger.info(f'Cache labels for project {project.id}: {updated} tasks updated')
+        if job is not None:
+            job.meta['progress'] = updated
+            job.save_meta()
+
+    if first_task is not None:
+        project.summary.update_data_columns([first_task])
+    return {'response_code': 200, 'detail': f'Updated {updated} tasks'}
 
-    for task in tasks:
-        task_labels = []
-        annotations = source_class.objects.filter(task=task).only('result')
-        for annotation in annotations:
-            labels = extract_labels(annotation, control_tag, label_interface_tags)
-            task_labels.extend(labels)
 
-        # cache labels in separate data column
-        # with counters
-        if with_counters:
-            task.data[column_name] = ', '.join(
-                sorted([f'{label}: {task_labels.count(label)}' for label in set(task_labels)])
-            )
-        # no counters
-        else:
-            task.data[column_name] = ', '.join(sorted(list(set(task_labels))))
-
-    Task.objects.bulk_update(tasks, fields=['data'], batch_size=1000)
-    first_task = Task.objects.get(id=queryset.first().id)
-    project.summary.update_data_columns([first_task])
-    return {'response_code': 200, 'detail': f'Updated {len(tasks)} tasks'}
+def extract_labels(annotation, control_tag, label_interface_tags=None):
+    return extract_result_labels(annotation.result, control_tag, label_interface_tags)
 
 
-def extract_labels(annotation, control_tag, label_interface_tags=None):
+def extract_result_labels(result, control_tag, label_interface_tags=None):
     labels = []
-    for region in annotation.result:
+    for region in result if isinstance(result, list) else []:
         # find regions with specific control tag name or just all regions if control tag is None
         if (control_tag is None or region['from_name'] == control_tag) and 'value' in region:
             # scan value for a field with list of strings (eg choices, textareas)
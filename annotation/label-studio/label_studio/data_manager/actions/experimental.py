@@ -9,7 +9,8 @@ from core.permissions import AllPermissions
 from core.utils.db import fast_first
 from data_manager.functions import DataManagerException
 from django.conf import settings
-from tasks.models import Annotation, Task
+from projects.functions.counters import annotation_counter_deltas, apply_counter_deltas
+from tasks.models import Annotation, Task, hash_task_data
 from tasks.serializers import TaskSerializerBulk
 
 logger = logging.getLogger(__name__)
@@ -46,6 +47,8 @@ def propagate_annotations(project, queryset, **kwargs):
         db_annotations.append(Annotation(**body))
 
     db_annotations = Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
+    # task state counters are recounted by update_tasks_counters_and_is_labeled
+    apply_counter_deltas(project.id, annotation_counter_deltas(db_annotations))
     TaskSerializerBulk.post_process_annotations(user, db_annotations, 'propagated_annotation')
     # Update counters for tasks and is_labeled. It should be a single operation as counters affect bulk is_labeled update
     project.update_tasks_counters_and_is_labeled(tasks_queryset=Task.objects.filter(id__in=tasks))
@@ -177,7 +180,8 @@ def add_data_field(project, queryset, **kwargs):
             tasks = list(queryset.only('data'))
             for task in tasks:
                 task.data[value_name] = value
-            Task.objects.bulk_update(tasks, fields=['data'], batch_size=1000)
+                task.data_hash = hash_task_data(task.data)
+            Task.objects.bulk_update(tasks, fields=['data', 'data_hash'], batch_size=1000)
 
         # postgres and other DB
         else:
@@ -187,7 +191,9 @@ def add_data_field(project, queryset, **kwargs):
                     Value([value_name]),
                     Value(value, JSONField()),
                     function='jsonb_set',
-                )
+                ),
+                # hashes are recalculated by the duplicates search
+                data_hash=None,
             )
 
     project.summary.update_data_columns([queryset.first()])
@@ -267,7 +273,9 @@ def add_expression(queryset, size, value, value_name):
     else:
         raise Exception('Undefined expression, you can use: ' + add_data_field_examples)
 
-    Task.objects.bulk_update(tasks, fields=['data'], batch_size=1000)
+    for task in tasks:
+        task.data_hash = hash_task_data(task.data)
+    Task.objects.bulk_update(tasks, fields=['data', 'data_hash'], batch_size=1000)
 
 
 def add_data_field_form(user, project):
@@ -4,6 +4,7 @@ import logging
 
 from core.permissions import AllPermissions
 from django.utils.timezone import now
+from projects.functions.counters import annotation_counter_deltas, apply_counter_deltas
 from tasks.models import Annotation, Prediction, Task
 from tasks.serializers import TaskSerializerBulk
 from webhooks.models import WebhookAction
@@ -48,6 +49,8 @@ def predictions_to_annotations(project, queryset, **kwargs):
     logger.debug(f'{count} predictions will be converter to annotations')
     db_annotations = [Annotation(**annotation) for annotation in annotations]
     db_annotations = Annotation.objects.bulk_create(db_annotations)
+    # task state counters are recounted by update_tasks_counters_and_is_labeled
+    apply_counter_deltas(project.id, annotation_counter_deltas(db_annotations))
     Task.objects.filter(id__in=tasks_ids).update(updated_at=now(), updated_by=request.user)
 
     if db_annotations:
@@ -4,17 +4,18 @@
 import logging
 from collections import defaultdict
 
-import ujson as json
 from core.label_config import replace_task_data_undefined_with_config_field
 from core.permissions import AllPermissions
 from core.redis import start_job_async_or_sync
 from data_manager.actions.basic import delete_tasks
+from django.conf import settings
+from django.db.models import Count
 from io_storages.azure_blob.models import AzureBlobImportStorageLink
 from io_storages.gcs.models import GCSImportStorageLink
 from io_storages.localfiles.models import LocalFilesImportStorageLink
 from io_storages.redis.models import RedisImportStorageLink
 from io_storages.s3.models import S3ImportStorageLink
-from tasks.models import Task
+from tasks.models import Annotation, Task, fill_data_hashes, hash_task_data
 
 logger = logging.getLogger(__name__)
 all_permissions = AllPermissions()
@@ -35,11 +36,16 @@ def remove_duplicates(project, queryset, **kwargs):
 
 
 def remove_duplicates_job(project, queryset, **kwargs):
-    """Job for start_job_async_or_sync"""
-    duplicates = find_duplicated_tasks_by_data(project, queryset)
-    restore_storage_links_for_duplicated_tasks(duplicates)
-    move_annotations(duplicates)
-    remove_duplicated_tasks(duplicates, project, queryset)
+    """Job for start_job_async_or_sync, duplicates are processed in chunks of BATCH_SIZE groups,
+    tasks to remove are collected from all chunks and deleted at once
+    """
+    removing = []
+    for duplicates in find_duplicated_tasks_by_data(project, queryset):
+        restore_storage_links_for_duplicated_tasks(duplicates)
+        move_annotations(duplicates)
+        removing += get_duplicated_tasks_to_remove(duplicates)
+    # every task belongs to one group only, duplicated IDs would break the count check of remove_duplicated_tasks
+    remove_duplicated_tasks(list(dict.fromkeys(removing)), project, queryset)
 
     # totally update tasks counters
     project._update_tasks_counters_and_task_states(
@@ -51,13 +57,11 @@ def remove_duplicates_job(project, queryset, **kwargs):
     )
 
 
-def remove_duplicated_tasks(duplicates, project, queryset):
-    """Remove duplicated tasks from queryset with condition that they don't have annotations
+def get_duplicated_tasks_to_remove(duplicates):
+    """IDs of duplicated tasks to remove, tasks with annotations and the first task of each group are kept
 
-    :param duplicates: dict with duplicated tasks
-    :param project: Project instance
-    :param queryset: queryset with input tasks
-    :return: queryset with tasks which should be kept
+    :param duplicates: dict with duplicated tasks grouped by data hash
+    :return: list of task IDs
     """
     removing = []
     # prepare main tasks which won't be deleted
@@ -82,7 +86,17 @@ def remove_duplicated_tasks(duplicates, project, queryset):
             # remove all other tasks
             else:
                 removing.append(task['id'])
+    return removing
+
 
+def remove_duplicated_tasks(removing, project, queryset):
+    """Remove duplicated tasks from queryset with condition that they don't have annotations
+
+    :param removing: IDs of duplicated tasks to remove
+    :param project: Project instance
+    :param queryset: queryset with input tasks
+    :return: queryset with tasks which should be kept
+    """
     # get the final queryset for removing tasks
     queryset = queryset.filter(id__in=removing, annotations__isnull=True)
     kept = queryset.exclude(id__in=removing, annotations__isnull=True)
@@ -95,7 +109,9 @@ def remove_duplicated_tasks(duplicates, project, queryset):
             'It means that some of duplicated tasks have been annotated twice or more.'
         )
 
-    delete_tasks(project, queryset)
+    if removing:
+        # project counters, states, webhooks and the summary are updated once for all removed tasks
+        delete_tasks(project, queryset)
     logger.info(f'Removed {len(removing)} duplicated tasks')
     return kept
 
@@ -117,15 +133,17 @@ def move_annotations(duplicates):
                 break
 
         # move annotations to the first task
-        for task in root[i + 1 :]:
-            if task['total_annotations'] + task['cancelled_annotations'] > 0:
-                Task.objects.get(id=task['id']).annotations.update(task_id=first['id'])
-                total_moved_annotations += task['total_annotations'] + task['cancelled_annotations']
-                logger.info(
-                    f"Moved {task['total_annotations']} annotations from task {task['id']} to task {first['id']}"
-                )
-                task['total_annotations'] = 0
-                task['cancelled_annotations'] = 0
+        annotated = [task for task in root[i + 1 :] if task['total_annotations'] + task['cancelled_annotations'] > 0]
+        if not annotated:
+            continue
+        Annotation.objects.filter(task_id__in=[task['id'] for task in annotated]).update(task_id=first['id'])
+        for task in annotated:
+            total_moved_annotations += task['total_annotations'] + task['cancelled_annotations']
+            task['total_annotations'] = 0
+            task['cancelled_annotations'] = 0
+        logger.info(f"Moved annotations from tasks {[task['id'] for task in annotated]} to task {first['id']}")
+
+    logger.info(f'Moved {total_moved_annotations} annotations of duplicated tasks')
 
 
 def restore_storage_links_for_duplicated_tasks(duplicates) -> None:
@@ -167,26 +185,42 @@ def restore_storage_links_for_duplicated_tasks(duplicates) -> None:
             # get already existing StorageLink
             link_instance = storage_link_class.objects.get(id=storage_link_id)
 
-            for task in tasks_without_storagelinks:
-                # assign existing StorageLink to other duplicated tasks
-                link = storage_link_class(
+            # assign existing StorageLink to other duplicated tasks
+            links = [
+                storage_link_class(
                     task_id=task['id'],
                     key=link_instance.key,
                     row_index=link_instance.row_index,
                     row_group=link_instance.row_group,
                     storage=link_instance.storage,
                 )
-                link.save()
-                total_restored_links += 1
+                for task in tasks_without_storagelinks
+            ]
+            storage_link_class.objects.bulk_create(links)
+            total_restored_links += len(links)
+            if links:
                 logger.info(
-                    f"Restored storage link for task {task['id']} from source task {tasks_with_storagelinks[0]['id']}"
+                    f"Restored storage links for tasks {[task['id'] for task in tasks_without_storagelinks]} "
+                    f"from source task {tasks_with_storagelinks[0]['id']}"
                 )
 
     logger.info(f'Restored {total_restored_links} storage links for duplicated tasks')
 
 
+def _group_duplicated_tasks(tasks, storages, data_hashes=None):
+    """Group tasks by data hash, data_hashes overrides stored hashes by task ID"""
+    data_hashes = data_hashes or {}
+    groups = defaultdict(list)
+    values = tasks.order_by('id').values('id', 'data_hash', 'total_annotations', 'cancelled_annotations', *storages)
+    for task in values:
+        groups[data_hashes.get(task['id'], task['data_hash'])].append(task)
+    return {data_hash: group for data_hash, group in groups.items() if len(group) > 1}
+
+
 def find_duplicated_tasks_by_data(project, queryset):
-    """Find duplicated tasks by `task.data` and return them as a dict"""
+    """Find duplicated tasks by `task.data` hash with GROUP BY, yield them as dicts {data_hash: [tasks]}
+    with BATCH_SIZE groups at most, every chunk is read after the previous one is processed
+    """
 
     # get io_storage_* links for tasks, we need to copy them
     storages = []
@@ -194,22 +228,46 @@ def find_duplicated_tasks_by_data(project, queryset):
         if field.startswith('io_storages_'):
             storages += [field]
 
-    groups = defaultdict(list)
-    tasks = list(queryset.values('data', 'id', 'total_annotations', 'cancelled_annotations', *storages))
-    logger.info(f'Retrieved {len(tasks)} tasks from queryset')
-
-    for task in list(tasks):
-        replace_task_data_undefined_with_config_field(task['data'], project)
-        task['data'] = json.dumps(task['data'])
-        groups[task['data']].append(task)
-
-    # make groups of duplicated ids for info print
-    duplicates = {d: groups[d] for d in groups if len(groups[d]) > 1}
-    info = {d: [task['id'] for task in duplicates[d]] for d in duplicates}
-
-    logger.info(f'Found {len(duplicates)} duplicated tasks')
-    logger.info(f'Duplicated tasks: {info}')
-    return duplicates
+    tasks = Task.objects.filter(id__in=queryset.values('id'))
+    fill_data_hashes(tasks)
+
+    # "$undefined$" data key is equal to the first data field of the label config,
+    # hashes of such tasks are calculated after the key replacement
+    undefined_key_hashes = {}
+    undefined_key_tasks = tasks.filter(data__has_key=settings.DATA_UNDEFINED_NAME).values_list('id', 'data')
+    for task_id, data in undefined_key_tasks.iterator():
+        replace_task_data_undefined_with_config_field(data, project)
+        undefined_key_hashes[task_id] = hash_task_data(data)
+    tasks_with_hashes = tasks.exclude(id__in=list(undefined_key_hashes))
+    # groups matching a replaced hash are built with the "$undefined$" tasks at the end, so each task is in one group
+    replaced_hashes = set(undefined_key_hashes.values())
+
+    duplicated_hashes = (
+        tasks_with_hashes.values('data_hash')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by('data_hash')
+        .values_list('data_hash', flat=True)
+    )
+    found, last_hash = 0, ''
+    while data_hashes := list(duplicated_hashes.filter(data_hash__gt=last_hash)[: settings.BATCH_SIZE]):
+        last_hash = data_hashes[-1]
+        data_hashes = [data_hash for data_hash in data_hashes if data_hash not in replaced_hashes]
+        if not data_hashes:
+            continue
+        duplicates = _group_duplicated_tasks(tasks_with_hashes.filter(data_hash__in=data_hashes), storages)
+        found += len(duplicates)
+        info = {data_hash: [task['id'] for task in group] for data_hash, group in duplicates.items()}
+        logger.info(f'Duplicated tasks: {info}')
+        yield duplicates
+
+    if undefined_key_hashes:
+        related = tasks.filter(data_hash__in=replaced_hashes) | tasks.filter(id__in=list(undefined_key_hashes))
+        duplicates = _group_duplicated_tasks(related, storages, undefined_key_hashes)
+        found += len(duplicates)
+        yield duplicates
+
+    logger.info(f'Found {found} groups of duplicated tasks')
 
 
 actions = [
@@ -8,7 +8,7 @@ from core.permissions import ViewClassPermission, all_permissions
 from core.utils.common import int_from_request, load_func
 from core.utils.params import bool_from_request
 from data_manager.actions import get_action_form, get_all_actions, perform_action
-from data_manager.functions import evaluate_predictions, get_prepare_params, get_prepared_queryset
+from data_manager.functions import get_prepare_params, get_prepared_queryset, schedule_predictions_evaluation
 from data_manager.managers import get_fields_for_evaluation
 from data_manager.models import View
 from data_manager.prepare_params import filters_schema, ordering_schema, prepare_params_schema
@@ -343,6 +343,14 @@ class TaskListAPI(generics.ListCreateAPIView):
             all_fields = None
         if page is not None:
             ids = [task.id for task in page]  # page is a list already
+
+            # retrieve ML predictions in background if tasks don't have them,
+            # the page is returned right away with the IDs of tasks waiting for predictions
+            predictions_pending = None
+            if not review and project.evaluate_predictions_automatically:
+                missing = Task.objects.filter(id__in=ids, predictions__isnull=True).order_by('id')
+                predictions_pending = schedule_predictions_evaluation(list(missing.values_list('id', flat=True)))
+
             tasks = list(
                 self.prefetch(
                     Task.prepared.annotate_queryset(
@@ -357,21 +365,16 @@ class TaskListAPI(generics.ListCreateAPIView):
             # keep ids ordering
             page = [tasks_by_ids[_id] for _id in ids]
 
-            # retrieve ML predictions if tasks don't have them
-            if not review and project.evaluate_predictions_automatically:
-                # TODO MM TODO this needs a discussion, because I'd expect
-                # people to retrieve manually instead on DM load, plus it
-                # will slow down initial DM load
-                # if project.retrieve_predictions_automatically is deprecated now and no longer used
-                tasks_for_predictions = Task.objects.filter(id__in=ids, predictions__isnull=True)
-                evaluate_predictions(tasks_for_predictions)
-                [tasks_by_ids[_id].refresh_from_db() for _id in ids]
-
             serializer = self.task_serializer_class(page, many=True, context=context)
-            return self.get_paginated_response(serializer.data)
-        # all tasks
+            response = self.get_paginated_response(serializer.data)
+            if predictions_pending is not None:
+                response.data['predictions_pending'] = predictions_pending
+            return response
+        # all tasks: predictions are scheduled for a limited number of tasks per request,
+        # other tasks without predictions are scheduled by the next requests
         if project.evaluate_predictions_automatically:
-            evaluate_predictions(queryset.filter(predictions__isnull=True))
+            missing = queryset.filter(predictions__isnull=True).values_list('id', flat=True)
+            schedule_predictions_evaluation(list(missing[: settings.PREDICTIONS_PENDING_MAX_TASKS]))
         queryset = Task.prepared.annotate_queryset(
             queryset, fields_for_evaluation=fields_for_evaluation, all_fields=all_fields, request=request
         )
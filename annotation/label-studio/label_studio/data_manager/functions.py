@@ -2,10 +2,11 @@
 """
 import logging
 from collections import OrderedDict
-from typing import Any, Iterable, Tuple
+from typing import Any, Iterable, List, Tuple
 from urllib.parse import unquote
 
 import ujson as json
+from core.redis import redis_delete_many, redis_set_many_nx, start_job_async_or_sync
 from core.utils.common import int_from_request
 from data_manager.models import View
 from data_manager.prepare_params import PrepareParams
@@ -41,7 +42,7 @@ def get_all_columns(project, *_):
     data_types.update(project_data_types.items())
 
     # all data types from import data
-    all_data_columns = project.summary.all_data_columns
+    all_data_columns = project.summary.fold_deltas().all_data_columns
     logger.info(f'get_all_columns: project_id={project.id} {all_data_columns=} {data_types=}')
     if all_data_columns:
         data_types.update({key: 'Unknown' for key in all_data_columns if key not in data_types})
@@ -326,6 +327,16 @@ def get_prepared_queryset(request, project):
     return queryset
 
 
+def prepare_params_select_all_tasks(prepare_params) -> bool:
+    """Check that prepare params don't filter tasks and keep the default ordering by task ID"""
+    if prepare_params.filters and prepare_params.filters.items:
+        return False
+    if prepare_params.ordering:
+        return False
+    selected = prepare_params.selectedItems
+    return not selected or (selected.all and not selected.excluded)
+
+
 def evaluate_predictions(tasks):
     """
     Call the given ML backend to retrieve predictions with the task queryset as an input.
@@ -343,6 +354,38 @@ def evaluate_predictions(tasks):
         return backend.predict_tasks(tasks=tasks)
 
 
+def _predictions_pending_key(task_id):
+    return f'predictions-pending:{task_id}'
+
+
+def evaluate_predictions_job(task_ids: List[int]) -> None:
+    """Retrieve predictions for tasks that still don't have them"""
+    try:
+        evaluate_predictions(Task.objects.filter(id__in=task_ids, predictions__isnull=True))
+    finally:
+        redis_delete_many([_predictions_pending_key(task_id) for task_id in task_ids])
+
+
+def schedule_predictions_evaluation(task_ids: List[int]) -> List[int]:
+    """Retrieve predictions for the tasks in a background job, return IDs of tasks with pending predictions.
+    Tasks already waiting for predictions are not enqueued again until the job finishes or
+    PREDICTIONS_PENDING_TTL expires. Without redis predictions are retrieved right away and nothing is pending.
+    """
+    if not task_ids:
+        return []
+    created = redis_set_many_nx(
+        [_predictions_pending_key(task_id) for task_id in task_ids], ttl=settings.PREDICTIONS_PENDING_TTL
+    )
+    if created is None:
+        evaluate_predictions_job(task_ids)
+        return []
+
+    new_task_ids = [task_id for task_id, is_new in zip(task_ids, created) if is_new]
+    if new_task_ids:
+        start_job_async_or_sync(evaluate_predictions_job, new_task_ids)
+    return list(task_ids)
+
+
 def filters_ordering_selected_items_exist(data):
     return data.get('filters') or data.get('ordering') or data.get('selectedItems')
 
@@ -389,7 +432,7 @@ def preprocess_field_name(raw_field_name, project) -> Tuple[str, bool]:
     if field_name.startswith('data.'):
         # process as $undefined$ only if real_name is from labeling config, not from task.data
         real_name = field_name.replace('data.', '')
-        common_data_columns = project.summary.common_data_columns
+        common_data_columns = project.summary.fold_deltas().common_data_columns
         real_name_suitable = (
             # there is only one object tag in labeling config
             # and requested filter name == value from object tag
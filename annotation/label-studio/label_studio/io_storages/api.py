@@ -6,6 +6,7 @@ import os
 
 from core.permissions import all_permissions
 from core.utils.io import read_yaml
+from core.utils.params import bool_from_request
 from django.conf import settings
 from drf_spectacular.utils import extend_schema
 from io_storages.serializers import ExportStorageSerializer, ImportStorageSerializer
@@ -117,6 +118,8 @@ class ImportStorageSyncAPI(generics.GenericAPIView):
             response_data = {'message': f'Storage {str(storage.id)} is not synchronizable'}
             return Response(status=status.HTTP_400_BAD_REQUEST, data=response_data)
         storage.validate_connection()
+        if bool_from_request(request.data, 'full_rescan', False):
+            storage.reset_sync_checkpoint()
         storage.sync()
         storage.refresh_from_db()
         return Response(self.serializer_class(storage).data)
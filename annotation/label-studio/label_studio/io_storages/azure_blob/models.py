@@ -27,7 +27,6 @@ from io_storages.base_models import (
 )
 from io_storages.utils import (
     StorageObject,
-    load_tasks_json,
     parse_range,
     storage_can_resolve_bucket_url,
 )
@@ -220,10 +219,10 @@ class AzureBlobImportStorageBase(AzureBlobStorageMixin, ImportStorage):
             task = {data_key: f'{self.url_scheme}://{self.container}/{key}'}
             return [StorageObject(key=key, task_data=task)]
 
-        container = self.get_container()
-        blob = container.download_blob(key)
-        blob = blob.content_as_bytes()
-        return load_tasks_json(blob, key)
+        return self.parse_blob(self.get_blob(key), key)
+
+    def get_blob(self, key) -> bytes:
+        return self.cached_client('container', self.get_container).download_blob(key).content_as_bytes()
 
     def scan_and_create_links(self):
         return self._scan_and_create_links(AzureBlobImportStorageLink)
@@ -266,20 +265,22 @@ class AzureBlobImportStorage(ProjectStorageMixin, AzureBlobImportStorageBase):
 
 class AzureBlobExportStorage(AzureBlobStorageMixin, ExportStorage):  # note: order is important!
     def save_annotation(self, annotation):
-        container = self.get_container()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
         # get key that identifies this object in storage
         key = AzureBlobExportStorageLink.get_key(annotation)
-        key = str(self.prefix) + '/' + key if self.prefix else key
-
-        # put object into storage
-        blob = container.get_blob_client(key)
-        blob.upload_blob(json.dumps(ser_annotation), overwrite=True)
+        self.save_object(key, ser_annotation)
 
         # create link if everything ok
         AzureBlobExportStorageLink.create(annotation, self)
 
+    def save_object(self, key, data):
+        key = str(self.prefix) + '/' + key if self.prefix else key
+
+        # put object into storage
+        blob = self.cached_client('container', self.get_container).get_blob_client(key)
+        blob.upload_blob(json.dumps(data), overwrite=True)
+
 
 def async_export_annotation_to_azure_storages(annotation):
     project = annotation.project
@@ -2,6 +2,7 @@
 """
 import base64
 import concurrent.futures
+import copy
 import itertools
 import json
 import logging
@@ -16,22 +17,31 @@ from urllib.parse import urljoin
 import django_rq
 import rq
 import rq.exceptions
-from core.feature_flags import flag_set
+from core.feature_flags import flag_set, flag_snapshot
 from core.redis import is_job_in_queue, is_job_on_worker, redis_connected
 from core.utils.common import load_func
 from data_export.serializers import ExportDataSerializer
+from data_import.serializers import ImportApiSerializer
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db import models, transaction
-from django.db.models import JSONField
+from django.db.models import Count, JSONField, Prefetch
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_rq import job
-from io_storages.utils import StorageObject, get_uri_via_regex, parse_bucket_uri
+from io_storages.utils import (
+    StorageObject,
+    get_uri_via_regex,
+    iter_prefetched,
+    load_tasks_json,
+    parse_bucket_uri,
+)
+from rest_framework.exceptions import ValidationError
 from rq.job import Job
 from tasks.models import Annotation, Task
-from tasks.serializers import AnnotationSerializer, PredictionSerializer
+from tasks.serializers import AnnotationSerializer, PredictionSerializer, TaskSerializerBulk
+from tasks.validation import TaskValidator
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
 
@@ -223,6 +233,15 @@ class Storage(StorageInfo):
     def validate_connection(self, client=None):
         raise NotImplementedError('validate_connection is not implemented')
 
+    def cached_client(self, name, factory):
+        """Create the client once per storage instance, so one sync or export doesn't reconnect for every object.
+        Clients used by sync worker threads must be thread-safe.
+        """
+        clients = self.__dict__.setdefault('_cached_clients', {})
+        if name not in clients:
+            clients[name] = factory()
+        return clients[name]
+
     class Meta:
         abstract = True
 
@@ -231,9 +250,20 @@ class ImportStorage(Storage):
     def iterkeys(self):
         return iter(())
 
+    def reset_sync_checkpoint(self):
+        """Forget the state of previous syncs, so the next sync scans the whole storage"""
+
     def get_data(self, key) -> list[StorageObject]:
         raise NotImplementedError
 
+    def get_blob(self, key) -> Union[bytes, str, None]:
+        """Read raw content of the object under the key, it's called from sync worker threads"""
+        raise NotImplementedError
+
+    def parse_blob(self, blob, key) -> list[StorageObject]:
+        """Parse JSON/JSONL/Parquet tasks from the object content returned by get_blob()"""
+        return load_tasks_json(blob, key)
+
     def generate_http_url(self, url):
         raise NotImplementedError
 
@@ -341,8 +371,9 @@ class ImportStorage(Storage):
 
         raise NotImplementedError
 
-    @classmethod
-    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+    @staticmethod
+    def _prepare_task(link_object: StorageObject):
+        """Split storage object into task data, predictions, annotations and link kwargs"""
         link_kwargs = asdict(link_object)
         data = link_kwargs.pop('task_data', None)
 
@@ -370,6 +401,12 @@ class ImportStorage(Storage):
             else:
                 data.pop('data')
 
+        return data, predictions, annotations, cancelled_annotations, link_kwargs
+
+    @classmethod
+    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+        data, predictions, annotations, cancelled_annotations, link_kwargs = cls._prepare_task(link_object)
+
         with transaction.atomic():
             task = Task.objects.create(
                 data=data,
@@ -409,8 +446,147 @@ class ImportStorage(Storage):
         return task
         # FIXME: add_annotation_history / post_process_annotations should be here
 
+    @staticmethod
+    def _import_task(project, members_email_to_id, data, predictions, annotations, raise_exception):
+        """Task dict for TaskSerializerBulk, task data isn't validated against the label config like in add_task,
+        invalid predictions and annotations are skipped when raise_exception is False
+        """
+        task = {'data': data, 'predictions': predictions, 'annotations': annotations}
+        try:
+            TaskValidator.check_predictions(task)
+        except ValidationError as exc:
+            if raise_exception:
+                raise
+            logger.warning(f'Skip invalid predictions of storage task: {exc}')
+            task['predictions'] = []
+
+        try:
+            TaskValidator.check_annotations(task)
+            # TaskSerializerBulk.create() resolves completed_by in place, check the copies to skip invalid ones here
+            TaskSerializerBulk._insert_valid_completed_by(
+                copy.deepcopy([annotation for annotation in annotations if isinstance(annotation, dict)]),
+                members_email_to_id,
+                set(members_email_to_id.values()),
+                project.created_by,
+            )
+        except ValidationError as exc:
+            if raise_exception:
+                raise
+            logger.warning(f'Skip invalid annotations of storage task: {exc}')
+            task['annotations'] = []
+        return task
+
+    @classmethod
+    def add_tasks(cls, project, maximum_annotations, storage, link_objects: list[StorageObject], link_class):
+        """Bulk version of add_task: tasks of a chunk of storage objects are created by TaskSerializerBulk
+        like in the import API, and their storage links are created with one bulk insert in the same transaction.
+        Annotations are bulk created like in the import API too, so Annotation post_save receivers
+        (export storage sync, ML backend training, labeling queue) are not run for them.
+        """
+        raise_exception = not flag_set(
+            'ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser()
+        )
+        prepared = [cls._prepare_task(link_object) for link_object in link_objects]
+        if not prepared:
+            return []
+
+        members_email_to_id = dict(project.organization.members.values_list('user__email', 'user__id'))
+        tasks = [
+            cls._import_task(project, members_email_to_id, data, predictions, annotations, raise_exception)
+            for data, predictions, annotations, _cancelled, _link_kwargs in prepared
+        ]
+
+        serializer = ImportApiSerializer(many=True, context={'project': project})
+        with transaction.atomic():
+            db_tasks = serializer.create(tasks)
+            link_class.objects.bulk_create(
+                [
+                    link_class(task_id=task.id, storage=storage, object_exists=True, **link_kwargs)
+                    for task, (*_task_fields, link_kwargs) in zip(db_tasks, prepared)
+                ],
+                batch_size=settings.BATCH_SIZE,
+            )
+            if hasattr(project, 'summary'):
+                project.summary.update_data_columns(db_tasks)
+                if serializer.db_annotations:
+                    project.summary.update_created_annotations_and_labels(serializer.db_annotations)
+
+        logger.debug(
+            f'Created {len(db_tasks)} tasks, {len(serializer.db_predictions)} predictions, '
+            f'{len(serializer.db_annotations)} annotations for {storage.__class__.__name__} {storage.id}'
+        )
+        return db_tasks
+
+    def _load_link_objects(self, key, check_file_extension, multitasks) -> tuple[int, list[StorageObject]]:
+        """Fetch and parse storage objects for the key, returns (payload size in bytes, link objects)"""
+        logger.debug(f'{self}: found new key {key}')
+
+        # Check if file should be processed as JSON based on extension
+        # Skip non-JSON files if use_blob_urls is False
+        if check_file_extension and not self.use_blob_urls:
+            _, ext = os.path.splitext(key.lower())
+            # Only process files with JSON/JSONL/PARQUET extensions
+            json_extensions = {'.json', '.jsonl', '.parquet'}
+
+            if ext and ext not in json_extensions:
+                raise ValueError(
+                    f'File "{key}" is not a JSON/JSONL/Parquet file. Only .json, .jsonl, and .parquet files can be processed.\n'
+                    f"If you're trying to import non-JSON data (images, audio, text, etc.), "
+                    f'edit storage settings and enable "Treat every bucket object as a source file"'
+                )
+
+        size = 0
+        try:
+            if self.use_blob_urls:
+                link_objects = self.get_data(key)
+            else:
+                try:
+                    blob = self.get_blob(key)
+                except NotImplementedError:
+                    # storages without get_blob() read and parse objects in get_data()
+                    link_objects = self.get_data(key)
+                else:
+                    size = len(blob) if blob else 0
+                    link_objects = self.parse_blob(blob, key)
+        except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+            logger.debug(exc, exc_info=True)
+            raise ValueError(
+                f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
+                f'(images, audio, text, etc.), edit storage settings and enable '
+                f'"Treat every bucket object as a source file"'
+            )
+
+        if not multitasks:
+            link_objects = link_objects[:1]
+        return size, link_objects
+
+    def _iter_link_objects(self, keys, check_file_extension, multitasks):
+        """Yield (key, link objects) in key order. JSON objects are fetched and parsed
+        STORAGE_SYNC_PREFETCH_WORKERS at a time, holding at most STORAGE_SYNC_PREFETCH_BYTES of fetched payloads.
+        """
+
+        def load(key):
+            return self._load_link_objects(key, check_file_extension, multitasks)
+
+        if self.use_blob_urls or settings.STORAGE_SYNC_PREFETCH_WORKERS <= 1:
+            # object urls are built without network requests, nothing to prefetch
+            for key in keys:
+                yield key, load(key)[1]
+            return
+
+        yield from iter_prefetched(
+            load,
+            keys,
+            max_workers=settings.STORAGE_SYNC_PREFETCH_WORKERS,
+            max_bytes=settings.STORAGE_SYNC_PREFETCH_BYTES,
+        )
+
     def _scan_and_create_links(self, link_class):
         """
+        Keys are read from iterkeys() in pages of STORAGE_SYNC_BATCH_SIZE. For each page
+        already linked keys are filtered out with one query. Objects of new keys are fetched concurrently
+        (see _iter_link_objects) and tasks are created with add_tasks() in chunks of STORAGE_SYNC_BATCH_SIZE tasks.
+
         TODO: deprecate this function and transform it to "pipeline" version  _scan_and_create_links_v2,
         TODO: it must be compatible with opensource, so old version is needed as well
         """
@@ -419,87 +595,67 @@ class ImportStorage(Storage):
 
         tasks_existed = tasks_created = 0
         maximum_annotations = self.project.maximum_annotations
-        task = self.project.tasks.order_by('-inner_id').first()
-        max_inner_id = (task.inner_id + 1) if task else 1
 
-        # Check feature flag once for the entire sync process
+        # Check feature flags once for the entire sync process
         check_file_extension = flag_set(
             'fflag_fix_back_plt_804_check_file_extension_11072025_short', user=self.project.organization.created_by
         )
+        multitasks = flag_set('fflag_feat_dia_2092_multitasks_per_storage_link')
 
         tasks_for_webhook = []
-        for key in self.iterkeys():
-            # w/o Dataflow
-            # pubsub.push(topic, key)
-            # -> GF.pull(topic, key) + env -> add_task()
-            logger.debug(f'Scanning key {key}')
-            self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
-
-            # skip if key has already been synced
-            if n_tasks_linked := link_class.n_tasks_linked(key, self):
-                logger.debug(f'{self.__class__.__name__} already has {n_tasks_linked} tasks linked to {key=}')
-                tasks_existed += n_tasks_linked  # update progress counter
-                continue
-
-            logger.debug(f'{self}: found new key {key}')
-
-            # Check if file should be processed as JSON based on extension
-            # Skip non-JSON files if use_blob_urls is False
-            if check_file_extension and not self.use_blob_urls:
-                _, ext = os.path.splitext(key.lower())
-                # Only process files with JSON/JSONL/PARQUET extensions
-                json_extensions = {'.json', '.jsonl', '.parquet'}
-
-                if ext and ext not in json_extensions:
-                    raise ValueError(
-                        f'File "{key}" is not a JSON/JSONL/Parquet file. Only .json, .jsonl, and .parquet files can be processed.\n'
-                        f"If you're trying to import non-JSON data (images, audio, text, etc.), "
-                        f'edit storage settings and enable "Treat every bucket object as a source file"'
-                    )
-
-            try:
-                link_objects = self.get_data(key)
-            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
-                logger.debug(exc, exc_info=True)
-                raise ValueError(
-                    f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
-                    f'(images, audio, text, etc.), edit storage settings and enable '
-                    f'"Treat every bucket object as a source file"'
-                )
-
-            if not flag_set('fflag_feat_dia_2092_multitasks_per_storage_link'):
-                link_objects = link_objects[:1]
-
-            for link_object in link_objects:
-                # TODO: batch this loop body with add_task -> add_tasks in a single bulk write.
-                # See DIA-2062 for prerequisites
-                task = self.add_task(
+        pending_objects = []
+
+        def create_tasks(link_objects):
+            nonlocal tasks_created, tasks_for_webhook
+            tasks = self.add_tasks(self.project, maximum_annotations, self, link_objects, link_class=link_class)
+            tasks_created += len(tasks)
+
+            # settings.WEBHOOK_BATCH_SIZE
+            # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
+            # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
+            # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
+            # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
+            # call to ensure all tasks are processed and no task is left unreported in the webhook.
+            tasks_for_webhook += [task.id for task in tasks]
+            while len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
+                emit_webhooks_for_instance(
+                    self.project.organization,
                     self.project,
-                    maximum_annotations,
-                    max_inner_id,
-                    self,
-                    link_object,
-                    link_class=link_class,
+                    WebhookAction.TASKS_CREATED,
+                    tasks_for_webhook[: settings.WEBHOOK_BATCH_SIZE],
                 )
-                max_inner_id += 1
-
-                # update progress counters for storage info
-                tasks_created += 1
-
-                # add task to webhook list
-                tasks_for_webhook.append(task.id)
-
-                # settings.WEBHOOK_BATCH_SIZE
-                # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
-                # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
-                # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
-                # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
-                # call to ensure all tasks are processed and no task is left unreported in the webhook.
-                if len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
-                    emit_webhooks_for_instance(
-                        self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
-                    )
-                    tasks_for_webhook = []
+                tasks_for_webhook = tasks_for_webhook[settings.WEBHOOK_BATCH_SIZE :]
+
+        def iter_new_keys():
+            nonlocal tasks_existed
+            for keys in _batched(self.iterkeys(), settings.STORAGE_SYNC_BATCH_SIZE):
+                # w/o Dataflow
+                # pubsub.push(topic, key)
+                # -> GF.pull(topic, key) + env -> add_task()
+                keys = list(dict.fromkeys(keys))
+                logger.debug(f'Scanning {len(keys)} keys starting from {keys[0]}')
+
+                # progress is written at most once per page of keys and once per STORAGE_IN_PROGRESS_TIMER seconds
+                self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
+
+                # skip keys that have already been synced
+                linked = link_class.n_tasks_linked_by_key(keys, self)
+                tasks_existed += sum(linked.values())  # update progress counter
+                for key in keys:
+                    if key in linked:
+                        logger.debug(f'{self.__class__.__name__} already has {linked[key]} tasks linked to {key=}')
+                        continue
+                    yield key
+
+        # new keys are read page by page in this thread, their objects are fetched ahead in worker threads
+        for key, link_objects in self._iter_link_objects(iter_new_keys(), check_file_extension, multitasks):
+            pending_objects += link_objects
+            while len(pending_objects) >= settings.STORAGE_SYNC_BATCH_SIZE:
+                create_tasks(pending_objects[: settings.STORAGE_SYNC_BATCH_SIZE])
+                pending_objects = pending_objects[settings.STORAGE_SYNC_BATCH_SIZE :]
+
+        if pending_objects:
+            create_tasks(pending_objects)
         if tasks_for_webhook:
             emit_webhooks_for_instance(
                 self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
@@ -571,19 +727,22 @@ class ProjectStorageMixin(models.Model):
 @job('low')
 def import_sync_background(storage_class, storage_id, timeout=settings.RQ_LONG_JOB_TIMEOUT, **kwargs):
     storage = storage_class.objects.get(id=storage_id)
-    storage.scan_and_create_links()
+    with flag_snapshot():
+        storage.scan_and_create_links()
 
 
 @job('low', timeout=settings.RQ_LONG_JOB_TIMEOUT)
 def export_sync_background(storage_class, storage_id, **kwargs):
     storage = storage_class.objects.get(id=storage_id)
-    storage.save_all_annotations()
+    with flag_snapshot():
+        storage.save_all_annotations()
 
 
 @job('low', timeout=settings.RQ_LONG_JOB_TIMEOUT)
 def export_sync_only_new_background(storage_class, storage_id, **kwargs):
     storage = storage_class.objects.get(id=storage_id)
-    storage.save_only_new_annotations()
+    with flag_snapshot():
+        storage.save_only_new_annotations()
 
 
 def storage_background_failure(*args, **kwargs):
@@ -620,23 +779,35 @@ def _batched(iterable, n):
         yield batch
 
 
+def _batched_by_task(annotations, n):
+    # like _batched, but annotations of one task are never split between batches,
+    # annotations must be ordered by task
+    batch = []
+    for annotation in annotations:
+        if len(batch) >= n and annotation.task_id != batch[-1].task_id:
+            yield batch
+            batch = []
+        batch.append(annotation)
+    if batch:
+        yield batch
+
+
 class ExportStorage(Storage, ProjectStorageMixin):
     can_delete_objects = models.BooleanField(
         _('can_delete_objects'), null=True, blank=True, help_text='Deletion from storage enabled'
     )
-    # Use 8 threads, unless we know we only have a single core
-    # TODO from testing, more than 8 seems to cause problems. revisit to add more parallelism.
-    max_workers = min(8, (os.cpu_count() or 2) * 4)
 
-    def _get_serialized_data(self, annotation):
+    def _is_task_format(self):
         user = self.project.organization.created_by
         flag = flag_set(
             'fflag_feat_optic_650_target_storage_task_format_long', user=user, override_system_default=False
         )
-        if settings.FUTURE_SAVE_TASK_TO_STORAGE or flag:
+        return settings.FUTURE_SAVE_TASK_TO_STORAGE or flag
+
+    def _get_serialized_data(self, annotation):
+        if self._is_task_format():
             # export task with annotations
-            # TODO: we have to rewrite save_all_annotations, because this func will be called for each annotation
-            # TODO: instead of each task, however, we have to call it only once per task
+            # save_annotations() serializes tasks in batches, this is used for single annotations only
             expand = ['annotations.reviews', 'annotations.completed_by']
             context = {'project': self.project}
             return ExportDataSerializer(annotation.task, context=context, expand=expand).data
@@ -648,30 +819,113 @@ class ExportStorage(Storage, ProjectStorageMixin):
     def save_annotation(self, annotation):
         raise NotImplementedError
 
+    def save_object(self, key, data):
+        """Put serialized data into the storage under the link key, storage prefix is added here.
+        It's called from worker threads of save_annotations(), so it must not access the database.
+        """
+        raise NotImplementedError
+
+    def _serialize_batch(self, annotations):
+        """Serialize a batch of annotations ordered by task into objects to save
+        :return: list of (key, serialized data, annotations stored in this object)
+        """
+        link_model = self.links.model
+        for annotation in annotations:
+            annotation.cached_user = self.cached_user
+
+        if not self._is_task_format():
+            serializer_class = load_func(settings.STORAGE_ANNOTATION_SERIALIZER)
+            data = serializer_class(annotations, many=True, context={'project': self.project}).data
+            return [
+                (link_model.get_key(annotation), item, [annotation]) for annotation, item in zip(annotations, data)
+            ]
+
+        # one object per task: the task is serialized and saved once for all its annotations
+        by_task = {}
+        for annotation in annotations:
+            by_task.setdefault(annotation.task_id, []).append(annotation)
+        prefetch = ['annotations', 'annotations__completed_by']
+        # the serializer expands annotation reviews, which exist in LSE only
+        if hasattr(Annotation, 'reviews'):
+            from reviews.models import AnnotationReview
+
+            prefetch.append(
+                Prefetch('annotations__reviews', queryset=AnnotationReview.objects.select_related('created_by'))
+            )
+        tasks = Task.objects.filter(id__in=by_task).select_related('project').prefetch_related(*prefetch)
+        expand = ['annotations.reviews', 'annotations.completed_by']
+        data = ExportDataSerializer(tasks, many=True, context={'project': self.project}, expand=expand).data
+        data = {item['id']: item for item in data}
+        return [
+            (link_model.get_key(task_annotations[0]), data[task_id], task_annotations)
+            for task_id, task_annotations in by_task.items()
+        ]
+
+    def _create_links(self, annotations):
+        """Create or touch export links of saved annotations in bulk, like ExportStorageLink.create()"""
+        link_model = self.links.model
+        annotation_ids = [annotation.id for annotation in annotations]
+        existing = link_model.objects.filter(storage=self, annotation_id__in=annotation_ids, object_exists=True)
+        existing_ids = set(existing.values_list('annotation_id', flat=True))
+        if existing_ids:
+            existing.update(updated_at=timezone.now())
+        link_model.objects.bulk_create(
+            [
+                link_model(annotation_id=annotation_id, storage=self, object_exists=True)
+                for annotation_id in annotation_ids
+                if annotation_id not in existing_ids
+            ],
+            batch_size=settings.BATCH_SIZE,
+        )
+
+    def _save_annotations_one_by_one(self, annotation_batch, executor):
+        # storages without save_object() serialize and save every annotation separately
+        futures = {}
+        for annotation in annotation_batch:
+            annotation.cached_user = self.cached_user
+            futures[executor.submit(self.save_annotation, annotation)] = [annotation]
+        return futures
+
     def save_annotations(self, annotations: models.QuerySet[Annotation]):
+        """Export the given annotations. Objects are serialized in the main thread in batches of
+        STORAGE_EXPORT_CHUNK_SIZE annotations, saved by STORAGE_EXPORT_MAX_WORKERS threads,
+        and export links of each batch are created in bulk.
+        """
         annotation_exported = 0
         total_annotations = annotations.count()
         self.info_set_in_progress()
         self.cached_user = self.project.organization.created_by
+        supports_save_object = type(self).save_object is not ExportStorage.save_object
+        annotations = annotations.select_related('task').order_by('task_id', 'id')
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Batch annotations so that we update progress before having to submit every future.
-            # Updating progress in thread requires coordinating on count and db writes, so just
-            # batching to keep it simpler.
-            for annotation_batch in _batched(
-                Annotation.objects.filter(project=self.project).iterator(
-                    chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE
-                ),
+        with ThreadPoolExecutor(max_workers=settings.STORAGE_EXPORT_MAX_WORKERS) as executor:
+            for annotation_batch in _batched_by_task(
+                annotations.iterator(chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE),
                 settings.STORAGE_EXPORT_CHUNK_SIZE,
             ):
-                futures = []
-                for annotation in annotation_batch:
-                    annotation.cached_user = self.cached_user
-                    futures.append(executor.submit(self.save_annotation, annotation))
+                if supports_save_object:
+                    futures = {
+                        executor.submit(self.save_object, key, data): saved_annotations
+                        for key, data, saved_annotations in self._serialize_batch(annotation_batch)
+                    }
+                else:
+                    futures = self._save_annotations_one_by_one(annotation_batch, executor)
 
+                saved = []
                 for future in concurrent.futures.as_completed(futures):
-                    annotation_exported += 1
-                    self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
+                    try:
+                        future.result()
+                    except Exception:
+                        logger.error(f'{self}: failed to export {futures[future]}', exc_info=True)
+                        continue
+                    saved.extend(futures[future])
+
+                # save_annotation() creates links itself
+                if supports_save_object:
+                    self._create_links(saved)
+                annotation_exported += len(saved)
+                # progress is written at most once per batch and once per STORAGE_IN_PROGRESS_TIMER seconds
+                self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
 
         self.info_set_completed(last_sync_count=annotation_exported, total_annotations=total_annotations)
 
@@ -740,6 +994,17 @@ class ImportStorageLink(models.Model):
     def n_tasks_linked(cls, key, storage):
         return cls.objects.filter(key=key, storage=storage.id).count()
 
+    @classmethod
+    def n_tasks_linked_by_key(cls, keys, storage):
+        """Number of linked tasks for each of the keys with at least one task, in a single query"""
+        rows = (
+            cls.objects.filter(key__in=keys, storage=storage.id)
+            .values('key')
+            .annotate(n_tasks=Count('id'))
+            .values_list('key', 'n_tasks')
+        )
+        return dict(rows)
+
     @classmethod
     def create(cls, task, key, storage, row_index=None, row_group=None):
         link, created = cls.objects.get_or_create(
@@ -25,7 +25,6 @@ from io_storages.base_models import (
 from io_storages.gcs.utils import GCS
 from io_storages.utils import (
     StorageObject,
-    load_tasks_json,
     parse_range,
     storage_can_resolve_bucket_url,
 )
@@ -189,12 +188,14 @@ class GCSImportStorageBase(GCSStorageMixin, ImportStorage):
         if self.use_blob_urls:
             task = {settings.DATA_UNDEFINED_NAME: GCS.get_uri(self.bucket, key)}
             return [StorageObject(key=key, task_data=task)]
-        blob = GCS.read_file(
+        return self.parse_blob(self.get_blob(key), key)
+
+    def get_blob(self, key) -> bytes:
+        return GCS.read_file(
             client=self.get_client(),
             bucket_name=self.bucket,
             key=key,
         )
-        return load_tasks_json(blob, key)
 
     def generate_http_url(self, url):
         return GCS.generate_http_url(
@@ -229,20 +230,23 @@ class GCSImportStorage(ProjectStorageMixin, GCSImportStorageBase):
 
 class GCSExportStorage(GCSStorageMixin, ExportStorage):
     def save_annotation(self, annotation):
-        bucket = self.get_bucket()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = GCSExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        GCSExportStorageLink.create(annotation, self)
+
+    def save_object(self, key, data):
+        bucket = self.cached_client('bucket', self.get_bucket)
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         blob = bucket.blob(key)
-        blob.upload_from_string(json.dumps(ser_annotation))
-
-        # create link if everything ok
-        GCSExportStorageLink.create(annotation, self)
+        blob.upload_from_string(json.dumps(data))
 
 
 def async_export_annotation_to_gcs_storages(annotation):
@@ -4,7 +4,6 @@
 import json
 import logging
 import os
-import re
 from pathlib import Path
 from urllib.parse import quote
 
@@ -20,7 +19,8 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
-from io_storages.utils import StorageObject, load_tasks_json
+from io_storages.localfiles.utils import LocalFilesScanner
+from io_storages.utils import StorageObject
 from rest_framework.exceptions import ValidationError
 from tasks.models import Annotation
 
@@ -63,21 +63,46 @@ class LocalFilesMixin(models.Model):
 class LocalFilesImportStorageBase(LocalFilesMixin, ImportStorage):
     url_scheme = 'https'
 
+    incremental_sync = models.BooleanField(
+        _('incremental sync'),
+        default=False,
+        help_text=_('List only directories modified since the last sync, use full rescan to list all directories'),
+    )
+    scan_checkpoint = models.JSONField(
+        _('scan checkpoint'),
+        null=True,
+        blank=True,
+        default=None,
+        help_text='Directories listed by the last successful sync, used by incremental sync',
+    )
+
     def can_resolve_url(self, url):
         return False
 
+    _scanner = None
+
+    def get_scanner(self) -> LocalFilesScanner:
+        return LocalFilesScanner(
+            self.path,
+            regex_filter=self.regex_filter,
+            run_size=settings.LOCAL_FILES_SCAN_RUN_SIZE,
+            checkpoint=self.scan_checkpoint if self.incremental_sync else None,
+        )
+
+    def reset_sync_checkpoint(self):
+        self.scan_checkpoint = None
+        self.save(update_fields=['scan_checkpoint'])
+
     def iterkeys(self):
-        path = Path(self.path)
-        regex = re.compile(str(self.regex_filter)) if self.regex_filter else None
         # For better control of imported tasks, file reading has been changed to ascending order of filenames.
         # In other words, the task IDs are sorted by filename order.
-        for file in sorted(path.rglob('*'), key=os.path.basename):
-            if file.is_file():
-                key = file.name
-                if regex and not regex.match(key):
-                    logger.debug(key + ' is skipped by regex filter')
-                    continue
-                yield str(file)
+        # Directories are read with os.scandir and sorted with an external merge sort, see LocalFilesScanner.
+        self._scanner = self.get_scanner()
+        yield from self._scanner.iter_files()
+        logger.debug(
+            f'{self}: {self._scanner.dirs_listed} directories listed, '
+            f'{self._scanner.dirs_skipped} unchanged directories skipped'
+        )
 
     def get_data(self, key) -> list[StorageObject]:
         path = Path(key)
@@ -91,15 +116,22 @@ class LocalFilesImportStorageBase(LocalFilesMixin, ImportStorage):
             }
             return [StorageObject(key=key, task_data=task)]
 
+        return self.parse_blob(self.get_blob(key), key)
+
+    def get_blob(self, key) -> bytes:
         try:
-            with open(path, 'rb') as f:
-                blob = f.read()
-                return load_tasks_json(blob, key)
+            with open(key, 'rb') as f:
+                return f.read()
         except OSError as e:
-            raise ValueError(f'Failed to read file {path}: {str(e)}')
+            raise ValueError(f'Failed to read file {key}: {str(e)}')
 
     def scan_and_create_links(self):
-        return self._scan_and_create_links(LocalFilesImportStorageLink)
+        result = self._scan_and_create_links(LocalFilesImportStorageLink)
+        # tasks for all scanned files are created, unchanged directories can be skipped next time
+        if self._scanner is not None and self.incremental_sync:
+            self.scan_checkpoint = self._scanner.get_checkpoint()
+            self.save(update_fields=['scan_checkpoint'])
+        return result
 
     class Meta:
         abstract = True
@@ -117,14 +149,17 @@ class LocalFilesExportStorage(LocalFilesMixin, ExportStorage):
 
         # get key that identifies this object in storage
         key = LocalFilesExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # Create export storage link
+        LocalFilesExportStorageLink.create(annotation, self)
+
+    def save_object(self, key, data):
         key = os.path.join(self.path, f'{key}')
 
         # put object into storage
         with open(key, mode='w') as f:
-            json.dump(ser_annotation, f, indent=2)
-
-        # Create export storage link
-        LocalFilesExportStorageLink.create(annotation, self)
+            json.dump(data, f, indent=2)
 
 
 class LocalFilesImportStorageLink(ImportStorageLink):
@@ -15,7 +15,14 @@ _common_storage_schema_properties = {
 # Local files import storage schema
 _local_files_import_storage_schema = {
     'type': 'object',
-    'properties': _common_storage_schema_properties,
+    'properties': {
+        **_common_storage_schema_properties,
+        'incremental_sync': {
+            'type': 'boolean',
+            'description': 'List only directories modified since the last successful sync. Files in other directories are picked up by a sync with full_rescan.',
+            'default': False,
+        },
+    },
     'required': [],
 }
 
@@ -14,6 +14,7 @@ class LocalFilesImportStorageSerializer(ImportStorageSerializer):
     class Meta:
         model = LocalFilesImportStorage
         fields = '__all__'
+        read_only_fields = ['scan_checkpoint']
 
     def validate(self, data):
         # Validate local file path
@@ -0,0 +1,141 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import heapq
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# directories modified less than this number of seconds before the scan are walked again on the next scan,
+# files created in the same mtime tick after the directory was listed would be missed otherwise
+MTIME_GRANULARITY_SEC = 2
+CHECKPOINT_VERSION = 1
+
+
+class LocalFilesScanner:
+    """Streaming walk over a local directory tree with bounded memory.
+
+    Files are yielded sorted by file name (then by full path), like sorted(Path(root).rglob('*'), key=basename),
+    but paths are collected into sorted runs of run_size items, spilled to temporary files and merged,
+    so only one run is kept in memory. The regex filter is applied to file names before anything is stat'ed.
+
+    With a checkpoint of the previous scan the scan is incremental: directories whose mtime didn't change since
+    the checkpoint are not listed, only their subdirectories recorded in the checkpoint are visited.
+    The new checkpoint is returned by get_checkpoint(), it's stored after the keys have been processed successfully.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        regex_filter: Optional[str] = None,
+        run_size: int = 100000,
+        checkpoint: Optional[dict] = None,
+    ):
+        self.root = os.path.abspath(root)
+        self.regex_filter = regex_filter or None
+        self.regex = re.compile(str(regex_filter)) if regex_filter else None
+        self.run_size = max(1, run_size)
+        self._previous = self._load_checkpoint(checkpoint or {})
+        self._current = {}
+        self.dirs_listed = self.dirs_skipped = 0
+
+    def _load_checkpoint(self, checkpoint: dict) -> dict:
+        if not checkpoint:
+            return {}
+        # files skipped by another filter or under another root were never synced
+        if checkpoint.get('version') != CHECKPOINT_VERSION or (checkpoint.get('root'), checkpoint.get('regex')) != (
+            self.root,
+            self.regex_filter,
+        ):
+            logger.info(f'Scan checkpoint of {self.root} is outdated, full scan will be done')
+            return {}
+        return checkpoint.get('dirs', {})
+
+    def get_checkpoint(self) -> dict:
+        """Directories walked by the scan, pass it to the next scanner of the same root to skip unchanged ones"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'root': self.root,
+            'regex': self.regex_filter,
+            'dirs': self._current,
+        }
+
+    def walk(self) -> Iterator[os.DirEntry]:
+        """Yield file entries matching the regex filter in directory order"""
+        fresh_after = (time.time() - MTIME_GRANULARITY_SEC) * 1e9
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError as exc:
+                logger.warning(f'Skip directory {directory}: {exc}')
+                continue
+
+            previous = self._previous.get(directory)
+            if previous and previous['mtime'] == mtime:
+                self.dirs_skipped += 1
+                self._current[directory] = previous
+                stack.extend(os.path.join(directory, name) for name in previous['dirs'])
+                continue
+
+            self.dirs_listed += 1
+            subdirs = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        # symlinks to directories are not followed, like in Path.rglob()
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif self.regex and not self.regex.match(entry.name):
+                            logger.debug(entry.name + ' is skipped by regex filter')
+                        elif entry.is_file():
+                            yield entry
+            except OSError as exc:
+                logger.warning(f'Failed to list directory {directory}: {exc}')
+                continue
+
+            self._current[directory] = {'mtime': None if mtime >= fresh_after else mtime, 'dirs': subdirs}
+            stack.extend(os.path.join(directory, name) for name in subdirs)
+
+    def iter_files(self) -> Iterator[str]:
+        """Yield paths of files sorted by file name using an external merge sort"""
+        with tempfile.TemporaryDirectory(prefix='ls-local-scan-') as tmp_dir:
+            runs = []
+            run = []
+            for entry in self.walk():
+                run.append((entry.name, entry.path))
+                if len(run) >= self.run_size:
+                    runs.append(self._spill(run, tmp_dir, len(runs)))
+                    run = []
+            run.sort()
+
+            if not runs:
+                for _, path in run:
+                    yield path
+                return
+
+            logger.debug(f'Merging {len(runs) + 1} sorted runs of {self.root}')
+            for _, path in heapq.merge(*(self._read_run(run_path) for run_path in runs), iter(run)):
+                yield path
+
+    @staticmethod
+    def _spill(run: list, tmp_dir: str, number: int) -> str:
+        run.sort()
+        run_path = os.path.join(tmp_dir, f'run-{number}.jsonl')
+        # json keeps file names with newlines and undecodable bytes (surrogate escapes) intact
+        with open(run_path, 'w') as f:
+            for item in run:
+                f.write(json.dumps(item) + '\n')
+        return run_path
+
+    @staticmethod
+    def _read_run(run_path: str) -> Iterator[tuple]:
+        with open(run_path) as f:
+            for line in f:
+                yield tuple(json.loads(line))
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("io_storages", "0019_azureblobimportstoragelink_row_group_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="s3importstorage",
+            name="incremental_sync",
+            field=models.BooleanField(
+                default=False,
+                help_text="List only objects after the last synced key of every folder, use full rescan to list all objects",
+                verbose_name="incremental sync",
+            ),
+        ),
+        migrations.AddField(
+            model_name="s3importstorage",
+            name="listing_checkpoint",
+            field=models.JSONField(
+                blank=True,
+                default=None,
+                help_text="Last listed keys of the last successful sync, used by incremental sync",
+                null=True,
+                verbose_name="listing checkpoint",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("io_storages", "0020_s3importstorage_incremental_sync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="localfilesimportstorage",
+            name="incremental_sync",
+            field=models.BooleanField(
+                default=False,
+                help_text="List only directories modified since the last sync, use full rescan to list all directories",
+                verbose_name="incremental sync",
+            ),
+        ),
+        migrations.AddField(
+            model_name="localfilesimportstorage",
+            name="scan_checkpoint",
+            field=models.JSONField(
+                blank=True,
+                default=None,
+                help_text="Directories listed by the last successful sync, used by incremental sync",
+                null=True,
+                verbose_name="scan checkpoint",
+            ),
+        ),
+    ]
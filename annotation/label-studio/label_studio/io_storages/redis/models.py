@@ -91,11 +91,16 @@ class RedisImportStorageBase(ImportStorage, RedisStorageMixin):
             yield key
 
     def get_data(self, key) -> list[StorageObject]:
+        return self.parse_blob(self.get_blob(key), key)
+
+    def get_blob(self, key):
         client = self.get_client()
-        value_str = client.get(key)
-        if not value_str:
+        return client.get(key)
+
+    def parse_blob(self, blob, key) -> list[StorageObject]:
+        if not blob:
             return []
-        return load_tasks_json(value_str, key)
+        return load_tasks_json(blob, key)
 
     def scan_and_create_links(self):
         return self._scan_and_create_links(RedisImportStorageLink)
@@ -118,19 +123,22 @@ class RedisExportStorage(RedisStorageMixin, ExportStorage):
     db = models.PositiveSmallIntegerField(_('db'), default=2, help_text='Server Database')
 
     def save_annotation(self, annotation):
-        client = self.get_client()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = RedisExportStorageLink.get_key(annotation)
-
-        # put object into storage
-        client.set(key, json.dumps(ser_annotation))
+        self.save_object(key, ser_annotation)
 
         # create link if everything ok
         RedisExportStorageLink.create(annotation, self)
 
+    def save_object(self, key, data):
+        client = self.cached_client('client', self.get_client)
+
+        # put object into storage
+        client.set(key, json.dumps(data))
+
     def validate_connection(self, client=None):
         if client is None:
             client = self.get_client()
@@ -131,7 +131,18 @@ class S3ImportStorageDetailAPI(ImportStorageDetailAPI):
                 description='Storage ID',
             ),
         ],
-        request=None,
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'full_rescan': {
+                        'type': 'boolean',
+                        'description': 'List all objects even if incremental sync is enabled',
+                        'default': False,
+                    },
+                },
+            },
+        },
         extensions={
             'x-fern-sdk-group-name': ['import_storage', 's3'],
             'x-fern-sdk-method-name': 'sync',
@@ -23,11 +23,12 @@ from io_storages.base_models import (
     ProjectStorageMixin,
 )
 from io_storages.s3.utils import (
+    S3KeyLister,
     catch_and_reraise_from_none,
     get_client_and_resource,
     resolve_s3_url,
 )
-from io_storages.utils import StorageObject, load_tasks_json, storage_can_resolve_bucket_url
+from io_storages.utils import StorageObject, storage_can_resolve_bucket_url
 from tasks.models import Annotation
 
 from label_studio.io_storages.s3.utils import AWS
@@ -190,20 +191,52 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
         default=False,
         help_text=_('Perform recursive scan over the bucket content'),
     )
+    incremental_sync = models.BooleanField(
+        _('incremental sync'),
+        default=False,
+        help_text=_(
+            'List only objects after the last synced key of every folder, use full rescan to list all objects'
+        ),
+    )
+    listing_checkpoint = models.JSONField(
+        _('listing checkpoint'),
+        null=True,
+        blank=True,
+        default=None,
+        help_text='Last listed keys of the last successful sync, used by incremental sync',
+    )
+
+    _lister = None
+
+    def _listing_params(self) -> dict:
+        # checkpoint positions are valid only for the same listing
+        return {'prefix': self.prefix or '', 'recursive_scan': self.recursive_scan, 'regex_filter': self.regex_filter}
+
+    def reset_sync_checkpoint(self):
+        self.listing_checkpoint = None
+        self.save(update_fields=['listing_checkpoint'])
 
     @catch_and_reraise_from_none
     def iterkeys(self):
-        client, bucket = self.get_client_and_bucket()
+        client = self.get_client()
+        self.validate_connection(client)
+        prefix, delimiter = '', None
         if self.prefix:
-            list_kwargs = {'Prefix': self.prefix.rstrip('/') + '/'}
+            prefix = self.prefix.rstrip('/') + '/'
             if not self.recursive_scan:
-                list_kwargs['Delimiter'] = '/'
-            bucket_iter = bucket.objects.filter(**list_kwargs).all()
-        else:
-            bucket_iter = bucket.objects.all()
+                delimiter = '/'
+
+        start_after = None
+        checkpoint = self.listing_checkpoint or {}
+        if self.incremental_sync and checkpoint.get('params') == self._listing_params():
+            start_after = checkpoint.get('positions')
+            logger.info(f'{self}: incremental sync, listing continues after {len(start_after)} checkpoint positions')
+
+        self._lister = S3KeyLister(
+            client, self.bucket, prefix=prefix, delimiter=delimiter, workers=settings.S3_SYNC_LISTING_WORKERS
+        )
         regex = re.compile(str(self.regex_filter)) if self.regex_filter else None
-        for obj in bucket_iter:
-            key = obj.key
+        for key in self._lister.iterkeys(start_after):
             if key.endswith('/'):
                 logger.debug(key + ' is skipped because it is a folder')
                 continue
@@ -214,7 +247,12 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
 
     @catch_and_reraise_from_none
     def scan_and_create_links(self):
-        return self._scan_and_create_links(S3ImportStorageLink)
+        result = self._scan_and_create_links(S3ImportStorageLink)
+        # all listed keys are synced, the next incremental sync starts after them
+        if self._lister is not None:
+            self.listing_checkpoint = {'params': self._listing_params(), 'positions': self._lister.positions}
+            self.save(update_fields=['listing_checkpoint'])
+        return result
 
     @catch_and_reraise_from_none
     def get_data(self, key) -> list[StorageObject]:
@@ -225,10 +263,12 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
             return [StorageObject(key=key, task_data=task)]
 
         # read task json from bucket and validate it
-        _, s3 = self.get_client_and_resource()
-        bucket = s3.Bucket(self.bucket)
-        obj = s3.Object(bucket.name, key).get()['Body'].read()
-        return load_tasks_json(obj, key)
+        return self.parse_blob(self.get_blob(key), key)
+
+    @catch_and_reraise_from_none
+    def get_blob(self, key) -> bytes:
+        # boto3 clients are thread-safe unlike resources, the cached client is shared by sync workers
+        return self.get_client().get_object(Bucket=self.bucket, Key=key)['Body'].read()
 
     @catch_and_reraise_from_none
     def generate_http_url(self, url):
@@ -262,12 +302,18 @@ class S3ImportStorage(ProjectStorageMixin, S3ImportStorageBase):
 class S3ExportStorage(S3StorageMixin, ExportStorage):
     @catch_and_reraise_from_none
     def save_annotation(self, annotation):
-        client, s3 = self.get_client_and_resource()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = S3ExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        S3ExportStorageLink.create(annotation, self)
+
+    @catch_and_reraise_from_none
+    def save_object(self, key, data):
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
@@ -284,10 +330,8 @@ class S3ExportStorage(S3StorageMixin, ExportStorage):
             else:
                 additional_params['ServerSideEncryption'] = 'AES256'
 
-        s3.Object(self.bucket, key).put(Body=json.dumps(ser_annotation), **additional_params)
-
-        # create link if everything ok
-        S3ExportStorageLink.create(annotation, self)
+        # the cached client is thread-safe and pooled, unlike resource objects
+        self.get_client().put_object(Bucket=self.bucket, Key=key, Body=json.dumps(data), **additional_params)
 
     @catch_and_reraise_from_none
     def delete_annotation(self, annotation):
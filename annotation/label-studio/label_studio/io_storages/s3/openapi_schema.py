@@ -29,6 +29,11 @@ _s3_import_storage_schema = {
         'presign': {'type': 'boolean', 'description': 'Presign URLs for download', 'default': True},
         'presign_ttl': {'type': 'integer', 'description': 'Presign TTL in minutes', 'default': 1},
         'recursive_scan': {'type': 'boolean', 'description': 'Scan recursively'},
+        'incremental_sync': {
+            'type': 'boolean',
+            'description': 'List only objects after the last synced key of every folder. Objects with smaller keys are picked up by a sync with full_rescan.',
+            'default': False,
+        },
         **_common_s3_storage_schema_properties,
     },
     'required': [],
@@ -80,6 +80,7 @@ class S3ImportStorageSerializer(S3StorageSerializerMixin, ImportStorageSerialize
     class Meta:
         model = S3ImportStorage
         fields = '__all__'
+        read_only_fields = ['listing_checkpoint']
 
 
 class S3ExportStorageSerializer(S3StorageSerializerMixin, ExportStorageSerializer):
@@ -2,8 +2,12 @@
 """
 import base64
 import fnmatch
+import heapq
 import logging
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 from urllib.parse import urlparse
 
 import boto3
@@ -32,12 +36,15 @@ def get_client_and_resource(
         aws_secret_access_key=aws_secret_access_key,
         aws_session_token=aws_session_token,
     )
-    settings = {'region_name': region_name or get_env('S3_region') or 'us-east-1'}
+    client_kwargs = {'region_name': region_name or get_env('S3_region') or 'us-east-1'}
     s3_endpoint = s3_endpoint or get_env('S3_ENDPOINT')
     if s3_endpoint:
-        settings['endpoint_url'] = s3_endpoint
-    client = session.client('s3', config=boto3.session.Config(signature_version='s3v4'), **settings)
-    resource = session.resource('s3', config=boto3.session.Config(signature_version='s3v4'), **settings)
+        client_kwargs['endpoint_url'] = s3_endpoint
+    # the client is shared by storage sync threads, keep a connection per thread
+    max_pool_connections = max(10, settings.STORAGE_EXPORT_MAX_WORKERS, settings.STORAGE_SYNC_PREFETCH_WORKERS)
+    config = boto3.session.Config(signature_version='s3v4', max_pool_connections=max_pool_connections)
+    client = session.client('s3', config=config, **client_kwargs)
+    resource = session.resource('s3', config=boto3.session.Config(signature_version='s3v4'), **client_kwargs)
     return client, resource
 
 
@@ -138,6 +145,97 @@ class AWS(object):
         return 'No objects found matching the provided glob pattern'
 
 
+class S3KeyLister:
+    """Lists object keys of a bucket prefix in key order, optionally resuming after previously listed keys.
+
+    Recursive listings are sharded: top level sub-prefixes ("folders") are found with one delimited listing
+    and each of them is listed separately, up to `workers` shards are requested in parallel ahead of the consumer.
+    The listing position is tracked per shard (the last listed key), see `positions` and `start_after`.
+    """
+
+    ROOT_SHARD = ''
+
+    def __init__(self, client, bucket: str, prefix: str = '', delimiter: Optional[str] = None, workers: int = 8):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self.workers = max(1, workers)
+        # shard -> last listed key, it's the checkpoint of the listing
+        self.positions = {}
+
+    def _iter_pages(self, executor, **list_kwargs) -> Iterator[dict]:
+        """Yield ListObjectsV2 pages, the first page is requested immediately, before the generator is started.
+        The next page is requested as soon as the current one arrives.
+        """
+        future = executor.submit(self.client.list_objects_v2, Bucket=self.bucket, **list_kwargs)
+
+        def pages(future):
+            while future is not None:
+                page = future.result()
+                future = None
+                if page.get('IsTruncated') and page.get('NextContinuationToken'):
+                    future = executor.submit(
+                        self.client.list_objects_v2,
+                        Bucket=self.bucket,
+                        ContinuationToken=page['NextContinuationToken'],
+                        **list_kwargs,
+                    )
+                yield page
+
+        return pages(future)
+
+    def _iter_shard(self, executor, shard: str, start_after: Optional[str], **list_kwargs) -> Iterator[str]:
+        list_kwargs['Prefix'] = shard
+        if start_after and start_after.startswith(shard):
+            list_kwargs['StartAfter'] = start_after
+        pages = self._iter_pages(executor, **list_kwargs)
+
+        def keys():
+            for page in pages:
+                for obj in page.get('Contents', []):
+                    self.positions[shard] = obj['Key']
+                    yield obj['Key']
+
+        return keys()
+
+    def _iter_top_level(self, executor) -> Iterator[tuple[str, bool]]:
+        """Yield (key, is_prefix) for objects and sub-prefixes right under the prefix, in key order"""
+        for page in self._iter_pages(executor, Prefix=self.prefix, Delimiter='/'):
+            keys = ((obj['Key'], False) for obj in page.get('Contents', []))
+            prefixes = ((item['Prefix'], True) for item in page.get('CommonPrefixes', []))
+            yield from heapq.merge(keys, prefixes)
+
+    def iterkeys(self, start_after: Optional[dict] = None) -> Iterator[str]:
+        """
+        :param start_after: positions of a previous listing, keys up to them are not listed again
+        """
+        start_after = start_after or {}
+        self.positions = dict(start_after)
+        with ThreadPoolExecutor(max_workers=self.workers + 1) as executor:
+            if self.delimiter:
+                # non-recursive listing can't be sharded
+                yield from self._iter_shard(
+                    executor, self.prefix, start_after.get(self.prefix), Delimiter=self.delimiter
+                )
+                return
+
+            # objects right under the prefix are always listed, keys before the position are skipped here
+            root_start_after = start_after.get(self.ROOT_SHARD)
+            window = deque()
+            for key, is_prefix in self._iter_top_level(executor):
+                if is_prefix:
+                    # up to `workers` shards are listed ahead while the first one in the window is consumed
+                    window.append(self._iter_shard(executor, key, start_after.get(key)))
+                elif not root_start_after or key > root_start_after:
+                    self.positions[self.ROOT_SHARD] = key
+                    window.append((key,))
+                while len(window) > self.workers:
+                    yield from window.popleft()
+            while window:
+                yield from window.popleft()
+
+
 class S3StorageError(Exception):
     pass
 
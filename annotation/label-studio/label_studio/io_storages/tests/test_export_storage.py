@@ -0,0 +1,100 @@
+import json
+from unittest import mock
+
+import boto3
+import pytest
+from io_storages.models import RedisExportStorage, S3ExportStorage
+from moto import mock_s3
+from projects.tests.factories import ProjectFactory
+from tasks.models import Annotation
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project_with_annotations():
+    project = ProjectFactory()
+    tasks = TaskFactory.create_batch(3, project=project)
+    for task in tasks:
+        AnnotationFactory.create_batch(2, task=task, project=project)
+    return project, tasks
+
+
+def create_storage(project, bucket):
+    # annotations are created before the storage, so post_save signals don't export them
+    storage = S3ExportStorage(
+        project=project,
+        bucket=bucket,
+        aws_access_key_id='example',
+        aws_secret_access_key='example',
+    )
+    storage.save()
+    return storage
+
+
+def list_keys(s3, bucket):
+    return sorted(obj['Key'] for obj in s3.list_objects_v2(Bucket=bucket).get('Contents', []))
+
+
+def test_save_annotations_exports_only_given_queryset(project_with_annotations, settings):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = False
+    project, tasks = project_with_annotations
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='pytest-export')
+        storage = create_storage(project, 'pytest-export')
+
+        annotations = Annotation.objects.filter(task=tasks[0])
+        storage.info_set_queued()
+        storage.save_annotations(annotations)
+
+        expected = sorted(str(annotation.id) for annotation in annotations)
+        assert list_keys(s3, 'pytest-export') == expected
+        assert sorted(storage.links.values_list('annotation_id', flat=True)) == sorted(a.id for a in annotations)
+        storage.refresh_from_db()
+        assert storage.last_sync_count == 2
+
+        # only annotations without links are exported
+        storage.info_set_queued()
+        storage.save_only_new_annotations()
+        storage.refresh_from_db()
+        assert storage.last_sync_count == 4
+        assert storage.links.count() == 6
+
+
+def test_save_annotations_task_format_saves_each_task_once(project_with_annotations, settings):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = True
+    settings.FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = True
+    # chunks end in the middle of a task, tasks must not be split
+    settings.STORAGE_EXPORT_CHUNK_SIZE = 3
+    project, tasks = project_with_annotations
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='pytest-export')
+        storage = create_storage(project, 'pytest-export')
+
+        storage.info_set_queued()
+        storage.save_all_annotations()
+
+        assert list_keys(s3, 'pytest-export') == sorted(f'{task.id}.json' for task in tasks)
+        body = json.loads(s3.get_object(Bucket='pytest-export', Key=f'{tasks[0].id}.json')['Body'].read())
+        assert len(body['annotations']) == 2
+        assert storage.links.count() == 6
+
+        # existing links are updated instead of duplicated
+        storage.info_set_queued()
+        storage.save_all_annotations()
+        assert storage.links.count() == 6
+
+
+def test_export_reuses_cached_client(project_with_annotations, settings):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = False
+    project, _ = project_with_annotations
+    storage = RedisExportStorage.objects.create(project=project)
+    storage.info_set_queued()
+    with mock.patch.object(RedisExportStorage, 'get_client') as get_client:
+        storage.save_annotations(Annotation.objects.filter(project=project))
+
+    get_client.assert_called_once()
+    assert get_client.return_value.set.call_count == 6
@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+
+import mock
+import pytest
+from io_storages.localfiles.models import LocalFilesImportStorage
+from io_storages.localfiles.utils import LocalFilesScanner
+from projects.tests.factories import ProjectFactory
+
+
+def make_tree(root, names):
+    for name in names:
+        path = Path(root) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('{}')
+
+
+def test_scanner_sorts_by_file_name_across_runs(tmp_path):
+    make_tree(tmp_path, ['b/3.json', 'a/2.json', '1.json', 'c/d/0.json', 'c/4.json', 'a/b/5.json'])
+    expected = sorted((str(p) for p in tmp_path.rglob('*') if p.is_file()), key=os.path.basename)
+
+    # run_size=2 spills three sorted runs to disk
+    assert list(LocalFilesScanner(str(tmp_path), run_size=2).iter_files()) == expected
+    assert list(LocalFilesScanner(str(tmp_path)).iter_files()) == expected
+
+
+def test_scanner_regex_filter(tmp_path):
+    make_tree(tmp_path, ['a.json', 'b.txt', 'sub/c.json'])
+    files = LocalFilesScanner(str(tmp_path), regex_filter=r'.*\.json').iter_files()
+    assert [os.path.basename(f) for f in files] == ['a.json', 'c.json']
+
+
+def test_scanner_incremental_walks_only_changed_directories(tmp_path):
+    root = tmp_path / 'data'
+    make_tree(root, ['a/1.json', 'b/2.json', 'b/c/3.json'])
+
+    with mock.patch('io_storages.localfiles.utils.MTIME_GRANULARITY_SEC', -3600):
+        scanner = LocalFilesScanner(str(root))
+        assert len(list(scanner.iter_files())) == 3
+        checkpoint = scanner.get_checkpoint()
+
+        scanner = LocalFilesScanner(str(root), checkpoint=checkpoint)
+        assert list(scanner.iter_files()) == []
+        assert scanner.dirs_listed == 0
+
+        make_tree(root, ['b/c/4.json'])
+        new_dir = root / 'b' / 'c'
+        os.utime(new_dir, ns=(new_dir.stat().st_atime_ns, new_dir.stat().st_mtime_ns + 10**9))
+        scanner = LocalFilesScanner(str(root), checkpoint=checkpoint)
+        assert [os.path.basename(f) for f in scanner.iter_files()] == ['3.json', '4.json']
+        assert scanner.dirs_listed == 1
+
+        # another regex filter invalidates the checkpoint
+        scanner = LocalFilesScanner(str(root), regex_filter=r'.*', checkpoint=checkpoint)
+        assert len(list(scanner.iter_files())) == 4
+
+
+@pytest.mark.django_db
+def test_incremental_sync_keeps_checkpoint_on_storage(tmp_path, settings):
+    settings.LOCAL_FILES_DOCUMENT_ROOT = str(tmp_path)
+    settings.LOCAL_FILES_SERVING_ENABLED = True
+    root = tmp_path / 'data'
+    make_tree(root, ['a/1.json', 'b/2.json'])
+    storage = LocalFilesImportStorage.objects.create(
+        project=ProjectFactory(), path=str(root), use_blob_urls=True, incremental_sync=True
+    )
+
+    with mock.patch('io_storages.localfiles.utils.MTIME_GRANULARITY_SEC', -3600):
+        storage.info_set_queued()
+        storage.scan_and_create_links()
+        storage.refresh_from_db()
+        assert sorted(storage.scan_checkpoint['dirs']) == sorted(str(root / name) for name in ('', 'a', 'b'))
+
+        # unchanged directories are not listed again
+        scanner = storage.get_scanner()
+        assert list(scanner.iter_files()) == []
+        assert scanner.dirs_listed == 0
+
+        # full rescan forgets the checkpoint
+        storage.reset_sync_checkpoint()
+        storage.refresh_from_db()
+        assert storage.scan_checkpoint is None
+        assert len(list(storage.get_scanner().iter_files())) == 2
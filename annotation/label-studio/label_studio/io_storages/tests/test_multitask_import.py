@@ -199,6 +199,36 @@ def test_storagelink_fields(project, common_task_data):
         assert storage_links[1].row_group is None
 
 
+@pytest.mark.fflag_feat_dia_2092_multitasks_per_storage_link_on
+def test_resync_skips_linked_keys(project, common_task_data, settings):
+    # one key per page and one task per bulk insert to exercise page boundaries
+    settings.STORAGE_SYNC_BATCH_SIZE = 1
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        bucket_name = 'pytest-s3-jsons'
+        s3.create_bucket(Bucket=bucket_name)
+        s3.put_object(Bucket=bucket_name, Key='test1.json', Body=json.dumps(common_task_data))
+        s3.put_object(Bucket=bucket_name, Key='test2.json', Body=json.dumps(common_task_data))
+
+        storage = S3ImportStorage(
+            project=project,
+            bucket=bucket_name,
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+            use_blob_urls=False,
+        )
+        storage.save()
+        storage.sync()
+        assert sorted(project.tasks.values_list('inner_id', flat=True)) == [1, 2, 3, 4]
+
+        # second sync finds all keys linked and creates nothing
+        storage.sync()
+        storage.refresh_from_db()
+        assert project.tasks.count() == 4
+        assert storage.last_sync_count == 0
+        assert storage.meta['tasks_existed'] == 4
+
+
 #
 # Unit tests for load_tasks_json()
 #
@@ -337,6 +367,58 @@ def test_preds_and_annots_list(storage):
     create_tasks(storage, output)
 
 
+def test_add_tasks_bulk(storage):
+    project, storage = storage
+    output = load_tasks_json(json.dumps(annots_preds_task_list).encode(), 'test.json')
+
+    tasks = S3ImportStorage.add_tasks(project, 1, storage, output, S3ImportStorageLink)
+
+    assert [task.inner_id for task in tasks] == [1, 2]
+    assert [task.data for task in tasks] == [t['data'] for t in annots_preds_task_list]
+    assert project.annotations.count() == 1
+    assert project.predictions.count() == 2
+    links = S3ImportStorageLink.objects.filter(storage=storage).order_by('task_id')
+    assert [(link.task_id, link.row_index) for link in links] == [(tasks[0].id, 0), (tasks[1].id, 1)]
+
+
+def test_add_tasks_bulk_after_null_inner_ids(storage):
+    project, storage = storage
+    output = load_tasks_json(json.dumps(bare_task_list).encode(), 'test.json')
+    S3ImportStorage.add_tasks(project, 1, storage, output, S3ImportStorageLink)
+    project.tasks.update(inner_id=None)
+
+    # tasks without inner_id don't restart the numbering
+    tasks = S3ImportStorage.add_tasks(project, 1, storage, output, S3ImportStorageLink)
+    assert [task.inner_id for task in tasks] == [3, 4]
+
+
+def test_add_tasks_bulk_like_import_api(storage):
+    project, storage = storage
+    task = {
+        'data': {'text': 'Task with all fields'},
+        'predictions': [{'result': [], 'score': '0.5', 'model_version': 'v1'}],
+        'annotations': [
+            {'id': 42, 'result': [], 'completed_by': project.created_by.id, 'lead_time': 1.5, 'was_cancelled': True},
+            {'result': [], 'completed_by': {'email': 'unknown@example.com'}},
+        ],
+    }
+    output = load_tasks_json(json.dumps([task]).encode(), 'test.json')
+
+    # the annotator email is unknown, so annotations of the task are skipped
+    (db_task,) = S3ImportStorage.add_tasks(project, 1, storage, output, S3ImportStorageLink)
+    assert db_task.annotations.count() == 0
+    prediction = db_task.predictions.get()
+    assert (prediction.score, prediction.model_version) == (0.5, 'v1')
+
+    task['annotations'].pop()
+    output = load_tasks_json(json.dumps([task]).encode(), 'test2.json')
+    (db_task,) = S3ImportStorage.add_tasks(project, 1, storage, output, S3ImportStorageLink)
+    annotation = db_task.annotations.get()
+    assert (annotation.completed_by_id, annotation.import_id, annotation.lead_time) == (project.created_by.id, 42, 1.5)
+    assert (db_task.total_annotations, db_task.cancelled_annotations) == (0, 1)
+    assert S3ImportStorageLink.objects.get(task=db_task).key == 'test2.json'
+
+
 def test_mixed_formats(storage):
     task_data = [bare_task_list[0], annots_preds_task_list[0]]
 
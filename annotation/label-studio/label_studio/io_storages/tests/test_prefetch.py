@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pytest
+from io_storages.utils import iter_prefetched
+
+
+def test_iter_prefetched_keeps_order():
+    def load(key):
+        # later keys finish first
+        time.sleep(0.01 * (5 - key))
+        return 1, key * 10
+
+    result = list(iter_prefetched(load, range(5), max_workers=4, max_bytes=1024))
+    assert result == [(key, key * 10) for key in range(5)]
+
+
+def test_iter_prefetched_respects_byte_budget():
+    lock = threading.Lock()
+    started = []
+
+    def load(key):
+        with lock:
+            started.append(key)
+        return 100, key
+
+    items = iter_prefetched(load, range(10), max_workers=4, max_bytes=150)
+    assert next(items) == (0, 0)
+    time.sleep(0.05)
+    # one consumed result of 100 bytes plus one buffered result exceed the budget
+    assert len(started) < 10
+    assert [key for key, _ in items] == list(range(1, 10))
+
+
+def test_iter_prefetched_reraises_at_failed_item():
+    def load(key):
+        if key == 2:
+            raise ValueError('broken object')
+        return 1, key
+
+    items = iter_prefetched(load, range(5), max_workers=2, max_bytes=1024)
+    assert next(items) == (0, 0)
+    assert next(items) == (1, 1)
+    with pytest.raises(ValueError, match='broken object'):
+        next(items)
@@ -0,0 +1,96 @@
+import boto3
+import pytest
+from io_storages.models import S3ImportStorage
+from moto import mock_s3
+from projects.tests.factories import ProjectFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def put_images(s3, bucket, keys):
+    for key in keys:
+        s3.put_object(Bucket=bucket, Key=key, Body=b'image')
+
+
+def synced_keys(storage):
+    return sorted(storage.links.values_list('key', flat=True))
+
+
+def test_incremental_sync_lists_only_new_keys():
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        bucket = 'pytest-s3-images'
+        s3.create_bucket(Bucket=bucket)
+        put_images(s3, bucket, ['data/a/1.jpg', 'data/a/2.jpg', 'data/b/1.jpg', 'data/root.jpg'])
+
+        storage = S3ImportStorage(
+            project=ProjectFactory(),
+            bucket=bucket,
+            prefix='data',
+            recursive_scan=True,
+            incremental_sync=True,
+            use_blob_urls=True,
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+        )
+        storage.save()
+        storage.sync()
+        storage.refresh_from_db()
+        assert storage.last_sync_count == 4
+        assert storage.listing_checkpoint['positions'] == {
+            '': 'data/root.jpg',
+            'data/a/': 'data/a/2.jpg',
+            'data/b/': 'data/b/1.jpg',
+        }
+
+        # new keys after the positions and in a new folder; data/a/0.jpg sorts before the position
+        put_images(s3, bucket, ['data/a/3.jpg', 'data/c/1.jpg', 'data/a/0.jpg'])
+        assert list(storage.iterkeys()) == ['data/a/3.jpg', 'data/c/1.jpg']
+
+        storage.sync()
+        storage.refresh_from_db()
+        assert storage.last_sync_count == 2
+        assert storage.meta['tasks_existed'] == 0
+
+        # full rescan picks up keys before the positions
+        storage.reset_sync_checkpoint()
+        storage.sync()
+        storage.refresh_from_db()
+        assert storage.last_sync_count == 1
+        assert synced_keys(storage) == sorted(
+            [
+                'data/a/0.jpg',
+                'data/a/1.jpg',
+                'data/a/2.jpg',
+                'data/a/3.jpg',
+                'data/b/1.jpg',
+                'data/c/1.jpg',
+                'data/root.jpg',
+            ]
+        )
+
+
+def test_checkpoint_is_ignored_when_listing_changes():
+    with mock_s3():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        bucket = 'pytest-s3-images'
+        s3.create_bucket(Bucket=bucket)
+        put_images(s3, bucket, ['1.jpg', '2.png'])
+
+        storage = S3ImportStorage(
+            project=ProjectFactory(),
+            bucket=bucket,
+            regex_filter=r'.*\.jpg',
+            incremental_sync=True,
+            use_blob_urls=True,
+            aws_access_key_id='example',
+            aws_secret_access_key='example',
+        )
+        storage.save()
+        storage.sync()
+        storage.refresh_from_db()
+        assert synced_keys(storage) == ['1.jpg']
+
+        storage.regex_filter = r'.*'
+        storage.save()
+        assert list(storage.iterkeys()) == ['1.jpg', '2.png']
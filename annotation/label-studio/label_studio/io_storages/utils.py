@@ -4,8 +4,10 @@ import io
 import json
 import logging
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Union
+from typing import Callable, Iterable, Iterator, Optional, TypeVar, Union
 
 from core.feature_flags import flag_set
 from core.utils.common import load_func
@@ -13,6 +15,9 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+R = TypeVar('R')
+
 # Put storage prefixes here
 uri_regex = r"([\"'])(?P<uri>(?P<storage>{})://[^\1=]*)\1"
 
@@ -185,3 +190,46 @@ def load_tasks_json(blob: str, key: str) -> list[StorageObject]:
     # uses load_tasks_json_lso here and an LSE-specific implementation in LSE
     load_tasks_json_func = load_func(settings.STORAGE_LOAD_TASKS_JSON)
     return load_tasks_json_func(blob, key)
+
+
+def iter_prefetched(
+    func: Callable[[T], tuple[int, R]], items: Iterable[T], max_workers: int, max_bytes: int
+) -> Iterator[tuple[T, R]]:
+    """Apply func to items in a thread pool and yield (item, result) in the order of items.
+
+    func must return (payload size in bytes, result). At most 2 * max_workers items are in flight,
+    and no new items are submitted while finished but not yet consumed results hold more than max_bytes.
+    An exception raised by func is re-raised when its item is reached.
+    Items are pulled from the iterable in the calling thread only.
+    """
+    items = iter(items)
+    pending = deque()
+    exhausted = False
+
+    def buffered_bytes():
+        return sum(future.result()[0] for _, future in pending if future.done() and future.exception() is None)
+
+    def fill(executor, held_bytes):
+        nonlocal exhausted
+        while not exhausted and len(pending) < 2 * max_workers and held_bytes + buffered_bytes() < max_bytes:
+            try:
+                item = next(items)
+            except StopIteration:
+                exhausted = True
+                return
+            pending.append((item, executor.submit(func, item)))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        fill(executor, 0)
+        while pending:
+            item, future = pending.popleft()
+            size, result = future.result()
+            # keep the pool busy while the consumer processes this result
+            fill(executor, size)
+            if not pending:
+                # budget is exhausted by the current result only, read the next item anyway
+                fill(executor, 0)
+            yield item, result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
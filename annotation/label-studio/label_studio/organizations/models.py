@@ -67,7 +67,9 @@ class OrganizationMember(OrganizationMemberMixin, models.Model):
             ).first()
             self.user.save(update_fields=['active_organization'])
 
-        self.user.task_locks.all().delete()
+        from tasks.locks import release_task_locks
+
+        release_task_locks(self.user.task_locks.all())
 
 
 OrganizationMixin = load_func(settings.ORGANIZATION_MIXIN)
@@ -12,7 +12,11 @@ from core.redis import start_job_async_or_sync
 from core.utils.common import paginator, paginator_help, temporary_disconnect_all_signals
 from core.utils.exceptions import LabelStudioDatabaseException, ProjectExistException
 from core.utils.io import find_dir, find_file, read_yaml
-from data_manager.functions import filters_ordering_selected_items_exist, get_prepared_queryset
+from data_manager.functions import (
+    filters_ordering_selected_items_exist,
+    get_prepare_params,
+    prepare_params_select_all_tasks,
+)
 from django.conf import settings
 from django.db import IntegrityError
 from django.db.models import F
@@ -483,9 +487,16 @@ class ProjectNextTaskAPI(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         project = self.get_object()
         dm_queue = filters_ordering_selected_items_exist(request.data)
-        prepared_tasks = get_prepared_queryset(request, project)
+        prepare_params = get_prepare_params(request, project)
+        prepared_tasks = Task.prepared.only_filtered(prepare_params=prepare_params)
 
-        next_task, queue_info = get_next_task(request.user, prepared_tasks, project, dm_queue)
+        next_task, queue_info = get_next_task(
+            request.user,
+            prepared_tasks,
+            project,
+            dm_queue,
+            use_labeling_queue=prepare_params_select_all_tasks(prepare_params),
+        )
 
         if next_task is None:
             raise NotFound(
@@ -599,6 +610,9 @@ class ProjectSummaryAPI(generics.RetrieveAPIView):
     permission_required = all_permissions.projects_view
     queryset = ProjectSummary.objects.all()
 
+    def get_object(self):
+        return super(ProjectSummaryAPI, self).get_object().fold_deltas()
+
     @extend_schema(exclude=True)
     def get(self, *args, **kwargs):
         return super(ProjectSummaryAPI, self).get(*args, **kwargs)
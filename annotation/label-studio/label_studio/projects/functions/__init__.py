@@ -1,6 +1,7 @@
 from core.feature_flags import flag_set
 from core.utils.db import SQCount
-from django.db.models import Count, OuterRef, Q
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from tasks.models import Annotation, Prediction, Task
 
 
@@ -55,3 +56,9 @@ def annotate_ground_truth_number(queryset):
 def annotate_skipped_annotations_number(queryset):
     subquery = Annotation.objects.filter(Q(project=OuterRef('pk')) & Q(was_cancelled=True)).values('id')
     return queryset.annotate(skipped_annotations_number=SQCount(subquery))
+
+
+def annotate_from_counters(queryset, field, annotate_func):
+    """Read the counter from ProjectCounters, projects without counters are counted by annotate_func"""
+    counted = annotate_func(queryset.model.objects.filter(pk=OuterRef('pk'))).values(field)[:1]
+    return queryset.annotate(**{field: Coalesce(F(f'counters__{field}'), Subquery(counted))})
@@ -0,0 +1,286 @@
+"""Project counters maintained incrementally.
+
+ProjectCounters stores the values of ProjectManager.COUNTER_FIELDS, so the project APIs read them with one join
+instead of aggregating tasks and annotations of every listed project on each request:
+- single task, annotation and prediction changes apply deltas in the same transaction (signals in tasks.models),
+- bulk imports and bulk deletes apply the summed deltas once,
+- bulk is_labeled recalculations (project settings changes, bulk annotation changes) recount the task state
+  counters of the project,
+- reconcile_project_counters() recounts the projects and repairs drift, e.g. deltas lost by a concurrent recount.
+  With redis it's scheduled in the background once per PROJECT_COUNTERS_RECONCILE_INTERVAL when counters are read,
+  without redis run the reconcile_project_counters command. Run it after the upgrade too: counters are created
+  for new projects only, projects without counters are aggregated on read like before.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from core.redis import redis_connected, redis_set, start_job_async_or_sync
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils.timezone import now
+from projects.models import Project, ProjectCounters, ProjectManager
+from tasks.models import Annotation, Prediction, Task
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ProjectManager.COUNTER_FIELDS
+# counters depending on the state of the whole task, bulk paths recount them instead of computing deltas
+TASK_STATE_COUNTERS = ['finished_task_number', 'num_tasks_with_annotations']
+
+# annotations counted by num_tasks_with_annotations and useful_annotation_number
+Q_useful_annotations = Q(was_cancelled=False) & Q(ground_truth=False) & Q(result__isnull=False)
+
+RECONCILE_KEY = 'project-counters:reconcile'
+
+_state = threading.local()
+_last_reconcile = 0.0
+
+
+@contextmanager
+def counters_suspended():
+    """Don't apply deltas from signals inside the block, the caller applies the summed deltas itself"""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def counters_are_suspended() -> bool:
+    return getattr(_state, 'suspended', False)
+
+
+def _deleting_tasks() -> set:
+    if not hasattr(_state, 'deleting_tasks'):
+        _state.deleting_tasks = set()
+    return _state.deleting_tasks
+
+
+def is_useful_annotation(annotation) -> bool:
+    return not annotation.was_cancelled and not annotation.ground_truth and annotation.result is not None
+
+
+def annotation_counter_deltas(annotations: Iterable[Annotation], sign: int = 1) -> Counter:
+    """Deltas of annotation counters for annotation objects, task state counters are not included"""
+    deltas = Counter()
+    for annotation in annotations:
+        if annotation.was_cancelled:
+            deltas['skipped_annotations_number'] += sign
+        else:
+            deltas['total_annotations_number'] += sign
+        if annotation.ground_truth:
+            deltas['ground_truth_number'] += sign
+        if is_useful_annotation(annotation):
+            deltas['useful_annotation_number'] += sign
+    return deltas
+
+
+def imported_counter_deltas(tasks: List[Task], annotations: List[Annotation], predictions_number: int) -> Counter:
+    """Deltas for newly created tasks with their annotations and predictions"""
+    deltas = annotation_counter_deltas(annotations)
+    deltas['task_number'] += len(tasks)
+    deltas['finished_task_number'] += sum(1 for task in tasks if task.is_labeled)
+    deltas['total_predictions_number'] += predictions_number
+    deltas['num_tasks_with_annotations'] += len(
+        {annotation.task_id for annotation in annotations if is_useful_annotation(annotation)}
+    )
+    return deltas
+
+
+def annotations_queryset_counter_deltas(annotations, sign: int = -1) -> Counter:
+    """Deltas of annotation counters for the annotations queryset, one aggregate query"""
+    counts = annotations.aggregate(
+        total_annotations_number=Count('id', filter=Q(was_cancelled=False)),
+        skipped_annotations_number=Count('id', filter=Q(was_cancelled=True)),
+        ground_truth_number=Count('id', filter=Q(ground_truth=True)),
+        useful_annotation_number=Count('id', filter=Q_useful_annotations),
+    )
+    return Counter({field: sign * (value or 0) for field, value in counts.items()})
+
+
+def tasks_queryset_counter_deltas(tasks, sign: int = -1) -> Counter:
+    """Deltas of all counters for the tasks queryset with their annotations and predictions"""
+    task_ids = tasks.values('id')
+    useful = Annotation.objects.filter(Q_useful_annotations, task_id=OuterRef('id'))
+    counts = Task.objects.filter(id__in=task_ids).aggregate(
+        task_number=Count('id'),
+        finished_task_number=Count('id', filter=Q(is_labeled=True)),
+        num_tasks_with_annotations=Count('id', filter=Exists(useful)),
+    )
+    deltas = Counter({field: sign * (value or 0) for field, value in counts.items()})
+    deltas.update(annotations_queryset_counter_deltas(Annotation.objects.filter(task_id__in=task_ids), sign))
+    deltas['total_predictions_number'] += sign * Prediction.objects.filter(task_id__in=task_ids).count()
+    return deltas
+
+
+def apply_counter_deltas(project_id: Optional[int], deltas: Dict[str, int]) -> None:
+    """Add deltas to the project counters in the current transaction, projects without counters are skipped"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if project_id is None or not deltas:
+        return
+    ProjectCounters.objects.filter(project_id=project_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}, updated_at=now()
+    )
+
+
+def recount_project_counters(project_ids: Iterable[int], fields: Optional[List[str]] = None) -> Dict[int, dict]:
+    """Count the counters with the aggregate queries and store them.
+    Counters are created when all fields are recounted, a part of fields is updated for existing counters only.
+    """
+    fields = fields or COUNTER_FIELDS
+    projects = ProjectManager.with_counts_annotate(
+        Project.objects.filter(id__in=list(project_ids)), fields=fields, aggregate=True
+    )
+    values = {project.pop('id'): project for project in projects.values('id', *fields)}
+
+    if set(fields) == set(COUNTER_FIELDS):
+        ProjectCounters.objects.bulk_create(
+            [ProjectCounters(project_id=project_id, **counters) for project_id, counters in values.items()],
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=[*fields, 'updated_at'],
+        )
+    else:
+        for project_id, counters in values.items():
+            ProjectCounters.objects.filter(project_id=project_id).update(**counters, updated_at=now())
+    return values
+
+
+def recount_task_state_counters(project_id: int) -> None:
+    recount_project_counters([project_id], fields=TASK_STATE_COUNTERS)
+
+
+def reconcile_project_counters(organization_id: Optional[int] = None) -> int:
+    """Recount counters of all projects (of the organization), return the number of projects with drifted counters"""
+    projects = Project.objects.order_by('id')
+    if organization_id is not None:
+        projects = projects.filter(organization_id=organization_id)
+    project_ids = list(projects.values_list('id', flat=True))
+
+    drifted = 0
+    batch_size = settings.PROJECT_COUNTERS_RECONCILE_BATCH_SIZE
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start : start + batch_size]
+        stored = {
+            counters.pop('project_id'): counters
+            for counters in ProjectCounters.objects.filter(project_id__in=batch).values('project_id', *COUNTER_FIELDS)
+        }
+        for project_id, counters in recount_project_counters(batch).items():
+            if project_id in stored and stored[project_id] != counters:
+                drifted += 1
+                logger.warning(
+                    f'Counters of project {project_id} drifted: stored {stored[project_id]}, actual {counters}'
+                )
+    logger.info(f'Counters of {len(project_ids)} projects reconciled, {drifted} drifted')
+    return drifted
+
+
+def schedule_project_counters_reconcile():
+    """Start reconcile_project_counters in the background at most once per PROJECT_COUNTERS_RECONCILE_INTERVAL
+    for all processes, it's skipped without redis: recounting all projects doesn't fit into a request
+    """
+    global _last_reconcile
+    interval = settings.PROJECT_COUNTERS_RECONCILE_INTERVAL
+    if interval <= 0 or time.monotonic() - _last_reconcile < interval:
+        return
+    _last_reconcile = time.monotonic()
+    if redis_connected() and redis_set(RECONCILE_KEY, 1, ttl=interval, nx=True):
+        start_job_async_or_sync(reconcile_project_counters, queue_name='low')
+
+
+def update_task_annotations(task: Task, annotations, **values) -> int:
+    """QuerySet.update() of annotations of the task with counter deltas, update() doesn't send signals"""
+    annotation_ids = list(annotations.values_list('id', flat=True))
+    if not annotation_ids:
+        return 0
+    changed = Annotation.objects.filter(id__in=annotation_ids)
+    if counters_are_suspended():
+        return changed.update(**values)
+
+    useful = Annotation.objects.filter(Q_useful_annotations, task_id=task.id)
+    had_useful = useful.exists()
+    deltas = annotations_queryset_counter_deltas(changed)
+    updated = changed.update(**values)
+    deltas.update(annotations_queryset_counter_deltas(changed, sign=1))
+    deltas['num_tasks_with_annotations'] += int(useful.exists()) - int(had_useful)
+    apply_counter_deltas(task.project_id, deltas)
+    return updated
+
+
+# signal handlers, see tasks.models
+
+
+def on_task_created(task: Task) -> None:
+    if not counters_are_suspended():
+        apply_counter_deltas(task.project_id, {'task_number': 1, 'finished_task_number': int(task.is_labeled)})
+
+
+def before_task_delete(task: Task) -> None:
+    """Task deltas are computed before annotations are deleted by cascade, annotations and predictions
+    are subtracted by their own post_delete signals
+    """
+    if counters_are_suspended():
+        return
+    has_useful = task.annotations.filter(Q_useful_annotations).exists()
+    task._counter_deltas = {
+        'task_number': -1,
+        'finished_task_number': -int(task.is_labeled),
+        'num_tasks_with_annotations': -int(has_useful),
+    }
+    _deleting_tasks().add(task.id)
+
+
+def after_task_delete(task: Task) -> None:
+    _deleting_tasks().discard(task.id)
+    deltas = getattr(task, '_counter_deltas', None)
+    if deltas and not counters_are_suspended():
+        apply_counter_deltas(task.project_id, deltas)
+
+
+def before_annotation_save(annotation: Annotation, old_annotation: Optional[Annotation]) -> None:
+    annotation._counters_before = annotation_counter_deltas([old_annotation] if old_annotation else [])
+    annotation._useful_before = old_annotation is not None and is_useful_annotation(old_annotation)
+
+
+def after_annotation_save(annotation: Annotation, labeled_delta: int = 0) -> None:
+    """Apply the difference between the annotation before and after saving"""
+    if counters_are_suspended():
+        return
+    deltas = annotation_counter_deltas([annotation])
+    deltas.subtract(getattr(annotation, '_counters_before', Counter()))
+    deltas['finished_task_number'] += labeled_delta
+
+    useful = is_useful_annotation(annotation)
+    if useful != getattr(annotation, '_useful_before', False):
+        others = Annotation.objects.filter(Q_useful_annotations, task_id=annotation.task_id).exclude(id=annotation.id)
+        if not others.exists():
+            deltas['num_tasks_with_annotations'] += 1 if useful else -1
+    apply_counter_deltas(annotation.project_id, deltas)
+
+
+def after_annotation_delete(annotation: Annotation) -> None:
+    if counters_are_suspended():
+        return
+    deltas = annotation_counter_deltas([annotation], sign=-1)
+    if annotation.task_id not in _deleting_tasks() and is_useful_annotation(annotation):
+        remaining = Annotation.objects.filter(Q_useful_annotations, task_id=annotation.task_id)
+        # with deferred constraints the collector can delete the task and send its post_delete first,
+        # then the task is already subtracted by after_task_delete
+        if not remaining.exists() and Task.objects.filter(id=annotation.task_id).exists():
+            deltas['num_tasks_with_annotations'] -= 1
+    apply_counter_deltas(annotation.project_id, deltas)
+
+
+def on_task_labeled_changed(project_id: Optional[int], labeled_delta: int) -> None:
+    if not counters_are_suspended():
+        apply_counter_deltas(project_id, {'finished_task_number': labeled_delta})
+
+
+def on_prediction_changed(prediction: Prediction, delta: int) -> None:
+    if not counters_are_suspended():
+        apply_counter_deltas(prediction.project_id, {'total_predictions_number': delta})
@@ -0,0 +1,190 @@
+"""Materialized labeling queue for get_next_task.
+
+Unlabeled tasks of the project are stored in LabelingQueueItem rows ordered by rank: the task ID for
+sequential sampling and a random number for uniform sampling. A next task is claimed by reading a few
+queue heads with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent annotators don't wait for each other
+and don't get the same candidate, instead of sorting all not solved tasks on each request.
+
+The queue is a hint only: every candidate is verified against the task state, and get_next_task falls back
+to the regular query path when no candidate is found. Items are removed when tasks become labeled,
+returned when annotations are deleted, and tasks imported after the build are appended on the next claim.
+The queue is built and refreshed every LABELING_QUEUE_REBUILD_INTERVAL seconds by a background job
+to catch bulk state changes, get_next_task uses the regular query path until the first build is done.
+"""
+import logging
+import random
+from datetime import timedelta
+from typing import Union
+
+from core.redis import redis_connected, redis_set, start_job_async_or_sync
+from core.utils.db import SQCount
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.utils.timezone import now
+from projects.models import LabelingQueue, LabelingQueueItem, Project
+from tasks.models import Annotation, AnnotationDraft, Task, TaskLock
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+LABELING_QUEUE_SAMPLINGS = (Project.SEQUENCE, Project.UNIFORM)
+
+
+def labeling_queue_applicable(project: Project) -> bool:
+    """Queue order matches get_next_task only when the choice depends on the sampling order alone"""
+    if not settings.LABELING_QUEUE_ENABLED or project.sampling not in LABELING_QUEUE_SAMPLINGS:
+        return False
+    if project.show_overlap_first or project.show_ground_truth_first:
+        return False
+    lse_project = getattr(project, 'lse_project', None)
+    if lse_project and getattr(lse_project, 'agreement_threshold', None) is not None:
+        return False
+    return True
+
+
+def _task_rank(task_id: int, sampling: str) -> float:
+    return float(task_id) if sampling == Project.SEQUENCE else random.random()
+
+
+def _rank_sql(sampling: str) -> str:
+    """SQL version of _task_rank, random ranks are in [0, 1) on all databases like random.random()"""
+    if sampling == Project.SEQUENCE:
+        return 'id'
+    if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+        # sqlite random() is a signed 64-bit integer
+        return '(0.5 + random() / 18446744073709551616.0)'
+    return 'random()'
+
+
+def _insert_tasks(project: Project, sampling: str, condition: str, params: list) -> None:
+    """INSERT ... SELECT unlabeled tasks of the project matching the SQL condition into the queue"""
+    task_table, item_table = Task._meta.db_table, LabelingQueueItem._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {item_table} (project_id, task_id, rank) '
+            f'SELECT project_id, id, {_rank_sql(sampling)} FROM {task_table} '
+            f'WHERE project_id = %s AND is_labeled = %s AND {condition}',
+            [project.id, False, *params],
+        )
+        logger.debug(f'{cursor.rowcount} tasks added to the labeling queue of project={project.id}')
+
+
+def _append_tasks(project: Project, sampling: str, after_task_id: int) -> int:
+    """Add unlabeled tasks with ID > after_task_id to the queue, return the new last task ID"""
+    last_task_id = Task.objects.filter(project=project, id__gt=after_task_id).aggregate(Max('id'))['id__max']
+    if last_task_id is None:
+        return after_task_id
+    _insert_tasks(project, sampling, 'id > %s AND id <= %s', [after_task_id, last_task_id])
+    return last_task_id
+
+
+def _queue_is_expired(queue: LabelingQueue, project: Project) -> bool:
+    expired = now() - timedelta(seconds=settings.LABELING_QUEUE_REBUILD_INTERVAL)
+    return queue.sampling != project.sampling or queue.built_at is None or queue.built_at < expired
+
+
+def rebuild_labeling_queue(project_id: int) -> None:
+    """Build the queue or refresh it after bulk task state changes, runs in the background.
+    Items are rewritten only when the sampling changes, otherwise items of labeled tasks are deleted
+    and unlabeled tasks missing in the queue are added, so claims of other annotators are not blocked.
+    """
+    project = Project.objects.filter(id=project_id).first()
+    if project is None:
+        return
+    with transaction.atomic():
+        LabelingQueue.objects.get_or_create(project=project)
+        # another job is rebuilding the queue right now
+        queue = LabelingQueue.objects.select_for_update(skip_locked=True).filter(project=project).first()
+        if queue is None or not _queue_is_expired(queue, project):
+            return
+
+        logger.debug(f'Rebuild the labeling queue of project={project.id}')
+        if queue.sampling != project.sampling:
+            LabelingQueueItem.objects.filter(project=project).delete()
+            queue.sampling = project.sampling
+            queue.last_task_id = _append_tasks(project, project.sampling, 0)
+        else:
+            LabelingQueueItem.objects.filter(project=project, task__is_labeled=True).delete()
+            item_table, task_table = LabelingQueueItem._meta.db_table, Task._meta.db_table
+            _insert_tasks(
+                project,
+                queue.sampling,
+                f'id <= %s AND NOT EXISTS (SELECT 1 FROM {item_table} WHERE task_id = {task_table}.id)',
+                [queue.last_task_id],
+            )
+            queue.last_task_id = _append_tasks(project, queue.sampling, queue.last_task_id)
+        queue.built_at = now()
+        queue.save()
+
+
+def schedule_labeling_queue_rebuild(project_id: int) -> None:
+    """Start rebuild_labeling_queue after the current transaction, once per interval for all processes
+    when redis is connected. Without redis the job runs synchronously after the commit
+    and returns at once if the queue has been rebuilt by another request.
+    """
+    key = f'labeling-queue:rebuild:{project_id}'
+    if redis_connected() and not redis_set(key, 1, ttl=settings.LABELING_QUEUE_REBUILD_INTERVAL, nx=True):
+        return
+    transaction.on_commit(lambda: start_job_async_or_sync(rebuild_labeling_queue, project_id, queue_name='low'))
+
+
+def refresh_labeling_queue(project: Project) -> bool:
+    """Append tasks imported since the last refresh, return False if the queue is not built for the project yet"""
+    queue, _ = LabelingQueue.objects.get_or_create(project=project)
+    if _queue_is_expired(queue, project):
+        schedule_labeling_queue_rebuild(project.id)
+    if queue.sampling != project.sampling or queue.built_at is None:
+        return False
+
+    if Task.objects.filter(project=project, id__gt=queue.last_task_id).exists():
+        # another annotator is refreshing the queue right now, the current items are good enough
+        queue = LabelingQueue.objects.select_for_update(skip_locked=True).filter(pk=queue.pk).first()
+        if queue is not None:
+            queue.last_task_id = _append_tasks(project, queue.sampling, queue.last_task_id)
+            queue.save(update_fields=['last_task_id'])
+    return True
+
+
+def claim_from_labeling_queue(user: User, project: Project) -> Union[Task, None]:
+    """Return the first queued task that is not labeled, not solved or postponed by the user and not locked"""
+    if not refresh_labeling_queue(project):
+        return None
+
+    # a task with overlap > 1 can be taken by several annotators at once, filter_unlocked checks the exact number
+    # of takes in lock_first_unlocked, here locks only pre-filter tasks which have no free slots for sure
+    locks = TaskLock.objects.filter(task=OuterRef('task_id'), expire_at__gt=now()).exclude(user=user)
+    solved = Annotation.objects.filter(task=OuterRef('task_id'), completed_by=user)
+    postponed = AnnotationDraft.objects.filter(task=OuterRef('task_id'), user=user, was_postponed=True)
+    candidates = list(
+        LabelingQueueItem.objects.filter(project=project)
+        .annotate(_num_locks=SQCount(locks.values('id')))
+        .filter(_num_locks__lt=F('task__overlap'))
+        .filter(~Exists(solved), ~Exists(postponed))
+        .order_by('rank')
+        .select_for_update(skip_locked=True, of=('self',))
+        .values_list('task_id', flat=True)[: settings.LABELING_QUEUE_CLAIM_SIZE]
+    )
+
+    stale = set(Task.objects.filter(pk__in=candidates, is_labeled=True).values_list('id', flat=True))
+    if stale:
+        LabelingQueueItem.objects.filter(task_id__in=stale).delete()
+
+    task_ids = [task_id for task_id in candidates if task_id not in stale]
+    return Task.lock_first_unlocked(task_ids, user, project)
+
+
+def requeue_task(task_id: int) -> None:
+    """Return the task to the labeling queue of its project (if the queue is built) when it's not labeled anymore"""
+    queue = (
+        LabelingQueue.objects.filter(project__tasks__id=task_id, project__tasks__is_labeled=False)
+        .values('project_id', 'sampling', 'last_task_id')
+        .first()
+    )
+    # tasks after last_task_id will be appended on the next refresh
+    if queue is None or task_id > queue['last_task_id']:
+        return
+    item = LabelingQueueItem(
+        project_id=queue['project_id'], task_id=task_id, rank=_task_rank(task_id, queue['sampling'])
+    )
+    LabelingQueueItem.objects.bulk_create([item], ignore_conflicts=True)
@@ -6,10 +6,10 @@ from core.feature_flags import flag_set
 from core.utils.common import conditional_atomic, db_is_not_sqlite, load_func
 from django.conf import settings
 from django.db.models import BooleanField, Case, Count, Exists, F, Max, OuterRef, Q, QuerySet, Value, When
-from django.db.models.fields import DecimalField
+from projects.functions.labeling_queue import claim_from_labeling_queue, labeling_queue_applicable
 from projects.functions.stream_history import add_stream_history
 from projects.models import Project
-from tasks.models import Annotation, Task
+from tasks.models import Annotation, Prediction, Task
 from users.models import User
 
 logger = logging.getLogger(__name__)
@@ -24,28 +24,51 @@ def get_next_task_logging_level(user: User) -> int:
     return level
 
 
-def _get_random_unlocked(task_query: QuerySet[Task], user: User, upper_limit=None) -> Union[Task, None]:
-    for task in task_query.order_by('?').only('id')[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE]:
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task.id)
-            if not task.has_lock(user):
-                return task
-        except Task.DoesNotExist:
-            logger.debug('Task with id {} locked'.format(task.id))
+def _lock_check_is_set_based(project: Project) -> bool:
+    # agreement threshold changes the allowed overlap of each task, it's checked task by task in has_lock
+    lse_project = getattr(project, 'lse_project', None)
+    return not (lse_project and lse_project.agreement_threshold is not None)
 
 
-def _get_first_unlocked(tasks_query: QuerySet[Task], user) -> Union[Task, None]:
-    # Skip tasks that are locked due to being taken by collaborators
-    for task_id in tasks_query.values_list('id', flat=True):
+def _get_first_unlocked_by_has_lock(task_ids, user: User) -> Union[Task, None]:
+    for task_id in task_ids:
         try:
             task = Task.objects.select_for_update(skip_locked=True).get(pk=task_id)
             if not task.has_lock(user):
                 return task
-
         except Task.DoesNotExist:
             logger.debug('Task with id {} locked'.format(task_id))
 
 
+def _lock_first(task_ids: List[int], user: User, project: Project) -> Union[Task, None]:
+    if not _lock_check_is_set_based(project):
+        return _get_first_unlocked_by_has_lock(task_ids, user)
+    return Task.lock_first_unlocked(task_ids, user, project)
+
+
+def _get_random_unlocked(task_query: QuerySet[Task], user: User, project: Project) -> Union[Task, None]:
+    # sample first, so lock subqueries are evaluated for the sampled tasks only instead of the whole query
+    task_ids = list(task_query.order_by('?').values_list('id', flat=True)[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE])
+    return _lock_first(task_ids, user, project)
+
+
+def _get_first_unlocked(tasks_query: QuerySet[Task], user: User, project: Project) -> Union[Task, None]:
+    # Skip tasks that are locked due to being taken by collaborators
+    if not _lock_check_is_set_based(project):
+        return _get_first_unlocked_by_has_lock(tasks_query.values_list('id', flat=True), user)
+
+    task_ids = Task.filter_unlocked(tasks_query, user, project).values_list('id', flat=True)
+    batch_size = settings.NEXT_TASK_UNLOCKED_BATCH_SIZE
+    offset = 0
+    while True:
+        batch = list(task_ids[offset : offset + batch_size])
+        # tasks of the batch can be taken by concurrent requests which are not committed yet
+        next_task = Task.lock_first_unlocked(batch, user, project)
+        if next_task or len(batch) < batch_size:
+            return next_task
+        offset += batch_size
+
+
 def _try_ground_truth(tasks: QuerySet[Task], project: Project, user: User) -> Union[Task, None]:
     """Returns task from ground truth set"""
     ground_truth = Annotation.objects.filter(task=OuterRef('pk'), ground_truth=True)
@@ -54,8 +77,8 @@ def _try_ground_truth(tasks: QuerySet[Task], project: Project, user: User) -> Un
     )
     if not_solved_tasks_with_ground_truths.exists():
         if project.sampling == project.SEQUENCE:
-            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user)
-        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user)
+            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user, project)
+        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user, project)
 
 
 def _try_tasks_with_overlap(tasks: QuerySet[Task]) -> Tuple[Union[Task, None], QuerySet[Task]]:
@@ -67,7 +90,7 @@ def _try_tasks_with_overlap(tasks: QuerySet[Task]) -> Tuple[Union[Task, None], Q
         return None, tasks.filter(overlap=1)
 
 
-def _try_breadth_first(tasks: QuerySet[Task], user: User) -> Union[Task, None]:
+def _try_breadth_first(tasks: QuerySet[Task], user: User, project: Project) -> Union[Task, None]:
     """Try to find tasks with maximum amount of annotations, since we are trying to label tasks as fast as possible"""
 
     tasks = tasks.annotate(annotations_count=Count('annotations', filter=~Q(annotations__completed_by=user)))
@@ -89,7 +112,7 @@ def _try_breadth_first(tasks: QuerySet[Task], user: User) -> Union[Task, None]:
     )
     if not_solved_tasks_labeling_with_max_annotations.exists():
         # try to complete tasks that are already in progress
-        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user)
+        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user, project)
 
 
 def _try_uncertainty_sampling(
@@ -97,48 +120,50 @@ def _try_uncertainty_sampling(
     project: Project,
     user_solved_tasks_array: List[int],
     user: User,
-    prepared_tasks: QuerySet[Task],
 ) -> Union[Task, None]:
-    task_with_current_predictions = tasks.filter(predictions__model_version=project.model_version)
-    if task_with_current_predictions.exists():
-        logger.debug('Use uncertainty sampling')
-        # collect all clusters already solved by user, count number of solved task in them
-        user_solved_clusters = (
-            prepared_tasks.filter(pk__in=user_solved_tasks_array)
-            .annotate(cluster=Max('predictions__cluster'))
-            .values_list('cluster', flat=True)
-        )
-        user_solved_clusters = Counter(user_solved_clusters)
-        # order each task by the count of how many tasks solved in it's cluster
-        cluster_num_solved_map = [When(predictions__cluster=k, then=v) for k, v in user_solved_clusters.items()]
-
-        # WARNING! this call doesn't work after consequent annotate
-        num_tasks_with_current_predictions = task_with_current_predictions.count()
-        if cluster_num_solved_map:
-            task_with_current_predictions = task_with_current_predictions.annotate(
-                cluster_num_solved=Case(*cluster_num_solved_map, default=0, output_field=DecimalField())
-            )
-            # next task is chosen from least solved cluster and with lowest prediction score
-            possible_next_tasks = task_with_current_predictions.order_by('cluster_num_solved', 'predictions__score')
-        else:
-            possible_next_tasks = task_with_current_predictions.order_by('predictions__score')
-
-        num_annotators = project.annotators().count()
-        if num_annotators > 1 and num_tasks_with_current_predictions > 0:
-            # try to randomize tasks to avoid concurrent labeling between several annotators
-            next_task = _get_random_unlocked(
-                possible_next_tasks, user, upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions)
-            )
-        else:
-            next_task = _get_first_unlocked(possible_next_tasks, user)
-    else:
+    # predictions of the current model version are read in the order of the active learning index
+    # (project_id, model_version, uncertainty), the most uncertain ones first
+    predictions = (
+        Prediction.objects.filter(project=project, model_version=project.model_version, task_id__in=tasks.values('id'))
+        .order_by(F('uncertainty').desc(nulls_last=True), 'id')
+        .values_list('task_id', 'cluster')
+    )
+    window = settings.ACTIVE_LEARNING_CANDIDATES
+    candidates = list(predictions[:window])
+    if not candidates:
         # uncertainty sampling fallback: choose by random sampling
         logger.debug(
             f'Uncertainty sampling fallbacks to random sampling '
             f'(current project.model_version={str(project.model_version)})'
         )
-        next_task = _get_random_unlocked(tasks, user)
-    return next_task
+        return _get_random_unlocked(tasks, user, project)
+
+    logger.debug('Use uncertainty sampling')
+    user_solved_clusters = None
+    if settings.ACTIVE_LEARNING_CLUSTER_DIVERSITY and any(cluster is not None for _, cluster in candidates):
+        # collect all clusters already solved by user, count number of solved task in them
+        user_solved_clusters = Counter(
+            Prediction.objects.filter(
+                project=project, model_version=project.model_version, task_id__in=user_solved_tasks_array
+            )
+            .values('task_id')
+            .annotate(task_cluster=Max('cluster'))
+            .values_list('task_cluster', flat=True)
+        )
+
+    # concurrent annotators don't take the same task because of skip locked, so no randomization is needed
+    offset = 0
+    while candidates:
+        task_ids = list(dict.fromkeys(task_id for task_id, _ in candidates))
+        if user_solved_clusters:
+            # next task is chosen from the least solved cluster among the most uncertain candidates
+            clusters = dict(reversed(candidates))
+            task_ids.sort(key=lambda task_id: user_solved_clusters[clusters[task_id]])
+        next_task = _lock_first(task_ids, user, project)
+        if next_task or len(candidates) < window:
+            return next_task
+        offset += window
+        candidates = list(predictions[offset : offset + window])
 
 
 def get_not_solved_tasks_qs(
@@ -236,7 +261,7 @@ def get_next_task_without_dm_queue(
 
     if not next_task and prioritized_low_agreement:
         logger.debug(f'User={user} tries low agreement from prepared tasks')
-        next_task = _get_first_unlocked(not_solved_tasks, user)
+        next_task = _get_first_unlocked(not_solved_tasks, user, project)
         queue_info += (' & ' if queue_info else '') + 'Low agreement queue'
 
     if not next_task and project.show_ground_truth_first:
@@ -247,7 +272,7 @@ def get_next_task_without_dm_queue(
     if not next_task and project.maximum_annotations > 1:
         # if there are any tasks in progress (with maximum number of annotations), randomly sampling from them
         logger.debug(f'User={user} tries depth first from prepared tasks')
-        next_task = _try_breadth_first(not_solved_tasks, user)
+        next_task = _try_breadth_first(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Breadth first queue'
 
@@ -261,7 +286,7 @@ def skipped_queue(next_task, prepared_tasks, project, user, queue_info):
         if skipped_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(skipped_tasks)])
             skipped_tasks = prepared_tasks.filter(pk__in=skipped_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(skipped_tasks, user)
+            next_task = _get_first_unlocked(skipped_tasks, user, project)
             queue_info = 'Skipped queue'
 
     return next_task, queue_info
@@ -274,7 +299,7 @@ def postponed_queue(next_task, prepared_tasks, project, user, queue_info):
         if postponed_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(postponed_tasks)])
             postponed_tasks = prepared_tasks.filter(pk__in=postponed_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(postponed_tasks, user)
+            next_task = _get_first_unlocked(postponed_tasks, user, project)
             if next_task is not None:
                 next_task.allow_postpone = False
             queue_info = 'Postponed draft queue'
@@ -293,19 +318,19 @@ def get_task_from_qs_with_sampling(
     next_task = None
     if project.sampling == project.SEQUENCE:
         logger.debug(f'User={user} tries sequence sampling from prepared tasks')
-        next_task = _get_first_unlocked(not_solved_tasks, user)
+        next_task = _get_first_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Sequence queue'
 
     elif project.sampling == project.UNCERTAINTY:
         logger.debug(f'User={user} tries uncertainty sampling from prepared tasks')
-        next_task = _try_uncertainty_sampling(not_solved_tasks, project, user_solved_tasks_array, user, prepared_tasks)
+        next_task = _try_uncertainty_sampling(not_solved_tasks, project, user_solved_tasks_array, user)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Active learning or random queue'
 
     elif project.sampling == project.UNIFORM:
         logger.debug(f'User={user} tries random sampling from prepared tasks')
-        next_task = _get_random_unlocked(not_solved_tasks, user)
+        next_task = _get_random_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Uniform random queue'
 
@@ -318,7 +343,12 @@ def get_next_task(
     project: Project,
     dm_queue: Union[bool, None],
     assigned_flag: Union[bool, None] = None,
+    use_labeling_queue: bool = False,
 ) -> Tuple[Union[Task, None], str]:
+    """
+    :param use_labeling_queue: prepared_tasks are all project tasks in the default order,
+                               so the next task can be claimed from the materialized labeling queue
+    """
     logger.debug(f'get_next_task called. user: {user}, project: {project}, dm_queue: {dm_queue}')
 
     with conditional_atomic(predicate=db_is_not_sqlite):
@@ -353,9 +383,22 @@ def get_next_task(
                 next_task = not_solved_tasks.first()
 
             else:
-                next_task, queue_info = get_task_from_qs_with_sampling(
-                    not_solved_tasks, user_solved_tasks_array, prepared_tasks, user, project, queue_info
-                )
+                if (
+                    use_labeling_queue
+                    and not assigned_flag
+                    and not prioritized_low_agreement
+                    and labeling_queue_applicable(project)
+                ):
+                    logger.debug(f'User={user} tries labeling queue')
+                    next_task = claim_from_labeling_queue(user, project)
+                    if next_task:
+                        queue_info += (' & ' if queue_info else '') + 'Labeling queue'
+
+                # the queue can be stale or exhausted, query tasks directly then
+                if not next_task:
+                    next_task, queue_info = get_task_from_qs_with_sampling(
+                        not_solved_tasks, user_solved_tasks_array, prepared_tasks, user, project, queue_info
+                    )
 
         next_task, queue_info = postponed_queue(next_task, prepared_tasks, project, user, queue_info)
 
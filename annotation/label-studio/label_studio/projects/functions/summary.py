@@ -0,0 +1,39 @@
+"""ProjectSummary aggregation.
+
+Annotation, draft and task changes don't rewrite the summary JSON fields, they append ProjectSummaryDelta rows
+(one row per bulk import or delete), so concurrent annotators don't wait for the summary row lock.
+Deltas are folded into the summary by fold_project_summary() at most PROJECT_SUMMARY_FOLD_INTERVAL seconds
+after the first pending change and by the summary readers (summary API, data manager columns,
+label config validation) via ProjectSummary.fold_deltas(). Without redis only bulk changes (imports, bulk deletes)
+are folded right after commit, single object changes are left to the readers.
+"""
+import logging
+
+from core.redis import redis_connected, redis_set, start_job_async_or_sync
+from django.conf import settings
+from projects.models import ProjectSummary
+
+logger = logging.getLogger(__name__)
+
+
+def fold_project_summary(project_id: int) -> None:
+    summary = ProjectSummary.objects.filter(project_id=project_id).first()
+    if summary is not None:
+        summary.fold_deltas()
+        logger.debug(f'Summary deltas of project {project_id} folded')
+
+
+def schedule_project_summary_fold(project_id: int, bulk: bool = True) -> None:
+    """One delayed fold per project and interval with redis. Without it a bulk change is folded immediately,
+    and a single object change isn't, so every annotation save doesn't lock and rewrite the summary row.
+    """
+    interval = settings.PROJECT_SUMMARY_FOLD_INTERVAL
+    if interval <= 0:
+        fold_project_summary(project_id)
+        return
+    if not redis_connected():
+        if bulk:
+            fold_project_summary(project_id)
+        return
+    if redis_set(f'project-summary-fold:{project_id}', 1, ttl=interval, nx=True):
+        start_job_async_or_sync(fold_project_summary, project_id, in_seconds=interval, queue_name='low')
@@ -95,16 +95,12 @@ def recalculate_created_annotations_and_labels_from_scratch(
     """
     logger.info(f'Reset cache started for project {project.id} and organization {organization_id}')
     logger.info(f'recalculate_created_annotations_and_labels_from_scratch project_id={project.id}')
-    summary.all_data_columns = {}
-    summary.common_data_columns = []
+    summary.reset()
     summary.update_data_columns(project.tasks.only('data'))
-
-    summary.created_labels, summary.created_annotations = {}, {}
     summary.update_created_annotations_and_labels(project.annotations.all())
-
-    summary.created_labels_drafts = {}
     drafts = AnnotationDraft.objects.filter(task__project=project)
     summary.update_created_labels_drafts(drafts)
+    summary.fold_deltas()
 
     logger.info(
         f'Reset cache finished for project {project.id} and organization {organization_id}:\n'
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recount project counters (task_number, finished_task_number, etc) and repair drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            dest='organization_id',
+            type=int,
+            default=None,
+            help='Reconcile projects of this organization only',
+        )
+        parser.add_argument(
+            '--redis',
+            dest='redis',
+            action='store_true',
+            default=False,
+            help='Use rq workers with redis (async background processing)',
+        )
+
+    def handle(self, *args, **options):
+        from core.redis import start_job_async_or_sync
+        from projects.functions.counters import reconcile_project_counters
+
+        start_job_async_or_sync(
+            reconcile_project_counters,
+            options['organization_id'],
+            redis=options['redis'],
+            queue_name='low',
+            job_timeout=3600 * 24,
+        )
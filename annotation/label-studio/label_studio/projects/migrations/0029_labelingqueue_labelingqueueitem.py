@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0056_updated_at_idx_async'),
+        ('projects', '0028_auto_20241107_1031'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelingQueue',
+            fields=[
+                ('project', models.OneToOneField(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='labeling_queue', serialize=False, to='projects.project')),
+                ('sampling', models.CharField(help_text='Project sampling the queue was built for', max_length=100, null=True)),
+                ('last_task_id', models.IntegerField(default=0, help_text='The last task ID added to the queue')),
+                ('built_at', models.DateTimeField(help_text='Full rebuild time', null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LabelingQueueItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.FloatField(help_text='Position in the queue, candidates are claimed in ascending order')),
+                ('project', models.ForeignKey(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, related_name='labeling_queue_items', to='projects.project')),
+                ('task', models.OneToOneField(help_text='Candidate task', on_delete=django.db.models.deletion.CASCADE, related_name='labeling_queue_item', to='tasks.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'rank'], name='projects_la_project_dd345e_idx')],
+            },
+        ),
+    ]
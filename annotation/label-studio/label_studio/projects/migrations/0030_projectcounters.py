@@ -0,0 +1,29 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0029_labelingqueue_labelingqueueitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCounters',
+            fields=[
+                ('project', models.OneToOneField(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='projects.project')),
+                ('task_number', models.IntegerField(default=0, help_text='Total task number in project')),
+                ('finished_task_number', models.IntegerField(default=0, help_text='Finished tasks')),
+                ('total_predictions_number', models.IntegerField(default=0, help_text='Total predictions number in project')),
+                ('total_annotations_number', models.IntegerField(default=0, help_text='Total annotations number in project including skipped_annotations_number')),
+                ('num_tasks_with_annotations', models.IntegerField(default=0, help_text='Tasks with annotations count')),
+                ('useful_annotation_number', models.IntegerField(default=0, help_text='Useful annotation number in project not including skipped_annotations_number')),
+                ('ground_truth_number', models.IntegerField(default=0, help_text='Honeypot annotation number in project')),
+                ('skipped_annotations_number', models.IntegerField(default=0, help_text='Skipped by collaborators annotation number')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projectcounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummaryDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sign', models.SmallIntegerField(default=1, help_text='1 for added counters, -1 for removed ones')),
+                ('all_data_columns', models.JSONField(default=dict)),
+                ('common_data_columns', models.JSONField(default=None, null=True)),
+                ('created_annotations', models.JSONField(default=dict)),
+                ('created_labels', models.JSONField(default=dict)),
+                ('created_labels_drafts', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summary_deltas', to='projects.project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0031_projectsummarydelta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectimport',
+            name='skip_duplicates',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='projectimport',
+            name='duplicate_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -30,12 +30,15 @@ from django.conf import settings
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 from django.db import connection, models, transaction
 from django.db.models import Avg, BooleanField, Case, Count, JSONField, Max, Q, Sum, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from label_studio_sdk._extensions.label_studio_tools.core.label_config import parse_config
 from labels_manager.models import Label
 from projects.functions import (
     annotate_finished_task_number,
+    annotate_from_counters,
     annotate_ground_truth_number,
     annotate_num_tasks_with_annotations,
     annotate_skipped_annotations_number,
@@ -89,7 +92,10 @@ class ProjectManager(models.Manager):
         return self.with_counts_annotate(self, fields=fields)
 
     @staticmethod
-    def with_counts_annotate(queryset, fields=None, exclude=None):
+    def with_counts_annotate(queryset, fields=None, exclude=None, aggregate=False):
+        """Annotate counters from ProjectCounters, or with aggregate queries over tasks and annotations
+        when aggregate=True or PROJECT_COUNTERS_ENABLED is off
+        """
         available_fields = ProjectManager.ANNOTATED_FIELDS
         if fields is None:
             to_annotate = available_fields
@@ -99,8 +105,16 @@ class ProjectManager(models.Manager):
         if exclude:
             to_annotate = {field: func for field, func in to_annotate.items() if field not in exclude}
 
-        for _, annotate_func in to_annotate.items():  # noqa: F402
-            queryset = annotate_func(queryset)
+        use_counters = settings.PROJECT_COUNTERS_ENABLED and not aggregate
+        if use_counters:
+            from projects.functions.counters import schedule_project_counters_reconcile
+
+            schedule_project_counters_reconcile()
+        for field, annotate_func in to_annotate.items():  # noqa: F402
+            if use_counters:
+                queryset = annotate_from_counters(queryset, field, annotate_func)
+            else:
+                queryset = annotate_func(queryset)
 
         return queryset
 
@@ -436,6 +450,7 @@ class Project(ProjectMixin, models.Model):
                 tasks_with_overlap = self.tasks.all()
             # update is_labeled after change
             bulk_update_stats_project_tasks(tasks_with_overlap, project=self)
+            self.recount_task_state_counters()
 
         # if cohort slider is tweaked
         elif overlap_cohort_percentage_changed:
@@ -443,6 +458,7 @@ class Project(ProjectMixin, models.Model):
                 if maximum_annotations_changed:
                     self.tasks.update(overlap=1)
                     bulk_update_stats_project_tasks(self.tasks.all(), project=self)
+                    self.recount_task_state_counters()
                 else:
                     logger.info(
                         f'Project {str(self)}: cohort percentage was changed but maximum annotations was not and is 1; taking no action'
@@ -501,6 +517,13 @@ class Project(ProjectMixin, models.Model):
             self._batch_update_with_retry(all_project_tasks.filter(id__in=ids), overlap=1)
         # update is labeled after tasks rearrange overlap
         bulk_update_stats_project_tasks(all_project_tasks, project=self)
+        self.recount_task_state_counters()
+
+    def recount_task_state_counters(self):
+        """Recount project counters depending on is_labeled after bulk updates of tasks"""
+        from projects.functions.counters import recount_task_state_counters
+
+        recount_task_state_counters(self.id)
 
     def remove_tasks_by_file_uploads(self, file_upload_ids):
         self.tasks.filter(file_upload_id__in=file_upload_ids).delete()
@@ -547,6 +570,8 @@ class Project(ProjectMixin, models.Model):
         with transaction.atomic():
             # Lock summary for update to avoid race conditions
             summary = ProjectSummary.objects.select_for_update().get(project=self)
+            # apply pending summary deltas before checking the config against the summary
+            self.summary.fold_deltas()
 
             if self.num_tasks == 0:
                 logger.debug(f'Project {self} has no tasks: nothing to validate here. Ensure project summary is empty')
@@ -698,6 +723,8 @@ class Project(ProjectMixin, models.Model):
         :return: Dictionary with count of deleted predictions
         :rtype: dict
         """
+        from projects.functions.counters import apply_counter_deltas, counters_suspended
+
         params = {'project': self}
 
         if model_version:
@@ -712,9 +739,11 @@ class Project(ProjectMixin, models.Model):
                 self.model_version = None
                 self.save(update_fields=['model_version'])
 
-            _, deleted_map = predictions.delete()
+            with counters_suspended():
+                _, deleted_map = predictions.delete()
 
-        count = deleted_map.get('tasks.Prediction', 0)
+            count = deleted_map.get('tasks.Prediction', 0)
+            apply_counter_deltas(self.id, {'total_predictions_number': -count})
         return {'deleted_predictions': count}
 
     def get_updated_weights(self):
@@ -800,6 +829,7 @@ class Project(ProjectMixin, models.Model):
             bulk_update_stats_project_tasks(
                 self.tasks.filter(Q(annotations__isnull=False) & Q(annotations__ground_truth=False))
             )
+            self.recount_task_state_counters()
 
         if hasattr(self, 'summary'):
             with transaction.atomic():
@@ -1076,6 +1106,7 @@ class Project(ProjectMixin, models.Model):
                 num_tasks_updated += update_tasks_counters(queryset, from_scratch)
                 bulk_update_stats_project_tasks(queryset, self)
             page_idx += 1
+        self.recount_task_state_counters()
         return num_tasks_updated
 
     def _update_tasks_counters_and_task_states(
@@ -1220,6 +1251,40 @@ class ProjectMember(models.Model):
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
 
+SUMMARY_FIELDS = [
+    'all_data_columns',
+    'common_data_columns',
+    'created_annotations',
+    'created_labels',
+    'created_labels_drafts',
+]
+
+
+def _add_counters(counters: dict, delta: dict, sign: int) -> list:
+    """Add delta counters to counters in place, removed counters reaching zero are popped and returned"""
+    removed = []
+    for key, count in delta.items():
+        if sign > 0:
+            counters[key] = counters.get(key, 0) + count
+        elif key in counters:
+            counters[key] -= count
+            if counters[key] <= 0:
+                counters.pop(key)
+                removed.append(key)
+    return removed
+
+
+def _add_label_counters(labels: dict, delta: dict, sign: int) -> None:
+    """{from_name: {label: count}} version of _add_counters, from_names without labels are popped on removal"""
+    for from_name, label_counts in delta.items():
+        if sign > 0:
+            _add_counters(labels.setdefault(from_name, {}), label_counts, sign)
+        elif from_name in labels:
+            _add_counters(labels[from_name], label_counts, sign)
+            if not labels[from_name]:
+                labels.pop(from_name)
+
+
 class ProjectSummary(models.Model):
 
     project = AutoOneToOneField(Project, primary_key=True, on_delete=models.CASCADE, related_name='summary')
@@ -1251,18 +1316,80 @@ class ProjectSummary(models.Model):
         return self.project.has_permission(user)
 
     def reset(self, tasks_data_based=True):
+        fields = ['created_annotations', 'created_labels', 'created_labels_drafts']
         if tasks_data_based:
-            self.all_data_columns = {}
-            self.common_data_columns = []
-        self.created_annotations = {}
-        self.created_labels = {}
-        self.created_labels_drafts = {}
-        self.save()
+            fields += ['all_data_columns', 'common_data_columns']
+        self._reset_fields(fields)
+
+    def _reset_fields(self, fields):
+        """Fold pending deltas and empty the fields, so the deltas added before can't be applied to the empty ones"""
+        with transaction.atomic():
+            self.fold_deltas(force=True)
+            for field in fields:
+                setattr(self, field, [] if field == 'common_data_columns' else {})
+            self.save(update_fields=fields)
+
+    def _add_delta(self, sign, num_objects, **fields):
+        """Append the delta row instead of rewriting the summary, it's applied by fold_deltas()"""
+        # empty counters change nothing, but empty common_data_columns of added tasks empty the common columns
+        fields = {field: value for field, value in fields.items() if value is not None and value != {}}
+        if not fields:
+            return
+        ProjectSummaryDelta.objects.create(project_id=self.project_id, sign=sign, **fields)
+
+        from projects.functions.summary import schedule_project_summary_fold
+
+        project_id, bulk = self.project_id, num_objects > 1
+        transaction.on_commit(lambda: schedule_project_summary_fold(project_id, bulk=bulk))
+
+    def fold_deltas(self, force=False):
+        """Apply pending deltas to the summary and delete them, returns self with up to date fields.
+        Without force the summary row is locked only when there are pending deltas.
+        """
+        deltas = ProjectSummaryDelta.objects.filter(project_id=self.project_id)
+        if not force and not deltas.exists():
+            return self
+
+        with transaction.atomic():
+            summary = ProjectSummary.objects.select_for_update().get(pk=self.pk)
+            for field in SUMMARY_FIELDS:
+                setattr(summary, field, getattr(summary, field) or ([] if field == 'common_data_columns' else {}))
+            deltas = list(deltas.order_by('id')[: settings.PROJECT_SUMMARY_FOLD_BATCH_SIZE])
+            while deltas:
+                for delta in deltas:
+                    summary._apply_delta(delta)
+                ProjectSummaryDelta.objects.filter(id__in=[delta.id for delta in deltas]).delete()
+                deltas = list(
+                    ProjectSummaryDelta.objects.filter(project_id=self.project_id, id__gt=deltas[-1].id).order_by(
+                        'id'
+                    )[: settings.PROJECT_SUMMARY_FOLD_BATCH_SIZE]
+                )
+            summary.save(update_fields=SUMMARY_FIELDS)
+
+        for field in SUMMARY_FIELDS:
+            setattr(self, field, getattr(summary, field))
+        return self
+
+    def _apply_delta(self, delta):
+        removed = _add_counters(self.all_data_columns, delta.all_data_columns, delta.sign)
+        if delta.common_data_columns is not None:
+            if not self.common_data_columns:
+                self.common_data_columns = sorted(delta.common_data_columns)
+            else:
+                self.common_data_columns = sorted(set(self.common_data_columns) & set(delta.common_data_columns))
+        if removed:
+            self.common_data_columns = [column for column in self.common_data_columns if column not in removed]
+
+        _add_counters(self.created_annotations, delta.created_annotations, delta.sign)
+        _add_label_counters(self.created_labels, delta.created_labels, delta.sign)
+        _add_label_counters(self.created_labels_drafts, delta.created_labels_drafts, delta.sign)
 
     def update_data_columns(self, tasks):
         common_data_columns = set()
-        all_data_columns = dict(self.all_data_columns)
+        all_data_columns = {}
+        num_tasks = 0
         for task in tasks:
+            num_tasks += 1
             try:
                 task_data = get_attr_or_item(task, 'data')
             except KeyError:
@@ -1275,39 +1402,20 @@ class ProjectSummary(models.Model):
             else:
                 common_data_columns &= set(task_data_keys)
 
-        self.all_data_columns = all_data_columns
-        if not self.common_data_columns:
-            self.common_data_columns = list(sorted(common_data_columns))
-        else:
-            self.common_data_columns = list(sorted(set(self.common_data_columns) & common_data_columns))
-        self.save(update_fields=['all_data_columns', 'common_data_columns'])
+        if num_tasks:
+            self._add_delta(
+                1, num_tasks, all_data_columns=all_data_columns, common_data_columns=list(sorted(common_data_columns))
+            )
 
     def remove_data_columns(self, tasks):
-        all_data_columns = dict(self.all_data_columns)
-        keys_to_remove = []
-
+        all_data_columns = {}
+        num_tasks = 0
         for task in tasks:
+            num_tasks += 1
             task_data = get_attr_or_item(task, 'data')
             for key in task_data.keys():
-                if key in all_data_columns:
-                    all_data_columns[key] -= 1
-                    if all_data_columns[key] == 0:
-                        keys_to_remove.append(key)
-                        all_data_columns.pop(key)
-        self.all_data_columns = all_data_columns
-
-        if keys_to_remove:
-            common_data_columns = list(self.common_data_columns)
-            for key in keys_to_remove:
-                if key in common_data_columns:
-                    common_data_columns.remove(key)
-            self.common_data_columns = common_data_columns
-        self.save(
-            update_fields=[
-                'all_data_columns',
-                'common_data_columns',
-            ]
-        )
+                all_data_columns[key] = all_data_columns.get(key, 0) + 1
+        self._add_delta(-1, num_tasks, all_data_columns=all_data_columns)
 
     def _get_annotation_key(self, result):
         result_type = result.get('type', None)
@@ -1343,9 +1451,11 @@ class ProjectSummary(models.Model):
         return labels
 
     def update_created_annotations_and_labels(self, annotations):
-        created_annotations = dict(self.created_annotations)
-        labels = dict(self.created_labels)
+        created_annotations = {}
+        labels = {}
+        num_annotations = 0
         for annotation in annotations:
+            num_annotations += 1
             results = get_attr_or_item(annotation, 'result') or []
             if not isinstance(results, list):
                 continue
@@ -1359,61 +1469,49 @@ class ProjectSummary(models.Model):
                 from_name = result['from_name']
 
                 # aggregate labels
-                if from_name not in self.created_labels:
-                    labels[from_name] = dict()
-
+                from_name_labels = labels.setdefault(from_name, {})
                 for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+                    from_name_labels[label] = from_name_labels.get(label, 0) + 1
 
-        logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {labels}')
-        self.created_annotations = created_annotations
-        self.created_labels = labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+        logger.debug(f'summary.created_annotations delta = {created_annotations}')
+        logger.debug(f'summary.created_labels delta = {labels}')
+        self._add_delta(1, num_annotations, created_annotations=created_annotations, created_labels=labels)
 
     def remove_created_annotations_and_labels(self, annotations):
         # we are going to remove all annotations, so we'll reset the corresponding fields on the summary
-        remove_all_annotations = self.project.annotations.count() == len(annotations)
-        created_annotations, created_labels = (
-            ({}, {}) if remove_all_annotations else (dict(self.created_annotations), dict(self.created_labels))
-        )
+        if self.project.annotations.count() == len(annotations):
+            self._reset_fields(['created_annotations', 'created_labels'])
+            return
+
+        created_annotations, created_labels = {}, {}
+        for annotation in annotations:
+            results = get_attr_or_item(annotation, 'result') or []
+            if not isinstance(results, list):
+                continue
+
+            for result in results:
+                # reduce annotation counters
+                key = self._get_annotation_key(result)
+                if key:
+                    created_annotations[key] = created_annotations.get(key, 0) + 1
 
-        if not remove_all_annotations:
-            for annotation in annotations:
-                results = get_attr_or_item(annotation, 'result') or []
-                if not isinstance(results, list):
+                # reduce labels counters
+                from_name = result.get('from_name', None)
+                if from_name is None:
                     continue
+                from_name_labels = created_labels.setdefault(from_name, {})
+                for label in self._get_labels(result):
+                    from_name_labels[label] = from_name_labels.get(label, 0) + 1
 
-                for result in results:
-                    # reduce annotation counters
-                    key = self._get_annotation_key(result)
-                    if key in created_annotations:
-                        created_annotations[key] -= 1
-                        if created_annotations[key] == 0:
-                            created_annotations.pop(key)
-
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in created_labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in created_labels[from_name]:
-                            created_labels[from_name][label] -= 1
-                            if created_labels[from_name][label] == 0:
-                                created_labels[from_name].pop(label)
-                    if not created_labels[from_name]:
-                        created_labels.pop(from_name)
-
-        logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {created_labels}')
-        self.created_annotations = created_annotations
-        self.created_labels = created_labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+        logger.debug(f'summary.created_annotations delta = -{created_annotations}')
+        logger.debug(f'summary.created_labels delta = -{created_labels}')
+        self._add_delta(-1, len(annotations), created_annotations=created_annotations, created_labels=created_labels)
 
     def update_created_labels_drafts(self, drafts):
-        labels = dict(self.created_labels_drafts)
+        labels = {}
+        num_drafts = 0
         for draft in drafts:
+            num_drafts += 1
             results = get_attr_or_item(draft, 'result') or []
             if not isinstance(results, list):
                 continue
@@ -1421,46 +1519,56 @@ class ProjectSummary(models.Model):
             for result in results:
                 if 'from_name' not in result:
                     continue
-                from_name = result['from_name']
 
                 # aggregate labels
-                if from_name not in self.created_labels_drafts:
-                    labels[from_name] = dict()
-
+                from_name_labels = labels.setdefault(result['from_name'], {})
                 for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+                    from_name_labels[label] = from_name_labels.get(label, 0) + 1
 
-        logger.debug(f'update summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+        logger.debug(f'update summary.created_labels_drafts delta = {labels}')
+        self._add_delta(1, num_drafts, created_labels_drafts=labels)
 
     def remove_created_drafts_and_labels(self, drafts):
         # we are going to remove all drafts, so we'll reset the corresponding field on the summary
-        remove_all_drafts = AnnotationDraft.objects.filter(task__project=self.project).count() == len(drafts)
-        labels = {} if remove_all_drafts else dict(self.created_labels_drafts)
+        if AnnotationDraft.objects.filter(task__project=self.project).count() == len(drafts):
+            self._reset_fields(['created_labels_drafts'])
+            return
 
-        if not remove_all_drafts:
-            for draft in drafts:
-                results = get_attr_or_item(draft, 'result') or []
-                if not isinstance(results, list):
-                    continue
+        labels = {}
+        for draft in drafts:
+            results = get_attr_or_item(draft, 'result') or []
+            if not isinstance(results, list):
+                continue
 
-                for result in results:
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in labels[from_name]:
-                            labels[from_name][label] -= 1
-                            if labels[from_name][label] == 0:
-                                labels[from_name].pop(label)
-                    if not labels[from_name]:
-                        labels.pop(from_name)
-        logger.debug(f'summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+            for result in results:
+                # reduce labels counters
+                from_name = result.get('from_name', None)
+                if from_name is None:
+                    continue
+                from_name_labels = labels.setdefault(from_name, {})
+                for label in self._get_labels(result):
+                    from_name_labels[label] = from_name_labels.get(label, 0) + 1
+        logger.debug(f'summary.created_labels_drafts delta = -{labels}')
+        self._add_delta(-1, len(drafts), created_labels_drafts=labels)
+
+
+class ProjectSummaryDelta(models.Model):
+    """Append-only change of ProjectSummary counters, folded into the summary by ProjectSummary.fold_deltas().
+    Counters are positive, sign tells whether they are added or removed.
+    """
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='summary_deltas')
+    sign = models.SmallIntegerField(default=1, help_text='1 for added counters, -1 for removed ones')
+    # { col1: task_count_with_col1 }
+    all_data_columns = JSONField(default=dict)
+    # common data columns of added tasks, null when the delta doesn't add tasks
+    common_data_columns = JSONField(null=True, default=None)
+    # { (from_name, to_name, type): annotation_count }
+    created_annotations = JSONField(default=dict)
+    # { from_name: {label1: count} }
+    created_labels = JSONField(default=dict)
+    created_labels_drafts = JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
 
 
 class ProjectImport(models.Model):
@@ -1474,6 +1582,7 @@ class ProjectImport(models.Model):
     preannotated_from_fields = models.JSONField(null=True, blank=True)
     commit_to_project = models.BooleanField(default=False)
     return_task_ids = models.BooleanField(default=False)
+    skip_duplicates = models.BooleanField(default=False)
     status = models.CharField(max_length=64, choices=Status.choices, default=Status.CREATED)
     url = models.CharField(max_length=2048, null=True, blank=True)
     traceback = models.TextField(null=True, blank=True)
@@ -1484,6 +1593,7 @@ class ProjectImport(models.Model):
     task_count = models.IntegerField(default=0)
     annotation_count = models.IntegerField(default=0)
     prediction_count = models.IntegerField(default=0)
+    duplicate_count = models.IntegerField(default=0)
     duration = models.IntegerField(default=0)
     file_upload_ids = models.JSONField(default=list)
     could_be_tasks_list = models.BooleanField(default=False)
@@ -1518,3 +1628,72 @@ class ProjectReimport(models.Model):
 
     def has_permission(self, user):
         return self.project.has_permission(user)
+
+
+class LabelingQueue(models.Model):
+    """Materialized next task candidates of the project, see projects.functions.labeling_queue"""
+
+    project = models.OneToOneField(
+        Project, primary_key=True, on_delete=models.CASCADE, related_name='labeling_queue', help_text='Project ID'
+    )
+    sampling = models.CharField(max_length=100, null=True, help_text='Project sampling the queue was built for')
+    last_task_id = models.IntegerField(default=0, help_text='The last task ID added to the queue')
+    built_at = models.DateTimeField(null=True, help_text='Full rebuild time')
+
+
+class LabelingQueueItem(models.Model):
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='labeling_queue_items', help_text='Project ID'
+    )
+    task = models.OneToOneField(
+        'tasks.Task', on_delete=models.CASCADE, related_name='labeling_queue_item', help_text='Candidate task'
+    )
+    # task ID for sequential sampling, random number for uniform sampling
+    rank = models.FloatField(help_text='Position in the queue, candidates are claimed in ascending order')
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'rank'])]
+
+
+class ProjectCounters(models.Model):
+    """Counters of ProjectManager.COUNTER_FIELDS maintained incrementally, see projects.functions.counters"""
+
+    project = models.OneToOneField(
+        Project, primary_key=True, on_delete=models.CASCADE, related_name='counters', help_text='Project ID'
+    )
+    task_number = models.IntegerField(default=0, help_text='Total task number in project')
+    finished_task_number = models.IntegerField(default=0, help_text='Finished tasks')
+    total_predictions_number = models.IntegerField(default=0, help_text='Total predictions number in project')
+    total_annotations_number = models.IntegerField(
+        default=0, help_text='Total annotations number in project including skipped_annotations_number'
+    )
+    num_tasks_with_annotations = models.IntegerField(default=0, help_text='Tasks with annotations count')
+    useful_annotation_number = models.IntegerField(
+        default=0, help_text='Useful annotation number in project not including skipped_annotations_number'
+    )
+    ground_truth_number = models.IntegerField(default=0, help_text='Honeypot annotation number in project')
+    skipped_annotations_number = models.IntegerField(default=0, help_text='Skipped by collaborators annotation number')
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+
+@receiver(post_save, sender=Project)
+def create_project_counters(sender, instance, created, **kwargs):
+    # counters of an empty project are exact, counters of older projects are created by reconciliation
+    if created:
+        ProjectCounters.objects.get_or_create(project=instance)
+
+
+@receiver(post_save, sender=Annotation)
+def remove_labeled_task_from_labeling_queue(sender, instance, **kwargs):
+    if settings.LABELING_QUEUE_ENABLED:
+        LabelingQueueItem.objects.filter(task_id=instance.task_id, task__is_labeled=True).delete()
+
+
+@receiver(post_delete, sender=Annotation)
+def return_task_to_labeling_queue(sender, instance, **kwargs):
+    if settings.LABELING_QUEUE_ENABLED:
+        from projects.functions.labeling_queue import requeue_task
+
+        # after commit: the task itself can be deleted in the same transaction
+        task_id = instance.task_id
+        transaction.on_commit(lambda: requeue_task(task_id))
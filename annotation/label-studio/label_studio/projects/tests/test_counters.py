@@ -0,0 +1,69 @@
+from django.test import TestCase
+from projects.functions.counters import COUNTER_FIELDS, reconcile_project_counters
+from projects.models import Project, ProjectCounters, ProjectManager
+from tasks.models import Prediction
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+from .factories import ProjectFactory
+
+RESULT = [{'id': 'a1', 'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['pos']}}]
+
+
+class TestProjectCounters(TestCase):
+    def get_counters(self, project):
+        return ProjectCounters.objects.filter(project=project).values(*COUNTER_FIELDS).get()
+
+    def assertCountersAreExact(self, project):
+        projects = ProjectManager.with_counts_annotate(Project.objects.filter(id=project.id), aggregate=True)
+        self.assertEqual(self.get_counters(project), projects.values(*COUNTER_FIELDS).get())
+
+    def test_counters_follow_changes(self):
+        project = ProjectFactory()
+        task_1 = TaskFactory(project=project)
+        task_2 = TaskFactory(project=project)
+        annotation = AnnotationFactory(task=task_1, result=RESULT)
+        AnnotationFactory(task=task_1, result=RESULT)
+        AnnotationFactory(task=task_2, result=RESULT, ground_truth=True)
+        Prediction.objects.create(task=task_2, project=project, result=RESULT, score=0.5)
+        self.assertCountersAreExact(project)
+        self.assertEqual(self.get_counters(project)['num_tasks_with_annotations'], 1)
+
+        annotation.was_cancelled = True
+        annotation.save()
+        self.assertCountersAreExact(project)
+
+        annotation.delete()
+        self.assertCountersAreExact(project)
+
+        task_1.delete()
+        self.assertCountersAreExact(project)
+        self.assertEqual(self.get_counters(project)['task_number'], 1)
+
+    def test_counters_follow_ground_truth_move(self):
+        project = ProjectFactory()
+        task = TaskFactory(project=project)
+        old = AnnotationFactory(task=task, result=RESULT, ground_truth=True)
+        new = AnnotationFactory(task=task, result=RESULT)
+        self.assertCountersAreExact(project)
+
+        new.ground_truth = True
+        new.save()
+        task.ensure_unique_groundtruth(new.id)
+        old.refresh_from_db()
+        self.assertFalse(old.ground_truth)
+        self.assertCountersAreExact(project)
+        self.assertEqual(self.get_counters(project)['ground_truth_number'], 1)
+
+    def test_reconcile_repairs_drift(self):
+        project = ProjectFactory()
+        TaskFactory(project=project)
+        ProjectCounters.objects.filter(project=project).update(task_number=10)
+
+        self.assertEqual(reconcile_project_counters(project.organization_id), 1)
+        self.assertEqual(self.get_counters(project)['task_number'], 1)
+
+        # projects created before the counters table get counters on reconciliation
+        ProjectCounters.objects.filter(project=project).delete()
+        self.assertEqual(Project.objects.with_counts(fields=['task_number']).get(id=project.id).task_number, 1)
+        self.assertEqual(reconcile_project_counters(project.organization_id), 0)
+        self.assertCountersAreExact(project)
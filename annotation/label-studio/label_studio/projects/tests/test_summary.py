@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import TestCase
+from projects.models import ProjectSummary, ProjectSummaryDelta
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+from .factories import ProjectFactory
+
+
+def make_result(label):
+    return [{'id': label, 'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': [label]}}]
+
+
+class TestProjectSummaryDeltas(TestCase):
+    def test_changes_are_folded_on_read(self):
+        project = ProjectFactory()
+        summary = project.summary
+        summary.update_data_columns([{'data': {'text': 'a', 'meta': 1}}, {'data': {'text': 'b'}}])
+        summary.update_created_annotations_and_labels(
+            [{'result': make_result('pos')}, {'result': make_result('pos')}, {'result': make_result('neg')}]
+        )
+        summary.update_created_labels_drafts([{'result': make_result('neg')}])
+
+        # the summary row isn't rewritten until deltas are folded
+        self.assertEqual(ProjectSummaryDelta.objects.filter(project=project).count(), 3)
+        self.assertEqual(ProjectSummary.objects.get(project=project).created_labels, {})
+
+        summary = ProjectSummary.objects.get(project=project).fold_deltas()
+        self.assertFalse(ProjectSummaryDelta.objects.filter(project=project).exists())
+        self.assertEqual(summary.all_data_columns, {'text': 2, 'meta': 1})
+        self.assertEqual(summary.common_data_columns, ['text'])
+        self.assertEqual(summary.created_annotations, {'label|text|choices': 3})
+        self.assertEqual(summary.created_labels, {'label': {'pos': 2, 'neg': 1}})
+        self.assertEqual(summary.created_labels_drafts, {'label': {'neg': 1}})
+
+        summary.remove_data_columns([{'data': {'text': 'a', 'meta': 1}}])
+        summary.remove_created_drafts_and_labels([{'result': make_result('neg')}, {'result': make_result('x')}])
+        summary = ProjectSummary.objects.get(project=project).fold_deltas()
+        self.assertEqual(summary.all_data_columns, {'text': 1})
+        self.assertEqual(summary.common_data_columns, ['text'])
+        self.assertEqual(summary.created_labels_drafts, {})
+
+    def test_tasks_without_common_columns_empty_common_columns(self):
+        project = ProjectFactory()
+        summary = project.summary
+        summary.update_data_columns([{'data': {'text': 'a'}}])
+        self.assertEqual(summary.fold_deltas().common_data_columns, ['text'])
+
+        summary.update_data_columns([{'data': {'image': 'a.jpg'}}, {'data': {'audio': 'a.wav'}}])
+        summary = ProjectSummary.objects.get(project=project).fold_deltas()
+        self.assertEqual(summary.common_data_columns, [])
+        self.assertEqual(summary.all_data_columns, {'text': 1, 'image': 1, 'audio': 1})
+
+    def test_removing_all_annotations_resets_labels(self):
+        project = ProjectFactory()
+        task = TaskFactory(project=project)
+        annotation = AnnotationFactory(task=task, result=make_result('pos'))
+        AnnotationFactory(task=task, result=make_result('neg'))
+        self.assertEqual(project.summary.fold_deltas().created_labels, {'label': {'pos': 1, 'neg': 1}})
+
+        project.summary.remove_created_annotations_and_labels([annotation])
+        self.assertEqual(project.summary.fold_deltas().created_labels, {'label': {'neg': 1}})
+
+        project.summary.remove_created_annotations_and_labels(list(project.annotations.all()))
+        summary = ProjectSummary.objects.get(project=project)
+        self.assertEqual(summary.created_annotations, {})
+        self.assertEqual(summary.created_labels, {})
+
+    @mock.patch('projects.functions.summary.redis_connected', return_value=False)
+    def test_only_bulk_changes_are_folded_after_commit_without_redis(self, _):
+        project = ProjectFactory()
+        task = TaskFactory(project=project)
+        ProjectSummary.objects.get(project=project).fold_deltas()
+
+        # a single annotation is left to the summary readers
+        with self.captureOnCommitCallbacks(execute=True):
+            AnnotationFactory(task=task, result=make_result('pos'))
+        self.assertEqual(ProjectSummary.objects.get(project=project).created_labels, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.summary.update_data_columns([{'data': {'text': 'a'}}, {'data': {'text': 'b'}}])
+        self.assertFalse(ProjectSummaryDelta.objects.filter(project=project).exists())
+        summary = ProjectSummary.objects.get(project=project)
+        self.assertEqual(summary.created_labels, {'label': {'pos': 1}})
+        self.assertEqual(summary.all_data_columns['text'], 3)
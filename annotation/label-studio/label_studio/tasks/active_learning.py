@@ -0,0 +1,81 @@
+"""Acquisition functions for active learning.
+
+Each function takes a prediction score and result and returns the prediction uncertainty,
+tasks with greater uncertainty are sampled first by the uncertainty sampling of the next task API.
+Class probabilities can be sent by ML backends in the "probabilities" field of prediction result regions:
+{"from_name": "sentiment", "to_name": "text", "type": "choices", "value": {"choices": ["positive"]},
+ "score": 0.7, "probabilities": {"positive": 0.7, "negative": 0.2, "neutral": 0.1}}
+Probabilities can also be a list of numbers. Functions based on probabilities fall back to least confidence
+when there are no probabilities in the result.
+"""
+import math
+from typing import Callable, Dict, List, Optional
+
+from core.utils.common import load_func
+from django.conf import settings
+
+AcquisitionFunction = Callable[[Optional[float], list], Optional[float]]
+
+
+def get_class_probabilities(result) -> List[List[float]]:
+    """Class probabilities of each result region that has them"""
+    probabilities = []
+    for region in result if isinstance(result, list) else []:
+        if not isinstance(region, dict):
+            continue
+        values = region.get('probabilities')
+        if isinstance(values, dict):
+            values = list(values.values())
+        if not isinstance(values, list):
+            continue
+        values = [float(p) for p in values if isinstance(p, (int, float)) and not isinstance(p, bool)]
+        if values:
+            probabilities.append(values)
+    return probabilities
+
+
+def least_confidence(score: Optional[float], result: list) -> Optional[float]:
+    if score is None:
+        return None
+    return 1.0 - score
+
+
+def margin(score: Optional[float], result: list) -> Optional[float]:
+    """1 - difference between the two most probable classes, the most uncertain region counts"""
+    margins = []
+    for probabilities in get_class_probabilities(result):
+        top = sorted(probabilities, reverse=True)[:2] + [0.0]
+        margins.append(1.0 - (top[0] - top[1]))
+    return max(margins) if margins else least_confidence(score, result)
+
+
+def entropy(score: Optional[float], result: list) -> Optional[float]:
+    """Entropy of class probabilities normalized to [0, 1], the most uncertain region counts"""
+    entropies = []
+    for probabilities in get_class_probabilities(result):
+        total = sum(probabilities)
+        if total <= 0:
+            continue
+        value = -sum(p / total * math.log(p / total) for p in probabilities if p > 0)
+        entropies.append(value / math.log(len(probabilities)) if len(probabilities) > 1 else 0.0)
+    return max(entropies) if entropies else least_confidence(score, result)
+
+
+ACQUISITION_FUNCTIONS: Dict[str, AcquisitionFunction] = {
+    'least_confidence': least_confidence,
+    'margin': margin,
+    'entropy': entropy,
+}
+
+
+def get_acquisition_function() -> AcquisitionFunction:
+    """ACTIVE_LEARNING_ACQUISITION_FUNCTION is a name from ACQUISITION_FUNCTIONS or an import path of a function"""
+    name = settings.ACTIVE_LEARNING_ACQUISITION_FUNCTION
+    return ACQUISITION_FUNCTIONS.get(name) or load_func(name)
+
+
+def get_uncertainty(score: Optional[float], result: list) -> Optional[float]:
+    try:
+        return get_acquisition_function()(score, result)
+    except (TypeError, ValueError):
+        return None
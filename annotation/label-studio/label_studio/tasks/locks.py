@@ -0,0 +1,210 @@
+"""Task lock maintenance: active lock counts with an optional cache and background reaping of expired locks.
+
+TaskLock rows stay the source of truth. With TASK_LOCK_CACHE set to "redis" or "locmem" the active locks
+of a task are mirrored as {user_id: expire_at timestamp} after each committed acquire/release and are
+read from the mirror; a task without a mirror entry is loaded from the DB once. "locmem" keeps the
+mirror in the process memory, use it only when one process serves the next task API.
+Expired locks are ignored by all reads, they are deleted by reap_expired_task_locks()
+at most once per TASK_LOCK_REAP_INTERVAL seconds instead of on every lock change.
+Locks are released through release_task_locks() to update the mirror; locks removed by cascade
+deletes of tasks or users aren't mirrored and stay in the cache until they expire.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from core.redis import (
+    redis_connected,
+    redis_delete,
+    redis_pipeline,
+    redis_set,
+    redis_zrem,
+    start_job_async_or_sync,
+)
+from core.utils.db import batch_delete
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+REAPING_KEY = 'task-locks:reaping'
+# a member with zero score marks a task loaded from the DB, it never counts as an active lock
+LOADED_MARK = '-'
+
+
+class RedisTaskLockCache:
+    @staticmethod
+    def _key(task_id):
+        return f'task-locks:{task_id}'
+
+    def get_locks(self, task_ids) -> Dict[int, Optional[Dict[int, float]]]:
+        """{task_id: {user_id: expire_at timestamp} or None if the task is not mirrored}"""
+        pipeline = redis_pipeline()
+        if pipeline is None:
+            return dict.fromkeys(task_ids)
+        for task_id in task_ids:
+            pipeline.zrangebyscore(self._key(task_id), time.time(), '+inf', withscores=True)
+            pipeline.zscore(self._key(task_id), LOADED_MARK)
+        replies = pipeline.execute()
+        locks = {}
+        for i, task_id in enumerate(task_ids):
+            members, loaded = replies[2 * i], replies[2 * i + 1]
+            locks[task_id] = {int(user): expire for user, expire in members} if loaded is not None else None
+        return locks
+
+    def load(self, task_id, locks: Dict[int, float]):
+        key = self._key(task_id)
+        pipeline = redis_pipeline()
+        if pipeline is None:
+            return
+        pipeline.zadd(key, {LOADED_MARK: 0, **{str(user): expire for user, expire in locks.items()}}, nx=True)
+        pipeline.expire(key, settings.TASK_LOCK_TTL)
+        pipeline.execute()
+
+    def set(self, task_id, user_id, expire_at: float):
+        key = self._key(task_id)
+        pipeline = redis_pipeline()
+        if pipeline is None:
+            return
+        # without LOADED_MARK the task is still loaded from the DB on the next read
+        pipeline.zadd(key, {str(user_id): expire_at})
+        pipeline.expire(key, max(1, int(expire_at - time.time())))
+        pipeline.execute()
+
+    def delete(self, task_id, user_id=None):
+        if user_id is None:
+            redis_delete(self._key(task_id))
+        else:
+            redis_zrem(self._key(task_id), str(user_id))
+
+
+class LocalMemoryTaskLockCache:
+    def __init__(self):
+        self._locks = {}
+        self._mutex = threading.Lock()
+
+    def get_locks(self, task_ids) -> Dict[int, Optional[Dict[int, float]]]:
+        current = time.time()
+        with self._mutex:
+            return {
+                task_id: (
+                    {user: expire for user, expire in self._locks[task_id].items() if expire > current}
+                    if task_id in self._locks
+                    else None
+                )
+                for task_id in task_ids
+            }
+
+    def load(self, task_id, locks: Dict[int, float]):
+        with self._mutex:
+            self._locks.setdefault(task_id, dict(locks))
+
+    def set(self, task_id, user_id, expire_at: float):
+        with self._mutex:
+            if task_id in self._locks:
+                self._locks[task_id][user_id] = expire_at
+
+    def delete(self, task_id, user_id=None):
+        with self._mutex:
+            if user_id is None:
+                self._locks.pop(task_id, None)
+            elif task_id in self._locks:
+                self._locks[task_id].pop(user_id, None)
+
+
+_local_memory_cache = LocalMemoryTaskLockCache()
+
+
+def get_task_lock_cache():
+    if settings.TASK_LOCK_CACHE == 'redis':
+        # every cache call checks the connection itself, without redis tasks are loaded from the DB
+        return RedisTaskLockCache()
+    if settings.TASK_LOCK_CACHE == 'locmem':
+        return _local_memory_cache
+    return None
+
+
+def _get_locks_from_db(task_ids) -> Dict[int, Dict[int, float]]:
+    from tasks.models import TaskLock
+
+    locks = {task_id: {} for task_id in task_ids}
+    active = TaskLock.objects.filter(task_id__in=task_ids, expire_at__gt=now())
+    for task_id, user_id, expire_at in active.values_list('task_id', 'user_id', 'expire_at'):
+        locks[task_id][user_id] = expire_at.timestamp()
+    return locks
+
+
+def count_active_locks(task_ids: Iterable[int], exclude_user_id: Optional[int] = None) -> Dict[int, int]:
+    """Number of active locks of each task, locks of exclude_user_id are not counted"""
+    from tasks.models import TaskLock
+
+    task_ids = list(task_ids)
+    cache = get_task_lock_cache()
+    if cache is None:
+        counts = dict.fromkeys(task_ids, 0)
+        active = TaskLock.objects.filter(task_id__in=task_ids, expire_at__gt=now())
+        if exclude_user_id is not None:
+            active = active.exclude(user_id=exclude_user_id)
+        counts.update(active.values('task_id').annotate(count=Count('id')).values_list('task_id', 'count'))
+        return counts
+
+    locks = cache.get_locks(task_ids)
+    missing = [task_id for task_id, task_locks in locks.items() if task_locks is None]
+    if missing:
+        for task_id, task_locks in _get_locks_from_db(missing).items():
+            cache.load(task_id, task_locks)
+            locks[task_id] = task_locks
+    return {
+        task_id: sum(1 for user_id in task_locks if user_id != exclude_user_id)
+        for task_id, task_locks in locks.items()
+    }
+
+
+def mirror_task_lock(task_id, user_id=None, expire_at=None):
+    """Update the cache after the lock change is committed, expire_at=None means the lock is released"""
+    cache = get_task_lock_cache()
+    if cache is None:
+        return
+    if expire_at is None:
+        cache.delete(task_id, user_id)
+    else:
+        cache.set(task_id, user_id, expire_at.timestamp())
+
+
+def release_task_locks(locks):
+    """Delete the TaskLock queryset and remove its active locks from the cache after commit.
+    TaskLock has no delete signals, so the queryset is fast-deleted with one DELETE statement.
+    """
+    released = []
+    if get_task_lock_cache() is not None:
+        released = list(locks.filter(expire_at__gt=now()).values_list('task_id', 'user_id'))
+    locks.delete()
+    if released:
+        transaction.on_commit(lambda: [mirror_task_lock(task_id, user_id) for task_id, user_id in released])
+
+
+def reap_expired_task_locks():
+    from tasks.models import TaskLock
+
+    deleted = batch_delete(TaskLock.objects.filter(expire_at__lt=now()), batch_size=settings.BATCH_SIZE)
+    logger.debug(f'{deleted} expired task locks deleted')
+
+
+_last_reaping = 0.0
+
+
+def schedule_expired_task_locks_reaping():
+    """Start reap_expired_task_locks at most once per TASK_LOCK_REAP_INTERVAL in this process,
+    and once per interval for all processes when redis is connected
+    """
+    global _last_reaping
+    interval = settings.TASK_LOCK_REAP_INTERVAL
+    if time.monotonic() - _last_reaping < interval:
+        return
+    _last_reaping = time.monotonic()
+    if redis_connected() and not redis_set(REAPING_KEY, 1, ttl=interval, nx=True):
+        return
+    start_job_async_or_sync(reap_expired_task_locks)
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations
+from django.conf import settings
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+import logging
+logger = logging.getLogger(__name__)
+
+IS_SQLITE = settings.DJANGO_DB == settings.DJANGO_DB_SQLITE
+
+migration_name = '0056_updated_at_idx_async'
+
+# delta export snapshots look up annotations, predictions and drafts changed since a watermark
+sql_create_indexes = [
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS task_completion_proj_upd_idx '
+    'ON task_completion (project_id, updated_at);',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS prediction_proj_upd_idx '
+    'ON prediction (project_id, updated_at);',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_annotationdraft_upd_idx '
+    'ON tasks_annotationdraft (updated_at);',
+]
+sql_drop_indexes = [
+    'DROP INDEX CONCURRENTLY IF EXISTS task_completion_proj_upd_idx;',
+    'DROP INDEX CONCURRENTLY IF EXISTS prediction_proj_upd_idx;',
+    'DROP INDEX CONCURRENTLY IF EXISTS tasks_annotationdraft_upd_idx;',
+]
+
+def forward_migration(migration_name):
+    migration, created = AsyncMigrationStatus.objects.get_or_create(
+        name=migration_name,
+        defaults={'status': AsyncMigrationStatus.STATUS_STARTED},
+    )
+    if not created:
+        return
+
+    logger.info(f'Start async migration {migration_name}')
+    from django.db import connection
+    cursor = connection.cursor()
+    for sql in sql_create_indexes:
+        cursor.execute(sql)
+    migration.status = AsyncMigrationStatus.STATUS_FINISHED
+    migration.save()
+    logger.info(f'Async migration {migration_name} complete')
+
+def backward_migration(migration_name):
+    migration = AsyncMigrationStatus.objects.create(
+        name=migration_name,
+        status=AsyncMigrationStatus.STATUS_STARTED,
+    )
+    logger.info(f'Start revert of async migration {migration_name}')
+    from django.db import connection
+    cursor = connection.cursor()
+    for sql in sql_drop_indexes:
+        cursor.execute(sql)
+    migration.status = AsyncMigrationStatus.STATUS_FINISHED
+    migration.save()
+    logger.info(f'Async migration {migration_name} revert complete')
+
+def forwards(apps, schema_editor):
+    if IS_SQLITE:
+        logger.info('SQLite execution')
+        logger.info('Skipping async index creation for non-PostgreSQL databases')
+        return
+
+    start_job_async_or_sync(forward_migration, migration_name=migration_name)
+
+def backwards(apps, schema_editor):
+    if IS_SQLITE:
+        return
+
+    start_job_async_or_sync(backward_migration, migration_name=migration_name)
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0055_task_proj_octlen_idx_async"),
+    ]
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
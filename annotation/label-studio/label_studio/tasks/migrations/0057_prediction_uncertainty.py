@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0056_updated_at_idx_async'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='uncertainty',
+            field=models.FloatField(default=None, editable=False, help_text='Value of the active learning acquisition function, more uncertain tasks are sampled first', null=True, verbose_name='uncertainty'),
+        ),
+    ]
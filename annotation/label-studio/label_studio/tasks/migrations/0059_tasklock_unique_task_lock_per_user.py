@@ -0,0 +1,33 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicated_locks(apps, schema_editor):
+    """Keep only the latest lock of each user for each task"""
+    TaskLock = apps.get_model('tasks', 'TaskLock')
+    duplicates = (
+        TaskLock.objects.values('task_id', 'user_id')
+        .annotate(last_id=Max('id'), count=models.Count('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        TaskLock.objects.filter(task_id=duplicate['task_id'], user_id=duplicate['user_id']).exclude(
+            id=duplicate['last_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0058_prediction_uncertainty_idx_async'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_locks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tasklock',
+            constraint=models.UniqueConstraint(fields=('task', 'user'), name='unique_task_lock_per_user'),
+        ),
+    ]
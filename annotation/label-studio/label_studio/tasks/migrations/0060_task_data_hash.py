@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0059_tasklock_unique_task_lock_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='data_hash',
+            field=models.CharField(default=None, editable=False, help_text='SHA-256 of the canonical JSON of task data, it is used to find duplicated tasks', max_length=64, null=True, verbose_name='data hash'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.9 on 2026-10-19 12:00
+
+from django.db import migrations
+from django.conf import settings
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+import logging
+logger = logging.getLogger(__name__)
+
+IS_SQLITE = settings.DJANGO_DB == settings.DJANGO_DB_SQLITE
+
+migration_name = '0061_task_data_hash_idx_async'
+BACKFILL_BATCH_SIZE = 5000
+
+# duplicated tasks are found by GROUP BY data_hash within the project
+sql_create_index = (
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS task_proj_data_hash_idx '
+    'ON task (project_id, data_hash);'
+)
+sql_drop_index = 'DROP INDEX CONCURRENTLY IF EXISTS task_proj_data_hash_idx;'
+
+
+def backfill_data_hash(Task):
+    from tasks.models import hash_task_data
+
+    last_id = 0
+    while True:
+        batch = list(
+            Task.objects.filter(id__gt=last_id, data_hash__isnull=True)
+            .order_by('id')
+            .only('id', 'data')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for task in batch:
+            task.data_hash = hash_task_data(task.data)
+        Task.objects.bulk_update(batch, ['data_hash'])
+        last_id = batch[-1].id
+
+
+def forward_migration(migration_name):
+    migration, created = AsyncMigrationStatus.objects.get_or_create(
+        name=migration_name,
+        defaults={'status': AsyncMigrationStatus.STATUS_STARTED},
+    )
+    if not created:
+        return
+
+    logger.info(f'Start async migration {migration_name}')
+    from django.db import connection
+    from django.db.migrations.loader import MigrationLoader
+    # the job can't get migration apps, the historical model is restored from the migration graph
+    state = MigrationLoader(connection).project_state(('tasks', migration_name))
+    backfill_data_hash(state.apps.get_model('tasks', 'Task'))
+    cursor = connection.cursor()
+    cursor.execute(sql_create_index)
+    migration.status = AsyncMigrationStatus.STATUS_FINISHED
+    migration.save()
+    logger.info(f'Async migration {migration_name} complete')
+
+def backward_migration(migration_name):
+    migration = AsyncMigrationStatus.objects.create(
+        name=migration_name,
+        status=AsyncMigrationStatus.STATUS_STARTED,
+    )
+    logger.info(f'Start revert of async migration {migration_name}')
+    from django.db import connection
+    cursor = connection.cursor()
+    cursor.execute(sql_drop_index)
+    migration.status = AsyncMigrationStatus.STATUS_FINISHED
+    migration.save()
+    logger.info(f'Async migration {migration_name} revert complete')
+
+def forwards(apps, schema_editor):
+    if IS_SQLITE:
+        logger.info('SQLite execution')
+        logger.info('Skipping async index creation for non-PostgreSQL databases')
+        backfill_data_hash(apps.get_model('tasks', 'Task'))
+        return
+
+    start_job_async_or_sync(forward_migration, migration_name=migration_name)
+
+def backwards(apps, schema_editor):
+    if IS_SQLITE:
+        return
+
+    start_job_async_or_sync(backward_migration, migration_name=migration_name)
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0060_task_data_hash"),
+    ]
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -2,6 +2,7 @@
 """
 import base64
 import datetime
+import hashlib
 import logging
 import numbers
 import os
@@ -23,13 +24,13 @@ from core.utils.common import (
     string_is_url,
     temporary_disconnect_list_signal,
 )
-from core.utils.db import batch_delete, fast_first
+from core.utils.db import SQCount, batch_delete, fast_first
 from core.utils.params import get_env
 from data_import.models import FileUpload
 from data_manager.managers import PreparedTaskManager, TaskManager
 from django.conf import settings
 from django.db import OperationalError, models, transaction
-from django.db.models import CheckConstraint, F, JSONField, Q
+from django.db.models import Case, CheckConstraint, Exists, F, JSONField, Max, OuterRef, Q, When
 from django.db.models.lookups import GreaterThanOrEqual
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
@@ -40,12 +41,47 @@ from django.utils.translation import gettext_lazy as _
 from label_studio_sdk.label_interface.objects import PredictionValue
 from rest_framework.exceptions import ValidationError
 from tasks.choices import ActionType
+from tasks.locks import (
+    count_active_locks,
+    mirror_task_lock,
+    release_task_locks,
+    schedule_expired_task_locks_reaping,
+)
 
 logger = logging.getLogger(__name__)
 
 TaskMixin = load_func(settings.TASK_MIXIN)
 
 
+def hash_task_data(data) -> str:
+    """SHA-256 of the canonical JSON of task data, tasks with equal data have equal hashes"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, escape_forward_slashes=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def next_inner_id(project) -> int:
+    """inner_id for the next task of the project, tasks of old projects can have NULL inner_ids"""
+    tasks = Task.objects.filter(project=project)
+    max_inner_id = tasks.aggregate(Max('inner_id'))['inner_id__max']
+    if max_inner_id is None:
+        max_inner_id = tasks.count()
+    return max_inner_id + 1
+
+
+def fill_data_hashes(tasks) -> None:
+    """Calculate data hashes of tasks created before the data_hash column or updated by SQL expressions"""
+    missing = tasks.filter(data_hash__isnull=True).order_by('id').only('id', 'data')
+    last_id, filled = 0, 0
+    while batch := list(missing.filter(id__gt=last_id)[: settings.BATCH_SIZE]):
+        for task in batch:
+            task.data_hash = hash_task_data(task.data)
+        Task.objects.bulk_update(batch, ['data_hash'])
+        last_id = batch[-1].id
+        filled += len(batch)
+    if filled:
+        logger.info(f'Calculated data hashes for {filled} tasks')
+
+
 class Task(TaskMixin, models.Model):
     """Business tasks from project"""
 
@@ -63,6 +99,14 @@ class Task(TaskMixin, models.Model):
         'the project label config. You can find examples of data for your project '
         'on the Import page in the Label Studio Data Manager UI.',
     )
+    data_hash = models.CharField(
+        _('data hash'),
+        max_length=64,
+        null=True,
+        default=None,
+        editable=False,
+        help_text='SHA-256 of the canonical JSON of task data, it is used to find duplicated tasks',
+    )
 
     meta = JSONField(
         'meta',
@@ -268,6 +312,40 @@ class Task(TaskMixin, models.Model):
 
         return q | Q(ground_truth=True)
 
+    @classmethod
+    def filter_unlocked(cls, tasks, user, project):
+        """Set-based version of has_lock: keep tasks that are not locked for the user.
+        Locks of other users and annotations counted by the project skip queue mode are summed up
+        per task in subqueries and compared with the task overlap.
+        Agreement threshold (overlap_with_agreement_threshold) isn't taken into account, use has_lock for it.
+        """
+        q = cls(project=project).get_lock_exclude_query(user)
+        locks = TaskLock.objects.filter(task=OuterRef('pk'), expire_at__gt=now()).exclude(user=user)
+        annotations = Annotation.objects.filter(task=OuterRef('pk')).exclude(q)
+        tasks = tasks.annotate(_num_takes=SQCount(locks.values('id')) + SQCount(annotations.values('id')))
+        unlocked = Q(_num_takes__lt=F('overlap'))
+
+        if project.show_ground_truth_first and flag_set(
+            'fflag_feat_all_leap_1825_annotator_evaluation_short', user='auto'
+        ):
+            # overlap is ignored for ground truth tasks in onboarding mode, see has_lock
+            ground_truth = Annotation.objects.filter(task=OuterRef('pk'), ground_truth=True)
+            tasks = tasks.annotate(_has_ground_truth=Exists(ground_truth))
+            unlocked |= Q(_has_ground_truth=True)
+
+        return tasks.filter(unlocked)
+
+    @classmethod
+    def lock_first_unlocked(cls, task_ids, user, project):
+        """Select for update the first task of task_ids in their order which is not locked for the user,
+        tasks selected for update by concurrent transactions are skipped
+        """
+        if not task_ids:
+            return None
+        preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(task_ids)])
+        tasks = cls.filter_unlocked(cls.objects.filter(pk__in=task_ids), user, project)
+        return fast_first(tasks.select_for_update(skip_locked=True).order_by(preserved_order))
+
     def has_lock(self, user=None):
         """
         Check whether current task has been locked by some user
@@ -317,7 +395,7 @@ class Task(TaskMixin, models.Model):
 
     @property
     def num_locks(self):
-        return self.locks.filter(expire_at__gt=now()).count()
+        return count_active_locks([self.id])[self.id]
 
     def overlap_with_agreement_threshold(self, num, num_locks):
         # Limit to one extra annotator at a time when the task is under the threshold and meets the overlap criteria,
@@ -343,7 +421,7 @@ class Task(TaskMixin, models.Model):
         return self.overlap
 
     def num_locks_user(self, user):
-        return self.locks.filter(expire_at__gt=now()).exclude(user=user).count()
+        return count_active_locks([self.id], exclude_user_id=user.id if user else None)[self.id]
 
     def get_storage_filename(self):
         for link_name in settings.IO_STORAGES_IMPORT_LINK_NAMES:
@@ -356,9 +434,6 @@ class Task(TaskMixin, models.Model):
         user.project = self.project  # link for activity log
         return mixin_has_permission and self.project.has_permission(user)
 
-    def clear_expired_locks(self):
-        self.locks.filter(expire_at__lt=now()).delete()
-
     def set_lock(self, user):
         """Lock current task by specified user. Lock lifetime is set by `expire_in_secs`"""
         from projects.functions.next_task import get_next_task_logging_level
@@ -372,13 +447,14 @@ class Task(TaskMixin, models.Model):
             ):
                 lock_ttl = self.project.custom_task_lock_ttl
             expire_at = now() + datetime.timedelta(seconds=lock_ttl)
-            try:
-                task_lock = TaskLock.objects.get(task=self, user=user)
-            except TaskLock.DoesNotExist:
-                TaskLock.objects.create(task=self, user=user, expire_at=expire_at)
-            else:
-                task_lock.expire_at = expire_at
-                task_lock.save()
+            # acquire or refresh the lock in one statement
+            TaskLock.objects.bulk_create(
+                [TaskLock(task=self, user=user, expire_at=expire_at)],
+                update_conflicts=True,
+                unique_fields=['task', 'user'],
+                update_fields=['expire_at'],
+            )
+            transaction.on_commit(lambda: mirror_task_lock(self.id, user.id, expire_at))
             logger.log(
                 get_next_task_logging_level(user),
                 f'User={user} acquires a lock for the task={self} ttl: {lock_ttl}',
@@ -388,7 +464,7 @@ class Task(TaskMixin, models.Model):
                 f'Current number of locks for task {self.id} is {num_locks}, but overlap={self.overlap}: '
                 f"that's a bug because this task should not be taken in a label stream (task should be locked)"
             )
-        self.clear_expired_locks()
+        schedule_expired_task_locks_reaping()
 
     def release_lock(self, user=None):
         """Release lock for the task.
@@ -396,10 +472,10 @@ class Task(TaskMixin, models.Model):
         """
 
         if user is not None:
-            self.locks.filter(user=user).delete()
+            release_task_locks(self.locks.filter(user=user))
         else:
-            self.locks.all().delete()
-        self.clear_expired_locks()
+            release_task_locks(self.locks.all())
+        schedule_expired_task_locks_reaping()
 
     def get_storage_link(self):
         # TODO: how to get neatly any storage class here?
@@ -516,7 +592,8 @@ class Task(TaskMixin, models.Model):
             summary.remove_data_columns([self])
 
     def ensure_unique_groundtruth(self, annotation_id):
-        self.annotations.exclude(id=annotation_id).update(ground_truth=False)
+        ground_truths = self.annotations.exclude(id=annotation_id).filter(ground_truth=True)
+        _project_counters().update_task_annotations(self, ground_truths, ground_truth=False)
 
     def save(self, *args, update_fields=None, **kwargs):
         if self.inner_id == 0:
@@ -530,6 +607,11 @@ class Task(TaskMixin, models.Model):
             if update_fields is not None:
                 update_fields = {'inner_id'}.union(update_fields)
 
+        if update_fields is None or 'data' in update_fields:
+            self.data_hash = hash_task_data(self.data)
+            if update_fields is not None:
+                update_fields = {'data_hash'}.union(update_fields)
+
         super().save(*args, update_fields=update_fields, **kwargs)
 
     @staticmethod
@@ -538,11 +620,14 @@ class Task(TaskMixin, models.Model):
         Delete Tasks queryset with switched off signals in batches to minimize memory usage
         :param queryset: Tasks queryset
         """
+        from projects.functions.counters import counters_suspended
+
         signals = [
             (post_delete, update_all_task_states_after_deleting_task, Task),
             (pre_delete, remove_data_columns, Task),
         ]
-        with temporary_disconnect_list_signal(signals):
+        # callers update project counters before unlinking the tasks from the project
+        with temporary_disconnect_list_signal(signals), counters_suspended():
             return batch_delete(queryset, batch_size=500)
 
     @staticmethod
@@ -788,8 +873,10 @@ class Annotation(AnnotationMixin, models.Model):
             logger.debug(f'On delete updated total_annotations for task {task.id}')
 
         logger.debug(f'Update task stats for task={task}')
+        was_labeled = task.is_labeled
         task.update_is_labeled()
         Task.objects.filter(id=task.id).update(is_labeled=task.is_labeled)
+        _project_counters().on_task_labeled_changed(self.project_id, int(task.is_labeled) - int(was_labeled))
 
         # remove annotation counters in project summary followed by deleting an annotation
         logger.debug('Remove annotation counters in project summary followed by deleting an annotation')
@@ -813,6 +900,12 @@ class TaskLock(models.Model):
     )
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time', null=True)
 
+    class Meta:
+        constraints = [
+            # Task.set_lock upserts the lock of the user
+            models.UniqueConstraint(fields=['task', 'user'], name='unique_task_lock_per_user'),
+        ]
+
 
 class AnnotationDraft(models.Model):
     result = JSONField(_('result'), help_text='Draft result in JSON format')
@@ -882,6 +975,8 @@ class AnnotationDraft(models.Model):
             if hasattr(project, 'summary'):
                 project.summary.remove_created_drafts_and_labels([self])
             super().delete(*args, **kwargs)
+            # updated_at marks the task as changed for delta exports, the deleted draft can't be found by them
+            Task.objects.filter(id=self.task_id).update(updated_at=now())
 
 
 class Prediction(models.Model):
@@ -924,6 +1019,13 @@ class Prediction(models.Model):
         help_text='Array of task IDs of the closest neighbors',
     )
     mislabeling = models.FloatField(_('mislabeling'), default=0.0, help_text='Related task mislabeling score')
+    uncertainty = models.FloatField(
+        _('uncertainty'),
+        default=None,
+        null=True,
+        editable=False,
+        help_text='Value of the active learning acquisition function, more uncertain tasks are sampled first',
+    )
 
     task = models.ForeignKey('tasks.Task', on_delete=models.CASCADE, related_name='predictions')
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='predictions', null=True)
@@ -996,6 +1098,12 @@ class Prediction(models.Model):
 
         self.task.save(update_fields=update_fields)
 
+    def update_uncertainty(self):
+        """Call it for predictions created by bulk_create, save() does it itself"""
+        from tasks.active_learning import get_uncertainty
+
+        self.uncertainty = get_uncertainty(self.score, self.result)
+
     def save(self, *args, update_fields=None, **kwargs):
         if self.project_id is None and self.task_id:
             logger.warning('project_id is not set for prediction, project_id being set in save method')
@@ -1005,9 +1113,10 @@ class Prediction(models.Model):
 
         # "result" data can come in different forms - normalize them to JSON
         self.result = self.prepare_prediction_result(self.result, self.project)
+        self.update_uncertainty()
 
         if update_fields is not None:
-            update_fields = {'result'}.union(update_fields)
+            update_fields = {'result', 'uncertainty'}.union(update_fields)
         # set updated_at field of task to now()
         self.update_task()
         return super(Prediction, self).save(*args, update_fields=update_fields, **kwargs)
@@ -1056,6 +1165,7 @@ class Prediction(models.Model):
                 score=1.0,  # Setting to 1.0 for now as we don't get back a score
                 result=pred['result'],
             )
+            prediction.update_uncertainty()
             return prediction
         except Exception as exc:
             # TODO: handle exceptions better
@@ -1230,12 +1340,35 @@ def update_all_task_states_after_deleting_task(sender, instance, **kwargs):
 # =========== PROJECT SUMMARY UPDATES ===========
 
 
+def _project_counters():
+    # projects.functions.counters imports projects.models, which imports this module
+    from projects.functions import counters
+
+    return counters
+
+
 @receiver(pre_delete, sender=Task)
 def remove_data_columns(sender, instance, **kwargs):
     """Reduce data column counters after removing task"""
     instance.decrease_project_summary_counters()
 
 
+@receiver(post_save, sender=Task)
+def increase_project_counters_after_creating_task(sender, instance, created, **kwargs):
+    if created:
+        _project_counters().on_task_created(instance)
+
+
+@receiver(pre_delete, sender=Task)
+def prepare_project_counters_before_deleting_task(sender, instance, **kwargs):
+    _project_counters().before_task_delete(instance)
+
+
+@receiver(post_delete, sender=Task)
+def decrease_project_counters_after_deleting_task(sender, instance, **kwargs):
+    _project_counters().after_task_delete(instance)
+
+
 def _task_data_is_not_updated(update_fields):
     if update_fields and list(update_fields) == ['is_labeled']:
         return True
@@ -1271,8 +1404,10 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
         old_annotation = sender.objects.get(id=instance.id)
     except Annotation.DoesNotExist:
         # annotation just created - do nothing
+        _project_counters().before_annotation_save(instance, None)
         return
     old_annotation.decrease_project_summary_counters()
+    _project_counters().before_annotation_save(instance, old_annotation)
 
     # update task counters if annotation changes it's was_cancelled status
     task = instance.task
@@ -1283,7 +1418,9 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
         else:
             task.cancelled_annotations = task.cancelled_annotations - 1
             task.total_annotations = task.total_annotations + 1
+        was_labeled = task.is_labeled
         task.update_is_labeled()
+        _project_counters().on_task_labeled_changed(instance.project_id, int(task.is_labeled) - int(was_labeled))
 
         Task.objects.filter(id=instance.task.id).update(
             is_labeled=task.is_labeled,
@@ -1303,25 +1440,41 @@ def update_project_summary_annotations_and_is_labeled(sender, instance, created,
         instance.task.cancelled_annotations = instance.task.annotations.all().filter(was_cancelled=True).count()
     else:
         instance.task.total_annotations = instance.task.annotations.all().filter(was_cancelled=False).count()
+    was_labeled = instance.task.is_labeled
     instance.task.update_is_labeled()
     instance.task.save(update_fields=['is_labeled', 'total_annotations', 'cancelled_annotations'])
     logger.debug(f'Updated total_annotations and cancelled_annotations for {instance.task.id}.')
+    labeled_delta = int(instance.task.is_labeled) - int(was_labeled)
+    _project_counters().after_annotation_save(instance, labeled_delta=labeled_delta)
+
+
+@receiver(post_delete, sender=Annotation)
+def decrease_project_counters_after_deleting_annotation(sender, instance, **kwargs):
+    _project_counters().after_annotation_delete(instance)
 
 
 @receiver(pre_delete, sender=Prediction)
 def remove_predictions_from_project(sender, instance, **kwargs):
     """Remove predictions counters"""
     instance.task.total_predictions = instance.task.predictions.all().count() - 1
-    instance.task.save(update_fields=['total_predictions'])
+    # updated_at marks the task as changed for delta exports, the deleted prediction can't be found by them
+    instance.task.save(update_fields=['total_predictions', 'updated_at'])
     logger.debug(f'Updated total_predictions for {instance.task.id}.')
 
 
 @receiver(post_save, sender=Prediction)
-def save_predictions_to_project(sender, instance, **kwargs):
+def save_predictions_to_project(sender, instance, created, **kwargs):
     """Add predictions counters"""
     instance.task.total_predictions = instance.task.predictions.all().count()
     instance.task.save(update_fields=['total_predictions'])
     logger.debug(f'Updated total_predictions for {instance.task.id}.')
+    if created:
+        _project_counters().on_prediction_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Prediction)
+def decrease_project_counters_after_deleting_prediction(sender, instance, **kwargs):
+    _project_counters().on_prediction_changed(instance, -1)
 
 
 # =========== END OF PROJECT SUMMARY UPDATES ===========
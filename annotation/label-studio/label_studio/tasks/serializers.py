@@ -6,10 +6,10 @@ import ujson as json
 from core.feature_flags import flag_set
 from core.label_config import replace_task_data_undefined_with_config_field
 from core.utils.common import load_func, retry_database_locked
-from core.utils.db import fast_first
 from django.conf import settings
 from django.db import IntegrityError, transaction
 from drf_spectacular.utils import extend_schema_field
+from projects.functions.counters import apply_counter_deltas, imported_counter_deltas
 from projects.models import Project
 from rest_flex_fields import FlexFieldsModelSerializer
 from rest_framework import generics, serializers
@@ -18,7 +18,15 @@ from rest_framework.fields import SkipField
 from rest_framework.serializers import ModelSerializer
 from rest_framework.settings import api_settings
 from tasks.exceptions import AnnotationDuplicateError
-from tasks.models import Annotation, AnnotationDraft, Prediction, PredictionMeta, Task
+from tasks.models import (
+    Annotation,
+    AnnotationDraft,
+    Prediction,
+    PredictionMeta,
+    Task,
+    hash_task_data,
+    next_inner_id,
+)
 from tasks.validation import TaskValidator
 from users.models import User
 from users.serializers import UserSerializer
@@ -159,7 +167,7 @@ class TaskSimpleSerializer(ModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('data_hash',)
 
 
 class BaseTaskSerializer(FlexFieldsModelSerializer):
@@ -201,7 +209,7 @@ class BaseTaskSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('data_hash',)
 
 
 class BaseTaskSerializerBulk(serializers.ListSerializer):
@@ -365,6 +373,9 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
         # to be sure we add tasks with annotations at the same time
         with transaction.atomic():
+            self.skipped_duplicates = 0
+            if self.context.get('skip_duplicates', False):
+                validated_tasks = self.skip_duplicated_tasks(validated_tasks)
 
             # extract annotations, predictions, drafts, reviews, etc
             # all these lists will be grouped by tasks, e.g.:
@@ -396,6 +407,10 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
             db_tasks = self.add_tasks(task_annotations, task_predictions, validated_tasks)
             db_annotations = self.add_annotations(task_annotations, user)
             self.add_predictions(task_predictions)
+            # signals updating project counters are not sent by bulk_create
+            apply_counter_deltas(
+                self.project.id, imported_counter_deltas(db_tasks, db_annotations, len(self.db_predictions))
+            )
 
         self.post_process_annotations(user, db_annotations, 'imported')
         self.post_process_tasks(self.project.id, [t.id for t in self.db_tasks])
@@ -437,15 +452,15 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
                         prediction_score = None
 
                 last_model_version = prediction.get('model_version', 'undefined')
-                db_predictions.append(
-                    Prediction(
-                        task=self.db_tasks[i],
-                        project=self.db_tasks[i].project,
-                        result=result,
-                        score=prediction_score,
-                        model_version=last_model_version,
-                    )
+                db_prediction = Prediction(
+                    task=self.db_tasks[i],
+                    project=self.db_tasks[i].project,
+                    result=result,
+                    score=prediction_score,
+                    model_version=last_model_version,
                 )
+                db_prediction.update_uncertainty()
+                db_predictions.append(db_prediction)
 
         # predictions: DB bulk create
         self.db_predictions = Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
@@ -537,6 +552,30 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
         return self.db_annotations
 
+    def skip_duplicated_tasks(self, validated_tasks):
+        """Drop tasks with the same data as existing project tasks or previous tasks in validated_tasks"""
+        # existing tasks without a hash are hashed once per import by the caller, see fill_data_hashes
+        for task in validated_tasks:
+            task['data_hash'] = hash_task_data(task['data'])
+
+        hashes = list({task['data_hash'] for task in validated_tasks})
+        existing = set()
+        for start in range(0, len(hashes), settings.BATCH_SIZE):
+            existing.update(
+                Task.objects.filter(
+                    project=self.project, data_hash__in=hashes[start : start + settings.BATCH_SIZE]
+                ).values_list('data_hash', flat=True)
+            )
+
+        unique_tasks = []
+        for task in validated_tasks:
+            if task['data_hash'] not in existing:
+                existing.add(task['data_hash'])
+                unique_tasks.append(task)
+        self.skipped_duplicates = len(validated_tasks) - len(unique_tasks)
+        logger.info(f'{self.skipped_duplicates} duplicated tasks skipped in project {self.project.id}')
+        return unique_tasks
+
     def add_tasks(self, task_annotations, task_predictions, validated_tasks):
         """Extract tasks from validated_tasks and store them in DB"""
         db_tasks = []
@@ -545,9 +584,7 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
         # Acquire a lock on the project to ensure atomicity when calculating inner_id
         project = Project.objects.select_for_update().get(id=self.project.id)
 
-        last_task = fast_first(Task.objects.filter(project=project).order_by('-inner_id'))
-        prev_inner_id = last_task.inner_id if last_task else 0
-        max_inner_id = (prev_inner_id + 1) if prev_inner_id else 1
+        max_inner_id = next_inner_id(project)
 
         for i, task in enumerate(validated_tasks):
             cancelled_annotations = len([ann for ann in task_annotations[i] if ann.get('was_cancelled', False)])
@@ -555,11 +592,12 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
             t = Task(
                 project=self.project,
                 data=task['data'],
+                data_hash=task.get('data_hash') or hash_task_data(task['data']),
                 meta=task.get('meta', {}),
                 overlap=max_overlap,
                 is_labeled=len(task_annotations[i]) >= max_overlap,
                 file_upload_id=task.get('file_upload_id'),
-                inner_id=None if prev_inner_id is None else max_inner_id + i,
+                inner_id=max_inner_id + i,
                 total_predictions=len(task_predictions[i]),
                 total_annotations=total_annotations,
                 cancelled_annotations=cancelled_annotations,
@@ -604,7 +642,7 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('data_hash',)
 
 
 TaskSerializer = load_func(settings.TASK_SERIALIZER)
@@ -621,7 +659,7 @@ class TaskWithAnnotationsSerializer(TaskSerializer):
         model = Task
         list_serializer_class = load_func(settings.TASK_SERIALIZER_BULK)
 
-        exclude = ()
+        exclude = ('data_hash',)
 
 
 class AnnotationDraftSerializer(ModelSerializer):
@@ -129,6 +129,36 @@ class TaskValidator:
                 class_def = class_def.__name__
             raise ValidationError('Task[{key}] must be {class_def}'.format(key=key, class_def=class_def))
 
+    @classmethod
+    def check_annotations(cls, task):
+        """Validate task['annotations'], items which aren't dicts are skipped by the import"""
+        cls.raise_if_wrong_class(task, 'annotations', list)
+        for annotation in task.get('annotations', []):
+            if not isinstance(annotation, dict):
+                logger.warning('Annotation must be dict, but "%s" found', str(type(annotation)))
+                continue
+
+            ok = 'result' in annotation
+            if not ok:
+                raise ValidationError('Annotation must have "result" fields')
+
+            # check result is list
+            if not isinstance(annotation.get('result', []), list):
+                raise ValidationError('"result" field in annotation must be list')
+
+    @classmethod
+    def check_predictions(cls, task):
+        """Validate task['predictions'], items which aren't dicts are skipped by the import"""
+        cls.raise_if_wrong_class(task, 'predictions', list)
+        for prediction in task.get('predictions', []):
+            if not isinstance(prediction, dict):
+                logger.warning('Prediction must be dict, but "%s" found', str(type(prediction)))
+                continue
+
+            ok = 'result' in prediction
+            if not ok:
+                raise ValidationError('Prediction must have "result" fields')
+
     def validate(self, task):
         """Validate whole task with task['data'] and task['annotations']. task['predictions']"""
         # task is class
@@ -164,30 +194,10 @@ class TaskValidator:
 
             # task[annotations]: we can't use AnnotationSerializer for validation
             # because it's much different with validation we need here
-            self.raise_if_wrong_class(task, 'annotations', list)
-            for annotation in task.get('annotations', []):
-                if not isinstance(annotation, dict):
-                    logger.warning('Annotation must be dict, but "%s" found', str(type(annotation)))
-                    continue
-
-                ok = 'result' in annotation
-                if not ok:
-                    raise ValidationError('Annotation must have "result" fields')
-
-                # check result is list
-                if not isinstance(annotation.get('result', []), list):
-                    raise ValidationError('"result" field in annotation must be list')
+            self.check_annotations(task)
 
             # task[predictions]
-            self.raise_if_wrong_class(task, 'predictions', list)
-            for prediction in task.get('predictions', []):
-                if not isinstance(prediction, dict):
-                    logger.warning('Prediction must be dict, but "%s" found', str(type(prediction)))
-                    continue
-
-                ok = 'result' in prediction
-                if not ok:
-                    raise ValidationError('Prediction must have "result" fields')
+            self.check_predictions(task)
 
             # task[meta]
             self.raise_if_wrong_class(task, 'meta', (dict, list))
@@ -0,0 +1,45 @@
+from unittest import mock
+
+import pytest
+from data_import.functions import async_import_background
+from projects.models import Project, ProjectImport
+from tasks.models import Task
+from tests.conftest import project_choices
+from tests.utils import make_project
+
+pytestmark = pytest.mark.django_db
+
+
+def test_async_import_rearranges_overlap_cohort_once(business_client, settings):
+    settings.IMPORT_TASKS_CHUNK_SIZE = 2
+    project = make_project(
+        dict(project_choices(), maximum_annotations=2, overlap_cohort_percentage=50),
+        business_client.user,
+        use_ml_backend=False,
+    )
+    project_import = ProjectImport.objects.create(
+        project=project, tasks=[{'image': f'{i}.jpg'} for i in range(5)], commit_to_project=True
+    )
+
+    with mock.patch.object(Project, '_rearrange_overlap_cohort') as rearrange:
+        async_import_background(project_import.id, business_client.user.id)
+
+    project_import.refresh_from_db()
+    assert project_import.status == ProjectImport.Status.COMPLETED
+    assert Task.objects.filter(project=project).count() == 5
+    # the import is committed in 3 chunks, but the whole project cohort is rearranged once
+    assert rearrange.call_count == 1
+
+
+def test_async_import_continues_null_inner_ids(business_client):
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    for tasks in ([{'image': f'{i}.jpg'} for i in range(3)], [{'image': '3.jpg'}]):
+        project_import = ProjectImport.objects.create(project=project, tasks=tasks, commit_to_project=True)
+        async_import_background(project_import.id, business_client.user.id)
+        # tasks created before inner_id was introduced have no inner_id
+        Task.objects.filter(project=project).update(inner_id=None)
+
+    # inner_id continues after the existing tasks instead of restarting at 1
+    project_import = ProjectImport.objects.create(project=project, tasks=[{'image': '4.jpg'}], commit_to_project=True)
+    async_import_background(project_import.id, business_client.user.id)
+    assert Task.objects.get(project=project, data={'image': '4.jpg'}).inner_id == 5
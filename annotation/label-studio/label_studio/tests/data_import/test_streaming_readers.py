@@ -0,0 +1,71 @@
+import codecs
+import io
+import json
+
+import pytest
+from data_import.models import iter_json_items, iter_lines, iter_text_chunks
+
+TASKS = [
+    {'data': {'text': 'über', 'n': 1}},
+    {'text': 'flat task'},
+    1234567,
+    -1.5e3,
+    True,
+    None,
+    [1, 2],
+    'x',
+]
+
+
+def _chunks(content: bytes, chunk_size: int):
+    return iter_text_chunks(io.BytesIO(content), chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 3, 7, 1024))
+@pytest.mark.parametrize('indent', (None, 2))
+@pytest.mark.parametrize('bom', (b'', codecs.BOM_UTF8))
+def test_iter_json_items(chunk_size, indent, bom):
+    content = bom + json.dumps(TASKS, indent=indent, ensure_ascii=False).encode()
+    assert list(iter_json_items(_chunks(content, chunk_size))) == TASKS
+
+
+@pytest.mark.parametrize('chunk_size', (1, 1024))
+def test_iter_json_items_single_object(chunk_size):
+    content = json.dumps({'text': 'single task'}).encode()
+    assert list(iter_json_items(_chunks(content, chunk_size))) == [{'text': 'single task'}]
+    assert list(iter_json_items(_chunks(b' [ ] ', chunk_size))) == []
+
+
+@pytest.mark.parametrize('chunk_size', (1, 3, 1024))
+@pytest.mark.parametrize(
+    'content',
+    (
+        b'',
+        b'[1,]',
+        b'[1 2]',
+        b'[',
+        b'[1',
+        b'[1] x',
+        b'[{"a": 1]',
+        b'[\n  {"a": 1},\n  {"b": 2}\n  {"c": 3}\n]',
+        b'[\n  {"a": 1},\n  {"b": \n  }\n]',
+        b'[\n  1,\n  2,\n]',
+        b'\n\n{"a": 1,\n "b"}',
+    ),
+)
+def test_iter_json_items_invalid(content, chunk_size):
+    with pytest.raises(json.JSONDecodeError) as error:
+        list(iter_json_items(_chunks(content, chunk_size)))
+    # positions in the whole document like json.loads reports them, not in the buffer
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(content)
+    assert (error.value.pos, error.value.lineno, error.value.colno) == (
+        expected.value.pos,
+        expected.value.lineno,
+        expected.value.colno,
+    )
+
+
+def test_iter_lines():
+    content = 'first\r\nsecond ü\n\nlast'.encode()
+    assert list(iter_lines(_chunks(content, 1))) == ['first\r', 'second ü', '', 'last']
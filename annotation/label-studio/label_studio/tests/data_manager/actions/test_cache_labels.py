@@ -89,3 +89,26 @@ def test_cache_labels_job(source, control_tag, with_counters, expected_cache_col
             expected_cache = ', '.join(sorted(list(set(all_labels))))
 
         assert cached_labels == expected_cache
+
+
+@pytest.mark.django_db
+def test_cache_labels_job_in_chunks(settings):
+    settings.BATCH_SIZE = 2
+    User = get_user_model()
+    test_user = User.objects.create(username='test_user')
+    project = Project.objects.create(title='Test Project', created_by=test_user)
+
+    tasks = [Task.objects.create(project=project, data={'text': f'This is task {i}'}) for i in range(5)]
+    for i, task in enumerate(tasks):
+        for label in ['A', 'B', 'A'][: i % 3 + 1]:
+            result = [{'from_name': 'label', 'to_name': 'text', 'type': 'labels', 'value': {'labels': [label]}}]
+            Annotation.objects.create(task=task, project=project, completed_by=test_user, result=result)
+
+    queryset = Task.objects.filter(project=project).exclude(id=tasks[0].id)
+    response = cache_labels_job(
+        project, queryset, request_data={'source': 'annotations', 'control_tag': 'ALL', 'with_counters': 'Yes'}
+    )
+    assert response['detail'] == 'Updated 4 tasks'
+
+    cached = [Task.objects.get(id=task.id).data.get('cache_all') for task in tasks]
+    assert cached == [None, 'A: 1, B: 1', 'A: 2, B: 1', 'A: 1', 'A: 1, B: 1']
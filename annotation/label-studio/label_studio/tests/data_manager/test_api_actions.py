@@ -2,8 +2,11 @@
 """
 
 import json
+from unittest import mock
 
 import pytest
+from data_manager.actions.basic import delete_tasks
+from data_manager.actions.remove_duplicates import move_annotations
 from django.db import transaction
 from io_storages.azure_blob.models import (
     AzureBlobImportStorage,
@@ -225,6 +228,73 @@ def test_action_remove_duplicates_with_annotations(business_client, project_id):
     assert task2.annotations.filter(was_cancelled=True).count() == 1, 'was_cancelled counter wrong'
 
 
+@pytest.mark.django_db
+def test_action_remove_duplicates_in_chunks(business_client, project_id, settings):
+    """Duplicated groups are read in chunks of BATCH_SIZE hash groups,
+    tasks with the "$undefined$" data key are grouped after the key is replaced by the first config field
+    """
+    settings.BATCH_SIZE = 1
+    project = Project.objects.get(pk=project_id)
+    project.label_config = (
+        '<View><Image name="image" value="$image"/>'
+        '<Choices name="label" toName="image"><Choice value="A"/></Choices></View>'
+    )
+    project.save()
+
+    task1 = make_task({'data': {'image': 'a.jpg'}}, project)
+    make_task({'data': {'image': 'a.jpg'}}, project)
+    task3 = make_task({'data': {'image': 'b.jpg'}}, project)
+    make_task({'data': {'image': 'b.jpg'}}, project)
+    task5 = make_task({'data': {'image': 'c.jpg'}}, project)
+    make_task({'data': {settings.DATA_UNDEFINED_NAME: 'c.jpg'}}, project)
+    make_task({'data': {settings.DATA_UNDEFINED_NAME: 'c.jpg'}}, project)
+    task8 = make_task({'data': {'image': 'd.jpg'}}, project)
+
+    with mock.patch('data_manager.actions.remove_duplicates.delete_tasks', wraps=delete_tasks) as delete:
+        status = business_client.post(
+            f'/api/dm/actions?project={project_id}&id=remove_duplicates',
+            json={'selectedItems': {'all': True, 'excluded': []}},
+        )
+
+    assert status.status_code == 200
+    assert list(project.tasks.order_by('id').values_list('id', flat=True)) == [task1.id, task3.id, task5.id, task8.id]
+    # project level bookkeeping runs once for all chunks
+    assert delete.call_count == 1
+
+
+@pytest.mark.django_db
+def test_action_remove_duplicates_undefined_key_joins_group(business_client, project_id, settings):
+    """Ordinary duplicates matching the hash of a "$undefined$" task are grouped only once with it"""
+    settings.BATCH_SIZE = 1
+    project = Project.objects.get(pk=project_id)
+    project.label_config = (
+        '<View><Image name="image" value="$image"/>'
+        '<Choices name="label" toName="image"><Choice value="A"/></Choices></View>'
+    )
+    project.save()
+
+    task1 = make_task({'data': {'image': 'a.jpg'}}, project)
+    make_task({'data': {'image': 'a.jpg'}}, project)
+    task3 = make_task({'data': {'image': 'c.jpg'}}, project)
+    make_task({'data': {'image': 'c.jpg'}}, project)
+    make_task({'data': {settings.DATA_UNDEFINED_NAME: 'c.jpg'}}, project)
+
+    with mock.patch(
+        'data_manager.actions.remove_duplicates.move_annotations', wraps=move_annotations
+    ) as move, mock.patch('data_manager.actions.remove_duplicates.delete_tasks', wraps=delete_tasks) as delete:
+        status = business_client.post(
+            f'/api/dm/actions?project={project_id}&id=remove_duplicates',
+            json={'selectedItems': {'all': True, 'excluded': []}},
+        )
+
+    assert status.status_code == 200
+    assert list(project.tasks.order_by('id').values_list('id', flat=True)) == [task1.id, task3.id]
+    groups = [group for call in move.call_args_list for group in call.args[0].values()]
+    grouped_ids = [task['id'] for group in groups for task in group]
+    assert len(grouped_ids) == len(set(grouped_ids)) == 5
+    assert delete.call_count == 1
+
+
 @pytest.mark.django_db
 def test_action_cache_labels(business_client, project_id):
     """This test checks that the "cache_labels" action works correctly
@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import json
+from unittest import mock
 
 import pytest
 from projects.models import Project
@@ -128,3 +129,24 @@ def test_views_total_counters(tasks_count, annotations_count, predictions_count,
     assert response_data['total'] == tasks_count, response_data
     assert response_data['total_annotations'] == tasks_count * annotations_count, response_data
     assert response_data['total_predictions'] == tasks_count * predictions_count, response_data
+
+
+@pytest.mark.django_db
+def test_tasks_api_schedules_missing_predictions(business_client, project_id):
+    project = Project.objects.get(pk=project_id)
+    project.evaluate_predictions_automatically = True
+    project.save(update_fields=['evaluate_predictions_automatically'])
+    task_ids = [make_task({'data': {'text': str(i)}}, project).id for i in range(3)]
+    make_prediction({'result': []}, task_ids[0])
+
+    # the second task is already waiting for predictions
+    with mock.patch('data_manager.functions.redis_set_many_nx', return_value=[False, True]), mock.patch(
+        'data_manager.functions.start_job_async_or_sync'
+    ) as start_job:
+        response = business_client.get(f'/api/tasks?project={project_id}')
+
+    assert response.status_code == 200, response.content
+    assert sorted(response.json()['predictions_pending']) == task_ids[1:]
+    assert len(response.json()['tasks']) == 3
+    start_job.assert_called_once()
+    assert start_job.call_args.args[1] == [task_ids[2]]
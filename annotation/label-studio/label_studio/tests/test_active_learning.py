@@ -0,0 +1,44 @@
+import math
+
+import pytest
+from tasks.active_learning import entropy, get_class_probabilities, get_uncertainty, least_confidence, margin
+
+
+def region(probabilities=None, score=None):
+    item = {'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['A']}}
+    if probabilities is not None:
+        item['probabilities'] = probabilities
+    if score is not None:
+        item['score'] = score
+    return item
+
+
+def test_get_class_probabilities():
+    result = [region({'A': 0.7, 'B': 0.3}), region([0.5, 0.5, True, 'x']), region(), 'broken']
+    assert get_class_probabilities(result) == [[0.7, 0.3], [0.5, 0.5]]
+    assert get_class_probabilities(None) == []
+
+
+def test_acquisition_functions():
+    result = [region({'A': 0.7, 'B': 0.2, 'C': 0.1})]
+    assert least_confidence(0.7, result) == pytest.approx(0.3)
+    assert least_confidence(None, result) is None
+    assert margin(0.7, result) == pytest.approx(0.5)
+    expected_entropy = -sum(p * math.log(p) for p in (0.7, 0.2, 0.1)) / math.log(3)
+    assert entropy(0.7, result) == pytest.approx(expected_entropy)
+
+    # the most uncertain region counts
+    assert margin(None, [region([0.9, 0.1]), region([0.5, 0.5])]) == pytest.approx(1.0)
+    # no probabilities: fallback to least confidence
+    assert margin(0.8, [region()]) == pytest.approx(0.2)
+    assert entropy(None, [region()]) is None
+
+
+def test_get_uncertainty_setting(settings):
+    result = [region([0.6, 0.4])]
+    settings.ACTIVE_LEARNING_ACQUISITION_FUNCTION = 'margin'
+    assert get_uncertainty(0.6, result) == pytest.approx(0.8)
+    settings.ACTIVE_LEARNING_ACQUISITION_FUNCTION = 'tasks.active_learning.entropy'
+    assert get_uncertainty(0.6, result) == pytest.approx(entropy(0.6, result))
+    settings.ACTIVE_LEARNING_ACQUISITION_FUNCTION = 'least_confidence'
+    assert get_uncertainty('0.6', result) is None
@@ -1,5 +1,8 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import gzip
+import hashlib
+import io
 import json
 
 import pytest
@@ -318,3 +321,205 @@ def test_export_with_predictions(
             assert task['predictions'][0]['score'] == predictions['score']
         else:
             assert task['predictions'] == []
+
+
+@pytest.mark.parametrize('compress', (False, True))
+def test_write_export_data(compress):
+    from data_export.mixins import ExportMixin
+
+    tasks = [{'id': i, 'data': {'text': f'über {i}'}} for i in range(3)]
+    file = io.BytesIO()
+    md5 = ExportMixin().write_export_data(file, iter(tasks), compress=compress)
+
+    content = file.getvalue()
+    assert md5 == hashlib.md5(content).hexdigest()
+    if compress:
+        content = gzip.decompress(content)
+    assert json.loads(content.decode('utf-8')) == tasks
+
+
+@pytest.mark.parametrize('prefetch', (0, 1, 3))
+def test_iter_task_batches_keeps_order(prefetch):
+    from data_export.mixins import ExportMixin
+
+    class Exporter(ExportMixin):
+        def get_task_queryset(self, ids, annotation_filter_options):
+            return [{'id': i} for i in ids]
+
+    timings = {'query': 0.0, 'query_wait': 0.0, 'serialization': 0.0}
+    batches = list(Exporter()._iter_task_batches(list(range(10)), 3, None, prefetch, timings))
+
+    assert batches == [[{'id': i} for i in range(start, min(start + 3, 10))] for start in range(0, 10, 3)]
+    assert timings['query'] > 0
+
+
+def test_ids_to_ranges():
+    from data_export.mixins import ids_to_ranges, ranges_to_ids
+
+    assert ids_to_ranges([]) == []
+    assert ids_to_ranges([5, 1, 2, 3, 7, 8, 3]) == [[1, 3], [5, 5], [7, 8]]
+    assert list(ranges_to_ids([[1, 3], [5, 5], [7, 8]])) == [1, 2, 3, 5, 7, 8]
+
+
+@pytest.mark.django_db
+def test_delta_export_and_compaction(business_client, configured_project):
+    from data_export.models import Export
+    from django.utils import timezone
+
+    project = configured_project
+    changed, removed = Task.objects.filter(project=project).order_by('id')
+    base = Export.objects.create(project=project, created_by=business_client.admin)
+    base.export_to_file()
+    base.refresh_from_db()
+    assert base.status == Export.Status.COMPLETED
+    r = business_client.get(f'/api/projects/{project.id}/exports/{base.id}')
+    assert r.status_code == 200
+    assert 'task_id_ranges' not in r.json()['counters']
+    # watermark has a safety margin, move it so the changes below are the only ones after it
+    Export.objects.filter(id=base.id).update(watermark=timezone.now())
+    base.refresh_from_db()
+
+    Annotation.objects.create(
+        task=changed, project=project, completed_by=business_client.admin, result=[{'value': {'choices': ['class_A']}}]
+    )
+    removed_id = removed.id
+    removed.delete()
+    added = Task.objects.create(project=project, data={'meta_info': 'meta info C', 'text': 'text C'})
+
+    delta = Export.objects.create(project=project, created_by=business_client.admin, base_export=base)
+    delta.export_to_file()
+    delta.refresh_from_db()
+    assert delta.status == Export.Status.COMPLETED
+    assert sorted(task['id'] for task in delta.iter_snapshot_tasks()) == [changed.id, added.id]
+    assert delta.counters['deleted_task_id_ranges'] == [[removed_id, removed_id]]
+
+    compacted = Export.objects.create(project=project, created_by=business_client.admin)
+    compacted.compact_from(delta)
+    compacted.refresh_from_db()
+    assert compacted.status == Export.Status.COMPLETED
+    assert compacted.base_export is None
+    tasks = list(compacted.iter_snapshot_tasks())
+    assert [task['id'] for task in tasks] == [changed.id, added.id]
+    assert len(tasks[0]['annotations']) == 1
+    assert compacted.counters['task_number'] == 2
+
+
+def test_parquet_export_writer(tmp_path):
+    import pyarrow.parquet as pq
+    from data_export.parquet import ParquetExportWriter
+
+    region = {
+        'id': 'r1',
+        'from_name': 'label',
+        'to_name': 'image',
+        'type': 'rectanglelabels',
+        'value': {'x': 10, 'y': 20.5, 'width': 30, 'height': 40, 'rotation': 0, 'rectanglelabels': ['Car']},
+    }
+    tasks = [
+        {
+            'id': i,
+            'data': {'image': f'/data/{i}.jpg'},
+            'created_at': '2024-01-01T00:00:00.000000Z',
+            'annotations': [{'id': 100 + i, 'completed_by': {'id': 1}, 'was_cancelled': False, 'result': [region]}],
+        }
+        for i in range(5)
+    ]
+    with ParquetExportWriter(tmp_path, row_group_size=2) as writer:
+        writer.write(tasks)
+
+    assert pq.ParquetFile(tmp_path / 'tasks.parquet').metadata.num_row_groups == 3
+    assert pq.read_table(tmp_path / 'tasks.parquet', columns=['id']).column('id').to_pylist() == list(range(5))
+    annotations = pq.read_table(tmp_path / 'annotations.parquet', columns=['task_id', 'completed_by']).to_pylist()
+    assert annotations[0] == {'task_id': 0, 'completed_by': 1}
+    regions = pq.read_table(tmp_path / 'regions.parquet', columns=['annotation_id', 'labels', 'y']).to_pylist()
+    assert regions[4] == {'annotation_id': 104, 'labels': ['Car'], 'y': 20.5}
+
+
+@pytest.mark.django_db
+def test_delta_export_requires_base_filter_options(business_client, configured_project):
+    from data_export.models import Export
+
+    project = configured_project
+    base = Export.objects.create(project=project, created_by=business_client.admin)
+    base.export_to_file(task_filter_options={'finished': 'only'})
+    base.refresh_from_db()
+    assert base.counters['filter_options']['task_filter_options'] == {'finished': 'only'}
+
+    # tombstones of a delta with other filters would list tasks which are only filtered out
+    r = business_client.post(
+        f'/api/projects/{project.id}/exports/',
+        data=json.dumps({'base_export': base.id}),
+        content_type='application/json',
+    )
+    assert r.status_code == 400
+    assert 'base_export' in r.json()['validation_errors']
+
+    delta = Export.objects.create(project=project, created_by=business_client.admin, base_export=base)
+    delta.export_to_file()
+    delta.refresh_from_db()
+    assert delta.status == Export.Status.FAILED
+
+
+@pytest.mark.django_db
+def test_delta_export_includes_tasks_with_deleted_predictions(business_client, configured_project):
+    from data_export.models import Export
+    from django.utils import timezone
+
+    project = configured_project
+    task = Task.objects.filter(project=project).order_by('id').first()
+    prediction = Prediction.objects.create(task=task, project=project, result=[], score=0.5)
+    base = Export.objects.create(project=project, created_by=business_client.admin)
+    base.export_to_file()
+    Export.objects.filter(id=base.id).update(watermark=timezone.now())
+    base.refresh_from_db()
+
+    prediction.delete()
+
+    delta = Export.objects.create(project=project, created_by=business_client.admin, base_export=base)
+    delta.export_to_file()
+    delta.refresh_from_db()
+    assert delta.status == Export.Status.COMPLETED
+    assert [t['id'] for t in delta.iter_snapshot_tasks()] == [task.id]
+
+
+@pytest.mark.django_db
+def test_delta_export_includes_tasks_with_deleted_drafts(business_client, configured_project):
+    from data_export.models import Export
+    from django.utils import timezone
+    from tasks.models import AnnotationDraft
+
+    project = configured_project
+    task = Task.objects.filter(project=project).order_by('id').first()
+    draft = AnnotationDraft.objects.create(task=task, user=business_client.admin, result=[])
+    base = Export.objects.create(project=project, created_by=business_client.admin)
+    base.export_to_file()
+    Export.objects.filter(id=base.id).update(watermark=timezone.now())
+    base.refresh_from_db()
+
+    draft.delete()
+
+    delta = Export.objects.create(project=project, created_by=business_client.admin, base_export=base)
+    delta.export_to_file()
+    delta.refresh_from_db()
+    assert delta.status == Export.Status.COMPLETED
+    assert [t['id'] for t in delta.iter_snapshot_tasks()] == [task.id]
+
+
+@pytest.mark.django_db
+def test_base_export_of_deltas_is_not_deleted(business_client, configured_project):
+    from data_export.models import Export
+
+    project = configured_project
+    base = Export.objects.create(project=project, created_by=business_client.admin)
+    base.export_to_file()
+    base.refresh_from_db()
+    delta = Export.objects.create(project=project, created_by=business_client.admin, base_export=base)
+    delta.export_to_file()
+
+    r = business_client.delete(f'/api/projects/{project.id}/exports/{base.id}')
+    assert r.status_code == 400
+    assert Export.objects.filter(id=base.id).exists()
+
+    # snapshot chains are removed together with the project
+    project.delete()
+    assert not Export.objects.filter(id__in=[base.id, delta.id]).exists()
@@ -0,0 +1,32 @@
+from unittest import mock
+
+import pytest
+from core.feature_flags import base, flag_set, flag_snapshot
+
+from .utils import make_annotator, make_project
+
+
+@pytest.mark.django_db
+def test_flag_snapshot_evaluates_flags_once_per_user(business_client):
+    project = make_project(dict(title='test_flag_snapshot'), business_client.user)
+    annotator = make_annotator({'email': 'ann@testflagsnapshot.com'}, project)
+    state = mock.Mock(valid=True)
+    state.to_json_dict.return_value = {'fflag_bulk': True, '$valid': True}
+
+    with mock.patch.object(base, 'client') as client:
+        client.all_flags_state.return_value = state
+        client.variation.return_value = False
+        with flag_snapshot():
+            for _ in range(3):
+                assert flag_set('fflag_bulk', user=business_client.user)
+                assert not flag_set('fflag_missing', user=business_client.user)
+                assert flag_set('fflag_bulk', user=annotator)
+
+        # flags are loaded in bulk for each user, missing flags are evaluated one time
+        assert client.all_flags_state.call_count == 2
+        assert client.variation.call_count == 1
+
+        # out of the snapshot every check goes to the client
+        flag_set('fflag_missing', user=business_client.user)
+        flag_set('fflag_missing', user=business_client.user)
+        assert client.variation.call_count == 3
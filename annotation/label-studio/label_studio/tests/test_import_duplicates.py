@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from tasks.models import Task, hash_task_data
+from tests.conftest import project_choices
+from tests.utils import make_project
+
+pytestmark = pytest.mark.django_db
+
+
+def test_data_hash_doesnt_depend_on_key_order():
+    assert hash_task_data({'image': 'a.jpg', 'meta': {'x': 1, 'y': 2}}) == hash_task_data(
+        {'meta': {'y': 2, 'x': 1}, 'image': 'a.jpg'}
+    )
+    assert hash_task_data({'image': 'a.jpg'}) != hash_task_data({'image': 'b.jpg'})
+
+
+def test_import_skip_duplicates(business_client):
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+
+    r = business_client.post(
+        f'/api/projects/{project.id}/import?skip_duplicates=true',
+        data=json.dumps([{'image': 'a.jpg'}, {'image': 'a.jpg'}, {'image': 'b.jpg'}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    assert r.json()['task_count'] == 2
+    assert r.json()['duplicate_count'] == 1
+
+    r = business_client.post(
+        f'/api/projects/{project.id}/import?skip_duplicates=true',
+        data=json.dumps([{'image': 'b.jpg'}, {'image': 'c.jpg'}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    assert r.json()['duplicate_count'] == 1
+    assert sorted(task.data['image'] for task in Task.objects.filter(project=project)) == ['a.jpg', 'b.jpg', 'c.jpg']
+
+    # duplicates are imported without the parameter
+    r = business_client.post(
+        f'/api/projects/{project.id}/import',
+        data=json.dumps([{'image': 'c.jpg'}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    assert Task.objects.filter(project=project, data_hash=hash_task_data({'image': 'c.jpg'})).count() == 2
+
+
+def test_import_skip_duplicates_of_task_without_hash(business_client):
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    business_client.post(
+        f'/api/projects/{project.id}/import',
+        data=json.dumps([{'image': 'a.jpg'}]),
+        content_type='application/json',
+    )
+    # tasks created before the data_hash column or updated by SQL expressions have no hash
+    Task.objects.filter(project=project).update(data_hash=None)
+
+    r = business_client.post(
+        f'/api/projects/{project.id}/import?skip_duplicates=true',
+        data=json.dumps([{'image': 'a.jpg'}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    assert r.json()['duplicate_count'] == 1
+    assert Task.objects.filter(project=project).count() == 1
+    assert Task.objects.get(project=project).data_hash == hash_task_data({'image': 'a.jpg'})
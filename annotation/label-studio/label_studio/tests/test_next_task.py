@@ -2,14 +2,22 @@
 """
 import json
 import time
+from datetime import timedelta
 from unittest import mock
 
 import pytest
 from core.redis import redis_healthcheck
 from django.apps import apps
+from django.db import connection
+from django.db.models.deletion import Collector
 from django.db.models import Q
-from projects.models import Project
-from tasks.models import Annotation, Prediction, Task
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from projects.functions.labeling_queue import rebuild_labeling_queue
+from projects.functions.next_task import _get_first_unlocked
+from projects.models import LabelingQueue, Project
+from tasks.locks import LocalMemoryTaskLockCache, release_task_locks
+from tasks.models import Annotation, Prediction, Task, TaskLock
 
 from .utils import (
     _client_is_annotator,
@@ -1327,3 +1335,186 @@ def test_overlap_first(business_client, setup_before_upload, show_overlap_first)
     else:
         assert not all_tasks_with_overlap_are_labeled
         assert not all_tasks_without_overlap_are_not_labeled
+
+
+@pytest.mark.django_db
+def test_next_task_from_labeling_queue(business_client, settings, django_capture_on_commit_callbacks):
+    settings.LABELING_QUEUE_ENABLED = True
+    config = dict(
+        title='test_labeling_queue',
+        is_published=True,
+        label_config="""
+            <View>
+              <Text name="text" value="$text"></Text>
+              <Choices name="text_class" choice="single" toName="text">
+                <Choice value="class_A"></Choice>
+                <Choice value="class_B"></Choice>
+              </Choices>
+            </View>""",
+    )
+    annotation_result = json.dumps(
+        [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}}]
+    )
+    project = make_project(config, business_client.user)
+    project.sampling = Project.SEQUENCE
+    project.save()
+    id1 = make_task({'data': {'text': 'aaa'}}, project).id
+    id2 = make_task({'data': {'text': 'bbb'}}, project).id
+    ann1 = make_annotator({'email': 'ann1@testlabelingqueue.com'}, project, True)
+    ann2 = make_annotator({'email': 'ann2@testlabelingqueue.com'}, project, True)
+
+    # the queue is built by a job started after the first request, which uses the regular query path
+    with django_capture_on_commit_callbacks(execute=True):
+        r = ann1.get(f'/api/projects/{project.id}/next')
+    assert r.status_code == 200
+    assert r.json()['id'] == id1
+    assert 'Labeling queue' not in r.json()['queue']
+    assert project.labeling_queue_items.count() == 2
+
+    # id1 is locked by ann1
+    r = ann2.get(f'/api/projects/{project.id}/next')
+    assert r.json()['id'] == id2
+    assert 'Labeling queue' in r.json()['queue']
+
+    # labeled task leaves the queue
+    ann1.post(f'/api/tasks/{id1}/annotations/', data={'task': id1, 'result': annotation_result})
+    assert list(project.labeling_queue_items.values_list('task_id', flat=True)) == [id2]
+
+    # tasks created after the queue build are appended on the next claim
+    id3 = make_task({'data': {'text': 'ccc'}}, project).id
+    r = ann1.get(f'/api/projects/{project.id}/next')
+    assert r.json()['id'] == id3
+    assert sorted(project.labeling_queue_items.values_list('task_id', flat=True)) == [id2, id3]
+
+
+@pytest.mark.django_db
+def test_labeling_queue_with_overlap(business_client, settings, django_capture_on_commit_callbacks):
+    settings.LABELING_QUEUE_ENABLED = True
+    project = make_project(
+        dict(title='test_labeling_queue_overlap', is_published=True, maximum_annotations=2), business_client.user
+    )
+    project.sampling = Project.UNIFORM
+    project.save()
+    task_id = make_task({'data': {'text': 'aaa'}}, project).id
+    ann1 = make_annotator({'email': 'ann1@testlabelingqueueoverlap.com'}, project, True)
+    ann2 = make_annotator({'email': 'ann2@testlabelingqueueoverlap.com'}, project, True)
+    ann3 = make_annotator({'email': 'ann3@testlabelingqueueoverlap.com'}, project, True)
+
+    # random ranks are in [0, 1) on all databases
+    with django_capture_on_commit_callbacks(execute=True):
+        assert ann1.get(f'/api/projects/{project.id}/next').json()['id'] == task_id
+    assert 0 <= project.labeling_queue_items.get().rank < 1
+
+    # the lock of ann1 leaves one more slot for overlap=2
+    r = ann2.get(f'/api/projects/{project.id}/next')
+    assert r.json()['id'] == task_id
+    assert 'Labeling queue' in r.json()['queue']
+
+    assert ann3.get(f'/api/projects/{project.id}/next').status_code == 404
+
+
+@pytest.mark.django_db
+def test_labeling_queue_rebuild_in_background(business_client, settings, django_capture_on_commit_callbacks):
+    settings.LABELING_QUEUE_ENABLED = True
+    project = make_project(dict(title='test_labeling_queue_rebuild', is_published=True), business_client.user)
+    project.sampling = Project.SEQUENCE
+    project.save()
+    id1, id2, id3 = [make_task({'data': {'text': text}}, project).id for text in ('aaa', 'bbb', 'ccc')]
+    rebuild_labeling_queue(project.id)
+    assert list(project.labeling_queue_items.order_by('rank').values_list('task_id', flat=True)) == [id1, id2, id3]
+
+    # bulk changes don't send signals: id1 is labeled and id3 is lost by the queue
+    Task.objects.filter(id=id1).update(is_labeled=True)
+    project.labeling_queue_items.filter(task_id=id3).delete()
+    LabelingQueue.objects.filter(project=project).update(built_at=now() - timedelta(days=1))
+
+    # the expired queue is still used by the request, the refresh job starts after the commit
+    ann1 = make_annotator({'email': 'ann1@testlabelingqueuerebuild.com'}, project, True)
+    with mock.patch(
+        'projects.functions.labeling_queue.start_job_async_or_sync'
+    ) as start_job, django_capture_on_commit_callbacks(execute=True):
+        r = ann1.get(f'/api/projects/{project.id}/next')
+    assert r.json()['id'] == id2
+    assert 'Labeling queue' in r.json()['queue']
+    start_job.assert_called_once_with(rebuild_labeling_queue, project.id, queue_name='low')
+    # the claim drops the labeled candidate, the lost task is restored by the job only
+    assert list(project.labeling_queue_items.values_list('task_id', flat=True)) == [id2]
+
+    rebuild_labeling_queue(project.id)
+    assert sorted(project.labeling_queue_items.values_list('task_id', flat=True)) == [id2, id3]
+
+
+@pytest.mark.parametrize(
+    'skip_queue, expected_index',
+    [
+        (Project.SkipQueue.REQUEUE_FOR_OTHERS, 0),
+        (Project.SkipQueue.IGNORE_SKIPPED, 1),
+    ],
+)
+@pytest.mark.django_db
+def test_get_first_unlocked_under_contention(business_client, skip_queue, expected_index):
+    project = make_project(dict(title='test_contention', skip_queue=skip_queue), business_client.user)
+    tasks = [make_task({'data': {'text': str(i)}}, project) for i in range(60)]
+    annotators = [make_annotator({'email': f'ann{i}@testcontention.com'}, project) for i in range(50)]
+    user = make_annotator({'email': 'user@testcontention.com'}, project)
+
+    # the head of the queue is locked by other annotators
+    expire_at = now() + timedelta(hours=1)
+    TaskLock.objects.bulk_create(
+        [TaskLock(task=task, user=annotator, expire_at=expire_at) for task, annotator in zip(tasks, annotators)]
+    )
+    # skipped annotation of another user is counted depending on the skip queue mode
+    make_annotation({'result': [], 'was_cancelled': True, 'completed_by': annotators[0]}, tasks[50].id)
+
+    with CaptureQueriesContext(connection) as queries:
+        task = _get_first_unlocked(project.tasks.order_by('id'), user, project)
+
+    assert task.id == tasks[50 + expected_index].id
+    # has_lock made several queries per locked candidate
+    assert len(queries) <= 10
+
+
+@pytest.mark.parametrize('task_lock_cache', ['', 'locmem'])
+@pytest.mark.django_db
+def test_task_lock_upsert_and_cache(
+    business_client, settings, monkeypatch, task_lock_cache, django_capture_on_commit_callbacks
+):
+    settings.TASK_LOCK_CACHE = task_lock_cache
+    monkeypatch.setattr('tasks.locks._local_memory_cache', LocalMemoryTaskLockCache())
+    project = make_project(dict(title='test_task_locks', maximum_annotations=2), business_client.user)
+    task = make_task({'data': {'text': 'aaa'}}, project)
+    ann1 = make_annotator({'email': 'ann1@testtasklocks.com'}, project)
+    ann2 = make_annotator({'email': 'ann2@testtasklocks.com'}, project)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        task.set_lock(ann1)
+        task.set_lock(ann1)
+        task.set_lock(ann2)
+    # the second lock of the same user refreshes the first one
+    assert task.locks.filter(user=ann1).count() == 1
+    assert task.num_locks == 2
+    assert task.num_locks_user(ann1) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        task.release_lock(ann1)
+    assert task.num_locks == 1
+    assert task.num_locks_user(ann2) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        task.release_lock()
+    assert task.num_locks == 0
+    assert not task.locks.exists()
+
+    # locks released by other users' querysets (e.g. removed organization members) leave the cache too
+    with django_capture_on_commit_callbacks(execute=True):
+        task.set_lock(ann1)
+    assert task.num_locks == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        release_task_locks(TaskLock.objects.filter(user=ann1))
+    assert task.num_locks == 0
+
+
+@pytest.mark.django_db
+def test_task_locks_are_fast_deleted():
+    # signal receivers on TaskLock would make every delete and cascade load the locks row by row
+    assert Collector(using='default').can_fast_delete(TaskLock.objects.all())